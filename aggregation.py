@@ -0,0 +1,454 @@
+"""Vectorized aggregation of benchmark samples.
+
+Samples from a whole run (or many runs) are loaded into NumPy columns and
+grouped by a key such as (model, context tier). One pass per metric then
+gives every group's mean, sample std, min/max, percentiles, CV, IQR outlier
+count and bootstrap confidence interval at once, instead of re-sorting
+Python lists group by group.
+
+Used by the CLI (benchmark.run_benchmarks), the benchmark job handler
+(routers.helpers._aggregate) and the history/analytics endpoints
+(db.get_benchmark_results / get_benchmark_results_for_runs). The prefill
+probe mode also fits its latency-vs-context curves here.
+
+Percentiles use the default "exclusive" method of ``statistics.quantiles``.
+Quantiles are given as integer fractions ``(i, q)``, so the interpolation
+positions are exact.
+"""
+
+from typing import Hashable, Optional, Sequence
+
+import numpy as np
+
+BOOTSTRAP_RESAMPLES = 1000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 0             # fixed, so every view of a run shows the same CI
+_BOOTSTRAP_BLOCK = 2_000_000   # resampled values held in memory at once
+
+P50, P90, P95, P99, Q1, Q3 = (1, 2), (9, 10), (19, 20), (99, 100), (1, 4), (3, 4)
+
+
+# ---------------------------------------------------------------------------
+# Columnar samples
+# ---------------------------------------------------------------------------
+
+def _value(row, field: str):
+    v = row.get(field) if isinstance(row, dict) else getattr(row, field, None)
+    return np.nan if v is None else v
+
+
+class SampleGroups:
+    """Samples as float64 columns, sorted so each group is contiguous.
+
+    ``rows`` may be dicts or objects (e.g. RunResult) and ``keys`` holds the
+    group key of each row. Missing/None values become NaN and are ignored by
+    the statistics.
+    """
+
+    def __init__(self, rows: Sequence, keys: Sequence[Hashable], fields: Sequence[str]):
+        index: dict = {}
+        codes = np.fromiter(
+            (index.setdefault(k, len(index)) for k in keys), dtype=np.int64, count=len(rows),
+        )
+        order = np.argsort(codes, kind="stable")
+        self.keys = list(index)
+        self.n_groups = len(self.keys)
+        self.codes = codes[order]
+        self.rows = [rows[i] for i in order]
+        self.columns = {
+            f: np.array([_value(r, f) for r in self.rows], dtype=np.float64) for f in fields
+        }
+        self.counts = np.bincount(self.codes, minlength=self.n_groups)
+        self.first = np.concatenate(([0], np.cumsum(self.counts)[:-1])).astype(np.int64)
+
+
+# ---------------------------------------------------------------------------
+# Grouped statistics
+# ---------------------------------------------------------------------------
+
+def _gather(values: np.ndarray, idx: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    out = np.full(len(mask), np.nan)
+    out[mask] = values[idx[mask]]
+    return out
+
+
+def _quantile(sorted_vals, starts, counts, frac: tuple[int, int]) -> np.ndarray:
+    """Exclusive-method quantile i/q per group (``statistics.quantiles`` semantics)."""
+    i, q = frac
+    out = _gather(sorted_vals, starts, counts == 1)
+    multi = counts >= 2
+    if multi.any():
+        n = counts[multi]
+        pos = i * (n + 1)                          # position * q, 1-based
+        j = np.clip(pos // q, 1, n - 1)
+        lo = sorted_vals[starts[multi] + j - 1]
+        hi = sorted_vals[starts[multi] + j]
+        out[multi] = lo + (pos - j * q) / q * (hi - lo)
+    return out
+
+
+def _bootstrap_mean_ci(sorted_vals, codes, starts, counts, rng, resamples, confidence):
+    """Percentile bootstrap CI of the mean for every group with >= 2 samples."""
+    low = np.full(len(counts), np.nan)
+    high = np.full(len(counts), np.nan)
+    eligible = counts >= 2
+    if not eligible.any():
+        return low, high
+    sel = eligible[codes]
+    slot_start, slot_n = starts[codes][sel], counts[codes][sel]
+    groups = np.flatnonzero(eligible)
+    seg = np.concatenate(([0], np.cumsum(counts[groups])[:-1]))
+    total = int(sel.sum())
+
+    means = np.empty((resamples, len(groups)))
+    block = max(1, _BOOTSTRAP_BLOCK // total)
+    for b0 in range(0, resamples, block):
+        b = min(block, resamples - b0)
+        idx = slot_start + (rng.random((b, total)) * slot_n).astype(np.int64)
+        means[b0:b0 + b] = np.add.reduceat(sorted_vals[idx], seg, axis=1) / counts[groups]
+
+    alpha = (1 - confidence) / 2
+    low[groups], high[groups] = np.quantile(means, [alpha, 1 - alpha], axis=0)
+    return low, high
+
+
+def grouped_stats(
+    values: np.ndarray,
+    codes: np.ndarray,
+    n_groups: int,
+    quantiles: Sequence[tuple[int, int]] = (),
+    outliers: bool = False,
+    bootstrap: bool = False,
+    rng: np.random.Generator | None = None,
+) -> dict[str, np.ndarray]:
+    """Per-group statistics of ``values`` in one pass (NaNs are ignored).
+
+    Returns arrays indexed by group code: n, sum, mean, std (sample, 0 when
+    n < 2), pstd (population), min, max, one entry per requested quantile
+    (keyed by the (i, q) tuple), plus "outliers" (IQR fences, n >= 4) and
+    "ci_low"/"ci_high" (bootstrap CI of the mean) when requested.
+    """
+    keep = ~np.isnan(values)
+    values, codes = values[keep], codes[keep]
+    order = np.lexsort((values, codes))
+    values, codes = values[order], codes[order]
+
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    has = counts > 0
+    sums = np.bincount(codes, weights=values, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(has, sums / counts, np.nan)
+        dev = values - mean[codes]
+        ss = np.bincount(codes, weights=dev * dev, minlength=n_groups)
+        std = np.where(counts >= 2, np.sqrt(ss / (counts - 1)), 0.0)
+        pstd = np.where(has, np.sqrt(ss / counts), 0.0)
+
+    out = {
+        "n": counts,
+        "sum": sums,
+        "mean": mean,
+        "std": std,
+        "pstd": pstd,
+        "min": _gather(values, starts, has),
+        "max": _gather(values, starts + counts - 1, has),
+    }
+    for frac in set(quantiles) | ({Q1, Q3} if outliers else set()):
+        out[frac] = _quantile(values, starts, counts, frac)
+
+    if outliers:
+        iqr = out[Q3] - out[Q1]
+        lower, upper = out[Q1] - 1.5 * iqr, out[Q3] + 1.5 * iqr
+        outside = (values < lower[codes]) | (values > upper[codes])
+        out["outliers"] = np.where(
+            counts >= 4, np.bincount(codes, weights=outside, minlength=n_groups), 0,
+        ).astype(np.int64)
+
+    if bootstrap:
+        out["ci_low"], out["ci_high"] = _bootstrap_mean_ci(
+            values, codes, starts, counts,
+            rng if rng is not None else np.random.default_rng(BOOTSTRAP_SEED),
+            BOOTSTRAP_RESAMPLES, BOOTSTRAP_CONFIDENCE,
+        )
+    return out
+
+
+def percentile(values: Sequence[float], frac: tuple[int, int]) -> float:
+    """Quantile ``frac`` of one sample list by the same method as grouped_stats.
+
+    For single summaries (load steps, throughput levels, replays, ITL
+    distributions) so they match the aggregated views. None/NaN values are
+    ignored; 0.0 when there is no data.
+    """
+    vals = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    if not len(vals):
+        return 0.0
+    q = grouped_stats(vals, np.zeros(len(vals), dtype=np.int64), 1, quantiles=(frac,))[frac][0]
+    return 0.0 if np.isnan(q) else float(q)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark run summaries (AggregatedResult fields)
+# ---------------------------------------------------------------------------
+
+RUN_FIELDS = (
+    "success", "tokens_per_second", "ttft_ms", "total_time_s", "output_tokens", "cost",
+    "input_tokens_per_second", "output_speed_tps", "itl_ms", "connection_reused",
+    "reasoning_tokens", "ttft_reasoning_ms", "ttft_answer_ms", "reasoning_tps", "answer_tps",
+)
+
+# Reasoning-phase means, None for groups without a reasoning run
+REASONING_MEANS = ("reasoning_tokens", "ttft_reasoning_ms", "ttft_answer_ms", "reasoning_tps", "answer_tps")
+
+
+def _f(x) -> float:
+    return 0.0 if np.isnan(x) else float(x)
+
+
+def _opt(x) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
+
+
+def _confidence_level(cv_tps: float, n: int) -> str:
+    if cv_tps < 10 and n >= 3:
+        return "high"
+    if cv_tps > 30 or n == 1:
+        return "low"
+    return "medium"
+
+
+def _ttft_by_connection(ttft, reused, codes, n_groups) -> tuple[np.ndarray, np.ndarray]:
+    """Mean TTFT per group over cold (new connection) and warm (reused) samples.
+
+    Samples whose reuse was not observed (NaN) count toward neither.
+    """
+    cold = grouped_stats(np.where(reused == 0, ttft, np.nan), codes, n_groups)["mean"]
+    warm = grouped_stats(np.where(reused == 1, ttft, np.nan), codes, n_groups)["mean"]
+    return cold, warm
+
+
+def summarize_runs(rows: Sequence, keys: Sequence[Hashable]) -> list[tuple[Hashable, dict]]:
+    """Aggregate benchmark runs grouped by ``keys`` into AggregatedResult fields.
+
+    ``rows`` are RunResults or result dicts, ``keys`` their group keys. Returns ``(key, fields)`` per
+    group in first-seen order. ``fields`` maps AggregatedResult attribute
+    names to values (only runs/failures are set for all-failure groups).
+    """
+    if not rows:
+        return []
+    g = SampleGroups(rows, keys, RUN_FIELDS)
+    ok = g.columns["success"] == 1
+    n_groups, codes = g.n_groups, g.codes
+
+    def col(field, positive=False):
+        v = g.columns[field]
+        mask = ok & (v > 0) if positive else ok
+        return np.where(mask, v, np.nan)
+
+    rng = np.random.default_rng(BOOTSTRAP_SEED)
+    tps = grouped_stats(col("tokens_per_second"), codes, n_groups, (P50, P95), outliers=True, bootstrap=True, rng=rng)
+    ttft = grouped_stats(col("ttft_ms"), codes, n_groups, (P50, P95, P99), bootstrap=True, rng=rng)
+    means = {
+        f: grouped_stats(col(f, positive), codes, n_groups)["mean"]
+        for f, positive in (
+            ("total_time_s", False), ("output_tokens", False),
+            ("input_tokens_per_second", True), ("output_speed_tps", True), ("itl_ms", True),
+        )
+    }
+    cost = grouped_stats(np.where(ok, np.nan_to_num(g.columns["cost"]), np.nan), codes, n_groups)
+    ttft_cold, ttft_warm = _ttft_by_connection(col("ttft_ms"), g.columns["connection_reused"], codes, n_groups)
+    reasoning = {f: grouped_stats(col(f), codes, n_groups)["mean"] for f in REASONING_MEANS}
+
+    out = []
+    for k, key_value in enumerate(g.keys):
+        n = int(tps["n"][k])
+        fields = {"runs": int(g.counts[k]), "failures": int(g.counts[k]) - n}
+        if n:
+            t_max = _f(tps["max"][k])
+            tt_max = _f(ttft["max"][k])
+            mean_tps, mean_ttft = _f(tps["mean"][k]), _f(ttft["mean"][k])
+            std_tps, std_ttft = _f(tps["std"][k]), _f(ttft["std"][k])
+            cv_tps = std_tps / mean_tps * 100 if n >= 2 and mean_tps > 0 else 0.0
+            fields.update({
+                "avg_ttft_ms": mean_ttft,
+                "avg_total_time_s": _f(means["total_time_s"][k]),
+                "avg_tokens_per_second": mean_tps,
+                "avg_output_tokens": _f(means["output_tokens"][k]),
+                "avg_cost": _f(cost["mean"][k]),
+                "total_cost": _f(cost["sum"][k]),
+                "avg_input_tps": _f(means["input_tokens_per_second"][k]),
+                "avg_output_speed_tps": _f(means["output_speed_tps"][k]),
+                "avg_itl_ms": _f(means["itl_ms"][k]),
+                "std_dev_tps": std_tps,
+                "min_tps": _f(tps["min"][k]),
+                "max_tps": t_max,
+                "p50_tps": _f(tps[P50][k]),
+                "p95_tps": _f(tps[P95][k]) if n >= 4 else t_max,
+                "outlier_count": int(tps["outliers"][k]),
+                "std_dev_ttft": std_ttft,
+                "p50_ttft": _f(ttft[P50][k]),
+                "p95_ttft": _f(ttft[P95][k]) if n >= 4 else tt_max,
+                "p99_ttft": _f(ttft[P99][k]) if n >= 5 else tt_max,
+                "cv_tps": cv_tps,
+                "cv_ttft": std_ttft / mean_ttft * 100 if n >= 2 and mean_ttft > 0 else 0.0,
+                "confidence_level": _confidence_level(cv_tps, n),
+                "ci_low_tps": _f(tps["ci_low"][k]),
+                "ci_high_tps": _f(tps["ci_high"][k]),
+                "ci_low_ttft": _f(ttft["ci_low"][k]),
+                "ci_high_ttft": _f(ttft["ci_high"][k]),
+                "avg_ttft_cold_ms": _opt(ttft_cold[k]),
+                "avg_ttft_warm_ms": _opt(ttft_warm[k]),
+                **{f"avg_{f}": _opt(reasoning[f][k]) for f in REASONING_MEANS},
+            })
+        out.append((key_value, fields))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Stored result rows (history / analytics views)
+# ---------------------------------------------------------------------------
+
+SAMPLE_FIELDS = (
+    "success", "tokens_per_second", "ttft_ms", "total_time_s", "input_tokens_per_second",
+    "output_speed_tps", "itl_ms", "itl_p50_ms", "itl_p90_ms", "itl_p99_ms",
+    "max_stall_ms", "stall_count", "cost",
+    "dns_ms", "connect_ms", "tls_ms", "server_wait_ms", "first_byte_ms", "connection_reused",
+    *REASONING_MEANS,
+)
+
+
+def _r(x, digits: int):
+    return None if np.isnan(x) else round(float(x), digits)
+
+
+def summarize_result_rows(samples: Sequence[dict]) -> dict[str, list[dict]]:
+    """Per-(run, model, tier) summaries of stored benchmark_results rows.
+
+    ``samples`` are rows with run_id, model_id, model, provider,
+    context_tokens, error and the SAMPLE_FIELDS columns. Returns
+    {run_id: [row, ...]}. Each run's rows are ordered by avg_tokens_per_second
+    (desc, NULLs last) and then by context_tokens.
+    """
+    if not samples:
+        return {}
+    keys = [(s["run_id"], s["model_id"], s["context_tokens"]) for s in samples]
+    g = SampleGroups(samples, keys, SAMPLE_FIELDS)
+    ok = g.columns["success"] == 1
+    n_groups, codes = g.n_groups, g.codes
+
+    def stats(field, **kw):
+        return grouped_stats(np.where(ok, g.columns[field], np.nan), codes, n_groups, **kw)
+
+    ospeed_col = g.columns["output_speed_tps"]
+    speed = np.where(np.isnan(ospeed_col) | (ospeed_col == 0), g.columns["tokens_per_second"], ospeed_col)
+    rng = np.random.default_rng(BOOTSTRAP_SEED)
+    ospeed = grouped_stats(np.where(ok, speed, np.nan), codes, n_groups, (P50, P95), outliers=True, bootstrap=True, rng=rng)
+    ttft = stats("ttft_ms", quantiles=(P50, P95, P99))
+    avg = {f: stats(f)["mean"] for f in (
+        "tokens_per_second", "total_time_s", "input_tokens_per_second", "itl_ms",
+        "itl_p50_ms", "itl_p90_ms", "itl_p99_ms", "cost",
+        "dns_ms", "connect_ms", "tls_ms", "server_wait_ms", "first_byte_ms", *REASONING_MEANS,
+    )}
+    reused = stats("connection_reused")
+    ttft_cold, ttft_warm = _ttft_by_connection(
+        np.where(ok, g.columns["ttft_ms"], np.nan), g.columns["connection_reused"], codes, n_groups,
+    )
+    stalls = stats("stall_count")
+    max_stall = stats("max_stall_ms")["max"]
+
+    by_run: dict[str, list[dict]] = {}
+    for k, (run_id, model_id, context_tokens) in enumerate(g.keys):
+        start, count = int(g.first[k]), int(g.counts[k])
+        first = g.rows[start]
+        errors = [r.get("error") for r in g.rows[start:start + count] if r.get("error")]
+        n_ok = int(ospeed["n"][k])
+        by_run.setdefault(run_id, []).append({
+            "model_id": model_id,
+            "model": first.get("model"),
+            "provider": first.get("provider"),
+            "context_tokens": context_tokens,
+            "runs": count,
+            "avg_tokens_per_second": _r(avg["tokens_per_second"][k], 2),
+            "avg_ttft_ms": _r(ttft["mean"][k], 1),
+            "avg_total_time_s": _r(avg["total_time_s"][k], 3),
+            "avg_input_tokens_per_second": _r(avg["input_tokens_per_second"][k], 2),
+            "avg_output_speed_tps": _r(ospeed["mean"][k], 2),
+            "avg_itl_ms": _r(avg["itl_ms"][k], 1),
+            "avg_itl_p50_ms": _r(avg["itl_p50_ms"][k], 1),
+            "avg_itl_p90_ms": _r(avg["itl_p90_ms"][k], 1),
+            "avg_itl_p99_ms": _r(avg["itl_p99_ms"][k], 1),
+            "max_stall_ms": _r(max_stall[k], 1),
+            "stall_count": int(stalls["sum"][k]) if stalls["n"][k] else None,
+            "std_dev_tps": round(float(ospeed["pstd"][k]), 2) if n_ok >= 2 else 0,
+            "p50_output_speed_tps": _r(ospeed[P50][k], 2),
+            "p95_output_speed_tps": _r(ospeed[P95][k] if n_ok >= 4 else ospeed["max"][k], 2),
+            "output_speed_ci_low": _r(ospeed["ci_low"][k], 2),
+            "output_speed_ci_high": _r(ospeed["ci_high"][k], 2),
+            "outlier_count": int(ospeed["outliers"][k]),
+            "p50_ttft_ms": _r(ttft[P50][k], 1),
+            "p95_ttft_ms": _r(ttft[P95][k] if n_ok >= 4 else ttft["max"][k], 1),
+            "p99_ttft_ms": _r(ttft[P99][k] if n_ok >= 5 else ttft["max"][k], 1),
+            "avg_cost": _r(avg["cost"][k], 8),
+            "avg_dns_ms": _r(avg["dns_ms"][k], 2),
+            "avg_connect_ms": _r(avg["connect_ms"][k], 2),
+            "avg_tls_ms": _r(avg["tls_ms"][k], 2),
+            "avg_server_wait_ms": _r(avg["server_wait_ms"][k], 1),
+            "avg_first_byte_ms": _r(avg["first_byte_ms"][k], 1),
+            "cold_connections": int(reused["n"][k] - reused["sum"][k]) if reused["n"][k] else None,
+            "avg_ttft_cold_ms": _r(ttft_cold[k], 1),
+            "avg_ttft_warm_ms": _r(ttft_warm[k], 1),
+            "avg_reasoning_tokens": _r(avg["reasoning_tokens"][k], 1),
+            "avg_ttft_reasoning_ms": _r(avg["ttft_reasoning_ms"][k], 1),
+            "avg_ttft_answer_ms": _r(avg["ttft_answer_ms"][k], 1),
+            "avg_reasoning_tps": _r(avg["reasoning_tps"][k], 2),
+            "avg_answer_tps": _r(avg["answer_tps"][k], 2),
+            "success_count": n_ok,
+            "error_count": count - int(ok[start:start + count].sum()),
+            "error": max(errors) if errors else None,
+        })
+
+    for rows in by_run.values():
+        rows.sort(key=lambda r: (r["avg_tokens_per_second"] is None, -(r["avg_tokens_per_second"] or 0), r["context_tokens"]))
+    return by_run
+
+
+# ---------------------------------------------------------------------------
+# Latency vs context curves (prefill probe)
+# ---------------------------------------------------------------------------
+
+def fit_latency_curve(tokens: Sequence[float], latency_ms: Sequence[float]) -> Optional[dict]:
+    """Least-squares fit of ``latency_ms = a + b*n + c*n^2`` over prompt tokens ``n``.
+
+    ``b`` is the linear (per-token) prefill cost and ``c`` the quadratic
+    (attention) term. With only two distinct token counts the fit is linear
+    (c = 0); with fewer it returns None. ``r2`` is measured on the samples.
+    """
+    x = np.asarray(tokens, dtype=np.float64)
+    y = np.asarray(latency_ms, dtype=np.float64)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    distinct = np.unique(x).size
+    if distinct < 2:
+        return None
+    degree = 2 if distinct >= 3 else 1
+    coeffs = np.polynomial.polynomial.polyfit(x, y, degree)
+    a, b, c = (list(coeffs) + [0.0])[:3]
+    residual = y - (a + b * x + c * x * x)
+    ss_tot = float(((y - y.mean()) ** 2).sum())
+    return {
+        "intercept_ms": float(a),
+        "per_token_ms": float(b),
+        "per_token_sq_ms": float(c),
+        "degree": degree,
+        "r2": 1.0 - float((residual ** 2).sum()) / ss_tot if ss_tot > 0 else 1.0,
+        "samples": int(x.size),
+        "min_tokens": float(x.min()),
+        "max_tokens": float(x.max()),
+    }
+
+
+def predict_latency(curve: dict, tokens: Sequence[float]) -> list[float]:
+    """Evaluate a ``fit_latency_curve`` result at each token count."""
+    n = np.asarray(tokens, dtype=np.float64)
+    pred = curve["intercept_ms"] + curve["per_token_ms"] * n + curve["per_token_sq_ms"] * n * n
+    return [float(v) for v in pred]
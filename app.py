@@ -45,6 +45,9 @@ import auth  # noqa: E402
 import db  # noqa: E402
 from ws_manager import ConnectionManager  # noqa: E402
 from job_registry import registry as job_registry  # noqa: E402
+from measurement_loop import measurement_loop  # noqa: E402
+from http_clients import aclose_clients  # noqa: E402
+import perf_profiles  # noqa: E402
 
 from contextlib import asynccontextmanager
 
@@ -273,13 +276,18 @@ async def lifespan(app_instance):
     await job_registry.startup()
     # Launch background scheduler for scheduled benchmarks
     scheduler_task = asyncio.create_task(_run_scheduler())
+    # Keep per-model latency profiles (adaptive timeouts) fresh from history
+    perf_task = asyncio.create_task(perf_profiles.run_refresh_loop())
     yield
+    perf_task.cancel()
     scheduler_task.cancel()
     try:
         await scheduler_task
     except asyncio.CancelledError:
         logger.debug("Scheduler task cancelled during shutdown")
     await job_registry.shutdown()
+    await aclose_clients()
+    measurement_loop.stop()
 
 
 # ---------------------------------------------------------------------------
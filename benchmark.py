@@ -12,10 +12,15 @@ Usage:
 """
 
 import argparse
+import hashlib
 import json
+import mmap
 import os
+import random
 import statistics
+import sys
 import time
+from array import array
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -37,6 +42,8 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
+from aggregation import P50, P90, P99, percentile, summarize_runs
+
 # Suppress LiteLLM noise by default
 litellm.suppress_debug_info = True
 
@@ -63,6 +70,8 @@ class Target:
     input_cost_per_mtok: Optional[float] = None   # custom $/1M input tokens
     output_cost_per_mtok: Optional[float] = None  # custom $/1M output tokens
     system_prompt: Optional[str] = None            # per-model system prompt (prepended to all requests)
+    rpm: Optional[int] = None                      # provider requests/minute limit (shared scheduler)
+    tpm: Optional[int] = None                      # provider tokens/minute limit (shared scheduler)
 
 
 @dataclass
@@ -81,6 +90,34 @@ class RunResult:
     input_tokens_per_second: float = 0.0
     output_speed_tps: float = 0.0   # Output tokens/sec EXCLUDING TTFT
     itl_ms: float = 0.0             # Inter-token latency in ms
+    # Per-chunk timeline (opt-in): packed float32 ms deltas + ITL distribution
+    chunk_timeline: Optional[bytes] = None
+    itl_p50_ms: float = 0.0
+    itl_p90_ms: float = 0.0
+    itl_p99_ms: float = 0.0
+    max_stall_ms: float = 0.0
+    stall_count: int = 0
+    cached_tokens: int = 0          # prompt tokens served from the provider's prefix cache
+    # Connection phases, ms (capture_phases only; None = not observed).
+    # dns/connect/tls are durations, the rest are offsets from the send.
+    dns_ms: Optional[float] = None
+    connect_ms: Optional[float] = None
+    tls_ms: Optional[float] = None
+    request_sent_ms: Optional[float] = None
+    server_wait_ms: Optional[float] = None
+    first_byte_ms: Optional[float] = None
+    stream_end_ms: Optional[float] = None
+    connection_reused: Optional[bool] = None
+    # Decode tok/s per output window (decay mode) and its least-squares slope
+    decode_windows: Optional[list[float]] = None
+    decode_slope_tps_per_1k: Optional[float] = None
+    # Reasoning vs answer phases (None when the run showed no reasoning).
+    # ttft_* are offsets from the send, *_tps are tokens over each phase.
+    reasoning_tokens: Optional[int] = None
+    ttft_reasoning_ms: Optional[float] = None
+    ttft_answer_ms: Optional[float] = None
+    reasoning_tps: Optional[float] = None
+    answer_tps: Optional[float] = None
 
 
 @dataclass
@@ -119,6 +156,195 @@ class AggregatedResult:
     cv_ttft: float = 0.0
     # Confidence level
     confidence_level: str = ""  # "high" / "medium" / "low"
+    # Bootstrap 95% confidence intervals of the mean
+    ci_low_tps: float = 0.0
+    ci_high_tps: float = 0.0
+    ci_low_ttft: float = 0.0
+    ci_high_ttft: float = 0.0
+    # Mean TTFT of runs that opened a new connection vs reused a pooled one
+    # (None when no run of that kind was observed)
+    avg_ttft_cold_ms: Optional[float] = None
+    avg_ttft_warm_ms: Optional[float] = None
+    # Reasoning vs answer phases, over runs that reasoned (None when none did)
+    avg_reasoning_tokens: Optional[float] = None
+    avg_ttft_reasoning_ms: Optional[float] = None
+    avg_ttft_answer_ms: Optional[float] = None
+    avg_reasoning_tps: Optional[float] = None
+    avg_answer_tps: Optional[float] = None
+
+
+# ---------------------------------------------------------------------------
+# Chunk timelines
+# ---------------------------------------------------------------------------
+
+STALL_THRESHOLD_MS = 250.0  # inter-chunk gap a streaming reader notices as a pause
+
+
+def pack_chunk_timeline(offsets_s: list[float]) -> bytes:
+    """Pack chunk arrival offsets (seconds since request start) into a blob.
+
+    Stored as little-endian float32 millisecond deltas: the first value is the
+    first chunk's offset from the request start, each following value is the
+    gap to the previous chunk.  4 bytes per chunk instead of one row per token.
+    """
+    deltas = array("f")
+    prev = 0.0
+    for t in offsets_s:
+        deltas.append((t - prev) * 1000)
+        prev = t
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    return deltas.tobytes()
+
+
+def unpack_chunk_timeline(blob: bytes) -> list[float]:
+    """Inverse of pack_chunk_timeline: return the float32 ms deltas."""
+    deltas = array("f")
+    deltas.frombytes(blob)
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    return deltas.tolist()
+
+
+def chunk_timeline_stats(deltas_ms: list[float], stall_threshold_ms: float = STALL_THRESHOLD_MS) -> dict:
+    """ITL distribution from timeline deltas (the first delta is TTFT and is excluded)."""
+    gaps = deltas_ms[1:]
+    return {
+        "itl_p50_ms": percentile(gaps, P50),
+        "itl_p90_ms": percentile(gaps, P90),
+        "itl_p99_ms": percentile(gaps, P99),
+        "max_stall_ms": max(gaps) if gaps else 0.0,
+        "stall_count": sum(1 for g in gaps if g > stall_threshold_ms),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Decode windows (long-generation decay)
+# ---------------------------------------------------------------------------
+
+DECODE_WINDOW_TOKENS = 128
+
+
+def decode_window_speeds(arrivals_s: list[float], output_tokens: int, window_tokens: int) -> list[float]:
+    """Decode tok/s over successive windows of ``window_tokens`` output tokens.
+
+    ``arrivals_s`` are content-chunk arrival offsets. The usage token count
+    is spread evenly over the chunks (most providers stream about one token
+    per chunk). Timing starts at the first chunk, so TTFT is excluded. A
+    trailing partial window is kept only if it holds at least half a window.
+    """
+    n = len(arrivals_s)
+    if n < 2 or output_tokens <= 0 or window_tokens <= 0:
+        return []
+    per_chunk = output_tokens / n
+    speeds = []
+    start = 0
+    for i in range(1, n):
+        tokens = (i - start) * per_chunk
+        elapsed = arrivals_s[i] - arrivals_s[start]
+        if tokens >= window_tokens and elapsed > 0:
+            speeds.append(tokens / elapsed)
+            start = i
+    tokens = (n - 1 - start) * per_chunk
+    elapsed = arrivals_s[-1] - arrivals_s[start]
+    if tokens >= window_tokens / 2 and elapsed > 0:
+        speeds.append(tokens / elapsed)
+    return speeds
+
+
+def decode_decay(speeds: list[float], window_tokens: int) -> dict:
+    """Summarize a decode-window profile: slope and first-to-last change.
+
+    ``slope_tps_per_1k`` is the least-squares slope of tok/s against output
+    position (per 1,000 tokens). Negative means decode slows as the KV
+    cache grows.
+    """
+    n = len(speeds)
+    out = {
+        "windows": n,
+        "first_window_tps": round(speeds[0], 2) if speeds else 0.0,
+        "last_window_tps": round(speeds[-1], 2) if speeds else 0.0,
+        "slope_tps_per_1k": None,
+        "decay_pct": None,
+    }
+    if n < 2:
+        return out
+    xs = [(i + 0.5) * window_tokens / 1000 for i in range(n)]
+    mx, my = sum(xs) / n, sum(speeds) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    out["slope_tps_per_1k"] = round(sum((x - mx) * (y - my) for x, y in zip(xs, speeds)) / sxx, 3)
+    if speeds[0] > 0:
+        out["decay_pct"] = round((speeds[-1] / speeds[0] - 1) * 100, 2)
+    return out
+
+
+def pack_decode_windows(speeds: list[float]) -> bytes:
+    """Pack per-window tok/s as little-endian float32 (4 bytes per window)."""
+    values = array("f", speeds)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_decode_windows(blob: bytes) -> list[float]:
+    """Inverse of pack_decode_windows."""
+    values = array("f")
+    values.frombytes(blob)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+# ---------------------------------------------------------------------------
+# Reasoning phases
+# ---------------------------------------------------------------------------
+
+REASONING_FIELDS = ("reasoning_tokens", "ttft_reasoning_ms", "ttft_answer_ms", "reasoning_tps", "answer_tps")
+
+
+def usage_reasoning_tokens(usage) -> Optional[int]:
+    """Reasoning tokens reported in ``usage.completion_tokens_details`` (None if absent)."""
+    details = getattr(usage, "completion_tokens_details", None)
+    tokens = getattr(details, "reasoning_tokens", None) if details is not None else None
+    return tokens if isinstance(tokens, int) and tokens >= 0 else None
+
+
+def split_reasoning_phases(
+    result: "RunResult",
+    first_reasoning_s: Optional[float],
+    first_answer_s: Optional[float],
+    end_s: float,
+    reasoning_chunks: int,
+    answer_chunks: int,
+    reported_reasoning_tokens: Optional[int] = None,
+) -> None:
+    """Fill the reasoning/answer phase fields of ``result``.
+
+    Offsets are seconds from the send. Reasoning tokens are the usage count
+    when the provider reports one, else ``result.output_tokens`` split by
+    the share of reasoning chunks. The reasoning phase runs from the first
+    reasoning chunk to the first answer chunk (or the end of the stream),
+    the answer phase from the first answer chunk to the end. Runs with
+    neither reasoning chunks nor reported reasoning tokens are left as is.
+    """
+    if not reasoning_chunks and not reported_reasoning_tokens:
+        return
+    if reported_reasoning_tokens:
+        reasoning = min(reported_reasoning_tokens, result.output_tokens)
+    else:
+        reasoning = round(result.output_tokens * reasoning_chunks / (reasoning_chunks + answer_chunks))
+    answer = result.output_tokens - reasoning
+    result.reasoning_tokens = reasoning
+
+    if first_reasoning_s is not None:
+        result.ttft_reasoning_ms = first_reasoning_s * 1000
+        phase_end = first_answer_s if first_answer_s is not None else end_s
+        if reasoning > 0 and phase_end > first_reasoning_s:
+            result.reasoning_tps = reasoning / (phase_end - first_reasoning_s)
+    if first_answer_s is not None:
+        result.ttft_answer_ms = first_answer_s * 1000
+        if answer > 0 and end_s > first_answer_s:
+            result.answer_tps = answer / (end_s - first_answer_s)
 
 
 def resolve_api_key(provider_cfg: dict) -> Optional[str]:
@@ -204,6 +430,8 @@ def build_targets(
                     input_cost_per_mtok=model.get("input_cost_per_mtok"),
                     output_cost_per_mtok=model.get("output_cost_per_mtok"),
                     system_prompt=model.get("system_prompt"),
+                    rpm=prov_cfg.get("rpm"),
+                    tpm=prov_cfg.get("tpm"),
                 )
             )
 
@@ -218,8 +446,15 @@ def build_targets(
 # Corpus cache for context generation
 # ---------------------------------------------------------------------------
 _CORPUS_TEXT: str | None = None
-_CORPUS_TOKENS: list[int] | None = None
+_CORPUS_TOKENS: "memoryview | list[int] | None" = None   # uint32 token ids (mmap-backed)
 _CORPUS_ENC = None
+_CORPUS_INDEX: "CorpusIndex | None" = None
+
+# On-disk token/offset arrays, built once per (corpus content, encoding)
+CORPUS_CACHE_DIR = Path(os.environ.get("CORPUS_CACHE_DIR", Path(__file__).parent / "data" / "corpus_cache"))
+
+# Unseeded window offsets come from here so consecutive runs differ
+_WINDOW_RNG = random.Random()
 
 # Synthetic fallback text (used when corpus file is unavailable, e.g. in tests)
 _SYNTHETIC_BLOCKS = [
@@ -246,9 +481,88 @@ _SYNTHETIC_BLOCKS = [
 ]
 
 
+class CorpusIndex:
+    """Pre-tokenized corpus with token -> byte offsets for zero-decode windows.
+
+    ``tokens`` holds the uint32 token ids and ``offsets`` the UTF-8 byte
+    position where each token starts (plus a final end offset).  Both are
+    memory-mapped from CORPUS_CACHE_DIR when it is writable, so the corpus is
+    tokenized once per machine instead of once per process.  A window of
+    ``n`` tokens is a byte slice of the corpus, so building one costs a
+    memcpy rather than a BPE decode.
+    """
+
+    def __init__(self, data: bytes, tokens, offsets):
+        self.data = data
+        self.tokens = tokens
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def window(self, start: int, n: int) -> str:
+        """Return the text of tokens [start, start + n), wrapping past the end."""
+        total = len(self.tokens)
+        end = start + n
+        if end <= total:
+            raw = self.data[self.offsets[start]:self.offsets[end]]
+        else:
+            raw = self.data[self.offsets[start]:] + self.data[:self.offsets[end - total]]
+        # A window edge can split a multi-byte character; drop the fragment
+        return raw.decode("utf-8", errors="ignore")
+
+
+def _mmap_uint32(path: Path):
+    """Memory-map a little-endian uint32 array file as a read-only memoryview."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast("I")
+
+
+def _build_corpus_index(text: str, enc) -> CorpusIndex:
+    """Load the corpus index from CORPUS_CACHE_DIR, building it on first use.
+
+    Falls back to in-memory arrays when the cache directory is not writable
+    or the platform is big-endian.
+    """
+    data = text.encode("utf-8")
+    digest = hashlib.sha1(data).hexdigest()[:16]
+    stem = CORPUS_CACHE_DIR / f"{enc.name}-{digest}"
+    tokens_path = stem.with_suffix(".tokens.u32")
+    offsets_path = stem.with_suffix(".offsets.u32")
+    use_mmap = sys.byteorder == "little" and array("I").itemsize == 4
+
+    if use_mmap and tokens_path.is_file() and offsets_path.is_file():
+        try:
+            return CorpusIndex(data, _mmap_uint32(tokens_path), _mmap_uint32(offsets_path))
+        except (OSError, ValueError, TypeError):
+            pass  # Corrupt/truncated cache -- rebuild below
+
+    tokens = array("I", enc.encode(text))
+    offsets = array("I", [0])
+    pos = 0
+    for tok in tokens:
+        pos += len(enc.decode_single_token_bytes(tok))
+        offsets.append(pos)
+
+    if use_mmap:
+        try:
+            CORPUS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            for path, arr in ((tokens_path, tokens), (offsets_path, offsets)):
+                tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+                with open(tmp, "wb") as f:
+                    arr.tofile(f)
+                os.replace(tmp, path)
+            return CorpusIndex(data, _mmap_uint32(tokens_path), _mmap_uint32(offsets_path))
+        except OSError:
+            pass  # Read-only filesystem -- keep the in-memory arrays
+
+    return CorpusIndex(data, tokens, offsets)
+
+
 def _load_corpus():
     """Load and cache book corpus. Falls back to synthetic text if file missing."""
-    global _CORPUS_TEXT, _CORPUS_TOKENS, _CORPUS_ENC
+    global _CORPUS_TEXT, _CORPUS_TOKENS, _CORPUS_ENC, _CORPUS_INDEX
     if _CORPUS_TEXT is not None:
         return _CORPUS_TEXT, _CORPUS_TOKENS, _CORPUS_ENC
 
@@ -260,38 +574,50 @@ def _load_corpus():
     corpus_path = Path(__file__).parent / "corpus" / "moby_dick.txt"
     if corpus_path.exists():
         text = corpus_path.read_text(encoding="utf-8")
-        tokens = enc.encode(text) if enc else None
-        _CORPUS_TEXT, _CORPUS_TOKENS, _CORPUS_ENC = text, tokens, enc
-        return text, tokens, enc
-
-    # Fallback: join synthetic blocks, repeat to fill a reasonable buffer
-    base = "\n\n".join(_SYNTHETIC_BLOCKS)
-    text = (base + "\n\n") * 200  # ~100K tokens of synthetic text
-    tokens = enc.encode(text) if enc else None
-    _CORPUS_TEXT, _CORPUS_TOKENS, _CORPUS_ENC = text, tokens, enc
+    else:
+        # Fallback: join synthetic blocks, repeat to fill a reasonable buffer
+        base = "\n\n".join(_SYNTHETIC_BLOCKS)
+        text = (base + "\n\n") * 200  # ~100K tokens of synthetic text
+
+    index = _build_corpus_index(text, enc) if enc else None
+    tokens = index.tokens if index else None
+    _CORPUS_TEXT, _CORPUS_TOKENS, _CORPUS_ENC, _CORPUS_INDEX = text, tokens, enc, index
     return text, tokens, enc
 
 
-def generate_context_text(target_tokens: int) -> str:
+def _corpus_index() -> CorpusIndex | None:
+    """Return the index of the loaded corpus (None without an encoding)."""
+    _load_corpus()
+    return _CORPUS_INDEX
+
+
+def generate_context_text(target_tokens: int, seed=None) -> str:
     """Generate context text of approximately target_tokens.
 
-    Uses a cached public-domain book corpus (Moby Dick) for natural,
-    non-repetitive context that defeats prompt caching. Falls back to
-    synthetic prose blocks if the corpus file is unavailable.
+    Returns a window of a public-domain book corpus (Moby Dick) starting at
+    a random token offset, so each run sends a different prefix and provider
+    prompt caches get no hits.  Pass ``seed`` to make the offset
+    reproducible.  Falls back to synthetic prose blocks if the corpus file
+    is unavailable.
     """
     if target_tokens <= 0:
         return ""
 
-    text, tokens, enc = _load_corpus()
-
-    if enc and tokens:
-        if target_tokens <= len(tokens):
-            return enc.decode(tokens[:target_tokens])
-        # Requested more than corpus has -- return all of it
-        return text
+    rng = random.Random(seed) if seed is not None else _WINDOW_RNG
+    index = _corpus_index()
+    if index is not None:
+        if target_tokens >= len(index):
+            # Requested more than corpus has -- return all of it
+            return _CORPUS_TEXT
+        return index.window(rng.randrange(len(index)), target_tokens)
 
     # No tiktoken available: rough char estimate (1 token ~ 4 chars)
-    return text[: target_tokens * 4]
+    text = _CORPUS_TEXT
+    span = target_tokens * 4
+    if span >= len(text):
+        return text
+    start = rng.randrange(len(text) - span)
+    return text[start:start + span]
 
 
 def run_single(
@@ -337,7 +663,10 @@ def run_single(
         stream = litellm.completion(**kwargs)
 
         ttft = None
-        chunk_count = 0
+        chunk_count = 0  # output chunks, once per delta; the two below only split the phases
+        reasoning_chunks = 0
+        answer_chunks = 0
+        first_reasoning = first_answer = None
         usage_from_stream = None
 
         for chunk in stream:
@@ -351,7 +680,16 @@ def run_single(
             # Handle both standard content AND reasoning model content
             # Reasoning models (Qwen3.5, DeepSeek-R1, etc.) use delta.reasoning_content
             delta = chunk.choices[0].delta if chunk.choices else None
-            if delta and (delta.content or getattr(delta, "reasoning_content", None)):
+            reasoning = getattr(delta, "reasoning_content", None) if delta else None
+            if reasoning:
+                reasoning_chunks += 1
+                if first_reasoning is None:
+                    first_reasoning = now - start
+            if delta and delta.content:
+                answer_chunks += 1
+                if first_answer is None:
+                    first_answer = now - start
+            if delta and (delta.content or reasoning):
                 chunk_count += 1
 
             # Capture usage from final chunk if provider supports it
@@ -367,6 +705,10 @@ def run_single(
         else:
             result.output_tokens = chunk_count
             result.input_tokens = 0
+        split_reasoning_phases(
+            result, first_reasoning, first_answer, total, reasoning_chunks, answer_chunks,
+            usage_reasoning_tokens(usage_from_stream) if usage_from_stream else None,
+        )
 
         result.ttft_ms = ttft or 0.0
         result.total_time_s = total
@@ -422,74 +764,53 @@ def run_single(
     return result
 
 
-def _compute_variance(agg: AggregatedResult, successes: list[RunResult]) -> None:
-    """Compute variance statistics and outlier detection on an AggregatedResult."""
-    n = len(successes)
-    if n == 0:
-        return
+# Two-sided 95% Student-t critical values by degrees of freedom (df > 30 -> normal)
+_T_CRIT_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
 
-    tps_vals = [r.tokens_per_second for r in successes]
-    ttft_vals = [r.ttft_ms for r in successes]
 
-    agg.min_tps = min(tps_vals)
-    agg.max_tps = max(tps_vals)
-    agg.p50_tps = statistics.median(tps_vals)
+def ci_relative_width(values: list[float]) -> float:
+    """Full width of the 95% t-interval on the mean, relative to the mean.
 
-    if n >= 2:
-        agg.std_dev_tps = statistics.stdev(tps_vals)
-        agg.std_dev_ttft = statistics.stdev(ttft_vals)
-        # p95: use quantiles when we have enough data, else use max
-        if n >= 4:
-            agg.p95_tps = statistics.quantiles(tps_vals, n=20)[-1]  # 95th percentile
-        else:
-            agg.p95_tps = max(tps_vals)
-    else:
-        agg.p95_tps = tps_vals[0]
-
-    # Outlier detection via IQR (only meaningful with >= 4 runs)
-    if n >= 4:
-        q1, _, q3 = statistics.quantiles(tps_vals, n=4)
-        iqr = q3 - q1
-        lower = q1 - 1.5 * iqr
-        upper = q3 + 1.5 * iqr
-        agg.outlier_count = sum(1 for v in tps_vals if v < lower or v > upper)
-
-    # Output Speed and ITL averages
-    ospeed_vals = [r.output_speed_tps for r in successes if r.output_speed_tps > 0]
-    if ospeed_vals:
-        agg.avg_output_speed_tps = sum(ospeed_vals) / len(ospeed_vals)
-    itl_vals = [r.itl_ms for r in successes if r.itl_ms > 0]
-    if itl_vals:
-        agg.avg_itl_ms = sum(itl_vals) / len(itl_vals)
-
-    # TTFT Percentiles
-    if n >= 1:
-        agg.p50_ttft = statistics.median(ttft_vals)
-    if n >= 4:
-        agg.p95_ttft = statistics.quantiles(ttft_vals, n=20)[-1]
-        agg.p99_ttft = statistics.quantiles(ttft_vals, n=100)[-1] if n >= 5 else max(ttft_vals)
-    elif n >= 2:
-        agg.p95_ttft = max(ttft_vals)
-        agg.p99_ttft = max(ttft_vals)
-    else:
-        agg.p95_ttft = ttft_vals[0] if ttft_vals else 0.0
-        agg.p99_ttft = ttft_vals[0] if ttft_vals else 0.0
+    0.10 means the interval spans 10% of the mean (about +/-5%).  Returns
+    ``inf`` when it cannot be estimated (fewer than 2 values, or mean <= 0).
+    """
+    n = len(values)
+    if n < 2:
+        return float("inf")
+    mean = sum(values) / n
+    if mean <= 0:
+        return float("inf")
+    t = _T_CRIT_95[n - 2] if n - 1 <= len(_T_CRIT_95) else 1.96
+    half_width = t * statistics.stdev(values) / (n ** 0.5)
+    return 2 * half_width / mean
 
-    # Coefficient of Variation
-    mean_tps = sum(tps_vals) / n if n > 0 else 0
-    if n >= 2 and mean_tps > 0:
-        agg.cv_tps = (agg.std_dev_tps / mean_tps) * 100
-    mean_ttft = sum(ttft_vals) / n if n > 0 else 0
-    if n >= 2 and mean_ttft > 0:
-        agg.cv_ttft = (agg.std_dev_ttft / mean_ttft) * 100
 
-    # Confidence level
-    if agg.cv_tps < 10 and n >= 3:
-        agg.confidence_level = "high"
-    elif agg.cv_tps > 30 or n == 1:
-        agg.confidence_level = "low"
-    else:
-        agg.confidence_level = "medium"
+def _compute_variance(agg: AggregatedResult, successes: list[RunResult]) -> None:
+    """Compute variance statistics, bootstrap CIs and outliers on an AggregatedResult."""
+    if not successes:
+        return
+    [(_, fields)] = summarize_runs(successes, [0] * len(successes))
+    for name, value in fields.items():
+        if name not in ("runs", "failures"):
+            setattr(agg, name, value)
+
+
+def aggregate_runs(groups: list[tuple[Target, list[RunResult]]]) -> list[AggregatedResult]:
+    """Aggregate many (target, run results) groups in one vectorized pass."""
+    rows = [r for _, run_results in groups for r in run_results]
+    keys = [i for i, (_, run_results) in enumerate(groups) for _ in run_results]
+    summaries = dict(summarize_runs(rows, keys))
+    results = []
+    for i, (target, run_results) in enumerate(groups):
+        agg = AggregatedResult(target=target, all_results=run_results)
+        for name, value in summaries.get(i, {}).items():
+            setattr(agg, name, value)
+        results.append(agg)
+    return results
 
 
 def run_benchmarks(
@@ -505,7 +826,7 @@ def run_benchmarks(
     if context_tiers is None:
         context_tiers = [0]
 
-    results = []
+    groups = []
     # Calculate total: for each target, count eligible tiers x runs
     total_runs = 0
     for target in targets:
@@ -555,37 +876,9 @@ def run_benchmarks(
                 else:
                     console.print(f"[red]FAIL[/red] {result.error[:80]}")
 
-            # Aggregate
-            successes = [r for r in run_results if r.success]
-            agg = AggregatedResult(
-                target=target,
-                runs=len(run_results),
-                failures=len(run_results) - len(successes),
-                all_results=run_results,
-            )
-
-            if successes:
-                n = len(successes)
-                agg.avg_ttft_ms = sum(r.ttft_ms for r in successes) / n
-                agg.avg_total_time_s = sum(r.total_time_s for r in successes) / n
-                agg.avg_tokens_per_second = sum(r.tokens_per_second for r in successes) / n
-                agg.avg_output_tokens = sum(r.output_tokens for r in successes) / n
-                agg.avg_cost = sum(r.cost for r in successes) / n
-                agg.total_cost = sum(r.cost for r in successes)
-                input_tps_vals = [r.input_tokens_per_second for r in successes if r.input_tokens_per_second > 0]
-                if input_tps_vals:
-                    agg.avg_input_tps = sum(input_tps_vals) / len(input_tps_vals)
-                ospeed_vals = [r.output_speed_tps for r in successes if r.output_speed_tps > 0]
-                if ospeed_vals:
-                    agg.avg_output_speed_tps = sum(ospeed_vals) / len(ospeed_vals)
-                itl_vals = [r.itl_ms for r in successes if r.itl_ms > 0]
-                if itl_vals:
-                    agg.avg_itl_ms = sum(itl_vals) / len(itl_vals)
-                _compute_variance(agg, successes)
-
-            results.append(agg)
+            groups.append((target, run_results))
 
-    return results
+    return aggregate_runs(groups)
 
 
 # ---------------------------------------------------------------------------
@@ -737,6 +1030,17 @@ def save_results(
                 "cv_tps": round(r.cv_tps, 1),
                 "cv_ttft": round(r.cv_ttft, 1),
                 "confidence_level": r.confidence_level,
+                "ci_low_tps": round(r.ci_low_tps, 2),
+                "ci_high_tps": round(r.ci_high_tps, 2),
+                "ci_low_ttft": round(r.ci_low_ttft, 1),
+                "ci_high_ttft": round(r.ci_high_ttft, 1),
+                "avg_ttft_cold_ms": round(r.avg_ttft_cold_ms, 1) if r.avg_ttft_cold_ms is not None else None,
+                "avg_ttft_warm_ms": round(r.avg_ttft_warm_ms, 1) if r.avg_ttft_warm_ms is not None else None,
+                "avg_reasoning_tokens": round(r.avg_reasoning_tokens, 1) if r.avg_reasoning_tokens is not None else None,
+                "avg_ttft_reasoning_ms": round(r.avg_ttft_reasoning_ms, 1) if r.avg_ttft_reasoning_ms is not None else None,
+                "avg_ttft_answer_ms": round(r.avg_ttft_answer_ms, 1) if r.avg_ttft_answer_ms is not None else None,
+                "avg_reasoning_tps": round(r.avg_reasoning_tps, 2) if r.avg_reasoning_tps is not None else None,
+                "avg_answer_tps": round(r.avg_answer_tps, 2) if r.avg_answer_tps is not None else None,
                 "runs": r.runs,
                 "failures": r.failures,
                 "error": next((rr.error for rr in r.all_results if not rr.success), ""),
@@ -0,0 +1,595 @@
+"""Request plans and result summaries for the benchmark modes.
+
+Each benchmark mode beyond the plain run -- open-loop load, prompt-cache
+effectiveness, max throughput, prefill probe, long-generation decay, trace
+replay, prompt datasets, embeddings and adaptive run counts -- has its
+defaults, request planning and per-step summary here. The job handlers
+send the requests (routers.helpers.async_run_single / async_run_embedding)
+and hand the per-request result dicts to these functions.
+
+Everything here is synchronous and works on plain dicts, so the modes
+can be tested without a live endpoint.
+"""
+
+import json
+import random
+from datetime import datetime
+
+from aggregation import P50, P95, P99, fit_latency_curve, percentile, predict_latency
+from benchmark import Target, ci_relative_width, decode_decay, generate_context_text
+from prompt_datasets import (
+    DATASET_MAX_TOKENS_CAP,
+    bucket_order,
+    length_bucket,
+    parse_request_line,
+    request_body,
+)
+from provider_params import PROVIDER_REGISTRY, identify_provider
+
+
+# ---------------------------------------------------------------------------
+# Open-loop load generator helpers
+# ---------------------------------------------------------------------------
+
+LOAD_DEFAULT_STEPS = [1, 2, 4, 8]  # offered requests/second per step
+LOAD_ARRIVAL_PATTERNS = ("poisson", "constant")
+
+
+def _arrival_offsets(
+    rate: float, duration_s: float, pattern: str = "poisson", seed: int | None = None,
+) -> list[float]:
+    """Return send offsets (seconds from step start) for one open-loop load step.
+
+    ``constant`` spaces requests exactly 1/rate apart.  ``poisson`` draws
+    exponential inter-arrival gaps, so requests arrive in bursts the way real
+    traffic does.  The first request always goes out at offset 0.
+    """
+    if rate <= 0 or duration_s <= 0:
+        return []
+    if pattern == "constant":
+        count = max(1, int(round(rate * duration_s)))
+        return [i / rate for i in range(count)]
+    if pattern != "poisson":
+        raise ValueError(f"Unknown arrival pattern: {pattern}")
+
+    rng = random.Random(seed)
+    offsets = [0.0]
+    t = rng.expovariate(rate)
+    while t < duration_s:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+
+def _summarize_load_step(
+    items: list[dict], rate: float, duration_s: float, wall_time_s: float,
+) -> dict:
+    """Summarize one load step from its per-request result dicts.
+
+    Aggregate output tok/s is total output tokens over the step's wall time
+    (first send to last completion), i.e. what the endpoint sustained under
+    the offered load -- not the mean of per-request speeds.
+    """
+    successes = [r for r in items if r.get("success")]
+    requests = len(items)
+    errors = requests - len(successes)
+    output_tokens = sum(r.get("output_tokens") or 0 for r in successes)
+    ttfts = [r["ttft_ms"] for r in successes if r.get("ttft_ms")]
+
+    return {
+        "target_rps": rate,
+        "offered_rps": round(requests / duration_s, 3) if duration_s > 0 else 0.0,
+        "requests": requests,
+        "successes": len(successes),
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "wall_time_s": round(wall_time_s, 3),
+        "output_tokens": output_tokens,
+        "aggregate_output_tps": round(output_tokens / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+        "ttft_p50_ms": round(percentile(ttfts, P50), 2),
+        "ttft_p95_ms": round(percentile(ttfts, P95), 2),
+        "ttft_p99_ms": round(percentile(ttfts, P99), 2),
+        "avg_total_time_s": round(sum(r["total_time_s"] for r in successes) / len(successes), 3) if successes else 0.0,
+        "total_cost": round(sum(r.get("cost") or 0 for r in successes), 8),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Prompt-cache effectiveness helpers
+# ---------------------------------------------------------------------------
+
+def _summarize_cache_phase(items: list[dict]) -> dict:
+    """Summarize the shared-prefix or unique-prefix runs of one (model, tier)."""
+    successes = [r for r in items if r.get("success")]
+    n = len(successes)
+    ttfts = [r["ttft_ms"] for r in successes]
+    prefill = [r["input_tokens_per_second"] for r in successes if r.get("input_tokens_per_second")]
+    return {
+        "runs": len(items),
+        "successes": n,
+        "avg_ttft_ms": round(sum(ttfts) / n, 2) if n else 0.0,
+        "p50_ttft_ms": round(percentile(ttfts, P50), 2),
+        "avg_prefill_tps": round(sum(prefill) / len(prefill), 2) if prefill else 0.0,
+        "avg_cost": round(sum(r.get("cost") or 0 for r in successes) / n, 8) if n else 0.0,
+        "avg_cached_tokens": round(sum(r.get("cached_tokens") or 0 for r in successes) / n, 1) if n else 0.0,
+        "cache_hit_rate": round(sum(1 for r in successes if r.get("cached_tokens")) / n, 3) if n else 0.0,
+    }
+
+
+def _cache_effectiveness(cached: dict, uncached: dict) -> dict:
+    """Compare shared-prefix (cached) vs unique-prefix (uncached) phase summaries."""
+    out = {"ttft_speedup": 0.0, "ttft_saved_ms": 0.0, "cost_savings_pct": 0.0}
+    if cached["avg_ttft_ms"] > 0 and uncached["avg_ttft_ms"] > 0:
+        out["ttft_speedup"] = round(uncached["avg_ttft_ms"] / cached["avg_ttft_ms"], 3)
+        out["ttft_saved_ms"] = round(uncached["avg_ttft_ms"] - cached["avg_ttft_ms"], 2)
+    if uncached["avg_cost"] > 0:
+        out["cost_savings_pct"] = round((1 - cached["avg_cost"] / uncached["avg_cost"]) * 100, 2)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Max-throughput (parallel streams) helpers
+# ---------------------------------------------------------------------------
+
+THROUGHPUT_DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16]  # simultaneous streams per level
+
+
+def _stream_speed(item: dict) -> float:
+    """Decode speed of one stream: output_speed_tps, else end-to-end tok/s."""
+    return item.get("output_speed_tps") or item.get("tokens_per_second") or 0.0
+
+
+def _summarize_throughput_level(items: list[dict], concurrency: int, wall_time_s: float) -> dict:
+    """Summarize the bursts of ``concurrency`` simultaneous streams at one level.
+
+    Aggregate output tok/s is total output tokens over the bursts' wall time
+    (first send to last stream end), i.e. what the server delivered across
+    all streams.  Per-stream tok/s is each stream's own decode speed, and
+    fairness is slowest / fastest stream (1.0 = every stream got an equal
+    share of the server).
+    """
+    successes = [r for r in items if r.get("success")]
+    requests = len(items)
+    errors = requests - len(successes)
+    output_tokens = sum(r.get("output_tokens") or 0 for r in successes)
+    speeds = [s for s in (_stream_speed(r) for r in successes) if s > 0]
+    ttfts = [r["ttft_ms"] for r in successes if r.get("ttft_ms")]
+    slowest, fastest = (min(speeds), max(speeds)) if speeds else (0.0, 0.0)
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "successes": len(successes),
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "wall_time_s": round(wall_time_s, 3),
+        "output_tokens": output_tokens,
+        "aggregate_output_tps": round(output_tokens / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+        "per_stream_tps_mean": round(sum(speeds) / len(speeds), 2) if speeds else 0.0,
+        "per_stream_tps_p50": round(percentile(speeds, P50), 2),
+        "per_stream_tps_min": round(slowest, 2),
+        "per_stream_tps_max": round(fastest, 2),
+        "stream_tps_spread": round(fastest - slowest, 2),
+        "fairness": round(slowest / fastest, 4) if fastest > 0 else 0.0,
+        "ttft_p50_ms": round(percentile(ttfts, P50), 2),
+        "ttft_p95_ms": round(percentile(ttfts, P95), 2),
+    }
+
+
+def _throughput_scaling(levels: list[dict]) -> dict:
+    """Add scaling figures to one target's level summaries, return the curve's peak.
+
+    Each level gains ``speedup`` (aggregate tok/s over the lowest level's)
+    and ``scaling_efficiency`` (speedup per added stream: 1.0 = linear
+    scaling, lower = streams are contending).  The peak is the level with
+    the highest aggregate tok/s -- past it, extra streams only add latency.
+    """
+    measured = [lv for lv in levels if lv["aggregate_output_tps"] > 0]
+    if not measured:
+        return {"peak_concurrency": None, "peak_aggregate_tps": 0.0}
+    base = min(measured, key=lambda lv: lv["concurrency"])
+    for lv in levels:
+        speedup = lv["aggregate_output_tps"] / base["aggregate_output_tps"]
+        lv["speedup"] = round(speedup, 3)
+        lv["scaling_efficiency"] = round(speedup * base["concurrency"] / lv["concurrency"], 3)
+    peak = max(measured, key=lambda lv: lv["aggregate_output_tps"])
+    return {"peak_concurrency": peak["concurrency"], "peak_aggregate_tps": peak["aggregate_output_tps"]}
+
+
+# ---------------------------------------------------------------------------
+# Prefill probe helpers
+# ---------------------------------------------------------------------------
+
+PREFILL_DEFAULT_PREDICT_TIERS = [1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000]
+
+
+def _probe_max_tokens(target: Target) -> int:
+    """Smallest max_tokens the target's provider accepts (1 for most)."""
+    provider = identify_provider(target.model_id, target.provider_key)
+    spec = PROVIDER_REGISTRY.get(provider, {}).get("tier1", {}).get("max_tokens", {})
+    return max(1, int(spec.get("min", 1)))
+
+
+def _summarize_prefill_tier(items: list[dict], tier: int) -> dict:
+    """Summarize the probe runs of one (model, tier): TTFT and prefill tok/s."""
+    successes = [r for r in items if r.get("success") and r.get("ttft_ms")]
+    ttfts = [r["ttft_ms"] for r in successes]
+    prompt_tokens = [r["input_tokens"] for r in successes if r.get("input_tokens")]
+    prefill = [r["input_tokens_per_second"] for r in successes if r.get("input_tokens_per_second")]
+    return {
+        "context_tokens": tier,
+        "runs": len(items),
+        "successes": len(successes),
+        "avg_input_tokens": round(sum(prompt_tokens) / len(prompt_tokens), 1) if prompt_tokens else 0.0,
+        "avg_ttft_ms": round(sum(ttfts) / len(ttfts), 2) if ttfts else 0.0,
+        "p50_ttft_ms": round(percentile(ttfts, P50), 2),
+        "avg_prefill_tps": round(sum(prefill) / len(prefill), 2) if prefill else 0.0,
+    }
+
+
+def _prefill_curve(items: list[dict], predict_tiers: list[int], context_window: int) -> dict:
+    """Fit TTFT vs prompt tokens over a model's probe runs and predict other tiers.
+
+    Each successful run is one sample, keyed by the prompt tokens the
+    provider reported (the tier size when it reported none).  Predictions
+    outside the measured token range are flagged as extrapolated.
+    """
+    samples = [
+        (r.get("input_tokens") or r.get("context_tokens") or 0, r["ttft_ms"])
+        for r in items if r.get("success") and r.get("ttft_ms")
+    ]
+    fit = fit_latency_curve([s[0] for s in samples], [s[1] for s in samples])
+    if fit is None:
+        return {"fit": None, "predictions": []}
+    tiers = [t for t in predict_tiers if 0 < t <= context_window]
+    predictions = [
+        {
+            "context_tokens": tier,
+            "ttft_ms": round(ttft, 2),
+            "prefill_tps": round(tier / (ttft / 1000), 2) if ttft > 0 else 0.0,
+            "extrapolated": not (fit["min_tokens"] <= tier <= fit["max_tokens"]),
+        }
+        for tier, ttft in zip(tiers, predict_latency(fit, tiers))
+    ]
+    fit = {
+        **fit,
+        "intercept_ms": round(fit["intercept_ms"], 3),
+        "per_token_ms": round(fit["per_token_ms"], 6),
+        "per_token_sq_ms": float(f"{fit['per_token_sq_ms']:.6g}"),
+        "r2": round(fit["r2"], 4),
+    }
+    return {"fit": fit, "predictions": predictions}
+
+
+# ---------------------------------------------------------------------------
+# Long-generation decay helpers
+# ---------------------------------------------------------------------------
+
+def _long_output_params(target: Target, max_tokens: int, provider_params: dict | None) -> dict | None:
+    """provider_params that keep generating up to max_tokens, where the provider can.
+
+    Adds ``min_tokens`` / ``ignore_eos`` passthrough params when the
+    provider registry lists them as Tier 3 params (vLLM). Passthrough values
+    the user set win. Other providers still stop at EOS.
+    """
+    provider = identify_provider(target.model_id, target.provider_key)
+    tier3 = PROVIDER_REGISTRY.get(provider, {}).get("tier3_examples", {})
+    forced = {}
+    if "min_tokens" in tier3:
+        forced["min_tokens"] = max_tokens
+    if "ignore_eos" in tier3:
+        forced["ignore_eos"] = True
+    if not forced:
+        return provider_params
+    merged = dict(provider_params or {})
+    merged["passthrough"] = {**forced, **(merged.get("passthrough") or {})}
+    return merged
+
+
+def _decay_profile(items: list[dict], window_tokens: int) -> dict:
+    """Mean decode-window profile of one model's runs, with its decay slope.
+
+    Window i is averaged over the runs that reached it, so runs that hit EOS
+    early only shorten the tail.
+    """
+    profiles = [r["decode_window_tps"] for r in items if r.get("success") and r.get("decode_window_tps")]
+    longest = max((len(p) for p in profiles), default=0)
+    mean = []
+    for i in range(longest):
+        values = [p[i] for p in profiles if len(p) > i]
+        mean.append(sum(values) / len(values))
+    outputs = [r.get("output_tokens") or 0 for r in items if r.get("success")]
+    return {
+        "window_tokens": window_tokens,
+        "runs": len(profiles),
+        "avg_output_tokens": round(sum(outputs) / len(outputs), 1) if outputs else 0.0,
+        "mean_window_tps": [round(v, 2) for v in mean],
+        **decode_decay(mean, window_tokens),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Trace replay helpers
+# ---------------------------------------------------------------------------
+
+REPLAY_MAX_REQUESTS = 5000
+
+
+def _replay_arrival(value, line_no: int) -> float | None:
+    """Arrival time in seconds from a number (epoch or relative) or an ISO 8601 string."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    raise ValueError(f"Line {line_no}: unreadable timestamp {value!r}")
+
+
+def _parse_replay_trace(
+    text: str, default_max_tokens: int = 512, max_requests: int = REPLAY_MAX_REQUESTS,
+) -> list[dict]:
+    """Parse a JSONL request log into replay entries sorted by arrival.
+
+    Each non-empty line is a JSON object with the chat request at the top
+    level or under ``body`` / ``request`` (OpenAI batch and proxy log
+    shapes): ``messages`` (required), ``max_tokens`` or
+    ``max_completion_tokens`` (default ``default_max_tokens``), and the
+    arrival time as ``timestamp`` (epoch or relative seconds, or ISO 8601)
+    or ``arrival_s``. A line without one arrives with the line before it.
+    Returns [{"index", "offset_s", "messages", "max_tokens"}] with offsets
+    relative to the first arrival. Raises ValueError naming the bad line.
+    """
+    entries = []
+    last_arrival = None
+    for line_no, line in enumerate(text.splitlines(), 1):
+        parsed = parse_request_line(line, line_no, require_messages=True)
+        if parsed is None:
+            continue
+        record, request = parsed
+        body = request_body(record)
+
+        arrival = _replay_arrival(
+            record.get("timestamp", record.get("arrival_s", body.get("timestamp"))), line_no,
+        )
+        if arrival is None:
+            arrival = last_arrival if last_arrival is not None else 0.0
+        last_arrival = arrival
+
+        entries.append({
+            "index": len(entries) + 1,
+            "arrival": arrival,
+            "messages": request["messages"],
+            "max_tokens": request.get("max_tokens", min(default_max_tokens, DATASET_MAX_TOKENS_CAP)),
+        })
+        if len(entries) > max_requests:
+            raise ValueError(f"Trace has more than {max_requests} requests")
+
+    if not entries:
+        raise ValueError("Trace has no requests")
+    entries.sort(key=lambda e: e["arrival"])  # stable: ties keep file order
+    first = entries[0]["arrival"]
+    for e in entries:
+        e["offset_s"] = round(e.pop("arrival") - first, 6)
+    return entries
+
+
+def _replay_trace_stats(entries: list[dict]) -> dict:
+    """Shape of a parsed trace: span and prompt/output length mix."""
+    prompt_chars = [
+        sum(len(m["content"]) if isinstance(m.get("content"), str) else len(json.dumps(m.get("content")))
+            for m in e["messages"])
+        for e in entries
+    ]
+    max_tokens = [e["max_tokens"] for e in entries]
+    duration = entries[-1]["offset_s"] if entries else 0.0
+    return {
+        "requests": len(entries),
+        "duration_s": round(duration, 3),
+        "avg_rps": round(len(entries) / duration, 3) if duration > 0 else None,
+        "prompt_chars_p50": round(percentile(prompt_chars, P50)),
+        "prompt_chars_p95": round(percentile(prompt_chars, P95)),
+        "max_tokens_p50": round(percentile(max_tokens, P50)),
+        "max_tokens_p95": round(percentile(max_tokens, P95)),
+    }
+
+
+def _summarize_replay(items: list[dict], speed: float, trace_duration_s: float, wall_time_s: float) -> dict:
+    """Summarize one model's replay, with a per-request latency/cost list in trace order."""
+    successes = [r for r in items if r.get("success")]
+    requests = len(items)
+    errors = requests - len(successes)
+    ttfts = [r["ttft_ms"] for r in successes if r.get("ttft_ms")]
+    latencies = [r["total_time_s"] * 1000 for r in successes]
+    output_tokens = sum(r.get("output_tokens") or 0 for r in successes)
+    total_cost = sum(r.get("cost") or 0 for r in successes)
+    return {
+        "speed": speed,
+        "trace_duration_s": round(trace_duration_s, 3),
+        "wall_time_s": round(wall_time_s, 3),
+        "requests": requests,
+        "successes": len(successes),
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "input_tokens": sum(r.get("input_tokens") or 0 for r in successes),
+        "output_tokens": output_tokens,
+        "aggregate_output_tps": round(output_tokens / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+        "ttft_p50_ms": round(percentile(ttfts, P50), 2),
+        "ttft_p95_ms": round(percentile(ttfts, P95), 2),
+        "ttft_p99_ms": round(percentile(ttfts, P99), 2),
+        "latency_p50_ms": round(percentile(latencies, P50), 2),
+        "latency_p95_ms": round(percentile(latencies, P95), 2),
+        "latency_p99_ms": round(percentile(latencies, P99), 2),
+        "total_cost": round(total_cost, 8),
+        "avg_cost_per_request": round(total_cost / len(successes), 8) if successes else 0.0,
+        "per_request": [
+            {
+                "index": r["replay_index"],
+                "offset_s": r["replay_offset_s"],
+                "success": r.get("success"),
+                "ttft_ms": r.get("ttft_ms"),
+                "latency_ms": round((r.get("total_time_s") or 0) * 1000, 1),
+                "input_tokens": r.get("input_tokens"),
+                "output_tokens": r.get("output_tokens"),
+                "cost": r.get("cost"),
+                "error": r.get("error") or None,
+            }
+            for r in sorted(items, key=lambda r: r["replay_index"])
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Prompt dataset helpers
+# ---------------------------------------------------------------------------
+
+def _dataset_bucket_row(items: list[dict]) -> dict:
+    """Run count, mean lengths and speeds over the runs in one length bucket."""
+    successes = [r for r in items if r.get("success")]
+
+    def avg(values):
+        values = [v for v in values if v]
+        return round(sum(values) / len(values), 2) if values else 0.0
+
+    return {
+        "runs": len(items),
+        "successes": len(successes),
+        "avg_input_tokens": avg(r["dataset_input_tokens"] for r in successes),
+        "avg_output_tokens": avg(r.get("output_tokens") for r in successes),
+        "avg_ttft_ms": avg(r.get("ttft_ms") for r in successes),
+        "avg_output_tps": avg(_stream_speed(r) for r in successes),
+        "avg_input_tps": avg(r.get("input_tokens_per_second") for r in successes),
+    }
+
+
+def _summarize_dataset_buckets(items: list[dict]) -> dict:
+    """Stratify one model's dataset runs by prompt and output length bucket.
+
+    Prompt length is the provider-reported input tokens, else the
+    record's chars/4 estimate (``dataset_input_tokens``). Returns rows
+    by input bucket, by output bucket, and per (input, output) cell, each
+    in ascending length order.
+    """
+    by_input: dict[str, list] = {}
+    by_output: dict[str, list] = {}
+    cells: dict[tuple[str, str], list] = {}
+    for r in items:
+        in_label = length_bucket(r["dataset_input_tokens"])
+        by_input.setdefault(in_label, []).append(r)
+        if r.get("success"):
+            out_label = length_bucket(r.get("output_tokens") or 0)
+            by_output.setdefault(out_label, []).append(r)
+            cells.setdefault((in_label, out_label), []).append(r)
+    return {
+        "runs": len(items),
+        "successes": sum(1 for r in items if r.get("success")),
+        "by_input": [
+            {"input_bucket": label, **_dataset_bucket_row(rows)}
+            for label, rows in sorted(by_input.items(), key=lambda kv: bucket_order(kv[0]))
+        ],
+        "by_output": [
+            {"output_bucket": label, **_dataset_bucket_row(rows)}
+            for label, rows in sorted(by_output.items(), key=lambda kv: bucket_order(kv[0]))
+        ],
+        "by_input_output": [
+            {"input_bucket": key[0], "output_bucket": key[1], **_dataset_bucket_row(rows)}
+            for key, rows in sorted(cells.items(), key=lambda kv: (bucket_order(kv[0][0]), bucket_order(kv[0][1])))
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Embedding benchmark helpers
+# ---------------------------------------------------------------------------
+
+EMBEDDING_DEFAULT_BATCH_SIZES = [1, 16, 64]        # input texts per request
+EMBEDDING_DEFAULT_INPUT_TOKENS = [128, 512]        # tokens per input text
+EMBEDDING_DEFAULT_CONCURRENCY = [1, 4]             # requests in flight
+
+
+def _embedding_inputs(batch_size: int, input_tokens: int) -> list[str]:
+    """``batch_size`` distinct corpus windows of about ``input_tokens`` tokens each."""
+    return [generate_context_text(input_tokens) for _ in range(batch_size)]
+
+
+def _summarize_embedding_cell(items: list[dict], wall_time_s: float) -> dict:
+    """Summarize the requests of one (model, input length, batch size, concurrency) cell.
+
+    vectors/s and tokens/s are aggregate over the cell's wall time, so
+    they include the effect of concurrency; latency percentiles are per
+    request.
+    """
+    successes = [r for r in items if r.get("success")]
+    requests = len(items)
+    errors = requests - len(successes)
+    latencies = [r["total_time_s"] * 1000 for r in successes]
+    vectors = sum(r.get("batch_size") or 0 for r in successes)
+    tokens = sum(r.get("input_tokens") or 0 for r in successes)
+    total_cost = sum(r.get("cost") or 0 for r in successes)
+    return {
+        "requests": requests,
+        "successes": len(successes),
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "wall_time_s": round(wall_time_s, 3),
+        "vectors": vectors,
+        "input_tokens": tokens,
+        "vectors_per_second": round(vectors / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+        "tokens_per_second": round(tokens / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+        "latency_p50_ms": round(percentile(latencies, P50), 2),
+        "latency_p95_ms": round(percentile(latencies, P95), 2),
+        "latency_p99_ms": round(percentile(latencies, P99), 2),
+        "total_cost": round(total_cost, 8),
+        "cost_per_1m_tokens": round(total_cost / tokens * 1_000_000, 6) if tokens else 0.0,
+        "embedding_dim": next((r["embedding_dim"] for r in successes if r.get("embedding_dim")), None),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Adaptive run count
+# ---------------------------------------------------------------------------
+
+ADAPTIVE_METRICS = {
+    # metric name -> result-item field(s), first non-zero wins
+    "output_speed": ("output_speed_tps", "tokens_per_second"),
+    "ttft": ("ttft_ms",),
+}
+
+
+def _adaptive_metric_value(item: dict, metric: str) -> float:
+    """Value of the adaptive stopping metric for one successful result item."""
+    for field in ADAPTIVE_METRICS[metric]:
+        if item.get(field):
+            return item[field]
+    return 0.0
+
+
+def _adaptive_stop_reason(items: list[dict], adaptive: dict) -> tuple[str | None, float]:
+    """Decide whether to stop sampling a (target, tier) pair.
+
+    ``adaptive`` holds metric, ci_width, min_runs, max_runs and max_cost.
+    Returns (reason, relative CI width); reason is None to keep sampling,
+    else one of "converged", "max_runs", "max_cost", "errors".
+    """
+    successes = [r for r in items if r.get("success")]
+    values = [_adaptive_metric_value(r, adaptive["metric"]) for r in successes]
+    width = ci_relative_width([v for v in values if v > 0])
+    done = len(items)
+
+    if len(successes) >= adaptive["min_runs"] and width <= adaptive["ci_width"]:
+        return "converged", width
+    if done >= adaptive["max_runs"]:
+        return "max_runs", width
+    max_cost = adaptive.get("max_cost")
+    if max_cost is not None and sum(r.get("cost") or 0 for r in items) >= max_cost:
+        return "max_cost", width
+    if done - len(successes) >= adaptive["min_runs"] and len(successes) < 2:
+        return "errors", width
+    return None, width
@@ -6,12 +6,15 @@ All tables are created on first startup via init_db().
 
 import json
 import logging
+import re
 import secrets
 import aiosqlite
 import uuid
 from pathlib import Path
 from typing import Optional
 
+from aggregation import summarize_result_rows
+
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent / "data" / "benchmark_studio.db"
@@ -113,6 +116,44 @@ async def get_db() -> aiosqlite.Connection:
     return db
 
 
+# Every job_type the jobs table accepts; keep in step with its CHECK constraint in init_db()
+JOB_TYPES = (
+    'benchmark', 'tool_eval', 'judge', 'judge_compare',
+    'param_tune', 'prompt_tune', 'scheduled_benchmark',
+    'prompt_auto_optimize', 'embedding_benchmark', 'rescore',
+)
+
+_JOB_TYPE_CHECK_RE = re.compile(r"CHECK\s*\(\s*job_type\s+IN\s*\((.*?)\)\s*\)", re.DOTALL)
+
+
+async def _rebuild_jobs_job_type_check(db, job_types: tuple[str, ...]) -> bool:
+    """Rewrite the jobs table's job_type CHECK to allow exactly ``job_types``.
+
+    SQLite can't alter a CHECK constraint, so the table is rebuilt with the
+    new list and the rows copied across. A no-op (returning False) when the
+    current constraint already allows every type. The caller commits.
+    """
+    cursor = await db.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'jobs'")
+    row = await cursor.fetchone()
+    if not row:
+        return False
+    match = _JOB_TYPE_CHECK_RE.search(row[0])
+    if not match:
+        raise RuntimeError("jobs table has no job_type CHECK constraint")
+    if set(job_types) <= set(re.findall(r"'([^']*)'", match.group(1))):
+        return False
+    check = "CHECK(job_type IN (" + ", ".join(f"'{t}'" for t in job_types) + "))"
+    await db.execute("ALTER TABLE jobs RENAME TO jobs_pre_rebuild")
+    await db.execute(row[0][:match.start()] + check + row[0][match.end():])
+    await db.execute("INSERT INTO jobs SELECT * FROM jobs_pre_rebuild")
+    await db.execute("DROP TABLE jobs_pre_rebuild")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_status ON jobs(user_id, status)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at DESC)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_timeout ON jobs(status, timeout_at)")
+    return True
+
+
 async def init_db():
     """Create all tables with ERD v2 schema. Called once at app startup."""
     logger.info("Initializing database at %s", DB_PATH)
@@ -340,7 +381,35 @@ async def init_db():
                 cost REAL,
                 success INTEGER NOT NULL DEFAULT 1,
                 error TEXT,
-                created_at TEXT NOT NULL DEFAULT (datetime('now'))
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                chunk_timeline BLOB,
+                itl_p50_ms REAL,
+                itl_p90_ms REAL,
+                itl_p99_ms REAL,
+                max_stall_ms REAL,
+                stall_count INTEGER,
+                cached_tokens INTEGER,
+                cache_phase TEXT,
+                dns_ms REAL,
+                connect_ms REAL,
+                tls_ms REAL,
+                request_sent_ms REAL,
+                server_wait_ms REAL,
+                first_byte_ms REAL,
+                stream_end_ms REAL,
+                connection_reused INTEGER,
+                decode_windows BLOB,
+                decode_window_tokens INTEGER,
+                decode_slope_tps_per_1k REAL,
+                reasoning_tokens INTEGER,
+                ttft_reasoning_ms REAL,
+                ttft_answer_ms REAL,
+                reasoning_tps REAL,
+                answer_tps REAL,
+                batch_size INTEGER,
+                concurrency INTEGER,
+                vectors_per_second REAL,
+                embedding_dim INTEGER
             )
         """)
         await db.commit()
@@ -637,11 +706,11 @@ async def init_db():
                 id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
                 user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
 
-                -- Type discriminator (one of 8 process types)
+                -- Type discriminator (one of 10 process types, see JOB_TYPES)
                 job_type TEXT NOT NULL CHECK(job_type IN (
                     'benchmark', 'tool_eval', 'judge', 'judge_compare',
                     'param_tune', 'prompt_tune', 'scheduled_benchmark',
-                    'prompt_auto_optimize'
+                    'prompt_auto_optimize', 'embedding_benchmark', 'rescore'
                 )),
 
                 -- Lifecycle
@@ -711,6 +780,49 @@ async def init_db():
         """)
         await db.commit()
 
+        # --- Prompt Datasets (JSONL files on disk, see prompt_datasets.py) ---
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS prompt_datasets (
+                id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+                user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                name TEXT NOT NULL,
+                prompt_count INTEGER NOT NULL DEFAULT 0,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                stats_json TEXT NOT NULL DEFAULT '{}',
+                created_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+        """)
+        await db.commit()
+
+        # --- Replay traces (parsed request logs on disk, see prompt_datasets.py) ---
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS replay_traces (
+                id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+                user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                name TEXT NOT NULL,
+                request_count INTEGER NOT NULL DEFAULT 0,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                stats_json TEXT NOT NULL DEFAULT '{}',
+                created_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+        """)
+        await db.commit()
+
+        # --- Response cache (content-addressed tool-eval responses, see response_cache.py) ---
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                model_id TEXT NOT NULL,
+                response_json TEXT NOT NULL,
+                latency_ms REAL NOT NULL DEFAULT 0,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                last_used_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+        """)
+        await db.commit()
+
         # ======================================================================
         # Indexes
         # ======================================================================
@@ -779,6 +891,13 @@ async def init_db():
         await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_timeout ON jobs(status, timeout_at)")
 
+        # Prompt dataset indexes
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_prompt_datasets_user ON prompt_datasets(user_id, created_at DESC)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_replay_traces_user ON replay_traces(user_id, created_at DESC)")
+
+        # Response cache LRU index
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_lru ON response_cache(last_used_at)")
+
         # Experiment indexes
         await db.execute("CREATE INDEX IF NOT EXISTS idx_experiments_user ON experiments(user_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_experiments_suite ON experiments(suite_id)")
@@ -921,6 +1040,167 @@ async def init_db():
         except Exception:
             pass
 
+        # --- Migration 709: Per-chunk timeline blob + ITL distribution on benchmark_results ---
+        for col, ctype in [
+            ("chunk_timeline", "BLOB"), ("itl_p50_ms", "REAL"), ("itl_p90_ms", "REAL"),
+            ("itl_p99_ms", "REAL"), ("max_stall_ms", "REAL"), ("stall_count", "INTEGER"),
+        ]:
+            try:
+                await db.execute(f"ALTER TABLE benchmark_results ADD COLUMN {col} {ctype}")
+            except Exception:
+                pass  # Column already exists
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (709, 'Add chunk_timeline and ITL distribution columns to benchmark_results')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 710: Prompt-cache accounting on benchmark_results ---
+        for col, ctype in [("cached_tokens", "INTEGER"), ("cache_phase", "TEXT")]:
+            try:
+                await db.execute(f"ALTER TABLE benchmark_results ADD COLUMN {col} {ctype}")
+            except Exception:
+                pass  # Column already exists
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (710, 'Add cached_tokens and cache_phase to benchmark_results')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 711: Connection-phase timings on benchmark_results ---
+        for col, ctype in [
+            ("dns_ms", "REAL"), ("connect_ms", "REAL"), ("tls_ms", "REAL"),
+            ("request_sent_ms", "REAL"), ("server_wait_ms", "REAL"), ("first_byte_ms", "REAL"),
+            ("stream_end_ms", "REAL"), ("connection_reused", "INTEGER"),
+        ]:
+            try:
+                await db.execute(f"ALTER TABLE benchmark_results ADD COLUMN {col} {ctype}")
+            except Exception:
+                pass  # Column already exists
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (711, 'Add connection-phase timing columns to benchmark_results')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 712: Decode-window profile (decay mode) on benchmark_results ---
+        for col, ctype in [
+            ("decode_windows", "BLOB"), ("decode_window_tokens", "INTEGER"), ("decode_slope_tps_per_1k", "REAL"),
+        ]:
+            try:
+                await db.execute(f"ALTER TABLE benchmark_results ADD COLUMN {col} {ctype}")
+            except Exception:
+                pass  # Column already exists
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (712, 'Add decode-window profile columns to benchmark_results')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 713: Reasoning vs answer phase metrics on benchmark_results ---
+        for col, ctype in [
+            ("reasoning_tokens", "INTEGER"), ("ttft_reasoning_ms", "REAL"), ("ttft_answer_ms", "REAL"),
+            ("reasoning_tps", "REAL"), ("answer_tps", "REAL"),
+        ]:
+            try:
+                await db.execute(f"ALTER TABLE benchmark_results ADD COLUMN {col} {ctype}")
+            except Exception:
+                pass  # Column already exists
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (713, 'Add reasoning-phase timing columns to benchmark_results')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 714: Prompt datasets for the dataset benchmark mode ---
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (714, 'Add prompt_datasets table')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 715: Embedding benchmarks (job type + per-request columns) ---
+        for col, ctype in [
+            ("batch_size", "INTEGER"), ("concurrency", "INTEGER"),
+            ("vectors_per_second", "REAL"), ("embedding_dim", "INTEGER"),
+        ]:
+            try:
+                await db.execute(f"ALTER TABLE benchmark_results ADD COLUMN {col} {ctype}")
+            except Exception:
+                pass  # Column already exists
+        try:
+            await _rebuild_jobs_job_type_check(db, JOB_TYPES)
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (715, 'Add embedding_benchmark job type and embedding columns to benchmark_results')"
+            )
+            await db.commit()
+        except Exception:
+            logger.exception("Migration 715 (jobs job_type rebuild) failed")
+
+        # --- Migration 716: Response cache for tool-eval calls ---
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (716, 'Add response_cache table')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 717: Rescore job type ---
+        try:
+            await _rebuild_jobs_job_type_check(db, JOB_TYPES)
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (717, 'Add rescore job type')"
+            )
+            await db.commit()
+        except Exception:
+            logger.exception("Migration 717 (jobs job_type rebuild) failed")
+
+        # --- Migration 718: Stored replay traces for the replay benchmark mode ---
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (718, 'Add replay_traces table')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
+        # --- Migration 719: Per-path schema validation errors on case_results ---
+        try:
+            await db.execute("ALTER TABLE case_results ADD COLUMN schema_errors TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (719, 'Add schema_errors to case_results')"
+            )
+            await db.commit()
+        except Exception:
+            pass
+
 
 # --- User CRUD ---
 
@@ -1168,6 +1448,14 @@ async def save_benchmark_run(
     return run_id
 
 
+async def update_benchmark_run_metadata(run_id: str, metadata: str) -> None:
+    """Replace the metadata JSON of a benchmark run (mode-specific summaries)."""
+    await _db.execute(
+        "UPDATE benchmark_runs SET metadata = ? WHERE id = ?",
+        (metadata, run_id),
+    )
+
+
 async def get_user_benchmark_runs(user_id: str, limit: int = 50, offset: int = 0) -> list[dict]:
     """Get benchmark runs for a user, newest first."""
     return await _db.fetch_all(
@@ -1211,57 +1499,128 @@ async def save_benchmark_result(
     cost: float | None = None,
     success: bool = True,
     error: str | None = None,
+    chunk_timeline: bytes | None = None,
+    itl_p50_ms: float | None = None,
+    itl_p90_ms: float | None = None,
+    itl_p99_ms: float | None = None,
+    max_stall_ms: float | None = None,
+    stall_count: int | None = None,
+    cached_tokens: int | None = None,
+    cache_phase: str | None = None,
+    dns_ms: float | None = None,
+    connect_ms: float | None = None,
+    tls_ms: float | None = None,
+    request_sent_ms: float | None = None,
+    server_wait_ms: float | None = None,
+    first_byte_ms: float | None = None,
+    stream_end_ms: float | None = None,
+    connection_reused: bool | None = None,
+    decode_windows: bytes | None = None,
+    decode_window_tokens: int | None = None,
+    decode_slope_tps_per_1k: float | None = None,
+    reasoning_tokens: int | None = None,
+    ttft_reasoning_ms: float | None = None,
+    ttft_answer_ms: float | None = None,
+    reasoning_tps: float | None = None,
+    answer_tps: float | None = None,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+    vectors_per_second: float | None = None,
+    embedding_dim: int | None = None,
 ) -> str:
-    """Save a single benchmark result. Returns result ID."""
+    """Save a single benchmark result. Returns result ID.
+
+    chunk_timeline is the packed float32 delta blob from
+    benchmark.pack_chunk_timeline (only present when timeline capture is on).
+    cache_phase is set by the prompt-cache mode ("prime"/"shared"/"unique").
+    The *_ms connection phases are only set when connection-phase capture is
+    on; connection_reused whenever the request went through a pooled client.
+    decode_windows is the float32 blob from benchmark.pack_decode_windows
+    (decay mode), one tok/s value per decode_window_tokens output tokens.
+    The reasoning/answer phase columns are only set for runs that reasoned.
+    batch_size/concurrency/vectors_per_second/embedding_dim are only set for
+    embedding benchmark requests (context_tokens is then tokens per input).
+    """
     result_id = uuid.uuid4().hex
     await _db.execute(
         "INSERT INTO benchmark_results "
         "(id, run_id, model_id, run_number, context_tokens, ttft_ms, total_time_s, "
         "output_tokens, input_tokens, tokens_per_second, input_tokens_per_second, "
-        "output_speed_tps, itl_ms, cost, success, error) "
-        "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        "output_speed_tps, itl_ms, cost, success, error, "
+        "chunk_timeline, itl_p50_ms, itl_p90_ms, itl_p99_ms, max_stall_ms, stall_count, "
+        "cached_tokens, cache_phase, dns_ms, connect_ms, tls_ms, request_sent_ms, "
+        "server_wait_ms, first_byte_ms, stream_end_ms, connection_reused, "
+        "decode_windows, decode_window_tokens, decode_slope_tps_per_1k, "
+        "reasoning_tokens, ttft_reasoning_ms, ttft_answer_ms, reasoning_tps, answer_tps, "
+        "batch_size, concurrency, vectors_per_second, embedding_dim) "
+        "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
         (result_id, run_id, model_id, run_number, context_tokens, ttft_ms, total_time_s,
          output_tokens, input_tokens, tokens_per_second, input_tokens_per_second,
-         output_speed_tps, itl_ms, cost, 1 if success else 0, error),
+         output_speed_tps, itl_ms, cost, 1 if success else 0, error,
+         chunk_timeline, itl_p50_ms, itl_p90_ms, itl_p99_ms, max_stall_ms, stall_count,
+         cached_tokens, cache_phase, dns_ms, connect_ms, tls_ms, request_sent_ms,
+         server_wait_ms, first_byte_ms, stream_end_ms,
+         None if connection_reused is None else int(connection_reused),
+         decode_windows, decode_window_tokens, decode_slope_tps_per_1k,
+         reasoning_tokens, ttft_reasoning_ms, ttft_answer_ms, reasoning_tps, answer_tps,
+         batch_size, concurrency, vectors_per_second, embedding_dim),
     )
     return result_id
 
 
-async def get_benchmark_results(run_id: str) -> list[dict]:
-    """Get aggregated per-model results for a benchmark run.
-
-    Returns one row per (model, context_tokens) with avg_* fields and
-    provider/model display names for frontend rendering.
-    """
+async def get_benchmark_timelines(run_id: str) -> list[dict]:
+    """Get per-run chunk timelines for a benchmark run (rows without one are skipped)."""
     return await _db.fetch_all(
-        "SELECT br.model_id, m.display_name AS model, p.name AS provider, "
-        "br.context_tokens, "
-        "COUNT(*) AS runs, "
-        "ROUND(AVG(CASE WHEN br.success = 1 THEN br.tokens_per_second END), 2) AS avg_tokens_per_second, "
-        "ROUND(AVG(CASE WHEN br.success = 1 THEN br.ttft_ms END), 1) AS avg_ttft_ms, "
-        "ROUND(AVG(CASE WHEN br.success = 1 THEN br.total_time_s END), 3) AS avg_total_time_s, "
-        "ROUND(AVG(CASE WHEN br.success = 1 THEN br.input_tokens_per_second END), 2) AS avg_input_tokens_per_second, "
-        "ROUND(AVG(CASE WHEN br.success = 1 THEN COALESCE(NULLIF(br.output_speed_tps, 0), br.tokens_per_second) END), 2) AS avg_output_speed_tps, "
-        "ROUND(AVG(CASE WHEN br.success = 1 THEN br.itl_ms END), 1) AS avg_itl_ms, "
-        "CASE WHEN SUM(CASE WHEN br.success = 1 THEN 1 ELSE 0 END) >= 2 THEN "
-        "  ROUND(SQRT(MAX(0, "
-        "    AVG(CASE WHEN br.success = 1 THEN COALESCE(NULLIF(br.output_speed_tps, 0), br.tokens_per_second) * COALESCE(NULLIF(br.output_speed_tps, 0), br.tokens_per_second) END) - "
-        "    AVG(CASE WHEN br.success = 1 THEN COALESCE(NULLIF(br.output_speed_tps, 0), br.tokens_per_second) END) * "
-        "    AVG(CASE WHEN br.success = 1 THEN COALESCE(NULLIF(br.output_speed_tps, 0), br.tokens_per_second) END)"
-        "  )), 2) ELSE 0 END AS std_dev_tps, "
-        "SUM(CASE WHEN br.success = 1 THEN 1 ELSE 0 END) AS success_count, "
-        "SUM(CASE WHEN br.success = 0 THEN 1 ELSE 0 END) AS error_count, "
-        "MAX(br.error) AS error "
+        "SELECT br.id, m.litellm_id AS model_id, m.display_name AS model, "
+        "br.run_number, br.context_tokens, br.ttft_ms, br.chunk_timeline, "
+        "br.itl_p50_ms, br.itl_p90_ms, br.itl_p99_ms, br.max_stall_ms, br.stall_count "
         "FROM benchmark_results br "
         "JOIN models m ON m.id = br.model_id "
-        "JOIN providers p ON p.id = m.provider_id "
-        "WHERE br.run_id = ? "
-        "GROUP BY br.model_id, br.context_tokens "
-        "ORDER BY avg_tokens_per_second DESC NULLS LAST, br.context_tokens",
+        "WHERE br.run_id = ? AND br.chunk_timeline IS NOT NULL "
+        "ORDER BY m.display_name, br.context_tokens, br.run_number",
         (run_id,),
     )
 
 
+_SAMPLE_QUERY_CHUNK = 500  # run ids per IN (...) list, below SQLite's variable limit
+
+
+async def get_benchmark_results(run_id: str) -> list[dict]:
+    """Get aggregated per-model results for a benchmark run.
+
+    Returns one row per (model, context_tokens) with avg_* fields,
+    percentiles, bootstrap CIs and provider/model display names for
+    frontend rendering.
+    """
+    return (await get_benchmark_results_for_runs([run_id])).get(run_id, [])
+
+
+async def get_benchmark_results_for_runs(run_ids: list[str]) -> dict[str, list[dict]]:
+    """Aggregated results for many runs: {run_id: [row, ...]}.
+
+    Raw samples are fetched with one query per chunk of run ids and
+    aggregated in a single vectorized pass (see aggregation.py).
+    """
+    samples = []
+    run_ids = list(dict.fromkeys(run_ids))
+    for i in range(0, len(run_ids), _SAMPLE_QUERY_CHUNK):
+        chunk = run_ids[i:i + _SAMPLE_QUERY_CHUNK]
+        samples.extend(await _db.fetch_all(
+            "SELECT br.run_id, br.model_id, m.display_name AS model, p.name AS provider, "
+            "br.context_tokens, br.success, br.error, br.tokens_per_second, br.ttft_ms, "
+            "br.total_time_s, br.input_tokens_per_second, br.output_speed_tps, br.itl_ms, "
+            "br.itl_p50_ms, br.itl_p90_ms, br.itl_p99_ms, br.max_stall_ms, br.stall_count, br.cost, "
+            "br.dns_ms, br.connect_ms, br.tls_ms, br.server_wait_ms, br.first_byte_ms, br.connection_reused, "
+            "br.reasoning_tokens, br.ttft_reasoning_ms, br.ttft_answer_ms, br.reasoning_tps, br.answer_tps "
+            "FROM benchmark_results br "
+            "JOIN models m ON m.id = br.model_id "
+            "JOIN providers p ON p.id = m.provider_id "
+            f"WHERE br.run_id IN ({','.join('?' * len(chunk))})",
+            tuple(chunk),
+        ))
+    return summarize_result_rows(samples)
+
+
 # --- Audit Log ---
 
 async def log_audit(
@@ -1297,11 +1656,19 @@ async def log_audit(
 
 # --- Tool Suites CRUD ---
 
+# tool_suites.updated_at is written at millisecond precision by every writer,
+# so two edits in the same second still give the compiled-suite cache
+# (tool_eval_scoring.py) a new, comparable version to key on.
+_SUITE_STAMP_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+_SUITE_TOUCH_SQL = f"UPDATE tool_suites SET updated_at = {_SUITE_STAMP_SQL} WHERE id = ?"
+
+
 async def create_tool_suite(user_id: str, name: str, description: str, system_prompt: str | None = None) -> str:
     """Create a tool suite. Returns suite_id."""
     suite_id = uuid.uuid4().hex
     await _db.execute(
-        "INSERT INTO tool_suites (id, user_id, name, description, system_prompt) VALUES (?, ?, ?, ?, ?)",
+        "INSERT INTO tool_suites (id, user_id, name, description, system_prompt, updated_at) "
+        f"VALUES (?, ?, ?, ?, ?, {_SUITE_STAMP_SQL})",
         (suite_id, user_id, name, description, system_prompt or ""),
     )
     return suite_id
@@ -1341,7 +1708,7 @@ async def update_tool_suite(suite_id: str, user_id: str, name: str = None, descr
         params.append(system_prompt)
     if not fields:
         return False
-    fields.append("updated_at = datetime('now')")
+    fields.append(f"updated_at = {_SUITE_STAMP_SQL}")
     params.extend([suite_id, user_id])
     count = await _db.execute_returning_rowcount(
         f"UPDATE tool_suites SET {', '.join(fields)} WHERE id = ? AND user_id = ?",
@@ -1359,6 +1726,21 @@ async def delete_tool_suite(suite_id: str, user_id: str) -> bool:
     return count > 0
 
 
+async def get_tool_suite_version(suite_id: str, user_id: str) -> str | None:
+    """Last-modified stamp of a suite, bumped by every tool definition and test case write.
+
+    Scoped to user: None when the suite does not exist or belongs to someone else.
+    """
+    return await _db.execute_returning_scalar(
+        "SELECT updated_at FROM tool_suites WHERE id = ? AND user_id = ?", (suite_id, user_id),
+    )
+
+
+async def touch_tool_suite(suite_id: str):
+    """Mark a suite as modified after its tools or test cases change."""
+    await _db.execute(_SUITE_TOUCH_SQL, (suite_id,))
+
+
 # --- Tool Definitions CRUD ---
 
 async def create_tool_definitions_batch(suite_id: str, tools: list[dict]) -> list[str]:
@@ -1382,6 +1764,7 @@ async def create_tool_definitions_batch(suite_id: str, tools: list[dict]) -> lis
                  idx),
             )
             ids.append(tool_id)
+        await conn.execute(_SUITE_TOUCH_SQL, (suite_id,))
         await conn.commit()
     return ids
 
@@ -1400,6 +1783,7 @@ async def delete_tool_definitions_for_suite(suite_id: str):
         "DELETE FROM tool_definitions WHERE suite_id = ?",
         (suite_id,),
     )
+    await touch_tool_suite(suite_id)
 
 
 # --- Tool Test Cases CRUD ---
@@ -1424,6 +1808,7 @@ async def create_test_case(suite_id: str, prompt: str, expected_tool: str | None
         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
         (case_id, suite_id, prompt, expected_tool, expected_params, param_scoring, multi_turn_config, scoring_config_json, 1 if should_call_tool else 0, category),
     )
+    await touch_tool_suite(suite_id)
     return case_id
 
 
@@ -1442,8 +1827,8 @@ async def create_suite_with_cases(
         await conn.execute("PRAGMA foreign_keys=ON")
         suite_id = uuid.uuid4().hex
         await conn.execute(
-            "INSERT INTO tool_suites (id, user_id, name, description, system_prompt) "
-            "VALUES (?, ?, ?, ?, ?)",
+            "INSERT INTO tool_suites (id, user_id, name, description, system_prompt, updated_at) "
+            f"VALUES (?, ?, ?, ?, ?, {_SUITE_STAMP_SQL})",
             (suite_id, user_id, name, description, system_prompt or ""),
         )
         # Create tool_definitions and build name->id map
@@ -1510,6 +1895,7 @@ async def create_test_cases_batch(suite_id: str, cases: list[dict]) -> int:
                     case.get("category"),
                 ),
             )
+        await conn.execute(_SUITE_TOUCH_SQL, (suite_id,))
         await conn.commit()
         return len(cases)
 
@@ -1549,6 +1935,8 @@ async def update_test_case(case_id: str, suite_id: str, prompt: str = None, expe
         f"UPDATE tool_test_cases SET {', '.join(fields)} WHERE id = ? AND suite_id = ?",
         params,
     )
+    if count:
+        await touch_tool_suite(suite_id)
     return count > 0
 
 
@@ -1558,6 +1946,8 @@ async def delete_test_case(case_id: str, suite_id: str) -> bool:
         "DELETE FROM tool_test_cases WHERE id = ? AND suite_id = ?",
         (case_id, suite_id),
     )
+    if count:
+        await touch_tool_suite(suite_id)
     return count > 0
 
 
@@ -1661,21 +2051,25 @@ async def save_case_result(
     required_present: float | None = None,
     type_correct: float | None = None,
     hallucination_free: float | None = None,
+    schema_errors: str | None = None,
 ) -> str:
-    """Save a single case result. Returns result ID."""
+    """Save a single case result. Returns result ID.
+
+    schema_errors is the JSON list of per-path schema validation errors.
+    """
     result_id = uuid.uuid4().hex
     await _db.execute(
         "INSERT INTO case_results "
         "(id, eval_run_id, test_case_id, model_id, tool_selection_score, param_accuracy, "
         "overall_score, irrelevance_score, actual_tool, actual_params, success, error, "
         "latency_ms, format_compliance, error_type, raw_request, raw_response, "
-        "schema_score, required_present, type_correct, hallucination_free) "
-        "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        "schema_score, required_present, type_correct, hallucination_free, schema_errors) "
+        "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
         (result_id, eval_run_id, test_case_id, model_id, tool_selection_score, param_accuracy,
          overall_score, irrelevance_score, actual_tool, actual_params,
          1 if success else 0, error, latency_ms, format_compliance, error_type,
          raw_request, raw_response,
-         schema_score, required_present, type_correct, hallucination_free),
+         schema_score, required_present, type_correct, hallucination_free, schema_errors),
     )
     return result_id
 
@@ -1692,8 +2086,8 @@ async def save_case_results_batch(eval_run_id: str, results: list[dict]) -> int:
                 "(id, eval_run_id, test_case_id, model_id, tool_selection_score, param_accuracy, "
                 "overall_score, irrelevance_score, actual_tool, actual_params, success, error, "
                 "latency_ms, format_compliance, error_type, raw_request, raw_response, "
-                "schema_score, required_present, type_correct, hallucination_free) "
-                "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                "schema_score, required_present, type_correct, hallucination_free, schema_errors) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
                 (result_id, eval_run_id, r["test_case_id"], r["model_id"],
                  r.get("tool_selection_score", 0.0), r.get("param_accuracy"),
                  r.get("overall_score", 0.0), r.get("irrelevance_score"),
@@ -1702,7 +2096,7 @@ async def save_case_results_batch(eval_run_id: str, results: list[dict]) -> int:
                  r.get("latency_ms", 0), r.get("format_compliance", "PASS"),
                  r.get("error_type"), r.get("raw_request"), r.get("raw_response"),
                  r.get("schema_score"), r.get("required_present"),
-                 r.get("type_correct"), r.get("hallucination_free")),
+                 r.get("type_correct"), r.get("hallucination_free"), r.get("schema_errors")),
             )
         await conn.commit()
     return len(results)
@@ -1732,6 +2126,46 @@ async def get_case_results(eval_run_id: str, model_id: str | None = None) -> lis
     )
 
 
+async def count_case_results(eval_run_id: str) -> int:
+    """Number of case results stored for an eval run."""
+    return await _db.execute_returning_scalar(
+        "SELECT COUNT(*) FROM case_results WHERE eval_run_id = ?", (eval_run_id,),
+    ) or 0
+
+
+async def get_case_results_page(eval_run_id: str, after_rowid: int = 0, limit: int = 500) -> list[dict]:
+    """Next page of an eval run's case results in insertion order (keyset on rowid).
+
+    Returns only what rescoring needs -- the stored call plus current scores;
+    raw_request is left out to keep pages small.
+    """
+    return await _db.fetch_all(
+        "SELECT rowid AS _rowid, id, test_case_id, model_id, success, actual_tool, actual_params, "
+        "raw_response, tool_selection_score, param_accuracy, overall_score, irrelevance_score, "
+        "schema_score, required_present, type_correct, hallucination_free, schema_errors, "
+        "format_compliance, error_type "
+        "FROM case_results WHERE eval_run_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+        (eval_run_id, after_rowid, limit),
+    )
+
+
+async def update_case_result_scores(updates: list[dict]) -> int:
+    """Write re-computed scores for many case results in one transaction. Returns count updated."""
+    async with aiosqlite.connect(_db._path()) as conn:
+        await conn.execute("PRAGMA busy_timeout=5000")
+        await conn.executemany(
+            "UPDATE case_results SET tool_selection_score = ?, param_accuracy = ?, overall_score = ?, "
+            "irrelevance_score = ?, schema_score = ?, required_present = ?, type_correct = ?, "
+            "hallucination_free = ?, schema_errors = ?, format_compliance = ?, error_type = ? WHERE id = ?",
+            [(u["tool_selection_score"], u["param_accuracy"], u["overall_score"],
+              u["irrelevance_score"], u["schema_score"], u["required_present"], u["type_correct"],
+              u["hallucination_free"], u["schema_errors"], u["format_compliance"], u["error_type"], u["id"])
+             for u in updates],
+        )
+        await conn.commit()
+    return len(updates)
+
+
 async def get_case_results_summary(eval_run_id: str) -> list[dict]:
     """Aggregate per-model summary for an eval run (replaces summary_json)."""
     summaries = await _db.fetch_all(
@@ -1791,6 +2225,43 @@ async def get_case_results_summary(eval_run_id: str) -> list[dict]:
     return summaries
 
 
+async def get_recent_call_latencies(days: int = 30, per_profile: int = 500) -> list[dict]:
+    """Recent successful-call latencies for perf_profiles, newest first.
+
+    One row per call with ``litellm_id``, ``api_base``, ``call_type``
+    ("benchmark" = TTFT of context-free runs, "tool_eval" = case latency) and
+    ``latency_ms``, keeping at most ``per_profile`` rows per profile.
+    Multi-turn cases are skipped: their latency is the total over all
+    rounds, not the latency of one completion.
+    """
+    return await _db.fetch_all(
+        """SELECT litellm_id, api_base, call_type, latency_ms FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY litellm_id, api_base, call_type ORDER BY created_at DESC
+            ) AS rn FROM (
+                SELECT m.litellm_id, p.api_base, 'benchmark' AS call_type,
+                       br.ttft_ms AS latency_ms, br.created_at
+                FROM benchmark_results br
+                JOIN models m ON br.model_id = m.id
+                JOIN providers p ON m.provider_id = p.id
+                WHERE br.success = 1 AND br.context_tokens = 0 AND br.ttft_ms > 0
+                  AND br.created_at >= datetime('now', ?)
+                UNION ALL
+                SELECT m.litellm_id, p.api_base, 'tool_eval', cr.latency_ms, cr.created_at
+                FROM case_results cr
+                JOIN models m ON cr.model_id = m.id
+                JOIN providers p ON m.provider_id = p.id
+                JOIN tool_test_cases tc ON cr.test_case_id = tc.id
+                WHERE cr.success = 1 AND cr.latency_ms > 0
+                  AND cr.created_at >= datetime('now', ?)
+                  AND NOT COALESCE(CASE WHEN json_valid(tc.multi_turn_config)
+                                        THEN json_extract(tc.multi_turn_config, '$.multi_turn') END, 0)
+            )
+        ) WHERE rn <= ? ORDER BY created_at DESC""",
+        (f"-{days} days", f"-{days} days", per_profile),
+    )
+
+
 # --- Parameter Tuner CRUD ---
 
 async def save_param_tune_run(
@@ -2496,29 +2967,71 @@ _PERIOD_MAP = {
 }
 
 
-def _period_filter(period: str) -> tuple[str, list]:
-    """Return (SQL WHERE clause fragment, params) for a period filter on `timestamp`."""
+def _period_filter(period: str, alias: str = "") -> tuple[str, list]:
+    """Return (SQL WHERE clause fragment, params) for a period filter on `timestamp`.
+
+    ``alias`` qualifies the column with a table alias (e.g. "r" -> r.timestamp).
+    """
     interval = _PERIOD_MAP.get(period)
     if interval:
-        return "AND timestamp > datetime('now', ?)", [interval]
+        column = f"{alias}.timestamp" if alias else "timestamp"
+        return f"AND {column} > datetime('now', ?)", [interval]
     return "", []
 
 
+def _run_mode_sql(alias: str = "") -> str:
+    """SQL expression for a benchmark run's mode (config_json $.mode, default 'standard').
+
+    ``alias`` qualifies config_json with the benchmark_runs table alias.
+    """
+    column = f"{alias}.config_json" if alias else "config_json"
+    return f"COALESCE(json_extract(CASE WHEN json_valid({column}) THEN {column} END, '$.mode'), 'standard')"
+
+
 async def get_analytics_benchmark_runs(user_id: str, period: str = "all") -> list[dict]:
-    """Return benchmark runs for a user within the given period.
+    """Return chat benchmark runs for a user within the given period.
 
-    Each row includes id, timestamp, prompt.
+    Each row includes id, timestamp, prompt. Embedding benchmark runs are
+    left out (see get_analytics_embedding_results).
     Results are in the benchmark_results table.
     """
     where_extra, params = _period_filter(period)
     return await _db.fetch_all(
         f"SELECT id, timestamp, prompt "
-        f"FROM benchmark_runs WHERE user_id = ? {where_extra} "
+        f"FROM benchmark_runs WHERE user_id = ? AND {_run_mode_sql()} != 'embedding' {where_extra} "
         f"ORDER BY timestamp DESC",
         [user_id] + params,
     )
 
 
+async def get_analytics_embedding_results(user_id: str, period: str = "all") -> list[dict]:
+    """Per-model aggregates of a user's embedding benchmark requests in the period.
+
+    One row per model with request/success counts, mean per-request
+    vectors/s and tokens/s, mean latency, cost per 1M input tokens and the
+    latest run timestamp.
+    """
+    where_extra, params = _period_filter(period, alias="r")
+    return await _db.fetch_all(
+        "SELECT m.litellm_id AS model_id, m.display_name AS model, p.name AS provider, "
+        "COUNT(*) AS requests, SUM(br.success) AS successes, "
+        "AVG(CASE WHEN br.success = 1 THEN br.vectors_per_second END) AS avg_vectors_per_second, "
+        "AVG(CASE WHEN br.success = 1 THEN br.tokens_per_second END) AS avg_tokens_per_second, "
+        "AVG(CASE WHEN br.success = 1 THEN br.total_time_s END) * 1000 AS avg_latency_ms, "
+        "SUM(CASE WHEN br.success = 1 THEN br.cost ELSE 0 END) AS total_cost, "
+        "SUM(CASE WHEN br.success = 1 THEN br.input_tokens ELSE 0 END) AS input_tokens, "
+        "MAX(br.embedding_dim) AS embedding_dim, MAX(r.timestamp) AS last_run "
+        "FROM benchmark_results br "
+        "JOIN benchmark_runs r ON r.id = br.run_id "
+        "JOIN models m ON m.id = br.model_id "
+        "JOIN providers p ON p.id = m.provider_id "
+        f"WHERE r.user_id = ? AND {_run_mode_sql('r')} = 'embedding' "
+        f"{where_extra} "
+        "GROUP BY br.model_id",
+        [user_id] + params,
+    )
+
+
 async def get_analytics_tool_eval_runs(user_id: str, period: str = "all") -> list[dict]:
     """Return tool eval runs for a user within the given period.
 
@@ -2894,6 +3407,152 @@ async def get_user_recent_job_count(user_id: str, hours: int = 1) -> int:
     return result["cnt"] if result else 0
 
 
+# --- Prompt Datasets CRUD ---
+
+async def create_prompt_dataset(
+    dataset_id: str, user_id: str, name: str, prompt_count: int, size_bytes: int, stats_json: str = "{}",
+) -> dict:
+    """Register an uploaded dataset file. Returns the row."""
+    await _db.execute(
+        "INSERT INTO prompt_datasets (id, user_id, name, prompt_count, size_bytes, stats_json) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (dataset_id, user_id, name, prompt_count, size_bytes, stats_json),
+    )
+    return await get_prompt_dataset(dataset_id, user_id)
+
+
+async def get_prompt_datasets(user_id: str) -> list[dict]:
+    """List a user's datasets, newest first."""
+    return await _db.fetch_all(
+        "SELECT * FROM prompt_datasets WHERE user_id = ? ORDER BY created_at DESC",
+        (user_id,),
+    )
+
+
+async def get_prompt_dataset(dataset_id: str, user_id: str) -> dict | None:
+    """Get a single dataset with ownership check."""
+    return await _db.fetch_one(
+        "SELECT * FROM prompt_datasets WHERE id = ? AND user_id = ?",
+        (dataset_id, user_id),
+    )
+
+
+async def delete_prompt_dataset(dataset_id: str, user_id: str) -> bool:
+    """Delete a dataset row with ownership check. Returns True if deleted."""
+    count = await _db.execute_returning_rowcount(
+        "DELETE FROM prompt_datasets WHERE id = ? AND user_id = ?",
+        (dataset_id, user_id),
+    )
+    return count > 0
+
+
+# --- Replay Traces CRUD ---
+
+async def create_replay_trace(
+    trace_id: str, user_id: str, name: str, request_count: int, size_bytes: int, stats_json: str = "{}",
+) -> dict:
+    """Register an imported replay trace file. Returns the row."""
+    await _db.execute(
+        "INSERT INTO replay_traces (id, user_id, name, request_count, size_bytes, stats_json) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (trace_id, user_id, name, request_count, size_bytes, stats_json),
+    )
+    return await get_replay_trace(trace_id, user_id)
+
+
+async def get_replay_traces(user_id: str) -> list[dict]:
+    """List a user's replay traces, newest first."""
+    return await _db.fetch_all(
+        "SELECT * FROM replay_traces WHERE user_id = ? ORDER BY created_at DESC",
+        (user_id,),
+    )
+
+
+async def get_replay_trace(trace_id: str, user_id: str) -> dict | None:
+    """Get a single replay trace with ownership check."""
+    return await _db.fetch_one(
+        "SELECT * FROM replay_traces WHERE id = ? AND user_id = ?",
+        (trace_id, user_id),
+    )
+
+
+async def delete_replay_trace(trace_id: str, user_id: str) -> bool:
+    """Delete a replay trace row with ownership check. Returns True if deleted."""
+    count = await _db.execute_returning_rowcount(
+        "DELETE FROM replay_traces WHERE id = ? AND user_id = ?",
+        (trace_id, user_id),
+    )
+    return count > 0
+
+
+# --- Response Cache CRUD ---
+
+async def get_cached_response(cache_key: str) -> dict | None:
+    """Fetch a cached response and mark it recently used (LRU). None on a miss."""
+    row = await _db.fetch_one("SELECT * FROM response_cache WHERE cache_key = ?", (cache_key,))
+    if row:
+        await _db.execute(
+            "UPDATE response_cache SET hit_count = hit_count + 1, "
+            "last_used_at = strftime('%Y-%m-%d %H:%M:%f', 'now') "
+            "WHERE cache_key = ?",
+            (cache_key,),
+        )
+    return row
+
+
+async def put_cached_response(cache_key: str, model_id: str, response_json: str, latency_ms: float):
+    """Insert or refresh one cached response."""
+    await _db.execute(
+        "INSERT INTO response_cache (cache_key, model_id, response_json, latency_ms, size_bytes, last_used_at) "
+        "VALUES (?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now')) "
+        "ON CONFLICT(cache_key) DO UPDATE SET response_json = excluded.response_json, "
+        "latency_ms = excluded.latency_ms, size_bytes = excluded.size_bytes, last_used_at = excluded.last_used_at",
+        (cache_key, model_id, response_json, latency_ms, len(response_json.encode())),
+    )
+
+
+async def evict_response_cache(max_bytes: int) -> int:
+    """Drop least-recently-used entries until the cache fits in ``max_bytes``.
+
+    Returns the number of entries removed.
+    """
+    total = await _db.fetch_one("SELECT COALESCE(SUM(size_bytes), 0) AS total FROM response_cache")
+    excess = (total["total"] if total else 0) - max_bytes
+    if excess <= 0:
+        return 0
+    rows = await _db.fetch_all(
+        "SELECT cache_key, size_bytes FROM response_cache ORDER BY last_used_at, created_at, rowid"
+    )
+    doomed = []
+    for row in rows:
+        if excess <= 0:
+            break
+        doomed.append(row["cache_key"])
+        excess -= row["size_bytes"]
+    removed = 0
+    for i in range(0, len(doomed), 500):
+        chunk = doomed[i:i + 500]
+        removed += await _db.execute_returning_rowcount(
+            f"DELETE FROM response_cache WHERE cache_key IN ({','.join('?' * len(chunk))})",
+            tuple(chunk),
+        )
+    return removed
+
+
+async def get_response_cache_stats() -> dict:
+    """Entry count, stored bytes and total hits of the response cache."""
+    row = await _db.fetch_one(
+        "SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size_bytes, "
+        "COALESCE(SUM(hit_count), 0) AS hits FROM response_cache"
+    )
+    return dict(row) if row else {"entries": 0, "size_bytes": 0, "hits": 0}
+
+
+async def clear_response_cache() -> int:
+    """Delete every cached response. Returns the number removed."""
+    return await _db.execute_returning_rowcount("DELETE FROM response_cache")
+
+
 # --- Model Profiles CRUD ---
 
 MAX_PROFILES_PER_MODEL = 20
@@ -0,0 +1,439 @@
+"""Instrumented HTTP clients for LiteLLM calls.
+
+LiteLLM normally opens its own connections (through aiohttp by default), so
+the TTFT measured in ``async_run_single`` mixes network setup with model
+prefill, and every request may pay for a fresh connection. Benchmark, eval
+and judge calls instead pass LiteLLM a pooled client built here. Its httpx
+transport keeps connections alive between calls and timestamps each phase of
+the request:
+
+  DNS lookup -> TCP connect -> TLS handshake -> request sent
+  -> first response byte -> end of stream (marked by the caller)
+
+DNS comes from a wrapper around httpcore's network backend. The wrapper
+resolves the host itself, so the lookup is timed on its own. TCP, TLS and the
+request/response events come from httpcore's ``trace`` request extension. A
+request that reuses a kept-alive connection has no DNS/TCP/TLS phases.
+
+Clients are pooled per event loop and endpoint (API base + key hash), with
+keep-alive, configurable limits (HTTP_POOL_* env vars) and HTTP/2 when the
+optional ``h2`` package is installed. LiteLLM only accepts a custom client for
+some providers, and each needs a provider-specific wrapper (the OpenAI SDK or
+LiteLLM's own HTTP handler). For any other provider ``litellm_client``
+returns None and LiteLLM uses its own connections, untraced.
+
+Usage:
+    from http_clients import litellm_client, record_phases
+
+    with record_phases() as phases:
+        kwargs["client"] = litellm_client(kwargs)
+        ...  # send, then consume the stream
+        phases.mark("stream_end")
+    timings = phases.durations()
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+import httpcore
+import httpx
+import litellm
+
+logger = logging.getLogger(__name__)
+
+PHASE_FIELDS = (
+    "dns_ms", "connect_ms", "tls_ms", "request_sent_ms",
+    "server_wait_ms", "first_byte_ms", "stream_end_ms",
+)
+
+# Providers whose LiteLLM integration accepts ``client=AsyncOpenAI(...)``
+_OPENAI_SDK_PROVIDERS = frozenset({"openai", "custom_openai", "lm_studio"})
+# Providers whose LiteLLM integration accepts ``client=AsyncHTTPHandler``
+_HTTP_HANDLER_PROVIDERS = frozenset({
+    "anthropic", "deepseek", "fireworks_ai", "groq", "hosted_vllm", "mistral",
+    "ollama", "ollama_chat", "openrouter", "together_ai", "xai",
+})
+
+DRAIN_TIMEOUT_S = 0.25  # max time spent reading a response's tail on close
+
+# httpcore trace event (without the http11/http2/connection prefix) -> mark
+_TRACE_MARKS = {
+    "connect_tcp.started": "connect_start",
+    "connect_tcp.complete": "connect_end",
+    "start_tls.started": "tls_start",
+    "start_tls.complete": "tls_end",
+    "send_request_body.complete": "request_sent",
+    "receive_response_headers.complete": "first_byte",
+}
+
+_current: ContextVar[Optional["ConnectionPhases"]] = ContextVar("connection_phases", default=None)
+
+
+class ConnectionPhases:
+    """perf_counter() marks for the phases of one HTTP request."""
+
+    def __init__(self):
+        self.marks: dict[str, float] = {}
+
+    def begin(self, at: Optional[float] = None) -> None:
+        """Start a new attempt (e.g. after a 429 retry), dropping older marks."""
+        self.marks = {"start": time.perf_counter() if at is None else at}
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = time.perf_counter()
+
+    async def trace(self, event_name: str, info: dict) -> None:
+        """httpcore ``trace`` extension callback."""
+        name = _TRACE_MARKS.get(event_name.split(".", 1)[-1])
+        if name:
+            self.mark(name)
+
+    def _span(self, begin: str, end: str) -> Optional[float]:
+        if begin in self.marks and end in self.marks:
+            return round((self.marks[end] - self.marks[begin]) * 1000, 2)
+        return None
+
+    @property
+    def connection_reused(self) -> Optional[bool]:
+        """True if no new connection was opened; None if nothing was traced."""
+        if "request_sent" not in self.marks:
+            return None
+        return "connect_end" not in self.marks
+
+    def durations(self) -> dict:
+        """Phase durations (dns/connect/tls) and offsets from the send, in ms.
+
+        Phases that did not happen, or could not be observed, are None.
+        """
+        marks = self.marks
+        connect_begin = "dns_end" if "dns_end" in marks else "connect_start"
+        return {
+            "dns_ms": self._span("dns_start", "dns_end"),
+            "connect_ms": self._span(connect_begin, "connect_end"),
+            "tls_ms": self._span("tls_start", "tls_end"),
+            "request_sent_ms": self._span("start", "request_sent"),
+            "server_wait_ms": self._span("request_sent", "first_byte"),
+            "first_byte_ms": self._span("start", "first_byte"),
+            "stream_end_ms": self._span("start", "stream_end"),
+            "connection_reused": self.connection_reused,
+        }
+
+
+def current_phases() -> Optional[ConnectionPhases]:
+    """The recorder for the request being made in this context, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def record_phases(phases: Optional[ConnectionPhases] = None) -> Iterator[ConnectionPhases]:
+    """Record connection phases for requests sent inside the block."""
+    phases = phases if phases is not None else ConnectionPhases()
+    token = _current.set(phases)
+    try:
+        yield phases
+    finally:
+        _current.reset(token)
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class _TimedNetworkBackend(httpcore.AsyncNetworkBackend):
+    """Resolves hostnames itself so DNS is timed apart from the TCP connect."""
+
+    def __init__(self, inner: httpcore.AsyncNetworkBackend):
+        self._inner = inner
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        phases = _current.get()
+        if phases is None or _is_ip(host):
+            return await self._inner.connect_tcp(host, port, timeout, local_address, socket_options)
+
+        phases.mark("dns_start")
+        try:
+            infos = await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout,
+            )
+        except asyncio.TimeoutError as exc:
+            raise httpcore.ConnectTimeout(f"DNS lookup for {host} timed out") from exc
+        except OSError as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        phases.mark("dns_end")
+
+        error: Optional[Exception] = None
+        for *_, sockaddr in infos:
+            try:
+                return await self._inner.connect_tcp(sockaddr[0], port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._inner.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._inner.sleep(seconds)
+
+
+class _DrainingStream(httpx.AsyncByteStream):
+    """Reads what is left of a response before closing it.
+
+    SSE clients (the OpenAI SDK included) stop at ``data: [DONE]`` and close
+    the response before the HTTP message terminator is read. httpcore then
+    drops the connection instead of returning it to the pool. Draining the
+    last bytes, bounded by DRAIN_TIMEOUT_S, keeps the connection reusable.
+    """
+
+    def __init__(self, inner: httpx.AsyncByteStream):
+        self._inner = inner
+
+    async def __aiter__(self):
+        async for part in self._inner:
+            yield part
+
+    async def _drain(self) -> None:
+        async for _ in self._inner:
+            pass
+
+    async def aclose(self) -> None:
+        try:
+            await asyncio.wait_for(self._drain(), DRAIN_TIMEOUT_S)
+        except Exception:
+            pass  # unfinished or broken response: the connection is dropped
+        await self._inner.aclose()
+
+
+class PhaseTracingTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that reports connection phases to the active recorder.
+
+    Every request is traced (with a throwaway recorder when none is active)
+    so the transport can count how many requests reused a pooled connection.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        pool = self._pool
+        if hasattr(pool, "_network_backend"):
+            pool._network_backend = _TimedNetworkBackend(pool._network_backend)
+        self.requests = 0
+        self.reused = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        phases = _current.get()
+        recorder = phases if phases is not None else ConnectionPhases()
+        request.extensions = {**request.extensions, "trace": recorder.trace}
+        response = await super().handle_async_request(request)
+        self.requests += 1
+        if "connect_end" not in recorder.marks:
+            self.reused += 1
+        response.stream = _DrainingStream(response.stream)
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Pooled LiteLLM clients
+# ---------------------------------------------------------------------------
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+POOL_ENABLED = _env_flag("HTTP_POOL", True)
+POOL_MAX_CONNECTIONS = int(os.environ.get("HTTP_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.environ.get("HTTP_POOL_MAX_KEEPALIVE", "20"))
+POOL_KEEPALIVE_EXPIRY_S = float(os.environ.get("HTTP_POOL_KEEPALIVE_EXPIRY_S", "60"))
+# HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)
+POOL_HTTP2 = _env_flag("HTTP_POOL_HTTP2", True) and _h2_available()
+PREWARM_TIMEOUT_S = 5.0
+
+
+class _PoolEntry:
+    """One endpoint's client: the LiteLLM-facing wrapper and its httpx client."""
+
+    def __init__(self, label: str, client, http: httpx.AsyncClient, base_url: Optional[str]):
+        self.label = label
+        self.client = client
+        self.http = http
+        self.base_url = base_url
+
+    @property
+    def transport(self) -> PhaseTracingTransport:
+        return self.http._transport
+
+
+# loop -> {(family, api_base, key fingerprint): _PoolEntry}. Clients are bound
+# to the loop they were created on (the main loop or the measurement loop).
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _resolve_provider(kwargs: dict) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """(provider, api_base, api_key) as LiteLLM would resolve them for ``kwargs``."""
+    try:
+        _, provider, dynamic_key, dynamic_base = litellm.get_llm_provider(
+            model=kwargs.get("model", ""),
+            custom_llm_provider=kwargs.get("custom_llm_provider"),
+            api_base=kwargs.get("api_base"),
+            api_key=kwargs.get("api_key"),
+        )
+    except Exception:
+        return None, None, None
+    return provider, kwargs.get("api_base") or dynamic_base, kwargs.get("api_key") or dynamic_key
+
+
+def _new_httpx_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY_S,
+    )
+    return httpx.AsyncClient(
+        transport=PhaseTracingTransport(limits=limits, http2=POOL_HTTP2),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        follow_redirects=True,
+    )
+
+
+def _pool_entry(kwargs: dict) -> Optional[_PoolEntry]:
+    provider, api_base, api_key = _resolve_provider(kwargs)
+    if provider in _OPENAI_SDK_PROVIDERS:
+        family = "openai"
+        api_key = api_key or os.environ.get("OPENAI_API_KEY") or ("none" if api_base else None)
+        if not api_key:
+            return None
+    elif provider in _HTTP_HANDLER_PROVIDERS:
+        family = "handler"
+    else:
+        return None
+
+    fingerprint = hashlib.sha1(str(api_key).encode()).hexdigest()[:10] if api_key else "-"
+    key = (family, api_base, fingerprint)
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        per_loop = _clients.setdefault(loop, {})
+        entry = per_loop.get(key)
+        if entry is not None:
+            return entry
+        http = _new_httpx_client()
+        if family == "openai":
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(api_key=api_key, base_url=api_base, http_client=http, max_retries=0)
+            base_url = str(client.base_url)
+        else:
+            from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+
+            client = AsyncHTTPHandler()
+            client.client = http
+            base_url = api_base
+        entry = per_loop[key] = _PoolEntry(f"{api_base or provider}|{fingerprint}", client, http, base_url)
+    logger.debug("Created pooled %s client for %s (http2=%s)", family, api_base or provider, POOL_HTTP2)
+    return entry
+
+
+def litellm_client(kwargs: dict):
+    """The pooled, phase-traced client to pass as ``client=`` for this call, or None.
+
+    None means the provider does not accept a custom client (or the key or
+    base URL can't be resolved), so LiteLLM should use its own.
+    """
+    entry = _pool_entry(kwargs)
+    return entry.client if entry is not None else None
+
+
+def attach_pooled_client(kwargs: dict) -> bool:
+    """Set ``kwargs["client"]`` to the endpoint's pooled client when pooling is on.
+
+    Returns whether a client was attached. A client already in ``kwargs``
+    is left alone.
+    """
+    if not POOL_ENABLED or "client" in kwargs:
+        return False
+    client = litellm_client(kwargs)
+    if client is None:
+        return False
+    kwargs["client"] = client
+    return True
+
+
+async def _warm(entry: _PoolEntry, timeout: float) -> bool:
+    try:
+        await entry.http.request("HEAD", entry.base_url, timeout=timeout)
+    except httpx.HTTPError as exc:
+        logger.debug("Pre-warm of %s failed: %s", entry.label, exc)
+        return False
+    return True
+
+
+async def prewarm(kwargs_list: list[dict], timeout: float = PREWARM_TIMEOUT_S) -> int:
+    """Open a kept-alive connection to each distinct endpoint before timing starts.
+
+    Sends one HEAD request per endpoint (any status will do: only the
+    connection matters). Endpoints without a known base URL, or whose
+    provider does not take a pooled client, are skipped. Returns the number
+    of endpoints warmed.
+    """
+    entries: dict[str, _PoolEntry] = {}
+    for kwargs in kwargs_list:
+        entry = _pool_entry(kwargs)
+        if entry is not None and entry.base_url:
+            entries.setdefault(entry.label, entry)
+    warmed = await asyncio.gather(*(_warm(e, timeout) for e in entries.values()))
+    return sum(warmed)
+
+
+def pool_stats() -> dict:
+    """Per-endpoint request and connection-reuse counters, summed across loops."""
+    with _clients_lock:
+        entries = [e for per_loop in list(_clients.values()) for e in per_loop.values()]
+    stats: dict[str, dict] = {}
+    for entry in entries:
+        s = stats.setdefault(entry.label, {"requests": 0, "reused": 0, "new_connections": 0})
+        transport = entry.transport
+        s["requests"] += transport.requests
+        s["reused"] += transport.reused
+        s["new_connections"] += transport.requests - transport.reused
+    return {
+        "enabled": POOL_ENABLED,
+        "http2": POOL_HTTP2,
+        "max_connections": POOL_MAX_CONNECTIONS,
+        "max_keepalive": POOL_MAX_KEEPALIVE,
+        "endpoints": stats,
+    }
+
+
+async def aclose_clients() -> None:
+    """Close the clients created on the running loop."""
+    with _clients_lock:
+        per_loop = _clients.pop(asyncio.get_running_loop(), {})
+    for entry in per_loop.values():
+        try:
+            await entry.http.aclose()
+        except Exception:
+            logger.debug("Failed to close HTTP client", exc_info=True)
@@ -17,12 +17,30 @@ judge_verdicts) instead of JSON blob columns.
 import asyncio
 import json
 import logging
+import random
 import time
 from dataclasses import replace
 
 import db
-from benchmark import Target, build_targets, save_results
+from benchmark import (
+    DECODE_WINDOW_TOKENS,
+    REASONING_FIELDS,
+    Target,
+    build_targets,
+    pack_decode_windows,
+    save_results,
+)
+from http_clients import PHASE_FIELDS, prewarm
 from job_registry import registry as job_registry
+from measurement_loop import measurement_loop
+from perf_profiles import profiles as perf_profiles
+from prompt_datasets import (
+    dataset_path,
+    estimate_prompt_tokens,
+    read_replay_trace,
+    replay_trace_path,
+    sample_dataset,
+)
 from provider_params import identify_provider, validate_params
 from routers.helpers import (
     _get_user_config,
@@ -44,7 +62,43 @@ from routers.helpers import (
     _build_tools_summary,
     _build_test_cases_summary,
     _parse_meta_response,
+    _is_local_endpoint,
+    async_run_embedding,
+    _case_concurrency,
+)
+from benchmark_modes import (
+    _arrival_offsets,
+    _summarize_load_step,
+    LOAD_DEFAULT_STEPS,
+    _summarize_cache_phase,
+    _cache_effectiveness,
+    _summarize_throughput_level,
+    _throughput_scaling,
+    THROUGHPUT_DEFAULT_CONCURRENCY,
+    _probe_max_tokens,
+    _summarize_prefill_tier,
+    _prefill_curve,
+    PREFILL_DEFAULT_PREDICT_TIERS,
+    _long_output_params,
+    _decay_profile,
+    _replay_trace_stats,
+    _summarize_replay,
+    _summarize_dataset_buckets,
+    _embedding_inputs,
+    _summarize_embedding_cell,
+    EMBEDDING_DEFAULT_BATCH_SIZES,
+    EMBEDDING_DEFAULT_INPUT_TOKENS,
+    EMBEDDING_DEFAULT_CONCURRENCY,
+    _adaptive_stop_reason,
+)
+from tool_eval_scoring import (
+    RESCORE_PAGE_SIZE,
+    RESCORE_FIELDS,
+    _rescore_case_result,
+    _tool_defs_to_openai,
+    get_compiled_suite,
 )
+from routers.discovery import probe_lm_studio_backend
 from routers.tool_eval import run_single_eval, run_multi_turn_eval
 from routers.judge import _judge_single_verdict, _judge_crosscase
 
@@ -54,36 +108,6 @@ logger = logging.getLogger(__name__)
 ws_manager = None
 
 
-# ---------------------------------------------------------------------------
-# Helper: Reconstruct OpenAI-format tools from tool_definitions rows
-# ---------------------------------------------------------------------------
-
-def _tool_defs_to_openai(tool_defs: list[dict]) -> list[dict]:
-    """Convert tool_definitions DB rows to the OpenAI function-calling format
-    expected by LiteLLM and the eval engine.
-
-    Each DB row has: name, description, parameters_schema (JSON string).
-    Returns: [{"type": "function", "function": {"name": ..., "description": ..., "parameters": ...}}, ...]
-    """
-    tools = []
-    for td in tool_defs:
-        params_schema = td.get("parameters_schema", "{}")
-        if isinstance(params_schema, str):
-            try:
-                params_schema = json.loads(params_schema)
-            except (json.JSONDecodeError, TypeError):
-                params_schema = {}
-        tools.append({
-            "type": "function",
-            "function": {
-                "name": td["name"],
-                "description": td.get("description", ""),
-                "parameters": params_schema,
-            },
-        })
-    return tools
-
-
 # ---------------------------------------------------------------------------
 # Helper: Resolve model DB ID from litellm_id
 # ---------------------------------------------------------------------------
@@ -162,6 +186,145 @@ async def _emit_param_adjustments(
         })
 
 
+# ---------------------------------------------------------------------------
+# Helper: Benchmark targets, result items, and persistence
+# ---------------------------------------------------------------------------
+
+def _apply_benchmark_profile(
+    target: Target, provider_params: dict | None, loaded_profiles: dict,
+) -> tuple[Target, dict | None]:
+    """Apply a model profile (B3) to a benchmark target.
+
+    Profile system_prompt replaces the config-level baseline; params merge as
+    defaults < profile < per-request overrides.
+    """
+    bench_target = target
+    bench_provider_params = provider_params
+    profile = loaded_profiles.get(target.model_id)
+    if profile:
+        profile_sys = profile.get("system_prompt")
+        if profile_sys:
+            bench_target = replace(target, system_prompt=profile_sys)
+
+        profile_params_raw = profile.get("params_json")
+        if profile_params_raw:
+            profile_params = json.loads(profile_params_raw) if isinstance(profile_params_raw, str) else profile_params_raw
+            if profile_params:
+                merged = dict(profile_params)
+                if bench_provider_params:
+                    merged.update(bench_provider_params)
+                bench_provider_params = merged
+    return bench_target, bench_provider_params
+
+
+def _benchmark_result_item(target: Target, result, run: int, runs: int, context_tokens: int) -> dict:
+    """Build the result dict streamed over WS and persisted to benchmark_results."""
+    item = {
+        "type": "result",
+        "provider": target.provider,
+        "model": target.display_name,
+        "model_id": target.model_id,
+        "run": run,
+        "runs": runs,
+        "context_tokens": context_tokens,
+        "ttft_ms": round(result.ttft_ms, 2),
+        "total_time_s": round(result.total_time_s, 3),
+        "output_tokens": result.output_tokens,
+        "input_tokens": result.input_tokens,
+        "tokens_per_second": round(result.tokens_per_second, 2),
+        "input_tokens_per_second": round(result.input_tokens_per_second, 2),
+        "output_speed_tps": round(result.output_speed_tps, 2),
+        "itl_ms": round(result.itl_ms, 1),
+        "cost": round(result.cost, 8),
+        "cached_tokens": result.cached_tokens,
+        "success": result.success,
+        "error": result.error,
+    }
+    if result.chunk_timeline is not None:
+        item.update({
+            "itl_p50_ms": round(result.itl_p50_ms, 1),
+            "itl_p90_ms": round(result.itl_p90_ms, 1),
+            "itl_p99_ms": round(result.itl_p99_ms, 1),
+            "max_stall_ms": round(result.max_stall_ms, 1),
+            "stall_count": result.stall_count,
+            # Raw bytes: popped by the consumer before the WS send, persisted as a blob
+            "chunk_timeline": result.chunk_timeline,
+        })
+    if result.request_sent_ms is not None:
+        item.update({name: getattr(result, name) for name in PHASE_FIELDS})
+    if result.connection_reused is not None:
+        item["connection_reused"] = result.connection_reused
+    if result.decode_windows is not None:
+        item["decode_window_tps"] = [round(v, 2) for v in result.decode_windows]
+        item["decode_slope_tps_per_1k"] = result.decode_slope_tps_per_1k
+    if result.reasoning_tokens is not None:
+        for name in REASONING_FIELDS:
+            value = getattr(result, name)
+            item[name] = round(value, 2) if isinstance(value, float) else value
+    return item
+
+
+async def _persist_benchmark_item(
+    user_id: str,
+    run_id: str,
+    item: dict,
+    model_db_id_cache: dict[str, str | None],
+    run_number_tracker: dict[str, int],
+    chunk_timeline: bytes | None = None,
+):
+    """ERD v2: Persist one result item to benchmark_results (never raises)."""
+    try:
+        model_litellm_id = item.get("model_id", "")
+        if model_litellm_id not in model_db_id_cache:
+            model_db_id_cache[model_litellm_id] = await _resolve_model_db_id(user_id, model_litellm_id)
+        model_db_id = model_db_id_cache[model_litellm_id]
+
+        if model_db_id:
+            # Track run numbers per model+tier
+            rn_key = f"{model_litellm_id}:{item.get('context_tokens', 0)}"
+            run_number_tracker[rn_key] = run_number_tracker.get(rn_key, 0) + 1
+
+            await db.save_benchmark_result(
+                run_id=run_id,
+                model_id=model_db_id,
+                run_number=run_number_tracker[rn_key],
+                context_tokens=item.get("context_tokens", 0),
+                ttft_ms=item.get("ttft_ms"),
+                total_time_s=item.get("total_time_s"),
+                output_tokens=item.get("output_tokens"),
+                input_tokens=item.get("input_tokens"),
+                tokens_per_second=item.get("tokens_per_second"),
+                input_tokens_per_second=item.get("input_tokens_per_second"),
+                output_speed_tps=item.get("output_speed_tps"),
+                itl_ms=item.get("itl_ms"),
+                cost=item.get("cost"),
+                success=item.get("success", True),
+                error=item.get("error"),
+                chunk_timeline=chunk_timeline,
+                itl_p50_ms=item.get("itl_p50_ms"),
+                itl_p90_ms=item.get("itl_p90_ms"),
+                itl_p99_ms=item.get("itl_p99_ms"),
+                max_stall_ms=item.get("max_stall_ms"),
+                stall_count=item.get("stall_count"),
+                cached_tokens=item.get("cached_tokens"),
+                cache_phase=item.get("cache_phase"),
+                **{name: item.get(name) for name in PHASE_FIELDS},
+                connection_reused=item.get("connection_reused"),
+                decode_windows=(
+                    pack_decode_windows(item["decode_window_tps"]) if item.get("decode_window_tps") is not None else None
+                ),
+                decode_window_tokens=item.get("decode_window_tokens"),
+                **{name: item.get(name) for name in REASONING_FIELDS},
+                decode_slope_tps_per_1k=item.get("decode_slope_tps_per_1k"),
+                batch_size=item.get("batch_size"),
+                concurrency=item.get("concurrency"),
+                vectors_per_second=item.get("vectors_per_second"),
+                embedding_dim=item.get("embedding_dim"),
+            )
+    except Exception as e:
+        logger.warning("Failed to save benchmark_result: %s", e)
+
+
 # ---------------------------------------------------------------------------
 # Benchmark Handler
 # ---------------------------------------------------------------------------
@@ -185,10 +348,14 @@ async def benchmark_handler(job_id: str, params: dict, cancel_event, progress_cb
     timeout = params.get("timeout", 300)
     provider_params = params.get("provider_params")
     profiles_map = params.get("profiles")  # {"model_id": "profile_id"} or None
+    mode = params.get("mode", "standard")
+    capture_timeline = params.get("capture_timeline", False)
+    context_seed = params.get("context_seed")
+    adaptive = params.get("adaptive")  # {"metric", "ci_width", "min_runs", "max_runs", "max_cost"} or None
 
     logger.info(
-        "Benchmark started: job_id=%s user_id=%s models=%d tiers=%s runs=%d",
-        job_id, user_id, len(model_ids) if model_ids else 0, context_tiers, runs,
+        "Benchmark started: job_id=%s user_id=%s mode=%s models=%d tiers=%s runs=%d",
+        job_id, user_id, mode, len(model_ids) if model_ids else 0, context_tiers, runs,
     )
 
     # Load model profiles if specified (B3)
@@ -219,23 +386,6 @@ async def benchmark_handler(job_id: str, params: dict, cancel_event, progress_cb
     if not prompt.strip():
         prompt = defaults.get("prompt", "Explain recursion in programming with a Python example.")
 
-    # Calculate total runs, skipping tiers that exceed context window
-    total = 0
-    for tier in context_tiers:
-        for target in targets:
-            headroom = target.context_window - max_tokens - 100
-            if tier == 0 or tier <= headroom:
-                total += runs
-
-    if total == 0:
-        if ws_manager:
-            await ws_manager.send_to_user(user_id, {
-                "type": "job_failed",
-                "job_id": job_id,
-                "error": "No benchmark targets matched the selected configuration",
-            })
-        return None
-
     # Build config_json for re-run support
     bench_config = {
         "models": model_ids,
@@ -251,6 +401,56 @@ async def benchmark_handler(job_id: str, params: dict, cancel_event, progress_cb
         bench_config["target_set"] = [list(t) for t in target_set]
     if profiles_map:
         bench_config["profiles"] = profiles_map
+    if capture_timeline:
+        bench_config["capture_timeline"] = True
+    if params.get("capture_phases"):
+        bench_config["capture_phases"] = True
+    if context_seed is not None:
+        bench_config["context_seed"] = context_seed
+    if adaptive:
+        bench_config["adaptive"] = adaptive
+    if params.get("isolate_measurement"):
+        bench_config["isolate_measurement"] = True
+    if params.get("prewarm_connections"):
+        bench_config["prewarm_connections"] = True
+
+    await _prewarm_targets(params, targets)
+
+    mode_runners = {
+        "load": _run_load_benchmark,
+        "cache": _run_cache_benchmark,
+        "throughput": _run_throughput_benchmark,
+        "prefill": _run_prefill_benchmark,
+        "decay": _run_decay_benchmark,
+        "replay": _run_replay_benchmark,
+        "dataset": _run_dataset_benchmark,
+    }
+    if mode in mode_runners:
+        return await mode_runners[mode](
+            job_id, params, targets, prompt, bench_config, config,
+            loaded_profiles, cancel_event, progress_cb,
+        )
+
+    # Adaptive runs sample each (target, tier) until its CI is tight enough,
+    # so progress starts from the max_runs worst case and shrinks on each stop.
+    planned_runs = adaptive["max_runs"] if adaptive else runs
+
+    # Calculate total runs, skipping tiers that exceed context window
+    total = 0
+    for tier in context_tiers:
+        for target in targets:
+            headroom = target.context_window - max_tokens - 100
+            if tier == 0 or tier <= headroom:
+                total += planned_runs
+
+    if total == 0:
+        if ws_manager:
+            await ws_manager.send_to_user(user_id, {
+                "type": "job_failed",
+                "job_id": job_id,
+                "error": "No benchmark targets matched the selected configuration",
+            })
+        return None
 
     # ERD v2: Create benchmark_runs row BEFORE the loop
     run_id = await db.save_benchmark_run(
@@ -286,214 +486,1393 @@ async def benchmark_handler(job_id: str, params: dict, cancel_event, progress_cb
         "job_id": job_id,
         "data": {
             "targets": [{"provider_key": t.provider_key, "model_id": t.model_id} for t in targets],
-            "runs": runs,
+            "runs": planned_runs,
             "context_tiers": context_tiers,
             "max_tokens": max_tokens,
+            "adaptive": bool(adaptive),
+        },
+    })
+
+    # Pre-validate params and warn user about drops/clamps BEFORE execution starts
+    await _emit_param_adjustments(
+        user_id, job_id, targets, provider_params,
+        temperature=temperature, max_tokens=max_tokens,
+    )
+
+    async def run_provider(prov_targets):
+        """Run all benchmarks for one provider sequentially.
+
+        Execution order: model → context tiers → runs.
+        This profiles each model across all context sizes before moving on.
+        """
+        for target in prov_targets:
+            if cancel_event.is_set():
+                return
+
+            # Apply model profile once per model (B3)
+            bench_target, bench_provider_params = _apply_benchmark_profile(
+                target, provider_params, loaded_profiles,
+            )
+
+            # Warm-up run once per model (discarded)
+            if warmup:
+                await _measured_run_single(
+                    params, bench_target, prompt, max_tokens, temperature, 0,
+                    timeout=timeout, provider_params=bench_provider_params,
+                )
+
+            for tier in context_tiers:
+                if cancel_event.is_set():
+                    return
+                headroom = target.context_window - max_tokens - 100
+                if tier > 0 and tier > headroom:
+                    # Notify user about the skip via WS
+                    await results_queue.put({
+                        "type": "skipped",
+                        "provider": target.display_name,
+                        "model": target.display_name,
+                        "reason": f"{tier//1000}K context exceeds model window ({target.context_window//1000}K - {max_tokens} max_tokens)",
+                    })
+                    continue
+
+                pair_items: list[dict] = []
+                for r in range(planned_runs):
+                    if cancel_event.is_set():
+                        return
+
+                    # Notify frontend that this provider/model/run is starting
+                    await _ws_send({
+                        "type": "benchmark_progress",
+                        "job_id": job_id,
+                        "data": {
+                            "type": "progress",
+                            "provider": target.provider,
+                            "model": target.display_name,
+                            "model_id": target.model_id,
+                            "run": r + 1,
+                            "runs": planned_runs,
+                            "context_tokens": tier,
+                        },
+                    })
+
+                    result = await _measured_run_single(
+                        params, bench_target, prompt, max_tokens, temperature, tier,
+                        timeout=timeout, provider_params=bench_provider_params,
+                        capture_timeline=capture_timeline,
+                        context_seed=None if context_seed is None else f"{context_seed}:{tier}:{r}",
+                    )
+                    item = _benchmark_result_item(target, result, r + 1, planned_runs, tier)
+                    await results_queue.put(item)
+
+                    if adaptive:
+                        pair_items.append(item)
+                        reason, width = _adaptive_stop_reason(pair_items, adaptive)
+                        if reason:
+                            await results_queue.put({
+                                "type": "adaptive_stop",
+                                "provider": target.provider,
+                                "model": target.display_name,
+                                "model_id": target.model_id,
+                                "context_tokens": tier,
+                                "runs": r + 1,
+                                "unused_runs": planned_runs - (r + 1),
+                                "reason": reason,
+                                "metric": adaptive["metric"],
+                                "ci_relative_width": round(width, 4) if width != float("inf") else None,
+                            })
+                            break
+
+    # Launch all provider groups as concurrent tasks
+    tasks = [asyncio.create_task(run_provider(g)) for g in provider_groups.values()]
+
+    async def sentinel():
+        watcher = _watch_cancel(tasks, cancel_event)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        watcher.cancel()
+        await results_queue.put(None)
+
+    asyncio.create_task(sentinel())
+
+    # Consume results and report progress
+    current = 0
+    all_results = []
+    adaptive_stops = []
+    while True:
+        try:
+            item = await asyncio.wait_for(results_queue.get(), timeout=15)
+        except asyncio.TimeoutError:
+            continue  # Keep waiting
+        if cancel_event.is_set():
+            for t in tasks:
+                t.cancel()
+            return None
+        if item is None:
+            break
+        if item["type"] == "skipped":
+            # Notify frontend about skipped tier
+            await _ws_send({
+                "type": "benchmark_result",
+                "job_id": job_id,
+                "data": item,
+            })
+            continue
+        if item["type"] == "adaptive_stop":
+            # Drop the runs this pair no longer needs from the progress total
+            total -= item.pop("unused_runs")
+            del item["type"]
+            adaptive_stops.append(item)
+            await _ws_send({
+                "type": "benchmark_adaptive_stop",
+                "job_id": job_id,
+                "data": item,
+            })
+            continue
+        if item["type"] == "result":
+            current += 1
+            chunk_timeline = item.pop("chunk_timeline", None)
+            all_results.append(item)
+            pct = int((current / total) * 100) if total > 0 else 0
+            detail = f"{item['model']}, Run {item['run']}/{item['runs']}"
+            if item["context_tokens"] > 0:
+                detail += f", Context {item['context_tokens'] // 1000}K"
+            await progress_cb(pct, detail)
+
+            # Send individual result data to frontend via WebSocket
+            await _ws_send({
+                "type": "benchmark_result",
+                "job_id": job_id,
+                "data": item,
+            })
+
+            # ERD v2: Persist each result row to benchmark_results
+            await _persist_benchmark_item(
+                user_id, run_id, item, model_db_id_cache, run_number_tracker,
+                chunk_timeline=chunk_timeline,
+            )
+
+    if adaptive:
+        await db.update_benchmark_run_metadata(
+            run_id, json.dumps({"mode": "standard", "adaptive": adaptive_stops}),
+        )
+
+    # Save aggregated results to JSON files (legacy format)
+    if all_results:
+        agg_results = _aggregate(all_results, config)
+        save_results(agg_results, prompt, context_tiers=context_tiers)
+
+        logger.info(
+            "Benchmark completed: job_id=%s user_id=%s results=%d run_id=%s",
+            job_id, user_id, len(all_results), run_id,
+        )
+
+        await db.log_audit(
+            user_id=user_id,
+            username=params.get("user_email", ""),
+            action="benchmark_complete",
+            resource_type="benchmark",
+            detail={"models": model_ids, "result_count": len(all_results)},
+        )
+
+        return run_id
+
+    logger.info("Benchmark produced no results: job_id=%s user_id=%s", job_id, user_id)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Benchmark modes: shared plumbing
+# ---------------------------------------------------------------------------
+
+def _fits_context(target: Target, tier: int, max_tokens: int) -> bool:
+    """True when a context tier fits the target's window (with max_tokens headroom)."""
+    return tier == 0 or tier <= target.context_window - max_tokens - 100
+
+
+def _watch_cancel(tasks: list[asyncio.Task], cancel_event) -> asyncio.Task:
+    """Cancel ``tasks`` as soon as ``cancel_event`` is set.
+
+    Checking the event between runs leaves in-flight calls streaming up to
+    max_tokens; cancelling the tasks aborts them mid-request (async_run_single
+    closes its stream, which releases the pooled connection). Cancel the
+    returned watcher once the tasks are done.
+    """
+    async def watch():
+        await cancel_event.wait()
+        for t in tasks:
+            t.cancel()
+
+    return asyncio.create_task(watch())
+
+
+async def _run_by_provider(targets: list[Target], run_target, cancel_event):
+    """Run ``run_target(target)`` for every target.
+
+    Provider groups run in parallel; models within a provider run
+    sequentially to avoid self-contention (same as the standard benchmark).
+    In-flight runs are aborted when ``cancel_event`` is set.
+    """
+    provider_groups: dict[str, list[Target]] = {}
+    for target in targets:
+        provider_groups.setdefault(target.provider, []).append(target)
+
+    async def run_provider(prov_targets: list[Target]):
+        for target in prov_targets:
+            if cancel_event.is_set():
+                return
+            await run_target(target)
+
+    tasks = [asyncio.create_task(run_provider(g)) for g in provider_groups.values()]
+    watcher = _watch_cancel(tasks, cancel_event)
+    done = await asyncio.gather(*tasks, return_exceptions=True)
+    watcher.cancel()
+    for res in done:
+        if isinstance(res, Exception):
+            raise res
+
+
+async def _run_cases(cases: list[dict], run_case, concurrency: int, cancel_event, on_result=None) -> list:
+    """Run ``run_case(case)`` for every case, at most ``concurrency`` at once.
+
+    Cases are independent, so a pool of workers pulls them in suite order;
+    ``on_result`` (if given) is awaited with each result as it completes,
+    i.e. in completion order. Returns the results in case order. No new
+    case starts once ``cancel_event`` is set, so the list may be short.
+    """
+    results: list = [None] * len(cases)
+    pending = iter(range(len(cases)))
+
+    async def worker():
+        for idx in pending:
+            if cancel_event.is_set():
+                return
+            result = await run_case(cases[idx])
+            results[idx] = result
+            if on_result is not None:
+                await on_result(result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(cases))))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+    return [r for r in results if r is not None]
+
+
+class _ModeRun:
+    """Plumbing shared by the non-standard benchmark modes.
+
+    Creates the benchmark_runs row, sends ``benchmark_init``, streams and
+    persists each result item like the standard path, and at the end stores
+    the mode's summary in benchmark_runs.metadata.
+    """
+
+    def __init__(self, job_id: str, params: dict, mode: str, progress_cb):
+        self.job_id = job_id
+        self.params = params
+        self.user_id = params["user_id"]
+        self.mode = mode
+        self.progress_cb = progress_cb
+        self.run_id: str | None = None
+        self.total = 0
+        self.completed = 0
+        self.results: list[dict] = []
+        self._model_db_ids: dict[str, str | None] = {}
+        self._run_numbers: dict[str, int] = {}
+
+    async def send(self, payload: dict):
+        if ws_manager:
+            await ws_manager.send_to_user(self.user_id, payload)
+
+    async def fail(self, error: str) -> None:
+        await self.send({"type": "job_failed", "job_id": self.job_id, "error": error})
+
+    async def start(
+        self, targets: list[Target], prompt: str, bench_config: dict,
+        context_tiers: list[int], total: int, init_extra: dict | None = None,
+    ) -> str:
+        """Create the run row, announce the run over WS, and pre-validate params."""
+        params = self.params
+        self.total = total
+        bench_config["mode"] = self.mode
+        bench_config["context_tiers"] = context_tiers
+        self.run_id = await db.save_benchmark_run(
+            user_id=self.user_id,
+            prompt=prompt,
+            context_tiers=json.dumps(context_tiers),
+            max_tokens=params.get("max_tokens", 512),
+            temperature=params.get("temperature", 0.7),
+            warmup=params.get("warmup", True),
+            config_json=json.dumps(bench_config),
+        )
+        data = {
+            "targets": [{"provider_key": t.provider_key, "model_id": t.model_id} for t in targets],
+            "runs": total // len(targets) if targets else 0,
+            "context_tiers": context_tiers,
+            "max_tokens": params.get("max_tokens", 512),
+            "mode": self.mode,
+        }
+        if init_extra:
+            data.update(init_extra)
+        await self.send({"type": "benchmark_init", "job_id": self.job_id, "data": data})
+        await _emit_param_adjustments(
+            self.user_id, self.job_id, targets, params.get("provider_params"),
+            temperature=params.get("temperature", 0.7), max_tokens=params.get("max_tokens", 512),
+        )
+        return self.run_id
+
+    async def add(self, item: dict, detail: str):
+        """Record one result item: progress, WS broadcast, benchmark_results row."""
+        self.completed += 1
+        chunk_timeline = item.pop("chunk_timeline", None)
+        self.results.append(item)
+        pct = min(99, int((self.completed / self.total) * 100)) if self.total else 0
+        await self.progress_cb(pct, detail)
+        await self.send({"type": "benchmark_result", "job_id": self.job_id, "data": item})
+        await _persist_benchmark_item(
+            self.user_id, self.run_id, item, self._model_db_ids, self._run_numbers,
+            chunk_timeline=chunk_timeline,
+        )
+
+    async def finish(self, config: dict, prompt: str, context_tiers: list[int], metadata: dict) -> str | None:
+        """Store the mode summary and the legacy JSON file; returns the run ID."""
+        await db.update_benchmark_run_metadata(self.run_id, json.dumps(dict(mode=self.mode, **metadata)))
+
+        if not self.results:
+            logger.info("Benchmark (%s) produced no results: job_id=%s user_id=%s", self.mode, self.job_id, self.user_id)
+            return None
+
+        save_results(_aggregate(self.results, config), prompt, context_tiers=context_tiers)
+
+        logger.info(
+            "Benchmark (%s) completed: job_id=%s user_id=%s results=%d run_id=%s",
+            self.mode, self.job_id, self.user_id, len(self.results), self.run_id,
+        )
+        await db.log_audit(
+            user_id=self.user_id,
+            username=self.params.get("user_email", ""),
+            action="benchmark_complete",
+            resource_type="benchmark",
+            detail={"models": self.params.get("models"), "result_count": len(self.results), "mode": self.mode},
+        )
+        return self.run_id
+
+
+async def _measured(params: dict, coro):
+    """Await ``coro``, on the dedicated measurement loop when params["isolate_measurement"]."""
+    if params.get("isolate_measurement"):
+        return await measurement_loop.run(coro)
+    return await coro
+
+
+async def _measured_run_single(params: dict, *args, **kwargs):
+    """async_run_single, on the dedicated measurement loop when params["isolate_measurement"].
+
+    Connection phases are captured when params["capture_phases"] is set.
+    params["ttft_deadline_s"] / params["idle_deadline_s"] override the
+    server's stream deadlines.
+    """
+    kwargs.setdefault("capture_phases", params.get("capture_phases", False))
+    kwargs.setdefault("ttft_deadline_s", params.get("ttft_deadline_s"))
+    kwargs.setdefault("idle_deadline_s", params.get("idle_deadline_s"))
+    return await _measured(params, async_run_single(*args, **kwargs))
+
+
+async def _prewarm_targets(params: dict, targets: list[Target]) -> int:
+    """Open a pooled connection to each target endpoint when params["prewarm_connections"].
+
+    Runs on the loop that will time the requests, since pooled clients are
+    per event loop.
+    """
+    if not params.get("prewarm_connections"):
+        return 0
+    kwargs_list = [
+        {k: v for k, v in (("model", t.model_id), ("api_base", t.api_base), ("api_key", t.api_key)) if v}
+        for t in targets
+    ]
+    warmed = await _measured(params, prewarm(kwargs_list))
+    logger.info("Pre-warmed connections to %d endpoint(s) for %d target(s)", warmed, len(targets))
+    return warmed
+
+
+async def _warmup_target(target: Target, prompt: str, params: dict, provider_params: dict | None):
+    """Discarded warm-up call, once per model (honours params["warmup"])."""
+    if params.get("warmup", True):
+        await _measured_run_single(
+            params, target, prompt, params.get("max_tokens", 512), params.get("temperature", 0.7), 0,
+            timeout=params.get("timeout", 300), provider_params=provider_params,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode: open-loop load generator
+# ---------------------------------------------------------------------------
+
+async def _run_open_loop_step(offsets: list[float], launch, cancel_event) -> tuple[list, float, int]:
+    """Fire ``launch(i)`` at each scheduled offset without waiting on earlier requests.
+
+    Open loop: the send schedule is fixed up front, so a slow endpoint sees
+    requests pile up instead of the generator backing off (which is what a
+    closed-loop ``for r in range(runs)`` does).  Returns (completed items,
+    wall time from first send to last completion, peak in-flight requests).
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    in_flight = 0
+    peak = 0
+
+    async def tracked(i: int):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await launch(i)
+        finally:
+            in_flight -= 1
+
+    tasks = []
+    for i, offset in enumerate(offsets):
+        delay = start + offset - loop.time()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(cancel_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        if cancel_event.is_set():
+            break
+        tasks.append(asyncio.create_task(tracked(i)))
+
+    watcher = _watch_cancel(tasks, cancel_event)
+    done = await asyncio.gather(*tasks, return_exceptions=True)
+    watcher.cancel()
+    if cancel_event.is_set():
+        return [], loop.time() - start, peak
+
+    items = []
+    for res in done:
+        if isinstance(res, BaseException):
+            logger.warning("Load step request failed: %s", res)
+        else:
+            items.append(res)
+    return items, loop.time() - start, peak
+
+
+async def _run_load_benchmark(
+    job_id: str,
+    params: dict,
+    targets: list[Target],
+    prompt: str,
+    bench_config: dict,
+    config: dict,
+    loaded_profiles: dict,
+    cancel_event,
+    progress_cb,
+) -> str | None:
+    """Open-loop load test: step through arrival rates and summarize each step.
+
+    Each step sends requests on a Poisson or constant arrival schedule at the
+    step's rate (requests/second) for ``load_step_duration_s`` seconds,
+    regardless of how many are still in flight.  Only the first context tier
+    is used.  Per-request rows go to benchmark_results as usual; per-step
+    summaries (aggregate output tok/s, TTFT p50/p95/p99, error rate) are
+    stored in benchmark_runs.metadata and streamed as ``benchmark_load_step``.
+    """
+    max_tokens = params.get("max_tokens", 512)
+    temperature = params.get("temperature", 0.7)
+    timeout = params.get("timeout", 300)
+    provider_params = params.get("provider_params")
+    tier = (params.get("context_tiers") or [0])[0]
+    steps = params.get("load_steps") or LOAD_DEFAULT_STEPS
+    arrival = params.get("load_arrival", "poisson")
+    duration_s = params.get("load_step_duration_s", 30)
+    seed = params.get("load_seed")
+    capture_timeline = params.get("capture_timeline", False)
+    context_seed = params.get("context_seed")
+
+    mode_run = _ModeRun(job_id, params, "load", progress_cb)
+    eligible = [t for t in targets if _fits_context(t, tier, max_tokens)]
+    if not eligible:
+        await mode_run.fail("No benchmark targets matched the selected configuration")
+        return None
+
+    # Same schedule for every model so steps are directly comparable
+    schedules = [
+        _arrival_offsets(rate, duration_s, arrival, seed=None if seed is None else seed + i)
+        for i, rate in enumerate(steps)
+    ]
+    bench_config["load"] = {
+        "steps": steps,
+        "arrival": arrival,
+        "step_duration_s": duration_s,
+        "seed": seed,
+    }
+    await mode_run.start(
+        eligible, prompt, bench_config, [tier],
+        total=len(eligible) * sum(len(s) for s in schedules),
+        init_extra={"load_steps": steps, "load_arrival": arrival},
+    )
+
+    step_summaries: list[dict] = []
+
+    async def run_target(target: Target):
+        bench_target, bench_provider_params = _apply_benchmark_profile(
+            target, provider_params, loaded_profiles,
+        )
+        await _warmup_target(bench_target, prompt, params, bench_provider_params)
+
+        for idx, (rate, offsets) in enumerate(zip(steps, schedules)):
+            if cancel_event.is_set():
+                return
+
+            async def launch(i: int, rate=rate, idx=idx, count=len(offsets)):
+                result = await _measured_run_single(
+                    params, bench_target, prompt, max_tokens, temperature, tier,
+                    timeout=timeout, provider_params=bench_provider_params,
+                    capture_timeline=capture_timeline,
+                    context_seed=None if context_seed is None else f"{context_seed}:{tier}:{idx}:{i}",
+                )
+                item = _benchmark_result_item(target, result, i + 1, count, tier)
+                item["load_step"] = idx + 1
+                item["load_rate_rps"] = rate
+                await mode_run.add(item, f"{item['model']}, Step {idx + 1}/{len(steps)} ({rate} req/s)")
+                return item
+
+            items, wall_time_s, peak = await _run_open_loop_step(offsets, launch, cancel_event)
+            if cancel_event.is_set():
+                return
+
+            summary = {
+                "provider": target.provider,
+                "model": target.display_name,
+                "model_id": target.model_id,
+                "step": idx + 1,
+                "arrival": arrival,
+                "duration_s": duration_s,
+                "peak_in_flight": peak,
+            }
+            summary.update(_summarize_load_step(items, rate, duration_s, wall_time_s))
+            step_summaries.append(summary)
+            await mode_run.send({"type": "benchmark_load_step", "job_id": job_id, "data": summary})
+
+    await _run_by_provider(eligible, run_target, cancel_event)
+
+    if cancel_event.is_set():
+        return None
+    return await mode_run.finish(config, prompt, [tier], {"load_steps": step_summaries})
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode: prompt-cache effectiveness
+# ---------------------------------------------------------------------------
+
+async def _run_cache_benchmark(
+    job_id: str,
+    params: dict,
+    targets: list[Target],
+    prompt: str,
+    bench_config: dict,
+    config: dict,
+    loaded_profiles: dict,
+    cancel_event,
+    progress_cb,
+) -> str | None:
+    """Measure how much provider prefix caching saves, per model and tier.
+
+    For each context tier (> 0) the same corpus window is sent once to prime
+    the cache and then ``runs`` more times ("shared"), followed by ``runs``
+    requests that each get a fresh window ("unique").  The shared window is
+    seeded per job, so the priming call is genuinely cold.  Each tier
+    reports cached vs uncached TTFT, prefill tok/s and cost, plus the
+    cached-token counts the provider put in ``usage``.
+    """
+    max_tokens = params.get("max_tokens", 512)
+    temperature = params.get("temperature", 0.7)
+    timeout = params.get("timeout", 300)
+    provider_params = params.get("provider_params")
+    runs = params.get("runs", 3)
+    tiers = [t for t in params.get("context_tiers", [0]) if t > 0]
+    context_seed = params.get("context_seed")
+
+    mode_run = _ModeRun(job_id, params, "cache", progress_cb)
+    if not tiers:
+        await mode_run.fail("Prompt-cache mode needs at least one context tier above 0")
+        return None
+    pairs = [(t, tier) for t in targets for tier in tiers if _fits_context(t, tier, max_tokens)]
+    if not pairs:
+        await mode_run.fail("No benchmark targets matched the selected configuration")
+        return None
+    eligible = [t for t in targets if any(p[0] is t for p in pairs)]
+
+    per_pair = 1 + 2 * runs
+    await mode_run.start(eligible, prompt, bench_config, tiers, total=len(pairs) * per_pair)
+
+    tier_summaries: list[dict] = []
+
+    async def run_target(target: Target):
+        bench_target, bench_provider_params = _apply_benchmark_profile(
+            target, provider_params, loaded_profiles,
+        )
+        await _warmup_target(bench_target, prompt, params, bench_provider_params)
+
+        for tier in tiers:
+            if not _fits_context(target, tier, max_tokens):
+                continue
+            shared_seed = f"cache:{job_id}:{tier}"
+            phases = [("prime", shared_seed)] + [("shared", shared_seed)] * runs + [
+                ("unique", None if context_seed is None else f"{context_seed}:unique:{tier}:{r}")
+                for r in range(runs)
+            ]
+            by_phase: dict[str, list[dict]] = {"prime": [], "shared": [], "unique": []}
+            for n, (phase, seed) in enumerate(phases):
+                if cancel_event.is_set():
+                    return
+                result = await _measured_run_single(
+                    params, bench_target, prompt, max_tokens, temperature, tier,
+                    timeout=timeout, provider_params=bench_provider_params,
+                    context_seed=seed,
+                )
+                item = _benchmark_result_item(target, result, n + 1, per_pair, tier)
+                item["cache_phase"] = phase
+                by_phase[phase].append(item)
+                await mode_run.add(item, f"{item['model']}, {tier // 1000}K {phase} {n + 1}/{per_pair}")
+
+            cached = _summarize_cache_phase(by_phase["shared"])
+            uncached = _summarize_cache_phase(by_phase["unique"])
+            prime = by_phase["prime"][0]
+            summary = {
+                "provider": target.provider,
+                "model": target.display_name,
+                "model_id": target.model_id,
+                "context_tokens": tier,
+                "prime": {
+                    "ttft_ms": prime["ttft_ms"],
+                    "cost": prime["cost"],
+                    "cached_tokens": prime["cached_tokens"],
+                    "success": prime["success"],
+                },
+                "cached": cached,
+                "uncached": uncached,
+            }
+            summary.update(_cache_effectiveness(cached, uncached))
+            tier_summaries.append(summary)
+            await mode_run.send({"type": "benchmark_cache_tier", "job_id": job_id, "data": summary})
+
+    await _run_by_provider(eligible, run_target, cancel_event)
+
+    if cancel_event.is_set():
+        return None
+    return await mode_run.finish(config, prompt, tiers, {"cache_tiers": tier_summaries})
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode: max-throughput parallel streams
+# ---------------------------------------------------------------------------
+
+async def _run_throughput_benchmark(
+    job_id: str,
+    params: dict,
+    targets: list[Target],
+    prompt: str,
+    bench_config: dict,
+    config: dict,
+    loaded_profiles: dict,
+    cancel_event,
+    progress_cb,
+) -> str | None:
+    """Max-throughput test: N simultaneous streams at one target, for each N.
+
+    Built for local servers (LM Studio, vLLM, Ollama, llama.cpp), where the
+    useful number is how much aggregate tok/s the box delivers as parallel
+    slots fill up.  Each level starts ``runs`` bursts of N streams together
+    and waits for the whole burst (a closed batch, unlike the open-loop load
+    mode).  Levels report aggregate tok/s, per-stream tok/s and fairness,
+    plus scaling efficiency against the lowest level, which together form
+    the scaling curve.  Targets with an api_base are probed like
+    /api/lm-studio/detect so each curve is tagged with its backend (GGUF/MLX).
+    Only the first context tier is used.
+    """
+    max_tokens = params.get("max_tokens", 512)
+    temperature = params.get("temperature", 0.7)
+    timeout = params.get("timeout", 300)
+    provider_params = params.get("provider_params")
+    runs = params.get("runs", 1)
+    tier = (params.get("context_tiers") or [0])[0]
+    levels = sorted(set(params.get("throughput_concurrency") or THROUGHPUT_DEFAULT_CONCURRENCY))
+    context_seed = params.get("context_seed")
+
+    mode_run = _ModeRun(job_id, params, "throughput", progress_cb)
+    eligible = [t for t in targets if _fits_context(t, tier, max_tokens)]
+    if not eligible:
+        await mode_run.fail("No benchmark targets matched the selected configuration")
+        return None
+
+    bench_config["throughput"] = {"concurrency": levels, "rounds": runs}
+    await mode_run.start(
+        eligible, prompt, bench_config, [tier],
+        total=len(eligible) * sum(levels) * runs,
+        init_extra={"throughput_concurrency": levels},
+    )
+
+    backends: dict[str, str] = {}
+    for target in eligible:
+        if not target.api_base or target.api_base in backends:
+            continue
+        # Only LM Studio / local servers expose the backend type; don't probe hosted APIs
+        if identify_provider(target.model_id, target.provider_key) == "lm_studio" or _is_local_endpoint(target.api_base):
+            probe = await probe_lm_studio_backend(target.api_base, target.api_key)
+            backends[target.api_base] = probe["backend_type"]
+
+    curves: list[dict] = []
+
+    async def run_target(target: Target):
+        bench_target, bench_provider_params = _apply_benchmark_profile(
+            target, provider_params, loaded_profiles,
+        )
+        await _warmup_target(bench_target, prompt, params, bench_provider_params)
+
+        level_summaries: list[dict] = []
+        for concurrency in levels:
+            items: list[dict] = []
+            wall_time_s = 0.0
+            for rnd in range(runs):
+                if cancel_event.is_set():
+                    return
+
+                async def launch(i: int, concurrency=concurrency, rnd=rnd):
+                    result = await _measured_run_single(
+                        params, bench_target, prompt, max_tokens, temperature, tier,
+                        timeout=timeout, provider_params=bench_provider_params,
+                        context_seed=None if context_seed is None else f"{context_seed}:{tier}:{concurrency}:{rnd}:{i}",
+                    )
+                    item = _benchmark_result_item(target, result, rnd * concurrency + i + 1, runs * concurrency, tier)
+                    item["throughput_concurrency"] = concurrency
+                    await mode_run.add(item, f"{item['model']}, {concurrency} parallel streams")
+                    return item
+
+                burst, burst_wall_s, _ = await _run_open_loop_step([0.0] * concurrency, launch, cancel_event)
+                items.extend(burst)
+                wall_time_s += burst_wall_s
+            if cancel_event.is_set():
+                return
+            summary = _summarize_throughput_level(items, concurrency, wall_time_s)
+            level_summaries.append(summary)
+            await mode_run.send({
+                "type": "benchmark_throughput_level", "job_id": job_id,
+                "data": {"provider": target.provider, "model_id": target.model_id, **summary},
+            })
+
+        curve = {
+            "provider": target.provider,
+            "model": target.display_name,
+            "model_id": target.model_id,
+            "backend_type": backends.get(target.api_base or "", "unknown"),
+            "levels": level_summaries,
+        }
+        curve.update(_throughput_scaling(level_summaries))
+        curves.append(curve)
+
+    await _run_by_provider(eligible, run_target, cancel_event)
+
+    if cancel_event.is_set():
+        return None
+    return await mode_run.finish(config, prompt, [tier], {"throughput_curves": curves})
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode: prefill-only probe
+# ---------------------------------------------------------------------------
+
+async def _run_prefill_benchmark(
+    job_id: str,
+    params: dict,
+    targets: list[Target],
+    prompt: str,
+    bench_config: dict,
+    config: dict,
+    loaded_profiles: dict,
+    cancel_event,
+    progress_cb,
+) -> str | None:
+    """Cheap context-scaling curve: every tier with max_tokens at the provider minimum.
+
+    Context tiers mostly measure prefill, so generating the full max_tokens
+    at each tier wastes time and money.  Here every run asks for the
+    smallest completion the provider accepts (usually 1 token) and only
+    TTFT and prefill tok/s are kept.  Each run gets a fresh corpus window so
+    prompt caching cannot hide prefill.  Per model, TTFT is fitted against
+    prompt tokens (intercept, linear and quadratic terms) and evaluated at
+    ``prefill_predict_tiers`` to fill in tiers that were not sent.
+    """
+    temperature = params.get("temperature", 0.7)
+    timeout = params.get("timeout", 300)
+    provider_params = params.get("provider_params")
+    runs = params.get("runs", 1)
+    tiers = params.get("context_tiers", [0])
+    predict_tiers = params.get("prefill_predict_tiers") or PREFILL_DEFAULT_PREDICT_TIERS
+    context_seed = params.get("context_seed")
+
+    mode_run = _ModeRun(job_id, params, "prefill", progress_cb)
+    probe_tokens = {t.model_id: _probe_max_tokens(t) for t in targets}
+    pairs = [(t, tier) for t in targets for tier in tiers if _fits_context(t, tier, probe_tokens[t.model_id])]
+    if not pairs:
+        await mode_run.fail("No benchmark targets matched the selected configuration")
+        return None
+    eligible = [t for t in targets if any(p[0] is t for p in pairs)]
+
+    bench_config["prefill"] = {"predict_tiers": predict_tiers}
+    await mode_run.start(eligible, prompt, bench_config, tiers, total=len(pairs) * runs)
+
+    curves: list[dict] = []
+
+    async def run_target(target: Target):
+        bench_target, bench_provider_params = _apply_benchmark_profile(
+            target, provider_params, loaded_profiles,
+        )
+        if bench_provider_params:
+            bench_provider_params = {
+                k: v for k, v in bench_provider_params.items() if k not in ("max_tokens", "max_completion_tokens")
+            } or None
+        max_tokens = probe_tokens[target.model_id]
+        if params.get("warmup", True):
+            await _measured_run_single(
+                params, bench_target, prompt, max_tokens, temperature, 0,
+                timeout=timeout, provider_params=bench_provider_params,
+            )
+
+        items: list[dict] = []
+        tier_summaries: list[dict] = []
+        for tier in tiers:
+            if not _fits_context(target, tier, max_tokens):
+                continue
+            tier_items = []
+            for r in range(runs):
+                if cancel_event.is_set():
+                    return
+                result = await _measured_run_single(
+                    params, bench_target, prompt, max_tokens, temperature, tier,
+                    timeout=timeout, provider_params=bench_provider_params,
+                    context_seed=f"prefill:{job_id}:{tier}:{r}" if context_seed is None
+                    else f"{context_seed}:prefill:{tier}:{r}",
+                )
+                item = _benchmark_result_item(target, result, r + 1, runs, tier)
+                tier_items.append(item)
+                await mode_run.add(item, f"{item['model']}, {tier // 1000}K prefill probe {r + 1}/{runs}")
+            items.extend(tier_items)
+            tier_summaries.append(_summarize_prefill_tier(tier_items, tier))
+
+        curve = {
+            "provider": target.provider,
+            "model": target.display_name,
+            "model_id": target.model_id,
+            "probe_max_tokens": max_tokens,
+            "tiers": tier_summaries,
+        }
+        curve.update(_prefill_curve(items, predict_tiers, target.context_window))
+        curves.append(curve)
+        await mode_run.send({"type": "benchmark_prefill_curve", "job_id": job_id, "data": curve})
+
+    await _run_by_provider(eligible, run_target, cancel_event)
+
+    if cancel_event.is_set():
+        return None
+    return await mode_run.finish(config, prompt, tiers, {"prefill_curves": curves})
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode: long-generation decode decay
+# ---------------------------------------------------------------------------
+
+DECAY_WARMUP_MAX_TOKENS = 16
+
+
+async def _run_decay_benchmark(
+    job_id: str,
+    params: dict,
+    targets: list[Target],
+    prompt: str,
+    bench_config: dict,
+    config: dict,
+    loaded_profiles: dict,
+    cancel_event,
+    progress_cb,
+) -> str | None:
+    """Decode speed per output window, to show how throughput decays with length.
+
+    Each run asks for ``max_tokens`` of output (with ``min_tokens`` /
+    ``ignore_eos`` where the provider supports them) and records decode
+    tok/s for every ``decay_window_tokens`` output tokens, built from the
+    chunk arrivals in async_run_single.  Per model, the runs' profiles are
+    averaged window by window and summarized by the least-squares slope
+    (tok/s per 1K output tokens) and the first-to-last window change.
+    Only the first context tier is used.
+    """
+    max_tokens = params.get("max_tokens", 512)
+    temperature = params.get("temperature", 0.7)
+    timeout = params.get("timeout", 300)
+    provider_params = params.get("provider_params")
+    runs = params.get("runs", 1)
+    tier = (params.get("context_tiers") or [0])[0]
+    window_tokens = params.get("decay_window_tokens") or DECODE_WINDOW_TOKENS
+    context_seed = params.get("context_seed")
+
+    mode_run = _ModeRun(job_id, params, "decay", progress_cb)
+    eligible = [t for t in targets if _fits_context(t, tier, max_tokens)]
+    if not eligible:
+        await mode_run.fail("No benchmark targets matched the selected configuration")
+        return None
+
+    bench_config["decay"] = {"window_tokens": window_tokens}
+    await mode_run.start(eligible, prompt, bench_config, [tier], total=len(eligible) * runs)
+
+    profiles: list[dict] = []
+
+    async def run_target(target: Target):
+        bench_target, bench_provider_params = _apply_benchmark_profile(
+            target, provider_params, loaded_profiles,
+        )
+        if params.get("warmup", True):
+            await _measured_run_single(
+                params, bench_target, prompt, DECAY_WARMUP_MAX_TOKENS, temperature, 0,
+                timeout=timeout, provider_params=bench_provider_params,
+            )
+        long_params = _long_output_params(bench_target, max_tokens, bench_provider_params)
+
+        items: list[dict] = []
+        for r in range(runs):
+            if cancel_event.is_set():
+                return
+            result = await _measured_run_single(
+                params, bench_target, prompt, max_tokens, temperature, tier,
+                timeout=timeout, provider_params=long_params,
+                context_seed=None if context_seed is None else f"{context_seed}:{tier}:{r}",
+                decode_window_tokens=window_tokens,
+            )
+            item = _benchmark_result_item(target, result, r + 1, runs, tier)
+            item["decode_window_tokens"] = window_tokens
+            items.append(item)
+            await mode_run.add(item, f"{item['model']}, decay run {r + 1}/{runs}")
+
+        profile = {
+            "provider": target.provider,
+            "model": target.display_name,
+            "model_id": target.model_id,
+            "max_tokens": max_tokens,
+            "forced_length": long_params is not bench_provider_params,
+        }
+        profile.update(_decay_profile(items, window_tokens))
+        profiles.append(profile)
+        await mode_run.send({"type": "benchmark_decay_profile", "job_id": job_id, "data": profile})
+
+    await _run_by_provider(eligible, run_target, cancel_event)
+
+    if cancel_event.is_set():
+        return None
+    return await mode_run.finish(config, prompt, [tier], {"decay_profiles": profiles})
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode: trace replay
+# ---------------------------------------------------------------------------
+
+REPLAY_WARMUP_MAX_TOKENS = 16
+
+
+async def _run_replay_benchmark(
+    job_id: str,
+    params: dict,
+    targets: list[Target],
+    prompt: str,
+    bench_config: dict,
+    config: dict,
+    loaded_profiles: dict,
+    cancel_event,
+    progress_cb,
+) -> str | None:
+    """Replay a captured request trace against each target.
+
+    The requests of the stored trace ``replay_trace_id`` (parsed by
+    _parse_replay_trace at import) are reissued with their own messages
+    and max_tokens at the trace's arrival offsets divided by
+    ``replay_speed``, open loop like the load mode, so the endpoint sees
+    the real prompt/output length mix and burstiness.  Each request is a
+    benchmark_results row; the per-model summary (latency/TTFT percentiles,
+    cost, per-request list in trace order) is stored in
+    benchmark_runs.metadata and streamed as ``benchmark_replay_summary``.
+    """
+    temperature = params.get("temperature", 0.7)
+    timeout = params.get("timeout", 300)
+    provider_params = params.get("provider_params")
+    speed = params.get("replay_speed") or 1.0
+    capture_timeline = params.get("capture_timeline", False)
+
+    mode_run = _ModeRun(job_id, params, "replay", progress_cb)
+    trace = await db.get_replay_trace(params.get("replay_trace_id") or "", params["user_id"])
+    if not trace:
+        await mode_run.fail("Replay trace not found")
+        return None
+    try:
+        entries = await asyncio.to_thread(read_replay_trace, replay_trace_path(params["user_id"], trace["id"]))
+    except (OSError, ValueError) as e:
+        logger.warning("Replay trace %s unreadable: %s", trace["id"], e)
+        await mode_run.fail(f"Replay trace unreadable: {e}")
+        return None
+    if not entries:
+        await mode_run.fail("Replay trace has no requests")
+        return None
+    if not targets:
+        await mode_run.fail("No benchmark targets matched the selected configuration")
+        return None
+
+    offsets = [e["offset_s"] / speed for e in entries]
+    trace_stats = _replay_trace_stats(entries)
+    label = f"Trace replay: {len(entries)} requests over {trace_stats['duration_s']:g}s"
+    bench_config["replay"] = {"trace_id": trace["id"], "name": trace["name"], "speed": speed, **trace_stats}
+    await mode_run.start(
+        targets, label, bench_config, [0], total=len(targets) * len(entries),
+        init_extra={"replay_requests": len(entries), "replay_speed": speed},
+    )
+
+    summaries: list[dict] = []
+
+    async def run_target(target: Target):
+        bench_target, bench_provider_params = _apply_benchmark_profile(
+            target, provider_params, loaded_profiles,
+        )
+        if params.get("warmup", True):
+            await _measured_run_single(
+                params, bench_target, "", REPLAY_WARMUP_MAX_TOKENS, temperature, 0,
+                timeout=timeout, provider_params=bench_provider_params,
+                replay_messages=entries[0]["messages"],
+            )
+
+        async def launch(i: int):
+            entry = entries[i]
+            result = await _measured_run_single(
+                params, bench_target, "", entry["max_tokens"], temperature, 0,
+                timeout=timeout, provider_params=bench_provider_params,
+                capture_timeline=capture_timeline, replay_messages=entry["messages"],
+            )
+            item = _benchmark_result_item(target, result, entry["index"], len(entries), 0)
+            item["replay_index"] = entry["index"]
+            item["replay_offset_s"] = entry["offset_s"]
+            await mode_run.add(item, f"{item['model']}, request {i + 1}/{len(entries)}")
+            return item
+
+        items, wall_time_s, peak = await _run_open_loop_step(offsets, launch, cancel_event)
+        if cancel_event.is_set():
+            return
+
+        summary = {
+            "provider": target.provider,
+            "model": target.display_name,
+            "model_id": target.model_id,
+            "peak_in_flight": peak,
+        }
+        summary.update(_summarize_replay(items, speed, trace_stats["duration_s"], wall_time_s))
+        summaries.append(summary)
+        await mode_run.send({"type": "benchmark_replay_summary", "job_id": job_id, "data": summary})
+
+    await _run_by_provider(targets, run_target, cancel_event)
+
+    if cancel_event.is_set():
+        return None
+    return await mode_run.finish(config, label, [0], {"replay_summaries": summaries})
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode: prompt dataset
+# ---------------------------------------------------------------------------
+
+DATASET_WARMUP_MAX_TOKENS = 16
+
+
+async def _run_dataset_benchmark(
+    job_id: str,
+    params: dict,
+    targets: list[Target],
+    prompt: str,
+    bench_config: dict,
+    config: dict,
+    loaded_profiles: dict,
+    cancel_event,
+    progress_cb,
+) -> str | None:
+    """Benchmark each target over a sample of an uploaded prompt dataset.
+
+    ``dataset_samples`` records are drawn once (with replacement when
+    ``dataset_replace``), streaming from the dataset file, and every target
+    runs the same sample one request at a time. Records keep their own
+    max_tokens (``max_tokens`` otherwise). Each request is a
+    benchmark_results row; the per-model summary stratified by prompt and
+    output length bucket is stored in benchmark_runs.metadata and streamed
+    as ``benchmark_dataset_buckets``.
+    """
+    max_tokens = params.get("max_tokens", 512)
+    temperature = params.get("temperature", 0.7)
+    timeout = params.get("timeout", 300)
+    provider_params = params.get("provider_params")
+    capture_timeline = params.get("capture_timeline", False)
+    seed = params.get("dataset_seed")
+    if seed is None:
+        seed = random.randrange(2**31)  # recorded in config_json so the sample can be re-drawn
+    replace_draws = bool(params.get("dataset_replace"))
+
+    mode_run = _ModeRun(job_id, params, "dataset", progress_cb)
+    dataset = await db.get_prompt_dataset(params.get("dataset_id") or "", params["user_id"])
+    if not dataset:
+        await mode_run.fail("Prompt dataset not found")
+        return None
+    if not targets:
+        await mode_run.fail("No benchmark targets matched the selected configuration")
+        return None
+    try:
+        records = await asyncio.to_thread(
+            sample_dataset, dataset_path(params["user_id"], dataset["id"]), dataset["prompt_count"],
+            params.get("dataset_samples", 50), replace_draws, seed,
+        )
+    except (OSError, ValueError) as e:
+        logger.warning("Dataset %s unreadable: %s", dataset["id"], e)
+        await mode_run.fail(f"Prompt dataset unreadable: {e}")
+        return None
+
+    label = f"Dataset {dataset['name']}: {len(records)} prompts"
+    bench_config["dataset"] = {
+        "id": dataset["id"],
+        "name": dataset["name"],
+        "prompt_count": dataset["prompt_count"],
+        "samples": len(records),
+        "replace": replace_draws,
+        "seed": seed,
+    }
+    await mode_run.start(
+        targets, label, bench_config, [0], total=len(targets) * len(records),
+        init_extra={"dataset_samples": len(records), "dataset_name": dataset["name"]},
+    )
+
+    summaries: list[dict] = []
+
+    async def run_target(target: Target):
+        bench_target, bench_provider_params = _apply_benchmark_profile(
+            target, provider_params, loaded_profiles,
+        )
+        if params.get("warmup", True):
+            first = records[0]
+            await _measured_run_single(
+                params, bench_target, first.get("prompt", ""), DATASET_WARMUP_MAX_TOKENS, temperature, 0,
+                timeout=timeout, provider_params=bench_provider_params,
+                replay_messages=first.get("messages"),
+            )
+
+        items = []
+        for i, record in enumerate(records):
+            if cancel_event.is_set():
+                return
+            result = await _measured_run_single(
+                params, bench_target, record.get("prompt", ""), record.get("max_tokens", max_tokens),
+                temperature, 0, timeout=timeout, provider_params=bench_provider_params,
+                capture_timeline=capture_timeline, replay_messages=record.get("messages"),
+            )
+            item = _benchmark_result_item(target, result, i + 1, len(records), 0)
+            item["dataset_index"] = record["index"]
+            item["dataset_input_tokens"] = item.get("input_tokens") or estimate_prompt_tokens(record)
+            await mode_run.add(item, f"{item['model']}, prompt {i + 1}/{len(records)}")
+            items.append(item)
+
+        summary = {
+            "provider": target.provider,
+            "model": target.display_name,
+            "model_id": target.model_id,
+        }
+        summary.update(_summarize_dataset_buckets(items))
+        summaries.append(summary)
+        await mode_run.send({"type": "benchmark_dataset_buckets", "job_id": job_id, "data": summary})
+
+    await _run_by_provider(targets, run_target, cancel_event)
+
+    if cancel_event.is_set():
+        return None
+    return await mode_run.finish(config, label, [0], {"dataset_buckets": summaries})
+
+
+# ---------------------------------------------------------------------------
+# Embedding Benchmark Handler
+# ---------------------------------------------------------------------------
+
+async def embedding_benchmark_handler(job_id: str, params: dict, cancel_event, progress_cb) -> str | None:
+    """Job registry handler for embedding throughput benchmarks.
+
+    Every target runs a grid of cells, one per (input tokens, batch size,
+    concurrency). A cell sends ``requests`` embedding requests, and
+    ``concurrency`` workers keep that many in flight (closed loop). Each
+    input is a fresh corpus window, so provider caches don't help. Requests
+    are stored in benchmark_runs / benchmark_results like chat benchmarks:
+    config_json mode is "embedding", context_tokens is tokens per input and
+    tokens_per_second is input tok/s. So they show up in history and the
+    embedding leaderboard. Per-cell summaries (vectors/s, tokens/s,
+    latency percentiles, cost) go into benchmark_runs.metadata and stream
+    as ``embedding_cell`` events.
+    """
+    user_id = params["user_id"]
+    model_ids = params["models"]
+    _raw_ts = params.get("target_set")
+    target_set = {tuple(t) for t in _raw_ts} if _raw_ts else None
+    batch_sizes = params.get("batch_sizes") or EMBEDDING_DEFAULT_BATCH_SIZES
+    input_tokens_list = params.get("input_tokens") or EMBEDDING_DEFAULT_INPUT_TOKENS
+    concurrency_levels = params.get("concurrency") or EMBEDDING_DEFAULT_CONCURRENCY
+    requests_per_cell = params.get("requests", 8)
+    timeout = params.get("timeout", 120)
+    warmup = params.get("warmup", True)
+    provider_params = params.get("provider_params")
+
+    logger.info(
+        "Embedding benchmark started: job_id=%s user_id=%s models=%d batches=%s inputs=%s concurrency=%s",
+        job_id, user_id, len(model_ids) if model_ids else 0, batch_sizes, input_tokens_list, concurrency_levels,
+    )
+
+    async def send(payload: dict):
+        if ws_manager:
+            await ws_manager.send_to_user(user_id, payload)
+
+    config = await _get_user_config(user_id)
+    targets = _filter_targets(build_targets(config), model_ids, target_set)
+    user_keys_cache = {}
+    for t in targets:
+        if t.provider_key and t.provider_key not in user_keys_cache:
+            encrypted = await db.get_user_key_for_provider(user_id, t.provider_key)
+            if encrypted:
+                user_keys_cache[t.provider_key] = encrypted
+    targets = inject_user_keys(targets, user_keys_cache)
+    if not targets:
+        await send({"type": "job_failed", "job_id": job_id,
+                    "error": "No benchmark targets matched the selected configuration"})
+        return None
+
+    cells = [(n, b, c) for n in input_tokens_list for b in batch_sizes for c in concurrency_levels]
+    total = len(targets) * len(cells) * requests_per_cell
+    bench_config = {
+        "mode": "embedding",
+        "models": model_ids,
+        "batch_sizes": batch_sizes,
+        "input_tokens": input_tokens_list,
+        "concurrency": concurrency_levels,
+        "requests": requests_per_cell,
+        "warmup": warmup,
+    }
+    if target_set:
+        bench_config["target_set"] = [list(t) for t in target_set]
+    if provider_params:
+        bench_config["provider_params"] = provider_params
+    label = (
+        f"Embedding benchmark: {len(cells)} cells x {requests_per_cell} requests "
+        f"(batch {', '.join(map(str, batch_sizes))})"
+    )
+    run_id = await db.save_benchmark_run(
+        user_id=user_id,
+        prompt=label,
+        context_tiers=json.dumps(input_tokens_list),
+        warmup=warmup,
+        config_json=json.dumps(bench_config),
+    )
+    await send({
+        "type": "embedding_init",
+        "job_id": job_id,
+        "data": {
+            "targets": [{"provider_key": t.provider_key, "model_id": t.model_id} for t in targets],
+            "cells": [{"input_tokens": n, "batch_size": b, "concurrency": c} for n, b, c in cells],
+            "requests": requests_per_cell,
         },
     })
 
-    # Pre-validate params and warn user about drops/clamps BEFORE execution starts
-    await _emit_param_adjustments(
-        user_id, job_id, targets, provider_params,
-        temperature=temperature, max_tokens=max_tokens,
-    )
+    completed = 0
+    summaries: list[dict] = []
+    model_db_ids: dict[str, str | None] = {}
+    run_numbers: dict[str, int] = {}
 
-    async def run_provider(prov_targets):
-        """Run all benchmarks for one provider sequentially.
+    async def run_target(target: Target):
+        nonlocal completed
+        if warmup:
+            await async_run_embedding(target, _embedding_inputs(1, min(input_tokens_list)), timeout, provider_params)
 
-        Execution order: model → context tiers → runs.
-        This profiles each model across all context sizes before moving on.
-        """
-        for target in prov_targets:
+        for input_tokens, batch_size, concurrency in cells:
             if cancel_event.is_set():
                 return
+            pending = iter(range(requests_per_cell))
+            items: list[dict] = []
 
-            # Apply model profile once per model (B3)
-            bench_target = target
-            bench_provider_params = provider_params
-            profile = loaded_profiles.get(target.model_id)
-            if profile:
-                # Profile system_prompt replaces config-level baseline
-                profile_sys = profile.get("system_prompt")
-                if profile_sys:
-                    bench_target = replace(target, system_prompt=profile_sys)
-
-                # Profile params: defaults < profile < per-request overrides
-                profile_params_raw = profile.get("params_json")
-                if profile_params_raw:
-                    profile_params = json.loads(profile_params_raw) if isinstance(profile_params_raw, str) else profile_params_raw
-                    if profile_params:
-                        merged = dict(profile_params)
-                        if bench_provider_params:
-                            merged.update(bench_provider_params)
-                        bench_provider_params = merged
-
-            # Warm-up run once per model (discarded)
-            if warmup:
-                await async_run_single(
-                    bench_target, prompt, max_tokens, temperature, 0,
-                    timeout=timeout, provider_params=bench_provider_params,
-                )
-
-            for tier in context_tiers:
-                if cancel_event.is_set():
-                    return
-                headroom = target.context_window - max_tokens - 100
-                if tier > 0 and tier > headroom:
-                    # Notify user about the skip via WS
-                    await results_queue.put({
-                        "type": "skipped",
-                        "provider": target.display_name,
-                        "model": target.display_name,
-                        "reason": f"{tier//1000}K context exceeds model window ({target.context_window//1000}K - {max_tokens} max_tokens)",
-                    })
-                    continue
-
-                for r in range(runs):
+            async def worker():
+                nonlocal completed
+                for i in pending:
                     if cancel_event.is_set():
                         return
-
-                    # Notify frontend that this provider/model/run is starting
-                    await _ws_send({
-                        "type": "benchmark_progress",
-                        "job_id": job_id,
-                        "data": {
-                            "type": "progress",
-                            "provider": target.provider,
-                            "model": target.display_name,
-                            "model_id": target.model_id,
-                            "run": r + 1,
-                            "runs": runs,
-                            "context_tokens": tier,
-                        },
-                    })
-
-                    result = await async_run_single(
-                        bench_target, prompt, max_tokens, temperature, tier,
-                        timeout=timeout, provider_params=bench_provider_params,
+                    res = await async_run_embedding(
+                        target, _embedding_inputs(batch_size, input_tokens), timeout, provider_params,
                     )
-                    await results_queue.put({
-                        "type": "result",
+                    latency = res["latency_s"]
+                    item = {
+                        "type": "embedding_result",
                         "provider": target.provider,
                         "model": target.display_name,
                         "model_id": target.model_id,
-                        "run": r + 1,
-                        "runs": runs,
-                        "context_tokens": tier,
-                        "ttft_ms": round(result.ttft_ms, 2),
-                        "total_time_s": round(result.total_time_s, 3),
-                        "output_tokens": result.output_tokens,
-                        "input_tokens": result.input_tokens,
-                        "tokens_per_second": round(result.tokens_per_second, 2),
-                        "input_tokens_per_second": round(result.input_tokens_per_second, 2),
-                        "output_speed_tps": round(result.output_speed_tps, 2),
-                        "itl_ms": round(result.itl_ms, 1),
-                        "cost": round(result.cost, 8),
-                        "success": result.success,
-                        "error": result.error,
-                    })
-
-    # Launch all provider groups as concurrent tasks
-    tasks = [asyncio.create_task(run_provider(g)) for g in provider_groups.values()]
-
-    async def sentinel():
-        await asyncio.gather(*tasks, return_exceptions=True)
-        await results_queue.put(None)
-
-    asyncio.create_task(sentinel())
-
-    # Consume results and report progress
-    current = 0
-    all_results = []
-    while True:
-        try:
-            item = await asyncio.wait_for(results_queue.get(), timeout=15)
-        except asyncio.TimeoutError:
-            continue  # Keep waiting
-        if item is None:
-            break
-        if cancel_event.is_set():
-            for t in tasks:
-                t.cancel()
-            return None
-        if item["type"] == "skipped":
-            # Notify frontend about skipped tier
-            await _ws_send({
-                "type": "benchmark_result",
-                "job_id": job_id,
-                "data": item,
-            })
-            continue
-        if item["type"] == "result":
-            current += 1
-            all_results.append(item)
-            pct = int((current / total) * 100) if total > 0 else 0
-            detail = f"{item['model']}, Run {item['run']}/{item['runs']}"
-            if item["context_tokens"] > 0:
-                detail += f", Context {item['context_tokens'] // 1000}K"
-            await progress_cb(pct, detail)
-
-            # Send individual result data to frontend via WebSocket
-            await _ws_send({
-                "type": "benchmark_result",
-                "job_id": job_id,
-                "data": item,
-            })
-
-            # ERD v2: Persist each result row to benchmark_results
-            try:
-                model_litellm_id = item.get("model_id", "")
-                if model_litellm_id not in model_db_id_cache:
-                    model_db_id_cache[model_litellm_id] = await _resolve_model_db_id(user_id, model_litellm_id)
-                model_db_id = model_db_id_cache[model_litellm_id]
-
-                if model_db_id:
-                    # Track run numbers per model+tier
-                    rn_key = f"{model_litellm_id}:{item.get('context_tokens', 0)}"
-                    run_number_tracker[rn_key] = run_number_tracker.get(rn_key, 0) + 1
-
-                    await db.save_benchmark_result(
-                        run_id=run_id,
-                        model_id=model_db_id,
-                        run_number=run_number_tracker[rn_key],
-                        context_tokens=item.get("context_tokens", 0),
-                        ttft_ms=item.get("ttft_ms"),
-                        total_time_s=item.get("total_time_s"),
-                        output_tokens=item.get("output_tokens"),
-                        input_tokens=item.get("input_tokens"),
-                        tokens_per_second=item.get("tokens_per_second"),
-                        input_tokens_per_second=item.get("input_tokens_per_second"),
-                        output_speed_tps=item.get("output_speed_tps"),
-                        itl_ms=item.get("itl_ms"),
-                        cost=item.get("cost"),
-                        success=item.get("success", True),
-                        error=item.get("error"),
+                        "run": i + 1,
+                        "runs": requests_per_cell,
+                        "context_tokens": input_tokens,
+                        "batch_size": batch_size,
+                        "concurrency": concurrency,
+                        "total_time_s": round(latency, 4),
+                        "input_tokens": res["input_tokens"],
+                        "output_tokens": 0,
+                        "tokens_per_second": round(res["input_tokens"] / latency, 2) if latency > 0 else 0.0,
+                        "vectors_per_second": round(res["vectors"] / latency, 2) if latency > 0 else 0.0,
+                        "embedding_dim": res["embedding_dim"],
+                        "cost": round(res["cost"], 8),
+                        "success": res["success"],
+                        "error": res["error"],
+                    }
+                    items.append(item)
+                    completed += 1
+                    await progress_cb(
+                        min(99, int(completed / total * 100)),
+                        f"{target.display_name}, {input_tokens} tok x {batch_size} @ {concurrency}",
                     )
-            except Exception as e:
-                logger.warning("Failed to save benchmark_result: %s", e)
+                    await send({"type": "benchmark_result", "job_id": job_id, "data": item})
+                    await _persist_benchmark_item(user_id, run_id, item, model_db_ids, run_numbers)
 
-    # Save aggregated results to JSON files (legacy format)
-    if all_results:
-        agg_results = _aggregate(all_results, config)
-        save_results(agg_results, prompt, context_tiers=context_tiers)
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            wall_time_s = time.perf_counter() - t0
+            if cancel_event.is_set():
+                return
 
-        logger.info(
-            "Benchmark completed: job_id=%s user_id=%s results=%d run_id=%s",
-            job_id, user_id, len(all_results), run_id,
-        )
+            summary = {
+                "provider": target.provider,
+                "model": target.display_name,
+                "model_id": target.model_id,
+                "input_tokens_per_input": input_tokens,
+                "batch_size": batch_size,
+                "concurrency": concurrency,
+            }
+            summary.update(_summarize_embedding_cell(items, wall_time_s))
+            summaries.append(summary)
+            await send({"type": "embedding_cell", "job_id": job_id, "data": summary})
 
-        await db.log_audit(
-            user_id=user_id,
-            username=params.get("user_email", ""),
-            action="benchmark_complete",
-            resource_type="benchmark",
-            detail={"models": model_ids, "result_count": len(all_results)},
-        )
+    await _run_by_provider(targets, run_target, cancel_event)
 
-        return run_id
+    if cancel_event.is_set():
+        return None
+    await db.update_benchmark_run_metadata(run_id, json.dumps({"mode": "embedding", "embedding_cells": summaries}))
 
-    logger.info("Benchmark produced no results: job_id=%s user_id=%s", job_id, user_id)
-    return None
+    logger.info(
+        "Embedding benchmark completed: job_id=%s user_id=%s requests=%d run_id=%s",
+        job_id, user_id, completed, run_id,
+    )
+    await db.log_audit(
+        user_id=user_id,
+        username=params.get("user_email", ""),
+        action="benchmark_complete",
+        resource_type="benchmark",
+        detail={"models": model_ids, "result_count": completed, "mode": "embedding"},
+    )
+    return run_id
 
 
 # ---------------------------------------------------------------------------
@@ -515,8 +1894,10 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
     provider_params = params.get("provider_params")
     system_prompt_raw = params.get("system_prompt")  # string | dict | None
     judge_config = params.get("judge")
-    judge_concurrency = int(params.get("judge_concurrency", 4))
+    judge_concurrency = int(params.get("judge_concurrency") or 0)  # 0: from the perf profile
     experiment_id = params.get("experiment_id")
+    case_concurrency = params.get("case_concurrency")  # None: per-endpoint default
+    cache_mode = params.get("cache_mode", "off")  # response cache: off / read_write / replay
     profiles_map = params.get("profiles")  # {"model_id": "profile_id"} or None
 
     logger.info(
@@ -533,13 +1914,20 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
                 loaded_profiles[model_id] = profile
                 logger.debug("Loaded profile %s for model %s", profile_id, model_id)
 
-    # Load suite + test cases
+    # Load suite + test cases; tools come from the tool_definitions table (ERD v2),
+    # parsed once per suite version and shared by every case x model
     suite = await db.get_tool_suite(suite_id, user_id)
-    cases = await db.get_test_cases(suite_id)
-
-    # ERD v2: Load tools from tool_definitions table instead of tools_json
-    tool_defs = await db.get_tool_definitions(suite_id)
-    tools = _tool_defs_to_openai(tool_defs)
+    compiled = await get_compiled_suite(suite_id, user_id)
+    if compiled is None:
+        logger.error("Tool eval: suite not found suite_id=%s", suite_id)
+        if ws_manager:
+            await ws_manager.send_to_user(user_id, {
+                "type": "job_failed",
+                "job_id": job_id,
+                "error": "Suite not found — it may have been deleted",
+            })
+        return None
+    cases, tools = compiled.cases, compiled.tools
 
     # Build targets
     config = await _get_user_config(user_id)
@@ -569,6 +1957,7 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
         user_id, job_id, targets, provider_params,
         temperature=temperature,
     )
+    await _prewarm_targets(params, targets)
 
     # Judge setup (opt-in)
     judge_enabled = False
@@ -606,6 +1995,11 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
                     bool(judge_target.api_key),
                 )
 
+    if not judge_concurrency:
+        judge_concurrency = perf_profiles.suggest_concurrency(
+            judge_target.model_id, judge_target.api_base, "judge", 4,
+        ) if judge_target else 4
+
     # Auto-cap judge concurrency when judge shares an endpoint with eval models.
     if judge_enabled and judge_target and judge_mode in ("live_inline", "post_eval"):
         eval_bases = {t.api_base for t in targets if t.api_base}
@@ -639,6 +2033,8 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
         eval_config["target_set"] = target_set_cleaned
     if profiles_map:
         eval_config["profiles"] = profiles_map
+    if cache_mode != "off":
+        eval_config["cache_mode"] = cache_mode
 
     # Build system_prompt_config and provider_params_json for DB
     system_prompt_config_json = json.dumps(system_prompt_raw) if system_prompt_raw else None
@@ -721,34 +2117,33 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
                             merged.update(eval_provider_params)
                         eval_provider_params = merged
 
-            for case in cases:
-                if cancel_event.is_set():
-                    return
-                mt_config = None
-                if case.get("multi_turn_config"):
-                    try:
-                        mt_config = json.loads(case["multi_turn_config"]) if isinstance(case["multi_turn_config"], str) else case["multi_turn_config"]
-                    except (json.JSONDecodeError, TypeError):
-                        logger.debug("Failed to parse multi_turn_config in tool eval handler")
-                        await _ws_send({
-                            "type": "eval_warning",
-                            "job_id": job_id,
-                            "detail": "Multi-turn config could not be parsed — running as single-turn",
-                        })
-                        mt_config = None
+            async def run_case(case, eval_target=eval_target, eval_provider_params=eval_provider_params,
+                               system_prompt=system_prompt):
+                if case["_mt_config_invalid"]:
+                    logger.debug("Failed to parse multi_turn_config in tool eval handler")
+                    await _ws_send({
+                        "type": "eval_warning",
+                        "job_id": job_id,
+                        "detail": "Multi-turn config could not be parsed — running as single-turn",
+                    })
 
-                if mt_config and mt_config.get("multi_turn"):
-                    case_with_mt = {**case, "_mt_config": mt_config}
-                    result = await run_multi_turn_eval(eval_target, tools, case_with_mt, temperature, tool_choice, provider_params=eval_provider_params, system_prompt=system_prompt)
-                else:
-                    result = await run_single_eval(eval_target, tools, case, temperature, tool_choice, provider_params=eval_provider_params, system_prompt=system_prompt)
-                await results_queue.put(result)
+                if case["_mt_config"]:
+                    return await run_multi_turn_eval(eval_target, tools, case, temperature, tool_choice, provider_params=eval_provider_params, system_prompt=system_prompt, cache_mode=cache_mode, suite=compiled)
+                return await run_single_eval(eval_target, tools, case, temperature, tool_choice, provider_params=eval_provider_params, system_prompt=system_prompt, cache_mode=cache_mode, suite=compiled)
+
+            if cancel_event.is_set():
+                return
+            concurrency = _case_concurrency(eval_target, case_concurrency)
+            logger.info("Tool eval %s: %d cases, %d in parallel", target.model_id, len(cases), concurrency)
+            await _run_cases(cases, run_case, concurrency, cancel_event, on_result=results_queue.put)
 
     # Launch provider groups in parallel
     tasks = [asyncio.create_task(run_provider(g)) for g in provider_groups.values()]
 
     async def sentinel():
+        watcher = _watch_cancel(tasks, cancel_event)
         await asyncio.gather(*tasks, return_exceptions=True)
+        watcher.cancel()
         await results_queue.put(None)
 
     asyncio.create_task(sentinel())
@@ -777,12 +2172,12 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
                     judge_verdicts.append(verdict)
                     await _ws_send({"type": "judge_verdict", "job_id": job_id, **verdict})
             continue
-        if item is None:
-            break
         if cancel_event.is_set():
             for t in tasks:
                 t.cancel()
             return None
+        if item is None:
+            break
 
         current += 1
         t = target_map.get(item["model_id"])
@@ -845,6 +2240,7 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
                     required_present=item.get("required_present"),
                     type_correct=item.get("type_correct"),
                     hallucination_free=item.get("hallucination_free"),
+                    schema_errors=json.dumps(item["schema_errors"]) if item.get("schema_errors") else None,
                 )
                 # Track for judge verdicts later
                 cr_key = f"{model_litellm_id}::{item.get('test_case_id', '')}"
@@ -1160,6 +2556,8 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
         "eval_id": eval_id,
         "judge_report_id": judge_report_id,
     }
+    if cache_mode != "off":
+        complete_evt["cached_cases"] = sum(1 for r in all_results if r.get("cached"))
     if experiment_id:
         try:
             exp = await db.get_experiment(experiment_id, user_id)
@@ -1420,6 +2818,85 @@ async def tool_eval_handler(job_id: str, params: dict, cancel_event, progress_cb
     return eval_id
 
 
+# ---------------------------------------------------------------------------
+# Rescore Handler
+# ---------------------------------------------------------------------------
+
+async def rescore_handler(job_id: str, params: dict, cancel_event, progress_cb) -> str | None:
+    """Job registry handler that re-applies scoring to a stored eval run.
+
+    Streams the run's case_results in pages, re-scores each stored call
+    against the test cases' current expectations / scoring_config_json and
+    the current score weights, and writes the new scores back in bulk.
+    No model is called. Returns the eval_run_id on success, or None.
+    """
+    user_id = params["user_id"]
+    eval_run_id = params["eval_run_id"]
+    start_time = time.perf_counter()
+
+    async def _ws_send(payload: dict):
+        if ws_manager:
+            await ws_manager.send_to_user(user_id, payload)
+
+    eval_run = await db.get_tool_eval_run(eval_run_id, user_id)
+    if not eval_run:
+        await _ws_send({"type": "job_failed", "job_id": job_id, "error": "Eval run not found"})
+        return None
+
+    compiled = await get_compiled_suite(eval_run["suite_id"], user_id)
+    if compiled is None:
+        await _ws_send({"type": "job_failed", "job_id": job_id, "error": "Suite not found"})
+        return None
+    cases = {c["id"]: c for c in compiled.cases}
+    total = await db.count_case_results(eval_run_id)
+
+    logger.info("Rescore started: job_id=%s eval_id=%s cases=%d", job_id, eval_run_id, total)
+    await _ws_send({"type": "rescore_start", "job_id": job_id, "eval_id": eval_run_id, "total_cases": total})
+
+    seen = rescored = changed = 0
+    after_rowid = 0
+    while not cancel_event.is_set():
+        rows = await db.get_case_results_page(eval_run_id, after_rowid, RESCORE_PAGE_SIZE)
+        if not rows:
+            break
+        after_rowid = rows[-1]["_rowid"]
+        updates = []
+        for row in rows:
+            new = _rescore_case_result(row, cases.get(row["test_case_id"]), compiled)
+            if new is None:
+                continue
+            updates.append(new)
+            if any(new[f] != row[f] for f in RESCORE_FIELDS):
+                changed += 1
+        if updates:
+            await db.update_case_result_scores(updates)
+        seen += len(rows)
+        rescored += len(updates)
+        pct = min(int(seen / total * 100), 99) if total else 99
+        await progress_cb(pct, f"Rescored {seen}/{total} cases")
+
+    if cancel_event.is_set():
+        return None
+
+    summaries = await db.get_case_results_summary(eval_run_id)
+    duration_s = round(time.perf_counter() - start_time, 3)
+    logger.info(
+        "Rescore completed: eval_id=%s rescored=%d changed=%d skipped=%d in %.2fs",
+        eval_run_id, rescored, changed, seen - rescored, duration_s,
+    )
+    await _ws_send({
+        "type": "rescore_complete",
+        "job_id": job_id,
+        "eval_id": eval_run_id,
+        "rescored": rescored,
+        "changed": changed,
+        "skipped": seen - rescored,
+        "duration_s": duration_s,
+        "summaries": summaries,
+    })
+    return eval_run_id
+
+
 # ---------------------------------------------------------------------------
 # Param Tune Handler
 # ---------------------------------------------------------------------------
@@ -1506,6 +2983,8 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
     optimization_mode = params.get("optimization_mode", "grid")
     n_trials = int(params.get("n_trials", 50))
     profiles_map = params.get("profiles")  # {"model_id": "profile_id"} or None
+    case_concurrency = params.get("case_concurrency")  # None: per-endpoint default
+    cache_mode = params.get("cache_mode", "off")  # response cache: off / read_write / replay
 
     logger.info(
         "Param tune started: job_id=%s user_id=%s models=%d",
@@ -1521,13 +3000,19 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
                 loaded_profiles[model_id] = profile
                 logger.debug("Loaded profile %s for model %s", profile_id, model_id)
 
-    # Load suite + test cases
+    # Load suite + test cases (compiled once, shared by every combo)
     suite = await db.get_tool_suite(suite_id, user_id)
-    cases = await db.get_test_cases(suite_id)
-
-    # ERD v2: Load tools from tool_definitions table
-    tool_defs = await db.get_tool_definitions(suite_id)
-    tools = _tool_defs_to_openai(tool_defs)
+    compiled = await get_compiled_suite(suite_id, user_id)
+    if compiled is None:
+        logger.error("Param tune: suite not found suite_id=%s", suite_id)
+        if ws_manager:
+            await ws_manager.send_to_user(user_id, {
+                "type": "job_failed",
+                "job_id": job_id,
+                "error": "Suite not found — it may have been deleted",
+            })
+        return None
+    cases, tools = compiled.cases, compiled.tools
 
     # Build targets first (may differ from model_ids if duplicates exist)
     config = await _get_user_config(user_id)
@@ -1588,6 +3073,7 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
             if encrypted:
                 user_keys_cache[t.provider_key] = encrypted
     targets = inject_user_keys(targets, user_keys_cache)
+    target_concurrency = {_target_key(t): _case_concurrency(t, case_concurrency) for t in targets}
 
     # ERD v2: Create param tune run BEFORE the loop
     tune_id = await db.save_param_tune_run(
@@ -1692,26 +3178,17 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
                             pp = merged
 
                 # Run all test cases for this combo
-                case_results = []
-                for case in cases:
-                    if cancel_event.is_set():
-                        return
-
-                    # Check if multi-turn
-                    mt_config = None
-                    if case.get("multi_turn_config"):
-                        try:
-                            mt_config = json.loads(case["multi_turn_config"]) if isinstance(case["multi_turn_config"], str) else case["multi_turn_config"]
-                        except (json.JSONDecodeError, TypeError):
-                            logger.debug("Failed to parse multi_turn_config in param tuner")
-                            mt_config = None
-
-                    if mt_config and mt_config.get("multi_turn"):
-                        case_with_mt = {**case, "_mt_config": mt_config}
-                        r = await run_multi_turn_eval(target, tools, case_with_mt, temp, tc, provider_params=pp if pp else None, system_prompt=profile_system_prompt)
-                    else:
-                        r = await run_single_eval(target, tools, case, temp, tc, provider_params=pp if pp else None, system_prompt=profile_system_prompt)
-                    case_results.append(r)
+                async def run_case(case, target=target, temp=temp, tc=tc, pp=pp,
+                                   profile_system_prompt=profile_system_prompt):
+                    if case["_mt_config"]:
+                        return await run_multi_turn_eval(target, tools, case, temp, tc, provider_params=pp if pp else None, system_prompt=profile_system_prompt, cache_mode=cache_mode, suite=compiled)
+                    return await run_single_eval(target, tools, case, temp, tc, provider_params=pp if pp else None, system_prompt=profile_system_prompt, cache_mode=cache_mode, suite=compiled)
+
+                case_results = await _run_cases(
+                    cases, run_case, target_concurrency[_target_key(target)], cancel_event,
+                )
+                if cancel_event.is_set():
+                    return
 
                 # Compute aggregate scores for this combo
                 tool_scores = [r["tool_selection_score"] for r in case_results if r.get("success")]
@@ -1767,7 +3244,9 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
     tasks = [asyncio.create_task(run_provider(g)) for g in provider_groups.values()]
 
     async def sentinel():
+        watcher = _watch_cancel(tasks, cancel_event)
         await asyncio.gather(*tasks, return_exceptions=True)
+        watcher.cancel()
         await results_queue.put(None)
 
     asyncio.create_task(sentinel())
@@ -1778,8 +3257,6 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
             item = await asyncio.wait_for(results_queue.get(), timeout=15)
         except asyncio.TimeoutError:
             continue  # Keep waiting
-        if item is None:
-            break
         if cancel_event.is_set():
             for t in tasks:
                 t.cancel()
@@ -1799,6 +3276,8 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
                 best_model_litellm_id=cancel_best_model,
             )
             return None
+        if item is None:
+            break
 
         completed += 1
         all_results.append(item)
@@ -1964,6 +3443,7 @@ async def param_tune_handler(job_id: str, params: dict, cancel_event, progress_c
                                 required_present=cr.get("required_present"),
                                 type_correct=cr.get("type_correct"),
                                 hallucination_free=cr.get("hallucination_free"),
+                                schema_errors=json.dumps(cr["schema_errors"]) if cr.get("schema_errors") else None,
                             )
                     except Exception as cr_e:
                         logger.warning("Failed to save promoted case result: %s", cr_e)
@@ -2030,6 +3510,8 @@ async def prompt_tune_handler(job_id: str, params: dict, cancel_event, progress_
     cfg = params.get("config", {})
     experiment_id = params.get("experiment_id")
     profiles_map = params.get("profiles")  # {"model_id": "profile_id"} or None
+    case_concurrency = params.get("case_concurrency")  # None: per-endpoint default
+    cache_mode = params.get("cache_mode", "off")  # response cache: off / read_write / replay
 
     population_size = int(cfg.get("population_size", 5))
     generations = int(cfg.get("generations", 1 if mode == "quick" else 3))
@@ -2050,13 +3532,19 @@ async def prompt_tune_handler(job_id: str, params: dict, cancel_event, progress_
         job_id, user_id, mode, total_prompts,
     )
 
-    # Load suite + test cases
+    # Load suite + test cases (compiled once, shared by every prompt candidate)
     suite = await db.get_tool_suite(suite_id, user_id)
-    cases = await db.get_test_cases(suite_id)
-
-    # ERD v2: Load tools from tool_definitions table
-    tool_defs = await db.get_tool_definitions(suite_id)
-    tools = _tool_defs_to_openai(tool_defs)
+    compiled = await get_compiled_suite(suite_id, user_id)
+    if compiled is None:
+        logger.error("Prompt tune: suite not found suite_id=%s", suite_id)
+        if ws_manager:
+            await ws_manager.send_to_user(user_id, {
+                "type": "job_failed",
+                "job_id": job_id,
+                "error": "Suite not found — it may have been deleted",
+            })
+        return None
+    cases, tools = compiled.cases, compiled.tools
 
     # Build targets
     config = await _get_user_config(user_id)
@@ -2075,6 +3563,7 @@ async def prompt_tune_handler(job_id: str, params: dict, cancel_event, progress_
                 user_keys_cache[t.provider_key] = encrypted
     meta_targets = inject_user_keys(meta_targets, user_keys_cache)
     eval_targets = inject_user_keys(eval_targets, user_keys_cache)
+    target_concurrency = {_target_key(t): _case_concurrency(t, case_concurrency) for t in eval_targets}
 
     # Load model profiles if specified (params only — prompt tuner tests prompts, not profile prompts)
     loaded_profiles = {}
@@ -2246,33 +3735,23 @@ async def prompt_tune_handler(job_id: str, params: dict, cancel_event, progress_
                             profile_pp = {k: v for k, v in _pp.items() if k not in ("temperature", "tool_choice", "max_tokens")}
 
                 # Run all test cases with this prompt as system_prompt
-                case_results = []
-                for case in cases:
-                    if cancel_event.is_set():
-                        break
-
+                async def run_case(case, target=target, prompt_text=p_info["text"], profile_pp=profile_pp):
                     # Dispatch: multi-turn or single-turn
-                    mt_config = None
-                    if case.get("multi_turn_config"):
-                        try:
-                            mt_config = json.loads(case["multi_turn_config"]) if isinstance(case["multi_turn_config"], str) else case["multi_turn_config"]
-                        except (json.JSONDecodeError, TypeError):
-                            mt_config = None
-
-                    if mt_config and mt_config.get("multi_turn"):
-                        case_with_mt = {**case, "_mt_config": mt_config}
-                        r = await run_multi_turn_eval(
-                            target, tools, case_with_mt, eval_temperature,
-                            eval_tool_choice, system_prompt=p_info["text"],
-                            provider_params=profile_pp,
-                        )
-                    else:
-                        r = await run_single_eval(
+                    if case["_mt_config"]:
+                        return await run_multi_turn_eval(
                             target, tools, case, eval_temperature,
-                            eval_tool_choice, system_prompt=p_info["text"],
-                            provider_params=profile_pp,
+                            eval_tool_choice, system_prompt=prompt_text,
+                            provider_params=profile_pp, cache_mode=cache_mode, suite=compiled,
                         )
-                    case_results.append(r)
+                    return await run_single_eval(
+                        target, tools, case, eval_temperature,
+                        eval_tool_choice, system_prompt=prompt_text,
+                        provider_params=profile_pp, cache_mode=cache_mode, suite=compiled,
+                    )
+
+                case_results = await _run_cases(
+                    cases, run_case, target_concurrency[_target_key(target)], cancel_event,
+                )
 
                 # Compute scores
                 overall_scores = [r["overall_score"] for r in case_results if r.get("success")]
@@ -2479,7 +3958,7 @@ async def judge_handler(job_id: str, params: dict, cancel_event, progress_cb) ->
     judge_model_raw = params["judge_model"]
     judge_provider_key = params.get("judge_provider_key")
     custom_instructions = params.get("custom_instructions", "")
-    concurrency = int(params.get("concurrency", 4))
+    concurrency = int(params.get("concurrency") or 0)  # 0: from the perf profile
     judge_max_tokens = int(params.get("max_tokens", 4096))
     experiment_id = params.get("experiment_id")
 
@@ -2513,8 +3992,8 @@ async def judge_handler(job_id: str, params: dict, cancel_event, progress_cb) ->
     version = int(params.get("version", 1))
 
     logger.info(
-        "Judge started: job_id=%s user_id=%s eval_run_id=%s concurrency=%d version=%d",
-        job_id, user_id, eval_run_id, concurrency, version,
+        "Judge started: job_id=%s user_id=%s eval_run_id=%s concurrency=%s version=%d",
+        job_id, user_id, eval_run_id, concurrency or "auto", version,
     )
 
     # ERD v2: Load eval results from case_results table instead of results_json
@@ -2653,6 +4132,8 @@ async def judge_handler(job_id: str, params: dict, cancel_event, progress_cb) ->
         encrypted = await db.get_user_key_for_provider(user_id, judge_target.provider_key)
         if encrypted:
             judge_target = inject_user_keys([judge_target], {judge_target.provider_key: encrypted})[0]
+    if not concurrency:
+        concurrency = perf_profiles.suggest_concurrency(judge_target.model_id, judge_target.api_base, "judge", 4)
     logger.debug(
         "Standalone judge target ready: model=%s api_base=%s has_key=%s",
         judge_target.model_id, judge_target.api_base,
@@ -2812,7 +4293,7 @@ async def judge_compare_handler(job_id: str, params: dict, cancel_event, progres
     eval_run_id_b = params["eval_run_id_b"]
     judge_model_raw = params["judge_model"]
     judge_provider_key = params.get("judge_provider_key")
-    concurrency = int(params.get("concurrency", 4))
+    concurrency = int(params.get("concurrency") or 0)  # 0: from the perf profile
     experiment_id = params.get("experiment_id")
 
     # Parse compound key (e.g. "zai::GLM-4.5-Air") from settings dropdown
@@ -2916,6 +4397,8 @@ async def judge_compare_handler(job_id: str, params: dict, cancel_event, progres
         encrypted = await db.get_user_key_for_provider(user_id, judge_target.provider_key)
         if encrypted:
             judge_target = inject_user_keys([judge_target], {judge_target.provider_key: encrypted})[0]
+    if not concurrency:
+        concurrency = perf_profiles.suggest_concurrency(judge_target.model_id, judge_target.api_base, "judge", 4)
 
     # Determine model names from enriched case results
     model_ids_a = list(dict.fromkeys(r["model_id"] for r in results_a))  # preserve order, unique
@@ -3125,7 +4608,8 @@ async def prompt_auto_optimize_handler(job_id: str, params: dict, cancel_event,
 
     # Load suite + test cases
     suite = await db.get_tool_suite(suite_id, user_id)
-    if not suite:
+    compiled = await get_compiled_suite(suite_id, user_id)
+    if not suite or compiled is None:
         logger.error("Auto-optimize: suite not found suite_id=%s", suite_id)
         if ws_manager:
             await ws_manager.send_to_user(user_id, {
@@ -3134,7 +4618,7 @@ async def prompt_auto_optimize_handler(job_id: str, params: dict, cancel_event,
                 "error": "Suite not found — it may have been deleted",
             })
         return None
-    cases = await db.get_test_cases(suite_id)
+    cases, tools = compiled.cases, compiled.tools
     if not cases:
         logger.error("Auto-optimize: no test cases in suite suite_id=%s", suite_id)
         if ws_manager:
@@ -3145,10 +4629,6 @@ async def prompt_auto_optimize_handler(job_id: str, params: dict, cancel_event,
             })
         return None
 
-    # ERD v2: Load tools from tool_definitions table
-    tool_defs = await db.get_tool_definitions(suite_id)
-    tools = _tool_defs_to_openai(tool_defs)
-
     # Build targets
     config = await _get_user_config(user_id)
     all_targets = build_targets(config)
@@ -3227,27 +4707,15 @@ async def prompt_auto_optimize_handler(job_id: str, params: dict, cancel_event,
             for case in cases:
                 if cancel_event.is_set():
                     return 0.0
-                mt_config = None
-                if case.get("multi_turn_config"):
-                    try:
-                        mt_config = (
-                            json.loads(case["multi_turn_config"])
-                            if isinstance(case["multi_turn_config"], str)
-                            else case["multi_turn_config"]
-                        )
-                    except (json.JSONDecodeError, TypeError):
-                        mt_config = None
-
-                if mt_config and mt_config.get("multi_turn"):
-                    case_with_mt = {**case, "_mt_config": mt_config}
+                if case["_mt_config"]:
                     r = await run_multi_turn_eval(
-                        target, tools, case_with_mt, eval_temperature,
-                        eval_tool_choice, system_prompt=prompt_text,
+                        target, tools, case, eval_temperature,
+                        eval_tool_choice, system_prompt=prompt_text, suite=compiled,
                     )
                 else:
                     r = await run_single_eval(
                         target, tools, case, eval_temperature,
-                        eval_tool_choice, system_prompt=prompt_text,
+                        eval_tool_choice, system_prompt=prompt_text, suite=compiled,
                     )
                 case_scores.append(r.get("overall_score", 0.0))
             if case_scores:
@@ -3479,7 +4947,9 @@ def register_all_handlers():
     Called from app.py during startup to wire up handlers.
     """
     job_registry.register_handler("benchmark", benchmark_handler)
+    job_registry.register_handler("embedding_benchmark", embedding_benchmark_handler)
     job_registry.register_handler("tool_eval", tool_eval_handler)
+    job_registry.register_handler("rescore", rescore_handler)
     job_registry.register_handler("param_tune", param_tune_handler)
     job_registry.register_handler("prompt_tune", prompt_tune_handler)
     job_registry.register_handler("prompt_auto_optimize", prompt_auto_optimize_handler)
@@ -0,0 +1,101 @@
+"""Dedicated measurement event loop for LLM Benchmark Studio.
+
+The main FastAPI loop also serializes WebSocket messages, writes SQLite rows
+and serves API requests. Any chunk timestamped there can be delayed by that
+work, which inflates TTFT and ITL while the server is busy. Benchmark
+streams can instead run on this loop. It lives in its own daemon thread and
+does nothing but read streams and timestamp chunks.
+
+Coroutines are handed over with ``asyncio.run_coroutine_threadsafe``. Their
+results (or exceptions) come back to the caller's loop through the returned
+future, so callers just ``await measurement_loop.run(coro)``. Cancelling the
+awaiting task cancels the stream on the measurement loop too.
+
+LiteLLM keys its cached HTTP clients by event loop, so connections opened
+here are never shared with the main loop.
+
+Usage:
+    from measurement_loop import measurement_loop
+
+    result = await measurement_loop.run(async_run_single(target, prompt, ...))
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Server-wide default for benchmark requests that don't set isolate_measurement
+ISOLATE_BY_DEFAULT = os.environ.get("ISOLATED_MEASUREMENT_LOOP", "").lower() in ("1", "true", "yes")
+
+
+class MeasurementLoop:
+    """An asyncio event loop running in a dedicated daemon thread."""
+
+    def __init__(self, name: str = "measurement-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread if needed (idempotent, thread-safe)."""
+        with self._lock:
+            if self._loop is not None and self._thread is not None and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+                # Drain anything still pending so coroutines are not leaked
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.close()
+
+            thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread = loop, thread
+            logger.info("Measurement loop started (thread=%s)", self.name)
+            return loop
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the loop and join its thread; in-flight streams are cancelled."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        logger.info("Measurement loop stopped")
+
+    async def run(self, coro: Awaitable[T]) -> T:
+        """Run ``coro`` on the measurement loop and await its result here."""
+        loop = self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+
+# Global singleton
+measurement_loop = MeasurementLoop()
@@ -0,0 +1,162 @@
+"""Historical latency profiles for LLM Benchmark Studio.
+
+Every (endpoint, model, call type) gets a rolling window of recent
+successful-call latencies. The window is seeded from ``benchmark_results``
+and ``case_results`` and topped up live as calls complete. The profile
+drives two things:
+  - per-call timeouts: p99 x ``PERF_TIMEOUT_MULTIPLIER``, clamped to
+    [``PERF_TIMEOUT_FLOOR_S``, ``PERF_TIMEOUT_MAX_S``]. Until a profile has
+    ``PERF_MIN_SAMPLES`` samples, callers keep their hardcoded default.
+  - a suggested default concurrency: as many in-flight calls as fit into
+    ``PERF_CONCURRENCY_BUDGET_S`` of median latency, capped at
+    ``PERF_MAX_CONCURRENCY``.
+
+Call types and the latency each one tracks:
+  - "benchmark": TTFT of context-free benchmark runs (drives the stream
+    TTFT deadline; total time depends on max_tokens, so it is not used)
+  - "tool_eval": latency of one tool-calling completion (seeded from
+    single-turn cases only; a multi-turn case stores its total)
+  - "judge": latency of one judge completion (live only; not stored in the DB)
+
+Usage:
+    from perf_profiles import profiles
+
+    timeout = profiles.timeout_for(target.model_id, target.api_base, "tool_eval", 120)
+    profiles.observe(target.model_id, target.api_base, "tool_eval", latency_ms)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+import db
+
+logger = logging.getLogger(__name__)
+
+PERF_MIN_SAMPLES = int(os.environ.get("PERF_MIN_SAMPLES", "20"))
+PERF_TIMEOUT_MULTIPLIER = float(os.environ.get("PERF_TIMEOUT_MULTIPLIER", "3"))
+PERF_TIMEOUT_FLOOR_S = float(os.environ.get("PERF_TIMEOUT_FLOOR_S", "15"))
+PERF_TIMEOUT_MAX_S = float(os.environ.get("PERF_TIMEOUT_MAX_S", "600"))
+PERF_REFRESH_S = float(os.environ.get("PERF_REFRESH_S", "600"))
+PERF_CONCURRENCY_BUDGET_S = 8.0  # median seconds of work kept in flight
+PERF_MAX_CONCURRENCY = 16
+PERF_WINDOW = 500  # samples kept per profile
+PERF_HISTORY_DAYS = 30
+
+
+def profile_key(model_id: str, api_base: Optional[str]) -> str:
+    """Profile identity: api_base (if any) + LiteLLM model id."""
+    base = str(api_base).rstrip("/") if api_base else ""
+    return f"{base}|{model_id}"
+
+
+class PerfProfiles:
+    """Rolling latency windows keyed by (endpoint|model, call type)."""
+
+    def __init__(self):
+        self._samples: dict[tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def _window(self, key: tuple[str, str]) -> deque:
+        window = self._samples.get(key)
+        if window is None:
+            with self._lock:
+                window = self._samples.setdefault(key, deque(maxlen=PERF_WINDOW))
+        return window
+
+    def observe(self, model_id: str, api_base: Optional[str], call_type: str, latency_ms: float) -> None:
+        """Record one successful call's latency."""
+        if latency_ms and latency_ms > 0:
+            self._window((profile_key(model_id, api_base), call_type)).append(float(latency_ms))
+
+    def load(self, rows: list[dict]) -> None:
+        """Replace the windows of every profile present in ``rows`` (newest first).
+
+        Rows carry ``litellm_id``, ``api_base``, ``call_type`` and
+        ``latency_ms``. Profiles absent from ``rows`` (e.g. live-only judge
+        profiles) keep their samples.
+        """
+        fresh: dict[tuple[str, str], deque] = {}
+        for row in rows:
+            key = (profile_key(row["litellm_id"], row.get("api_base")), row["call_type"])
+            window = fresh.setdefault(key, deque(maxlen=PERF_WINDOW))
+            if len(window) < PERF_WINDOW and row.get("latency_ms"):
+                window.appendleft(float(row["latency_ms"]))
+        with self._lock:
+            self._samples.update(fresh)
+
+    def profile(self, model_id: str, api_base: Optional[str], call_type: str) -> Optional[dict]:
+        """Sample count and p50/p99 latency, or None with too few samples."""
+        window = self._samples.get((profile_key(model_id, api_base), call_type))
+        if not window or len(window) < PERF_MIN_SAMPLES:
+            return None
+        p50, p99 = np.percentile(np.fromiter(window, dtype=float), [50, 99])
+        return {"samples": len(window), "p50_ms": round(float(p50), 1), "p99_ms": round(float(p99), 1)}
+
+    def timeout_for(self, model_id: str, api_base: Optional[str], call_type: str, default: float) -> float:
+        """Per-call timeout in seconds; ``default`` until the profile is warm."""
+        prof = self.profile(model_id, api_base, call_type)
+        if prof is None:
+            return default
+        timeout = prof["p99_ms"] / 1000 * PERF_TIMEOUT_MULTIPLIER
+        return round(min(max(timeout, PERF_TIMEOUT_FLOOR_S), PERF_TIMEOUT_MAX_S), 1)
+
+    def suggest_concurrency(self, model_id: str, api_base: Optional[str], call_type: str, default: int) -> int:
+        """Default concurrency for an endpoint: more for fast models, 1 for slow ones."""
+        prof = self.profile(model_id, api_base, call_type)
+        if prof is None:
+            return default
+        fits = int(PERF_CONCURRENCY_BUDGET_S * 1000 // max(prof["p50_ms"], 1.0))
+        return min(max(fits, 1), PERF_MAX_CONCURRENCY)
+
+    def stats(self) -> dict:
+        """Warm profiles with their derived timeout and concurrency."""
+        out = {}
+        for (key, call_type), window in list(self._samples.items()):
+            api_base, model_id = key.split("|", 1)
+            prof = self.profile(model_id, api_base, call_type)
+            if prof is None:
+                continue
+            out.setdefault(key, {})[call_type] = {
+                **prof,
+                "timeout_s": self.timeout_for(model_id, api_base, call_type, PERF_TIMEOUT_MAX_S),
+                "suggested_concurrency": self.suggest_concurrency(model_id, api_base, call_type, 1),
+            }
+        return out
+
+    def clear(self) -> None:
+        """Drop every profile (tests and admin resets)."""
+        with self._lock:
+            self._samples.clear()
+
+
+async def refresh(store: Optional["PerfProfiles"] = None) -> int:
+    """Reload the DB-backed profiles; returns the number of samples loaded."""
+    rows = await db.get_recent_call_latencies(days=PERF_HISTORY_DAYS, per_profile=PERF_WINDOW)
+    (store or profiles).load(rows)
+    return len(rows)
+
+
+async def run_refresh_loop() -> None:
+    """Background task: refresh the profiles now and every PERF_REFRESH_S."""
+    while True:
+        try:
+            loaded = await refresh()
+            logger.debug("Perf profiles refreshed from %d samples", loaded)
+        except asyncio.CancelledError:
+            break
+        except Exception:
+            logger.exception("Perf profile refresh failed")
+        try:
+            await asyncio.sleep(PERF_REFRESH_S)
+        except asyncio.CancelledError:
+            break
+
+
+# Global singleton
+profiles = PerfProfiles()
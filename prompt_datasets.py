@@ -0,0 +1,286 @@
+"""Prompt datasets for the dataset benchmark mode.
+
+A dataset is a JSONL file with one prompt per line, stored as
+``DATASETS_DIR/<user_id>/<dataset_id>.jsonl``. A line holds the request
+at the top level or under ``body`` / ``request`` (so a replay trace can
+be reused):
+  - ``prompt`` (string) or ``messages`` (chat messages, sent verbatim)
+  - optional ``max_tokens`` / ``max_completion_tokens``
+
+Files are never loaded whole. Uploads are validated line by line as they
+stream to disk. Sampling takes two passes: the line count is recorded
+at upload, indices are drawn from it (with or without replacement), and
+one streaming pass collects just the sampled lines. Memory is
+O(samples), not O(dataset).
+
+Replay traces (mode="replay") are parsed once at import and stored next
+to the datasets as ``DATASETS_DIR/<user_id>/<trace_id>.trace.json``, so
+jobs carry only the trace id.
+
+Usage:
+    from prompt_datasets import write_dataset, sample_dataset
+
+    info = await write_dataset(request.stream(), dataset_path(user_id, dataset_id))
+    records = sample_dataset(path, info["prompt_count"], k=50, replace=False, seed=1)
+"""
+
+import asyncio
+import json
+import os
+import random
+from pathlib import Path
+from typing import AsyncIterable, Optional
+
+DATASETS_DIR = Path(os.environ.get("DATASETS_DIR", Path(__file__).parent / "data" / "datasets"))
+DATASET_MAX_MB = float(os.environ.get("DATASET_MAX_MB", "200"))
+DATASET_MAX_LINE_BYTES = 2_000_000
+DATASET_MAX_TOKENS_CAP = 128_000
+
+# Upper edges (tokens) of the length buckets results are stratified by;
+# the last bucket is open-ended.
+LENGTH_BUCKETS = [128, 512, 2048, 8192, 32768]
+
+
+class DatasetTooLarge(ValueError):
+    """The upload exceeded DATASET_MAX_MB."""
+
+
+def dataset_path(user_id: str, dataset_id: str) -> Path:
+    """On-disk location of one user's dataset."""
+    return DATASETS_DIR / user_id / f"{dataset_id}.jsonl"
+
+
+def replay_trace_path(user_id: str, trace_id: str) -> Path:
+    """On-disk location of one user's imported replay trace."""
+    return DATASETS_DIR / user_id / f"{trace_id}.trace.json"
+
+
+def write_replay_trace(entries: list[dict], path: Path) -> int:
+    """Store parsed replay entries at ``path``; returns the file size in bytes.
+
+    Written to a temporary file and renamed into place, like datasets.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".part")
+    data = json.dumps(entries, ensure_ascii=False).encode("utf-8")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return len(data)
+
+
+def read_replay_trace(path: Path) -> list[dict]:
+    """Load the parsed replay entries stored by write_replay_trace."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def request_body(record: dict):
+    """The chat request of a log line: at the top level or under ``body`` / ``request``."""
+    return record.get("body") or record.get("request") or record
+
+
+def parse_request_line(line: str, line_no: int, require_messages: bool = False) -> Optional[tuple[dict, dict]]:
+    """Validate one JSONL request-log line; None for a blank line.
+
+    Shared by dataset uploads and replay-trace imports. Returns (record,
+    request): the line's JSON object, for fields outside the request such
+    as timestamps, and {"prompt": str} or {"messages": list} plus
+    "max_tokens" when the line sets one (capped at DATASET_MAX_TOKENS_CAP).
+    With ``require_messages`` a prompt-only line is rejected. Raises
+    ValueError naming the line.
+    """
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Line {line_no}: invalid JSON ({e.msg})")
+    if not isinstance(record, dict):
+        raise ValueError(f"Line {line_no}: expected a JSON object")
+    body = request_body(record)
+    if not isinstance(body, dict):
+        raise ValueError(f"Line {line_no}: request body must be an object")
+
+    out: dict = {}
+    messages = body.get("messages")
+    if messages is not None or require_messages:
+        if not isinstance(messages, list) or not messages:
+            raise ValueError(f"Line {line_no}: 'messages' must be a non-empty list")
+        for msg in messages:
+            if not isinstance(msg, dict) or not isinstance(msg.get("role"), str):
+                raise ValueError(f"Line {line_no}: every message needs a 'role'")
+        out["messages"] = messages
+    else:
+        prompt = body.get("prompt")
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise ValueError(f"Line {line_no}: needs a non-empty 'prompt' string or a 'messages' list")
+        out["prompt"] = prompt
+
+    max_tokens = body.get("max_tokens", body.get("max_completion_tokens"))
+    if max_tokens is not None:
+        if not isinstance(max_tokens, int) or isinstance(max_tokens, bool) or max_tokens < 1:
+            raise ValueError(f"Line {line_no}: max_tokens must be a positive integer")
+        out["max_tokens"] = min(max_tokens, DATASET_MAX_TOKENS_CAP)
+    return record, out
+
+
+def parse_record(line: str, line_no: int) -> Optional[dict]:
+    """Validate one dataset line; None for a blank line.
+
+    Returns {"prompt": str} or {"messages": list}, plus "max_tokens" when
+    the line sets one. Raises ValueError naming the line.
+    """
+    parsed = parse_request_line(line, line_no)
+    return parsed[1] if parsed else None
+
+
+def estimate_prompt_tokens(record: dict) -> int:
+    """Rough prompt size in tokens (characters / 4), for bucketing before a run."""
+    if "prompt" in record:
+        return len(record["prompt"]) // 4
+    chars = 0
+    for msg in record["messages"]:
+        content = msg.get("content")
+        chars += len(content) if isinstance(content, str) else len(json.dumps(content)) if content else 0
+    return chars // 4
+
+
+def length_bucket(tokens: int) -> str:
+    """Label of the length bucket ``tokens`` falls in, e.g. "<=512" or ">32768"."""
+    for edge in LENGTH_BUCKETS:
+        if tokens <= edge:
+            return f"<={edge}"
+    return f">{LENGTH_BUCKETS[-1]}"
+
+
+def bucket_order(label: str) -> int:
+    """Sort key that puts bucket labels in ascending length order."""
+    labels = [f"<={edge}" for edge in LENGTH_BUCKETS] + [f">{LENGTH_BUCKETS[-1]}"]
+    return labels.index(label) if label in labels else len(labels)
+
+
+async def write_dataset(chunks: AsyncIterable[bytes], path: Path, max_bytes: Optional[int] = None) -> dict:
+    """Stream an upload to ``path``, validating each line on the way.
+
+    Writes to a temporary file and renames it into place only when every
+    line parsed, so a rejected upload leaves nothing behind. Line parsing
+    and file I/O run in a worker thread, off the event loop. Returns
+    {"prompt_count", "size_bytes", "input_buckets"} where input_buckets
+    counts prompts per estimated length bucket. Raises ValueError naming
+    the bad line, or DatasetTooLarge past ``max_bytes``.
+    """
+    max_bytes = max_bytes if max_bytes is not None else int(DATASET_MAX_MB * 1024 * 1024)
+    tmp = path.with_suffix(".part")
+    count = 0
+    size = 0
+    line_no = 0
+    buckets: dict[str, int] = {}
+    pending = b""
+    out = None
+
+    def take(raw: bytes):
+        nonlocal count, line_no
+        line_no += 1
+        if len(raw) > DATASET_MAX_LINE_BYTES:
+            raise ValueError(f"Line {line_no}: longer than {DATASET_MAX_LINE_BYTES} bytes")
+        try:
+            text = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValueError(f"Line {line_no}: not valid UTF-8")
+        record = parse_record(text, line_no)
+        if record is None:
+            return
+        label = length_bucket(estimate_prompt_tokens(record))
+        buckets[label] = buckets.get(label, 0) + 1
+        count += 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def open_tmp():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(tmp, "w", encoding="utf-8")
+
+    def feed(chunk: bytes):
+        nonlocal pending
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for raw in lines:
+            take(raw)
+        if len(pending) > DATASET_MAX_LINE_BYTES:
+            raise ValueError(f"Line {line_no + 1}: longer than {DATASET_MAX_LINE_BYTES} bytes")
+
+    def finish():
+        if pending:
+            take(pending)
+        out.close()
+        if count == 0:
+            raise ValueError("Dataset has no prompts")
+        os.replace(tmp, path)
+
+    try:
+        out = await asyncio.to_thread(open_tmp)
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise DatasetTooLarge(f"Dataset exceeds {max_bytes // (1024 * 1024)} MB")
+            await asyncio.to_thread(feed, chunk)
+        await asyncio.to_thread(finish)
+    except BaseException:
+        if out is not None:
+            out.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    return {
+        "prompt_count": count,
+        "size_bytes": size,
+        "input_buckets": dict(sorted(buckets.items(), key=lambda kv: bucket_order(kv[0]))),
+    }
+
+
+def sample_indices(population: int, k: int, replace: bool, seed: Optional[int] = None) -> list[int]:
+    """Draw ``k`` line indices out of ``population``, in draw order.
+
+    Without replacement the sample is capped at the population size.
+    """
+    rng = random.Random(seed)
+    if population <= 0:
+        return []
+    if replace:
+        return [rng.randrange(population) for _ in range(k)]
+    return rng.sample(range(population), min(k, population))
+
+
+def sample_dataset(
+    path: Path, population: int, k: int, replace: bool = False, seed: Optional[int] = None,
+) -> list[dict]:
+    """Sample ``k`` records from a stored dataset in one streaming pass.
+
+    ``population`` is the dataset's prompt count (recorded at upload).
+    Returns the records in draw order, each with its 1-based ``index`` in
+    the file; a line drawn twice (with replacement) appears twice.
+    """
+    indices = sample_indices(population, k, replace, seed)
+    slots: dict[int, list[int]] = {}
+    for pos, idx in enumerate(indices):
+        slots.setdefault(idx, []).append(pos)
+    out: list[Optional[dict]] = [None] * len(indices)
+    remaining = len(slots)
+    with open(path, encoding="utf-8") as f:
+        idx = 0
+        for line_no, line in enumerate(f, 1):
+            if not remaining:
+                break
+            if not line.strip():
+                continue
+            if idx in slots:
+                record = parse_record(line, line_no)
+                for pos in slots[idx]:
+                    out[pos] = {"index": idx + 1, **record}
+                remaining -= 1
+            idx += 1
+    if remaining:
+        raise ValueError(f"Dataset file has fewer than {population} prompts")
+    return out
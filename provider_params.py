@@ -235,6 +235,7 @@ PROVIDER_REGISTRY: dict[str, dict] = {
             "guided_choice": {"type": "array", "note": "Constrain output to specific choices"},
             "best_of": {"type": "int", "note": "Generate N sequences, return best"},
             "ignore_eos": {"type": "bool", "note": "Ignore end-of-sequence token"},
+            "min_tokens": {"type": "int", "min": 0, "note": "Generate at least this many tokens before EOS can stop"},
         },
         "notes": "IMPORTANT: Do NOT use extra_body for vLLM -- pass params as direct kwargs (GitHub #4769).",
     },
@@ -0,0 +1,383 @@
+"""Process-wide provider rate-limit scheduler for LLM Benchmark Studio.
+
+Every LiteLLM call goes through one shared scheduler, so concurrent jobs that
+hit the same endpoint share a single budget. Without it, they would race each
+other into 429 storms.
+
+Limits are tracked per endpoint. An endpoint is the api_base (or the LiteLLM
+provider prefix) plus a fingerprint of the API key, because providers apply
+limits per key. Each endpoint has:
+  - an RPM bucket and a TPM bucket, set with ``rpm``/``tpm`` on the provider
+    in config.yaml or learned from ``x-ratelimit-*`` response headers
+  - a shared "blocked until" deadline, set from Retry-After or from the reset
+    headers once a limit is exhausted, which pauses every caller at once
+
+Usage:
+    from rate_limiter import scheduler
+
+    response = await scheduler.acompletion(kwargs, rpm=target.rpm, tpm=target.tpm)
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import litellm
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = int(os.environ.get("RATE_LIMIT_MAX_RETRIES", "3"))
+MAX_BACKOFF_S = float(os.environ.get("RATE_LIMIT_MAX_BACKOFF_S", "60"))
+BASE_BACKOFF_S = 1.0
+BURST_SECONDS = 10.0  # bucket capacity, in seconds of budget
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value) -> Optional[float]:
+    """Parse a reset duration ("20ms", "1.5s", "6m0s", "12") into seconds."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return max(float(text), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(text)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def parse_retry_after(headers: Mapping) -> Optional[float]:
+    """Seconds to wait from ``retry-after-ms`` / ``retry-after`` (delta or HTTP date)."""
+    if "retry-after-ms" in headers:
+        try:
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        except (TypeError, ValueError):
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(parsedate_to_datetime(str(value)).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalize_headers(raw) -> dict:
+    """Lower-case header names and strip LiteLLM's ``llm_provider-`` prefix."""
+    if not isinstance(raw, Mapping):
+        return {}
+    out = {}
+    for k, v in raw.items():
+        k = str(k).lower()
+        if k.startswith("llm_provider-"):
+            k = k[len("llm_provider-"):]
+        out[k] = v
+    return out
+
+
+def response_headers(response) -> dict:
+    """Provider headers attached to a LiteLLM response or stream wrapper."""
+    hidden = getattr(response, "_hidden_params", None)
+    headers = {}
+    if isinstance(hidden, Mapping):
+        headers.update(_normalize_headers(hidden.get("additional_headers")))
+    headers.update(_normalize_headers(getattr(response, "_response_headers", None)))
+    return headers
+
+
+def exception_headers(exc: Exception) -> dict:
+    """Provider headers attached to a LiteLLM exception (429 response)."""
+    headers = _normalize_headers(getattr(getattr(exc, "response", None), "headers", None))
+    headers.update(_normalize_headers(getattr(exc, "headers", None)))
+    headers.update(_normalize_headers(getattr(exc, "litellm_response_headers", None)))
+    return headers
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Rough TPM cost of a request: prompt characters / 4 plus the output budget.
+
+    Embedding requests count the characters of their ``input`` texts.
+    """
+    chars = 0
+    for msg in kwargs.get("messages") or []:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if isinstance(content, str):
+            chars += len(content)
+        elif content:
+            chars += len(str(content))
+    inputs = kwargs.get("input")
+    for text in [inputs] if isinstance(inputs, str) else inputs or []:
+        chars += len(text) if isinstance(text, str) else len(str(text))
+    output = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0
+    return chars // 4 + int(output)
+
+
+class TokenBucket:
+    """Continuously refilling bucket that lets callers reserve into debt.
+
+    Reserving always succeeds and returns how long the caller must wait.
+    Concurrent callers therefore queue up in reservation order. A lock makes
+    buckets safe to share with the measurement loop's thread.
+    """
+
+    def __init__(self, per_minute: float):
+        self._lock = threading.Lock()
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * BURST_SECONDS, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, per_minute: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.per_minute = per_minute
+            self.rate = per_minute / 60.0
+            self.capacity = max(self.rate * BURST_SECONDS, 1.0)
+            self.level = min(self.level, self.capacity)
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount``; return seconds until the caller may go.
+
+        The full amount is charged, so a request larger than the bucket
+        leaves it in debt and later callers wait out the real overdraft.
+        The caller itself only waits until a full bucket's worth (or
+        ``amount``, if smaller) is available.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            need = min(amount, self.capacity)
+            wait = 0.0 if self.level >= need else (need - self.level) / self.rate
+            self.level -= amount
+            return wait
+
+    def sync_remaining(self, remaining: float) -> None:
+        """Never believe we have more budget than the provider says is left."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.level, remaining)
+
+
+class _Endpoint:
+    """Buckets and backoff state for one endpoint."""
+
+    def __init__(self):
+        self.requests: Optional[TokenBucket] = None
+        self.tokens: Optional[TokenBucket] = None
+        self.configured_rpm: Optional[float] = None
+        self.configured_tpm: Optional[float] = None
+        self.blocked_until = 0.0  # time.monotonic() deadline
+        self.rate_limited = 0     # 429s seen
+
+    def set_limits(self, rpm: Optional[float], tpm: Optional[float]) -> None:
+        if rpm:
+            self.requests = _retarget(self.requests, rpm)
+        if tpm:
+            self.tokens = _retarget(self.tokens, tpm)
+
+    def block_for(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def _retarget(bucket: Optional[TokenBucket], per_minute: float) -> TokenBucket:
+    if bucket is None:
+        return TokenBucket(per_minute)
+    if bucket.per_minute != per_minute:
+        bucket.set_rate(per_minute)
+    return bucket
+
+
+class RateLimitScheduler:
+    """Shared RPM/TPM scheduler keyed by endpoint."""
+
+    def __init__(self):
+        self._endpoints: dict[str, _Endpoint] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_key(kwargs: dict) -> str:
+        """Endpoint identity: api_base (or provider prefix) + API key fingerprint."""
+        base = kwargs.get("api_base")
+        if not base:
+            model = str(kwargs.get("model", ""))
+            base = model.split("/", 1)[0] if "/" in model else "openai"
+        api_key = kwargs.get("api_key")
+        fingerprint = hashlib.sha1(str(api_key).encode()).hexdigest()[:10] if api_key else "-"
+        return f"{str(base).rstrip('/')}|{fingerprint}"
+
+    def _endpoint(self, key: str) -> _Endpoint:
+        ep = self._endpoints.get(key)
+        if ep is None:
+            with self._lock:
+                ep = self._endpoints.setdefault(key, _Endpoint())
+        return ep
+
+    def configure(self, key: str, rpm: Optional[float] = None, tpm: Optional[float] = None) -> None:
+        """Apply explicit limits; these take precedence over learned ones."""
+        ep = self._endpoint(key)
+        if rpm:
+            ep.configured_rpm = rpm
+        if tpm:
+            ep.configured_tpm = tpm
+        ep.set_limits(rpm, tpm)
+
+    async def acquire(self, key: str, tokens: int = 0) -> None:
+        """Wait until the endpoint is unblocked and has budget for one request."""
+        ep = self._endpoint(key)
+        while True:
+            blocked = ep.blocked_until - time.monotonic()
+            if blocked <= 0:
+                break
+            await asyncio.sleep(blocked)
+        wait = 0.0
+        if ep.requests:
+            wait = ep.requests.reserve(1)
+        if ep.tokens and tokens:
+            wait = max(wait, ep.tokens.reserve(tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe_headers(self, key: str, headers: dict) -> None:
+        """Learn limits and remaining budget from ``x-ratelimit-*`` headers."""
+        if not headers:
+            return
+        ep = self._endpoint(key)
+        for kind, configured in (("requests", ep.configured_rpm), ("tokens", ep.configured_tpm)):
+            limit = _as_float(headers.get(f"x-ratelimit-limit-{kind}"))
+            if limit and not configured:
+                ep.set_limits(limit if kind == "requests" else None, limit if kind == "tokens" else None)
+            remaining = _as_float(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if remaining is None:
+                continue
+            bucket = ep.requests if kind == "requests" else ep.tokens
+            if bucket:
+                bucket.sync_remaining(remaining)
+            if remaining <= 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    ep.block_for(reset)
+
+    def backoff(self, key: str, headers: dict, attempt: int) -> float:
+        """Record a 429 and block the endpoint; returns the chosen delay.
+
+        Retry-After is honored with up to 10% (max 1s) of added jitter so
+        waiters don't all retry together. Without it, full-jitter
+        exponential backoff is used.
+        """
+        ep = self._endpoint(key)
+        ep.rate_limited += 1
+        retry_after = parse_retry_after(headers)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, min(retry_after * 0.1, 1.0))
+        else:
+            delay = random.uniform(0, BASE_BACKOFF_S * (2 ** attempt))
+        delay = min(delay, MAX_BACKOFF_S)
+        ep.block_for(delay)
+        return delay
+
+    def request_limit(self, kwargs: dict) -> Optional[float]:
+        """Requests per minute currently enforced for the endpoint of ``kwargs`` (None if unlimited)."""
+        ep = self._endpoints.get(self.endpoint_key(kwargs))
+        return ep.requests.per_minute if ep and ep.requests else None
+
+    async def acompletion(
+        self,
+        kwargs: dict,
+        *,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = MAX_RETRIES,
+        on_send: Optional[Callable[[], None]] = None,
+    ):
+        """Rate-limited ``litellm.acompletion(**kwargs)`` with 429 retries.
+
+        ``on_send`` runs right before each HTTP attempt, so latency timers
+        can exclude the time spent queued or backing off.
+        """
+        return await self._send(
+            litellm.acompletion, kwargs, rpm=rpm, tpm=tpm, max_retries=max_retries, on_send=on_send,
+        )
+
+    async def aembedding(
+        self,
+        kwargs: dict,
+        *,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = MAX_RETRIES,
+        on_send: Optional[Callable[[], None]] = None,
+    ):
+        """Rate-limited ``litellm.aembedding(**kwargs)``; same budget and retries as acompletion."""
+        return await self._send(
+            litellm.aembedding, kwargs, rpm=rpm, tpm=tpm, max_retries=max_retries, on_send=on_send,
+        )
+
+    async def _send(self, call, kwargs: dict, *, rpm, tpm, max_retries: int, on_send):
+        key = self.endpoint_key(kwargs)
+        if rpm or tpm:
+            self.configure(key, rpm, tpm)
+        cost = estimate_tokens(kwargs)
+
+        for attempt in range(max_retries + 1):
+            await self.acquire(key, cost)
+            if on_send:
+                on_send()
+            try:
+                response = await call(**kwargs)
+            except litellm.exceptions.RateLimitError as exc:
+                headers = exception_headers(exc)
+                self.observe_headers(key, headers)
+                if attempt >= max_retries:
+                    raise
+                delay = self.backoff(key, headers, attempt)
+                logger.info(
+                    "Rate limited by %s (attempt %d/%d) -- retrying in %.1fs",
+                    key.split("|", 1)[0], attempt + 1, max_retries + 1, delay,
+                )
+                continue
+            self.observe_headers(key, response_headers(response))
+            return response
+
+    def stats(self) -> dict:
+        """Current limits and 429 counts per endpoint (API keys are never exposed)."""
+        now = time.monotonic()
+        return {
+            key: {
+                "rpm": ep.requests.per_minute if ep.requests else None,
+                "tpm": ep.tokens.per_minute if ep.tokens else None,
+                "blocked_for_s": round(max(ep.blocked_until - now, 0.0), 2),
+                "rate_limited": ep.rate_limited,
+            }
+            for key, ep in self._endpoints.items()
+        }
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# Global singleton
+scheduler = RateLimitScheduler()
@@ -0,0 +1,104 @@
+"""Deterministic response cache for tool-eval calls.
+
+At temperature 0 a rerun of the same suite against the same model resends
+byte-identical requests. The cache stores each response under a hash of
+everything that shapes it -- endpoint (api_base + API key fingerprint),
+model, messages, tools, tool_choice and every resolved sampling param --
+so iterating on scoring, judge prompts or dashboards replays stored
+responses instead of paying for the calls again.
+
+Modes (per job, ``cache_mode``):
+  - "off": no lookups, no writes (default)
+  - "read_write": serve hits, call the provider on a miss and store the result
+  - "replay": serve hits only; a miss fails the case without calling out
+
+Only temperature-0 requests are cached. Each entry is the response's full
+``model_dump()``, so reasoning content and provider-specific fields survive
+a replay. Entries live in the ``response_cache`` table; once the stored
+bytes exceed ``RESPONSE_CACHE_MAX_MB``, the least-recently-used entries are
+evicted down to ``RESPONSE_CACHE_EVICT_TO`` of the cap.
+
+Usage:
+    import response_cache
+
+    key = response_cache.cache_key(kwargs)
+    hit = await response_cache.get(key)       # (response, latency_ms) or None
+    await response_cache.put(key, kwargs["model"], response, latency_ms)
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+import litellm
+
+import db
+from rate_limiter import scheduler
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_MAX_MB = float(os.environ.get("RESPONSE_CACHE_MAX_MB", "200"))
+RESPONSE_CACHE_EVICT_TO = 0.9  # fraction of the cap kept after an eviction pass
+CACHE_MODES = ("off", "read_write", "replay")
+
+# Transport-only kwargs: they change how a request is sent, not what comes back.
+# The API key is folded into the endpoint fingerprint instead of being hashed raw.
+_TRANSPORT_KEYS = {"api_key", "api_base", "timeout", "client", "num_retries", "metadata"}
+
+# Running total of stored bytes, so put() does not SUM the table on every
+# write. None until measured. Overwrites and admin clears only make it
+# overestimate; an eviction pass resets it to be measured again.
+_stored_bytes: Optional[int] = None
+
+
+class CacheMiss(Exception):
+    """Replay mode found no cached response for a request."""
+
+
+def cacheable(kwargs: dict) -> bool:
+    """Only deterministic (temperature 0) requests are cached."""
+    temperature = kwargs.get("temperature")
+    return temperature is not None and float(temperature) == 0.0
+
+
+def cache_key(kwargs: dict) -> str:
+    """SHA-256 over the endpoint and every response-shaping kwarg."""
+    payload = {k: v for k, v in kwargs.items() if k not in _TRANSPORT_KEYS}
+    payload["_endpoint"] = scheduler.endpoint_key(kwargs)
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+async def get(key: str) -> Optional[tuple[litellm.ModelResponse, float]]:
+    """Cached (response, original latency_ms) for ``key``, or None."""
+    row = await db.get_cached_response(key)
+    if row is None:
+        return None
+    try:
+        response = litellm.ModelResponse(**json.loads(row["response_json"]))
+    except Exception:
+        logger.warning("Unreadable response cache entry %s -- ignoring", key[:12])
+        return None
+    return response, row["latency_ms"]
+
+
+async def put(key: str, model_id: str, response, latency_ms: float) -> None:
+    """Store a response's full ``model_dump()`` and evict past the size cap."""
+    global _stored_bytes
+    payload = response.model_dump() if hasattr(response, "model_dump") else response
+    response_json = json.dumps(payload, default=str)
+    await db.put_cached_response(key, model_id, response_json, latency_ms)
+    if _stored_bytes is None:
+        _stored_bytes = (await db.get_response_cache_stats())["size_bytes"]
+    else:
+        _stored_bytes += len(response_json.encode())
+
+    max_bytes = int(RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+    if _stored_bytes <= max_bytes:
+        return
+    removed = await db.evict_response_cache(int(max_bytes * RESPONSE_CACHE_EVICT_TO))
+    _stored_bytes = None
+    if removed:
+        logger.info("Response cache over %.0f MB -- evicted %d entries", RESPONSE_CACHE_MAX_MB, removed)
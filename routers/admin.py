@@ -11,6 +11,9 @@ from pydantic import ValidationError
 
 import auth
 import db
+from http_clients import pool_stats
+from perf_profiles import profiles as perf_profiles
+from rate_limiter import scheduler
 from schemas import RateLimitUpdate
 from routers.helpers import _get_user_config, _user_locks, _user_cancel
 
@@ -219,9 +222,26 @@ async def admin_system_health(current_user: dict = Depends(auth.require_admin)):
         "total_queued": len([j for j in active_jobs if j["status"] == "queued"]),
         "connected_ws_clients": ws_manager.get_connection_count() if ws_manager else 0,
         "process_uptime_s": round(time.time() - _process_start_time) if _process_start_time else 0,
+        "provider_rate_limits": scheduler.stats(),
+        "perf_profiles": perf_profiles.stats(),
+        "http_pools": pool_stats(),
+        "response_cache": await db.get_response_cache_stats(),
     }
 
 
+@router.delete("/api/admin/response-cache")
+async def admin_clear_response_cache(request: Request, current_user: dict = Depends(auth.require_admin)):
+    """Drop every cached tool-eval response."""
+    removed = await db.clear_response_cache()
+    await db.log_audit(
+        current_user["id"], current_user.get("email", ""), "admin_response_cache_clear",
+        detail={"removed": removed},
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent", ""),
+    )
+    return {"status": "ok", "removed": removed}
+
+
 @router.get("/api/admin/audit")
 async def admin_audit_log(
     request: Request,
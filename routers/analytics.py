@@ -21,11 +21,32 @@ async def analytics_leaderboard(
     period: str = "all",
     user: dict = Depends(auth.get_current_user),
 ):
-    """Aggregate benchmark or tool-eval results into a ranked leaderboard."""
+    """Aggregate benchmark, embedding or tool-eval results into a ranked leaderboard."""
     if period not in _VALID_PERIODS:
         return JSONResponse({"error": f"period must be one of {sorted(_VALID_PERIODS)}"}, status_code=400)
-    if type not in ("benchmark", "tool_eval"):
-        return JSONResponse({"error": "type must be 'benchmark' or 'tool_eval'"}, status_code=400)
+    if type not in ("benchmark", "embedding", "tool_eval"):
+        return JSONResponse({"error": "type must be 'benchmark', 'embedding' or 'tool_eval'"}, status_code=400)
+
+    if type == "embedding":
+        rows = await db.get_analytics_embedding_results(user["id"], period)
+        models = []
+        for r in rows:
+            tokens = r.get("input_tokens") or 0
+            models.append({
+                "model_id": r["model_id"],
+                "model": r.get("model") or r["model_id"],
+                "provider": r.get("provider", ""),
+                "avg_vectors_per_second": round(r.get("avg_vectors_per_second") or 0, 2),
+                "avg_tokens_per_second": round(r.get("avg_tokens_per_second") or 0, 2),
+                "avg_latency_ms": round(r.get("avg_latency_ms") or 0, 1),
+                "cost_per_1m_tokens": round((r.get("total_cost") or 0) / tokens * 1_000_000, 6) if tokens else 0,
+                "embedding_dim": r.get("embedding_dim"),
+                "success_rate": round((r.get("successes") or 0) / r["requests"], 4) if r.get("requests") else 0,
+                "total_requests": r.get("requests") or 0,
+                "last_run": r.get("last_run"),
+            })
+        models.sort(key=lambda m: m["avg_tokens_per_second"], reverse=True)
+        return {"type": "embedding", "period": period, "models": models}
 
     if type == "tool_eval":
         runs = await db.get_analytics_tool_eval_runs(user["id"], period)
@@ -77,10 +98,10 @@ async def analytics_leaderboard(
 
     # Default: benchmark leaderboard
     runs = await db.get_analytics_benchmark_runs(user["id"], period)
+    results_by_run = await db.get_benchmark_results_for_runs([run["id"] for run in runs])
     model_agg_bm: dict[str, dict] = {}  # model_id -> stats
     for run in runs:
-        results = await db.get_benchmark_results(run["id"])
-        for r in results:
+        for r in results_by_run.get(run["id"], []):
             # Skip context-tier groups with zero successes
             if not r.get("success_count", 0):
                 continue
@@ -100,7 +121,7 @@ async def analytics_leaderboard(
             entry = model_agg_bm[model_id]
             entry["tps_vals"].append(float(r.get("avg_tokens_per_second", 0) or 0))
             entry["ttft_vals"].append(float(r.get("avg_ttft_ms", 0) or 0))
-            entry["cost_vals"].append(float(r.get("cost", 0) or 0))
+            entry["cost_vals"].append(float(r.get("avg_cost", 0) or 0))
             entry["output_speed_vals"].append(float(r.get("avg_output_speed_tps", 0) or 0))
             entry["itl_vals"].append(float(r.get("avg_itl_ms", 0) or 0))
             if run["timestamp"] > entry["last_run"]:
@@ -143,14 +164,14 @@ async def analytics_trends(
         return JSONResponse({"error": "models parameter is required (comma-separated)"}, status_code=400)
 
     runs = await db.get_analytics_benchmark_runs(user["id"], period)
+    results_by_run = await db.get_benchmark_results_for_runs([run["id"] for run in runs])
 
     series_map: dict[str, list[dict]] = {mid: [] for mid in model_ids}
     model_names: dict[str, str] = {}  # model_id -> display name
 
     for run in runs:
-        results = await db.get_benchmark_results(run["id"])
         run_model_vals: dict[str, list[float]] = {}
-        for r in results:
+        for r in results_by_run.get(run["id"], []):
             if not r.get("success_count", 0):
                 continue
             m_id = r.get("model_id", "")
@@ -216,7 +237,7 @@ async def analytics_compare(
                 }
             model_map[model_id]["tps_vals"].append(float(r.get("avg_tokens_per_second", 0) or 0))
             model_map[model_id]["ttft_vals"].append(float(r.get("avg_ttft_ms", 0) or 0))
-            model_map[model_id]["cost_vals"].append(float(r.get("cost", 0) or 0))
+            model_map[model_id]["cost_vals"].append(float(r.get("avg_cost", 0) or 0))
             model_map[model_id]["output_speed_vals"].append(float(r.get("avg_output_speed_tps", 0) or 0))
             model_map[model_id]["itl_vals"].append(float(r.get("avg_itl_ms", 0) or 0))
 
@@ -1,7 +1,9 @@
 """Benchmark execution, history, and cancel routes."""
 
+import asyncio
 import json
 import logging
+import uuid
 
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import JSONResponse
@@ -9,18 +11,31 @@ from pydantic import ValidationError
 
 import auth
 import db
-from schemas import BenchmarkRequest, DirectBenchmarkRequest
+from schemas import BenchmarkRequest, DirectBenchmarkRequest, EmbeddingBenchmarkRequest
 from job_registry import registry as job_registry
+from measurement_loop import ISOLATE_BY_DEFAULT
+from benchmark import chunk_timeline_stats, unpack_chunk_timeline
+from prompt_datasets import (
+    DATASET_MAX_MB,
+    DatasetTooLarge,
+    dataset_path,
+    replay_trace_path,
+    write_dataset,
+    write_replay_trace,
+)
 from routers.helpers import (
     _parse_target_selection,
     _get_user_cancel,
     _check_rate_limit,
 )
+from benchmark_modes import _parse_replay_trace, _replay_trace_stats
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["benchmark"])
 
+REPLAY_TRACE_MAX_CHARS = 20_000_000
+
 
 def _enrich_confidence(results: list[dict]) -> None:
     """Add confidence_level to each result row based on CV and run count."""
@@ -55,6 +70,18 @@ async def run_benchmark(request: Request, user: dict = Depends(auth.get_current_
     except (ValidationError, Exception) as e:
         raise HTTPException(422, detail=str(e))
 
+    replay_trace = None
+    if validated.mode == "replay":
+        replay_trace = await db.get_replay_trace(validated.replay_trace_id, user["id"])
+        if not replay_trace:
+            raise HTTPException(404, detail="Replay trace not found")
+
+    dataset = None
+    if validated.mode == "dataset":
+        dataset = await db.get_prompt_dataset(validated.dataset_id, user["id"])
+        if not dataset:
+            raise HTTPException(404, detail="Prompt dataset not found")
+
     model_ids, target_set = _parse_target_selection(raw)
     runs = validated.runs
     max_tokens = validated.max_tokens
@@ -97,7 +124,75 @@ async def run_benchmark(request: Request, user: dict = Depends(auth.get_current_
         "warmup": warmup,
         "provider_params": provider_params,
         "profiles": profiles,
+        "mode": validated.mode,
+        "capture_timeline": validated.capture_timeline,
+        "capture_phases": validated.capture_phases,
+        "context_seed": validated.context_seed,
+        "isolate_measurement": (
+            ISOLATE_BY_DEFAULT if validated.isolate_measurement is None else validated.isolate_measurement
+        ),
+        "prewarm_connections": validated.prewarm_connections,
+        "ttft_deadline_s": validated.ttft_deadline_s,
+        "idle_deadline_s": validated.idle_deadline_s,
     }
+    if validated.mode == "load":
+        params.update({
+            "load_steps": validated.load_steps,
+            "load_arrival": validated.load_arrival,
+            "load_step_duration_s": validated.load_step_duration_s,
+            "load_seed": validated.load_seed,
+        })
+        progress_detail = (
+            f"Load test: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"{len(validated.load_steps)} steps ({validated.load_arrival})"
+        )
+    elif validated.mode == "throughput":
+        params["throughput_concurrency"] = validated.throughput_concurrency
+        progress_detail = (
+            f"Throughput: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"up to {max(validated.throughput_concurrency)} parallel streams"
+        )
+    elif validated.mode == "prefill":
+        params["prefill_predict_tiers"] = validated.prefill_predict_tiers
+        progress_detail = (
+            f"Prefill probe: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"{len(context_tiers)} tier{'s' if len(context_tiers) != 1 else ''}"
+        )
+    elif validated.mode == "decay":
+        params["decay_window_tokens"] = validated.decay_window_tokens
+        progress_detail = (
+            f"Decay: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"{max_tokens} tokens in {validated.decay_window_tokens}-token windows"
+        )
+    elif validated.mode == "replay":
+        params.update({"replay_trace_id": validated.replay_trace_id, "replay_speed": validated.replay_speed})
+        progress_detail = (
+            f"Replay: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"{replay_trace['request_count']} requests at {validated.replay_speed:g}x"
+        )
+    elif validated.mode == "dataset":
+        params.update({
+            "dataset_id": validated.dataset_id,
+            "dataset_samples": validated.dataset_samples,
+            "dataset_replace": validated.dataset_replace,
+            "dataset_seed": validated.dataset_seed,
+        })
+        progress_detail = (
+            f"Dataset: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"{validated.dataset_samples} prompts from {dataset['name']}"
+        )
+    elif validated.mode == "standard" and validated.adaptive:
+        params["adaptive"] = {
+            "metric": validated.adaptive_metric,
+            "ci_width": validated.adaptive_ci_width,
+            "min_runs": validated.adaptive_min_runs,
+            "max_runs": validated.adaptive_max_runs,
+            "max_cost": validated.adaptive_max_cost,
+        }
+        progress_detail = (
+            f"Benchmark: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"adaptive {validated.adaptive_min_runs}-{validated.adaptive_max_runs} runs each"
+        )
 
     job_id = await job_registry.submit(
         job_type="benchmark",
@@ -110,6 +205,158 @@ async def run_benchmark(request: Request, user: dict = Depends(auth.get_current_
     return {"job_id": job_id, "status": "submitted"}
 
 
+@router.post("/api/benchmark/embedding")
+async def run_embedding_benchmark(request: Request, user: dict = Depends(auth.get_current_user)):
+    """Benchmark embedding endpoints via the job registry. Returns job_id immediately.
+
+    Each model runs every (input_tokens, batch_size, concurrency) cell.
+    Results stream over WebSocket (embedding_init, benchmark_result,
+    embedding_cell) and are stored as a benchmark run with mode "embedding".
+    """
+    raw = await request.json()
+    try:
+        validated = EmbeddingBenchmarkRequest(**raw)
+    except (ValidationError, Exception) as e:
+        raise HTTPException(422, detail=str(e))
+
+    model_ids, target_set = _parse_target_selection(raw)
+    await _check_rate_limit(user["id"])
+
+    await db.log_audit(
+        user_id=user["id"],
+        username=user.get("email", ""),
+        action="benchmark_start",
+        resource_type="benchmark",
+        detail={"models": model_ids, "mode": "embedding", "batch_sizes": validated.batch_sizes},
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent", ""),
+    )
+
+    cells = len(validated.batch_sizes) * len(validated.input_tokens) * len(validated.concurrency)
+    model_count = len(model_ids)
+    job_id = await job_registry.submit(
+        job_type="embedding_benchmark",
+        user_id=user["id"],
+        params={
+            "user_id": user["id"],
+            "user_email": user.get("email", ""),
+            "models": model_ids,
+            "target_set": [list(t) for t in target_set] if target_set else None,
+            "batch_sizes": validated.batch_sizes,
+            "input_tokens": validated.input_tokens,
+            "concurrency": validated.concurrency,
+            "requests": validated.requests,
+            "timeout": validated.timeout,
+            "warmup": validated.warmup,
+            "provider_params": validated.provider_params,
+        },
+        progress_detail=(
+            f"Embedding: {model_count} model{'s' if model_count != 1 else ''}, "
+            f"{cells} cell{'s' if cells != 1 else ''} x {validated.requests} requests"
+        ),
+    )
+    return {"job_id": job_id, "status": "submitted"}
+
+
+@router.post("/api/benchmark/replay/import")
+async def import_replay_trace(request: Request, user: dict = Depends(auth.get_current_user)):
+    """Import a JSONL request log for mode="replay".
+
+    Body: {"trace": "<JSONL>", "name": "...", "max_tokens": 512}. The trace
+    is parsed once and stored; pass the returned ``id`` as
+    ``replay_trace_id`` to POST /api/benchmark to run it. Returns the trace
+    row with its request count, span and prompt/output length percentiles.
+    """
+    body = await request.json()
+    trace = body.get("trace")
+    if not isinstance(trace, str) or not trace.strip():
+        return JSONResponse({"error": "trace must be a non-empty JSONL string"}, status_code=400)
+    if len(trace) > REPLAY_TRACE_MAX_CHARS:
+        return JSONResponse({"error": f"trace exceeds {REPLAY_TRACE_MAX_CHARS} characters"}, status_code=413)
+    name = str(body.get("name") or "").strip()[:200] or "Untitled trace"
+    try:
+        entries = await asyncio.to_thread(
+            _parse_replay_trace, trace, default_max_tokens=int(body.get("max_tokens") or 512),
+        )
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid replay trace: {e}"}, status_code=400)
+
+    trace_id = uuid.uuid4().hex
+    size = await asyncio.to_thread(write_replay_trace, entries, replay_trace_path(user["id"], trace_id))
+    stats = _replay_trace_stats(entries)
+    row = await db.create_replay_trace(trace_id, user["id"], name, len(entries), size, json.dumps(stats))
+    logger.info("Replay trace imported: user_id=%s trace_id=%s requests=%d", user["id"], trace_id, len(entries))
+    return {**row, "stats": stats}
+
+
+@router.get("/api/benchmark/replay/traces")
+async def list_replay_traces(user: dict = Depends(auth.get_current_user)):
+    """List the user's imported replay traces, newest first."""
+    rows = await db.get_replay_traces(user["id"])
+    for row in rows:
+        row["stats"] = json.loads(row.pop("stats_json") or "{}")
+    return {"traces": rows}
+
+
+@router.delete("/api/benchmark/replay/traces/{trace_id}")
+async def delete_replay_trace(trace_id: str, user: dict = Depends(auth.get_current_user)):
+    """Delete an imported replay trace and its file."""
+    if not await db.delete_replay_trace(trace_id, user["id"]):
+        return JSONResponse({"error": "Replay trace not found"}, status_code=404)
+    replay_trace_path(user["id"], trace_id).unlink(missing_ok=True)
+    return {"status": "ok"}
+
+
+@router.post("/api/benchmark/datasets")
+async def upload_prompt_dataset(request: Request, name: str = "", user: dict = Depends(auth.get_current_user)):
+    """Upload a JSONL prompt dataset for mode="dataset".
+
+    The request body is the raw JSONL file (one ``prompt`` or ``messages``
+    record per line); it is validated and written to disk as it streams in,
+    never held in memory. ``?name=`` labels the dataset. Returns the dataset
+    row with its prompt count and per-length-bucket prompt counts.
+    """
+    name = (name or "").strip()[:200] or "Untitled dataset"
+    max_bytes = int(DATASET_MAX_MB * 1024 * 1024)
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        return JSONResponse({"error": f"Dataset exceeds {DATASET_MAX_MB:g} MB"}, status_code=413)
+
+    dataset_id = uuid.uuid4().hex
+    path = dataset_path(user["id"], dataset_id)
+    try:
+        info = await write_dataset(request.stream(), path, max_bytes=max_bytes)
+    except DatasetTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid dataset: {e}"}, status_code=400)
+
+    stats = {"input_buckets": info["input_buckets"]}
+    row = await db.create_prompt_dataset(
+        dataset_id, user["id"], name, info["prompt_count"], info["size_bytes"], json.dumps(stats),
+    )
+    logger.info("Prompt dataset uploaded: user_id=%s dataset_id=%s prompts=%d", user["id"], dataset_id, info["prompt_count"])
+    return {**row, "stats": stats}
+
+
+@router.get("/api/benchmark/datasets")
+async def list_prompt_datasets(user: dict = Depends(auth.get_current_user)):
+    """List the user's prompt datasets, newest first."""
+    rows = await db.get_prompt_datasets(user["id"])
+    for row in rows:
+        row["stats"] = json.loads(row.pop("stats_json") or "{}")
+    return {"datasets": rows}
+
+
+@router.delete("/api/benchmark/datasets/{dataset_id}")
+async def delete_prompt_dataset(dataset_id: str, user: dict = Depends(auth.get_current_user)):
+    """Delete a prompt dataset and its file."""
+    if not await db.delete_prompt_dataset(dataset_id, user["id"]):
+        return JSONResponse({"error": "Dataset not found"}, status_code=404)
+    dataset_path(user["id"], dataset_id).unlink(missing_ok=True)
+    return {"status": "ok"}
+
+
 @router.post("/api/benchmark/cancel")
 async def cancel_benchmark(request: Request, user: dict = Depends(auth.get_current_user)):
     """Cancel a running benchmark.
@@ -234,6 +481,7 @@ async def get_rate_limit(user: dict = Depends(auth.get_current_user)):
 async def get_history(user: dict = Depends(auth.get_current_user)):
     """Get the current user's benchmark history from the database."""
     runs = await db.get_user_benchmark_runs(user["id"])
+    results_by_run = await db.get_benchmark_results_for_runs([run["id"] for run in runs])
     for run in runs:
         ct = run.get("context_tiers")
         if isinstance(ct, str):
@@ -244,7 +492,7 @@ async def get_history(user: dict = Depends(auth.get_current_user)):
                 # Comma-separated string like "0,5000,50000"
                 run["context_tiers"] = [int(x) for x in ct.split(",") if x.strip().isdigit()]
         # Embed per-model results so the list view can show tok/s, TTFT, etc.
-        run["results"] = await db.get_benchmark_results(run["id"])
+        run["results"] = results_by_run.get(run["id"], [])
         _enrich_confidence(run["results"])
     return {"runs": runs}
 
@@ -265,6 +513,11 @@ async def get_history_run(run_id: str, user: dict = Depends(auth.get_current_use
             run["context_tiers"] = parsed if isinstance(parsed, list) else [parsed]
         except (json.JSONDecodeError, TypeError):
             run["context_tiers"] = [int(x) for x in ct.split(",") if x.strip().isdigit()]
+    if isinstance(run.get("metadata"), str):
+        try:
+            run["metadata"] = json.loads(run["metadata"])
+        except (json.JSONDecodeError, TypeError):
+            pass
     if isinstance(run.get("config_json"), str):
         try:
             run["config"] = json.loads(run["config_json"])
@@ -274,6 +527,23 @@ async def get_history_run(run_id: str, user: dict = Depends(auth.get_current_use
     return run
 
 
+@router.get("/api/history/{run_id}/timelines")
+async def get_history_timelines(run_id: str, user: dict = Depends(auth.get_current_user)):
+    """Return decoded per-chunk timelines for a run captured with capture_timeline."""
+    run = await db.get_benchmark_run(run_id, user["id"])
+    if not run:
+        return JSONResponse({"error": "Run not found"}, status_code=404)
+    timelines = []
+    for row in await db.get_benchmark_timelines(run_id):
+        deltas = unpack_chunk_timeline(row.pop("chunk_timeline"))
+        row["chunk_deltas_ms"] = [round(d, 2) for d in deltas]
+        row["chunk_count"] = len(deltas)
+        if row.get("itl_p50_ms") is None:
+            row.update(chunk_timeline_stats(deltas))
+        timelines.append(row)
+    return {"run_id": run_id, "timelines": timelines}
+
+
 @router.delete("/api/history/{run_id}")
 async def delete_history_run(run_id: str, user: dict = Depends(auth.get_current_user)):
     """Delete a benchmark run from history."""
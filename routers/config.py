@@ -51,6 +51,8 @@ async def get_config(user: dict = Depends(auth.get_current_user)):
             "api_key": "***" if prov_cfg.get("api_key") else "",
             "model_id_prefix": prov_cfg.get("model_id_prefix", ""),
             "direct_local": bool(prov_cfg.get("direct_local", False)),
+            "rpm": prov_cfg.get("rpm"),
+            "tpm": prov_cfg.get("tpm"),
             "models": models,
         }
 
@@ -230,6 +232,10 @@ async def add_provider(request: Request, user: dict = Depends(auth.get_current_u
         new_prov["api_key"] = body["api_key"]
     if validated.model_id_prefix:
         new_prov["model_id_prefix"] = validated.model_id_prefix
+    if validated.rpm:
+        new_prov["rpm"] = validated.rpm
+    if validated.tpm:
+        new_prov["tpm"] = validated.tpm
 
     config.setdefault("providers", {})[prov_key] = new_prov
     await _save_user_config(user["id"], config)
@@ -274,6 +280,15 @@ async def update_provider(request: Request, user: dict = Depends(auth.get_curren
             prov_cfg.pop("model_id_prefix", None)
     if "direct_local" in body:
         prov_cfg["direct_local"] = bool(body["direct_local"])
+    for limit in ("rpm", "tpm"):
+        if limit in body:
+            value = body[limit]
+            if value in (None, "", 0):
+                prov_cfg.pop(limit, None)
+            elif isinstance(value, int) and not isinstance(value, bool) and value > 0:
+                prov_cfg[limit] = value
+            else:
+                return JSONResponse({"error": f"{limit} must be a positive integer"}, status_code=400)
 
     await _save_user_config(user["id"], config)
     return {"status": "ok"}
@@ -8,12 +8,11 @@ import time
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import JSONResponse
 
-import litellm
-
 import auth
 import db
 from benchmark import Target, build_targets, sanitize_error
 from keyvault import vault
+from rate_limiter import scheduler
 from provider_params import (
     PROVIDER_REGISTRY,
     identify_provider,
@@ -138,8 +137,6 @@ async def discover_models(provider_key: str, user: dict = Depends(auth.get_curre
 @router.get("/api/lm-studio/detect")
 async def detect_lm_studio_backend(provider_key: str, user: dict = Depends(auth.get_current_user)):
     """Detect LM Studio model backend type (GGUF vs MLX) via /v1/models."""
-    import httpx
-
     config = await _get_user_config(user["id"])
     prov_cfg = config.get("providers", {}).get(provider_key)
     if not prov_cfg:
@@ -161,6 +158,18 @@ async def detect_lm_studio_backend(provider_key: str, user: dict = Depends(auth.
     if not api_key:
         api_key = prov_cfg.get("api_key", "")  # inline literal (e.g. "not-needed")
 
+    return await probe_lm_studio_backend(api_base, api_key)
+
+
+async def probe_lm_studio_backend(api_base: str, api_key: str | None = None) -> dict:
+    """Query an OpenAI-compatible /models endpoint for LM Studio backend info.
+
+    Returns {"available", "models", "backend_type", ...}; backend_type is the
+    shared ``compatibility_type`` (e.g. "gguf", "mlx"), "mixed" or "unknown".
+    Never raises: failures come back with available=False and an error.
+    """
+    import httpx
+
     url = f"{api_base.rstrip('/')}/models"
     headers = {}
     if api_key:
@@ -245,7 +254,7 @@ async def health_check_providers(user: dict = Depends(auth.get_current_user)):
 
         start = time.perf_counter()
         try:
-            await litellm.acompletion(**kwargs)
+            await scheduler.acompletion(kwargs, rpm=target.rpm, tpm=target.tpm, max_retries=0)
             latency = (time.perf_counter() - start) * 1000
             return {"name": name, "status": "ok", "latency_ms": round(latency)}
         except Exception as e:
@@ -31,16 +31,16 @@ async def export_history_csv(user: dict = Depends(auth.get_current_user)):
         "context_tokens", "output_tokens",
     ])
 
+    results_by_run = await db.get_benchmark_results_for_runs([run["id"] for run in runs])
     for run in runs:
-        results = await db.get_benchmark_results(run["id"])
-        for r in results:
+        for r in results_by_run.get(run["id"], []):
             writer.writerow([
                 run.get("timestamp", ""),
                 run.get("prompt", ""),
                 r.get("model_id", ""),
-                r.get("tokens_per_second", ""),
-                r.get("ttft_ms", ""),
-                r.get("cost", ""),
+                r.get("avg_tokens_per_second", ""),
+                r.get("avg_ttft_ms", ""),
+                r.get("avg_cost", ""),
                 r.get("context_tokens", ""),
                 r.get("output_tokens", ""),
             ])
@@ -127,11 +127,11 @@ async def export_leaderboard_csv(
         filename = f"leaderboard_tool_eval_{period}.csv"
     else:
         runs = await db.get_analytics_benchmark_runs(user["id"], period)
+        results_by_run = await db.get_benchmark_results_for_runs([run["id"] for run in runs])
         model_agg_bm: dict[str, dict] = {}
         for run in runs:
-            results = await db.get_benchmark_results(run["id"])
-            for r in results:
-                if not r.get("success", True):
+            for r in results_by_run.get(run["id"], []):
+                if not r.get("success_count", 0):
                     continue
                 model_id = r.get("model_id", "")
                 if model_id not in model_agg_bm:
@@ -143,9 +143,9 @@ async def export_leaderboard_csv(
                         "last_run": run["timestamp"],
                     }
                 entry = model_agg_bm[model_id]
-                entry["tps_vals"].append(float(r.get("tokens_per_second", 0) or 0))
-                entry["ttft_vals"].append(float(r.get("ttft_ms", 0) or 0))
-                entry["cost_vals"].append(float(r.get("cost", 0) or 0))
+                entry["tps_vals"].append(float(r.get("avg_tokens_per_second", 0) or 0))
+                entry["ttft_vals"].append(float(r.get("avg_ttft_ms", 0) or 0))
+                entry["cost_vals"].append(float(r.get("avg_cost", 0) or 0))
                 if run["timestamp"] > entry["last_run"]:
                     entry["last_run"] = run["timestamp"]
 
@@ -8,17 +8,24 @@ This module centralizes:
 - Key injection
 - Scoring functions
 - Eval engine helpers
+- Benchmark and embedding request execution
 - Aggregation and SSE utilities
+
+Benchmark-mode summaries live in benchmark_modes; schema validation,
+compiled suites and rescoring live in tool_eval_scoring.
 """
 
 import ast
 import asyncio
 import json
 import logging
+import math
+import os
 import re
 import time
 from dataclasses import replace
 from pathlib import Path
+from urllib.parse import urlparse
 
 import litellm
 
@@ -26,18 +33,28 @@ from benchmark import (
     AggregatedResult,
     RunResult,
     Target,
-    _compute_variance,
+    aggregate_runs,
     build_targets,
+    chunk_timeline_stats,
+    REASONING_FIELDS,
+    decode_decay,
+    decode_window_speeds,
     generate_context_text,
+    pack_chunk_timeline,
     run_single,
     save_results,
     sanitize_error,
+    split_reasoning_phases,
+    usage_reasoning_tokens,
 )
 import auth
 import db
+import http_clients
+from http_clients import ConnectionPhases, attach_pooled_client, litellm_client, record_phases
 from keyvault import vault
+from perf_profiles import profiles as perf_profiles
+from rate_limiter import estimate_tokens, scheduler
 from provider_params import (
-    PROVIDER_REGISTRY,
     identify_provider,
     validate_params,
     build_litellm_kwargs,
@@ -626,93 +643,6 @@ def compute_overall_score(tool_score: float, param_score: float | None, schema_s
         return tool_score
 
 
-# JSON type map for schema validation
-_JSON_TYPE_MAP: dict[str, type | tuple] = {
-    "string": str,
-    "number": (int, float),
-    "integer": int,
-    "boolean": bool,
-    "array": list,
-    "object": dict,
-    "null": type(None),
-}
-
-
-def score_schema_validation(parameters_schema: dict, actual_params: dict | None) -> dict:
-    """Score Tier 2: schema validation of actual LLM parameters against tool schema.
-
-    Args:
-        parameters_schema: The tool definition's JSON Schema (e.g. {"type": "object", "properties": {...}, "required": [...]})
-        actual_params: The parameters the LLM actually called with (dict or None)
-
-    Returns:
-        dict with keys: required_present, type_correct, hallucination_free, schema_score
-    """
-    if not parameters_schema or not isinstance(parameters_schema, dict):
-        return {"required_present": None, "type_correct": None, "hallucination_free": None, "schema_score": None}
-
-    properties = parameters_schema.get("properties") or {}
-    required_fields = set(parameters_schema.get("required") or [])
-    actual = actual_params if isinstance(actual_params, dict) else {}
-
-    # Cardinality guard — prevent DoS from malicious oversized schemas
-    if len(properties) > 200 or len(required_fields) > 200 or len(actual) > 200:
-        return {"required_present": None, "type_correct": None, "hallucination_free": None, "schema_score": None}
-
-    # --- Required field presence ---
-    if required_fields:
-        present_required = {k for k in required_fields if k in actual}
-        required_present = len(present_required) / len(required_fields)
-    else:
-        required_present = 1.0  # No required fields = perfect presence score
-
-    # --- Type correctness ---
-    if properties:
-        type_correct_count = 0
-        type_total = 0
-        for param_name, param_schema in properties.items():
-            if param_name not in actual:
-                continue  # Only score params that were actually provided
-            type_total += 1
-            expected_type = param_schema.get("type") if isinstance(param_schema, dict) else None
-            if expected_type is None:
-                type_correct_count += 1  # No type constraint = assume correct
-                continue
-            python_type = _JSON_TYPE_MAP.get(expected_type)
-            if python_type is None:
-                type_correct_count += 1  # Unknown type = assume correct
-                continue
-            actual_val = actual[param_name]
-            # Special case: booleans are ints in Python, so check bool first
-            if expected_type == "integer" and isinstance(actual_val, bool):
-                pass  # bool is subclass of int but not an integer in JSON Schema sense
-            elif isinstance(actual_val, python_type):
-                type_correct_count += 1
-        type_correct = type_correct_count / type_total if type_total > 0 else 1.0
-    else:
-        type_correct = 1.0  # No properties defined = assume correct
-
-    # --- Hallucination check (extra params not in schema) ---
-    if properties:
-        known_params = set(properties.keys())
-        actual_param_keys = set(actual.keys())
-        extra_params = actual_param_keys - known_params
-        hallucination_free = 1.0 - len(extra_params) / max(len(actual_param_keys), 1)
-        hallucination_free = max(0.0, hallucination_free)
-    else:
-        hallucination_free = 1.0  # No schema = can't hallucinate
-
-    # --- Composite schema score ---
-    schema_score = 0.5 * required_present + 0.3 * type_correct + 0.2 * hallucination_free
-
-    return {
-        "required_present": round(required_present, 4),
-        "type_correct": round(type_correct, 4),
-        "hallucination_free": round(hallucination_free, 4),
-        "schema_score": round(schema_score, 4),
-    }
-
-
 def score_multi_turn(
     tool_chain: list[dict],
     expected_tool: str | list[str],
@@ -1089,26 +1019,182 @@ async def _maybe_update_experiment_best(
 # Async benchmark execution
 # ---------------------------------------------------------------------------
 
+# Stream deadlines (seconds, 0 = off); requests can override both.
+STREAM_TTFT_DEADLINE_S = float(os.environ.get("STREAM_TTFT_DEADLINE_S", "120"))
+STREAM_IDLE_DEADLINE_S = float(os.environ.get("STREAM_IDLE_DEADLINE_S", "60"))
+TTFT_DEADLINE_PREFILL_TPS = 1000  # slowest prefill the TTFT deadline allows for context padding
+
+
+class _StreamDeadline:
+    """TTFT and inter-chunk idle deadline for the task reading a stream.
+
+    Until the first token the task is cancelled ``ttft_s`` after the last
+    ``arm()`` -- called when a request attempt is actually sent, so time
+    queued in the rate limiter or waiting out 429 backoff does not count;
+    after it, once no token has arrived for ``idle_s``. A single timer is
+    re-armed lazily when it fires, so a token chunk costs one clock read
+    instead of a new timer (or a wait_for task) per chunk. ``expired``
+    names the deadline that cancelled the task.
+    """
+
+    def __init__(self, ttft_s: float, idle_s: float):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._ttft_s = ttft_s
+        self._idle_s = idle_s
+        self._last_token: float | None = None
+        self._handle = None
+        self.expired: str | None = None
+
+    def arm(self):
+        """(Re)start the TTFT deadline; a no-op once the first token arrived."""
+        if self._last_token is not None:
+            return
+        self.cancel()
+        if self._ttft_s > 0:
+            self._handle = self._loop.call_later(self._ttft_s, self._fire)
+
+    def token(self):
+        """Record a token chunk: the TTFT deadline is met and the idle clock restarts."""
+        first = self._last_token is None
+        self._last_token = self._loop.time()
+        if first:
+            self.cancel()
+            if self._idle_s > 0:
+                self._handle = self._loop.call_later(self._idle_s, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        if self._last_token is not None:
+            remaining = self._last_token + self._idle_s - self._loop.time()
+            if remaining > 0:
+                self._handle = self._loop.call_later(remaining, self._fire)
+                return
+            self.expired = "stalled"
+        else:
+            self.expired = "ttft_timeout"
+        self._task.cancel()
+
+    def cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def absorb(self):
+        """Undo the deadline's own task cancellation so the run can finish."""
+        uncancel = getattr(self._task, "uncancel", None)  # Python 3.11+
+        if uncancel is not None:
+            uncancel()
+
+
+def _cached_prompt_tokens(usage) -> int:
+    """Prompt tokens served from the provider's prefix cache, per the usage block.
+
+    OpenAI-style usage reports ``prompt_tokens_details.cached_tokens``;
+    Anthropic (via LiteLLM) reports ``cache_read_input_tokens``.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if not isinstance(cached, int) or cached <= 0:
+        cached = getattr(usage, "cache_read_input_tokens", None)
+    return cached if isinstance(cached, int) and cached > 0 else 0
+
+
+async def _scheduled_completion(
+    target: Target, kwargs: dict, phases: ConnectionPhases | None = None,
+    on_send=None, **opts,
+) -> tuple[object, float]:
+    """Send ``kwargs`` through the shared provider rate-limit scheduler.
+
+    Returns (response, sent_at), where sent_at is the perf_counter() of the
+    attempt that went out, so latencies exclude queueing and 429 backoff.
+    The call goes through the endpoint's pooled HTTP client when pooling is
+    on (or ``phases`` is given) and the provider accepts one; with ``phases``
+    the connection phases of the last attempt are recorded. ``on_send``
+    runs alongside, right when each attempt's sent_at is taken.
+    """
+    sent_at = time.perf_counter()
+
+    def _mark_send():
+        nonlocal sent_at
+        sent_at = time.perf_counter()
+        if phases is not None:
+            phases.begin(sent_at)
+        if on_send is not None:
+            on_send()
+
+    if phases is None:
+        attach_pooled_client(kwargs)
+        response = await scheduler.acompletion(
+            kwargs, rpm=target.rpm, tpm=target.tpm, on_send=_mark_send, **opts,
+        )
+        return response, sent_at
+
+    client = kwargs.get("client") or litellm_client(kwargs)
+    if client is not None:
+        kwargs["client"] = client
+    with record_phases(phases):
+        response = await scheduler.acompletion(
+            kwargs, rpm=target.rpm, tpm=target.tpm, on_send=_mark_send, **opts,
+        )
+    return response, sent_at
+
 
 async def async_run_single(
     target: Target, prompt: str, max_tokens: int, temperature: float,
     context_tokens: int = 0, timeout: int = 120,
     provider_params: dict | None = None,
+    capture_timeline: bool = False,
+    context_seed=None,
+    capture_phases: bool = False,
+    decode_window_tokens: int = 0,
+    ttft_deadline_s: float | None = None,
+    idle_deadline_s: float | None = None,
+    replay_messages: list[dict] | None = None,
 ) -> RunResult:
-    """Execute a single streaming benchmark run using async litellm."""
+    """Execute a single streaming benchmark run using async litellm.
+
+    With ``capture_timeline`` the arrival offset of every content chunk is
+    kept and packed into ``result.chunk_timeline``, and the ITL distribution
+    (p50/p90/p99, max stall, stall count) is filled in from it.
+    ``context_seed`` pins the corpus window used for context padding.
+    With ``capture_phases`` the DNS/TCP/TLS/server-wait breakdown of the
+    request is recorded (see http_clients.py). ``result.connection_reused``
+    is filled in whenever the request went through a pooled client.
+    With ``decode_window_tokens`` the decode speed of each successive window
+    of that many output tokens goes into ``result.decode_windows``.
+    Reasoning chunks (``delta.reasoning_content``) count as output, and runs
+    that reason get separate reasoning/answer phase timings and speeds.
+    If the calling task is cancelled, the stream is closed before
+    CancelledError propagates, so its connection goes back to the pool.
+
+    ``ttft_deadline_s`` (plus 1 s per TTFT_DEADLINE_PREFILL_TPS context
+    tokens) bounds the wait for the first token and ``idle_deadline_s``
+    the gap between token chunks; None uses the STREAM_*_DEADLINE_S
+    defaults (the TTFT one from the model's perf profile once it is warm)
+    and 0 turns a deadline off. A run that misses one is aborted
+    and kept as a failure (``[ttft_timeout]`` / ``[stalled]``) with the
+    metrics of what streamed so far.
+
+    ``replay_messages`` (trace replay) are sent as-is instead of the
+    prompt, context padding and target system prompt.
+    """
     result = RunResult(target=target, context_tokens=context_tokens)
 
-    messages = []
-    if target.system_prompt:
-        if context_tokens > 0:
-            context_text = generate_context_text(context_tokens)
-            messages.append({"role": "system", "content": target.system_prompt + "\n\n" + context_text})
-        else:
-            messages.append({"role": "system", "content": target.system_prompt})
-    elif context_tokens > 0:
-        context_text = generate_context_text(context_tokens)
-        messages.append({"role": "system", "content": context_text})
-    messages.append({"role": "user", "content": prompt})
+    if replay_messages is not None:
+        messages = list(replay_messages)
+    else:
+        messages = []
+        if target.system_prompt:
+            if context_tokens > 0:
+                context_text = generate_context_text(context_tokens, seed=context_seed)
+                messages.append({"role": "system", "content": target.system_prompt + "\n\n" + context_text})
+            else:
+                messages.append({"role": "system", "content": target.system_prompt})
+        elif context_tokens > 0:
+            context_text = generate_context_text(context_tokens, seed=context_seed)
+            messages.append({"role": "system", "content": context_text})
+        messages.append({"role": "user", "content": prompt})
 
     pp_copy = dict(provider_params) if provider_params else None
     extra = build_litellm_kwargs(
@@ -1140,38 +1226,89 @@ async def async_run_single(
 
     logger.info("Benchmark call: model=%s api_base=%s stream=%s", kwargs.get("model"), kwargs.get("api_base"), kwargs.get("stream"))
 
-    try:
-        start = time.perf_counter()
-        stream = await litellm.acompletion(**kwargs)
+    if ttft_deadline_s is None:
+        ttft_deadline_s = perf_profiles.timeout_for(
+            target.model_id, target.api_base, "benchmark", STREAM_TTFT_DEADLINE_S,
+        )
+    if ttft_deadline_s > 0:
+        ttft_deadline_s += context_tokens / TTFT_DEADLINE_PREFILL_TPS
+    if idle_deadline_s is None:
+        idle_deadline_s = STREAM_IDLE_DEADLINE_S
 
+    stream = None
+    try:
+        phases = ConnectionPhases() if capture_phases or http_clients.POOL_ENABLED else None
         ttft = None
-        chunk_count = 0
+        chunk_count = 0  # output chunks, once per delta; the two below only split the phases
+        reasoning_chunks = 0
+        answer_chunks = 0
+        first_reasoning = first_answer = None
         usage_from_stream = None
+        arrivals = [] if capture_timeline or decode_window_tokens > 0 else None
+        missed_deadline = None
 
-        async for chunk in stream:
-            now = time.perf_counter()
-
-            if ttft is None:
-                ttft = (now - start) * 1000
-
-            if (
-                chunk.choices
-                and chunk.choices[0].delta
-                and chunk.choices[0].delta.content
-            ):
-                chunk_count += 1
+        start = time.perf_counter()
+        deadline = _StreamDeadline(ttft_deadline_s, idle_deadline_s)
+        try:
+            stream, start = await _scheduled_completion(
+                target, kwargs, phases=phases, on_send=deadline.arm,
+            )
 
-            if hasattr(chunk, "usage") and chunk.usage:
-                usage_from_stream = chunk.usage
+            async for chunk in stream:
+                now = time.perf_counter()
+
+                if ttft is None:
+                    ttft = (now - start) * 1000
+
+                delta = chunk.choices[0].delta if chunk.choices else None
+                reasoning = getattr(delta, "reasoning_content", None) if delta else None
+                if reasoning:
+                    reasoning_chunks += 1
+                    if first_reasoning is None:
+                        first_reasoning = now - start
+                if delta and delta.content:
+                    answer_chunks += 1
+                    if first_answer is None:
+                        first_answer = now - start
+                if delta and (delta.content or reasoning):
+                    chunk_count += 1
+                    deadline.token()
+                    if arrivals is not None:
+                        arrivals.append(now - start)
+
+                if hasattr(chunk, "usage") and chunk.usage:
+                    usage_from_stream = chunk.usage
+        except asyncio.CancelledError:
+            if deadline.expired is None:
+                raise
+            deadline.absorb()
+            missed_deadline = deadline.expired
+        finally:
+            deadline.cancel()
 
         total = time.perf_counter() - start
+        if capture_phases:
+            phases.mark("stream_end")
+            for name, value in phases.durations().items():
+                setattr(result, name, value)
+        elif phases is not None:
+            result.connection_reused = phases.connection_reused
+        # Release the connection back to the pool so the next run can reuse it
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
 
         if usage_from_stream:
             result.output_tokens = usage_from_stream.completion_tokens or chunk_count
             result.input_tokens = usage_from_stream.prompt_tokens or 0
+            result.cached_tokens = _cached_prompt_tokens(usage_from_stream)
         else:
             result.output_tokens = chunk_count
             result.input_tokens = 0
+        split_reasoning_phases(
+            result, first_reasoning, first_answer, total, reasoning_chunks, answer_chunks,
+            usage_reasoning_tokens(usage_from_stream) if usage_from_stream else None,
+        )
 
         result.ttft_ms = ttft or 0.0
         result.total_time_s = total
@@ -1179,17 +1316,48 @@ async def async_run_single(
             result.output_tokens / total if total > 0 else 0.0
         )
 
+        # Output Speed (excludes TTFT) and average Inter-Token Latency
+        gen_time = total - result.ttft_ms / 1000.0
+        if gen_time > 0 and result.output_tokens > 0:
+            result.output_speed_tps = result.output_tokens / gen_time
+        if result.output_tokens > 1 and gen_time > 0:
+            result.itl_ms = gen_time / (result.output_tokens - 1) * 1000
+
+        if arrivals and decode_window_tokens > 0:
+            result.decode_windows = decode_window_speeds(arrivals, result.output_tokens, decode_window_tokens)
+            result.decode_slope_tps_per_1k = decode_decay(result.decode_windows, decode_window_tokens)["slope_tps_per_1k"]
+
+        if arrivals and capture_timeline:
+            result.chunk_timeline = pack_chunk_timeline(arrivals)
+            gaps_ms = [(b - a) * 1000 for a, b in zip(arrivals, arrivals[1:])]
+            stats = chunk_timeline_stats([arrivals[0] * 1000] + gaps_ms)
+            result.itl_p50_ms = stats["itl_p50_ms"]
+            result.itl_p90_ms = stats["itl_p90_ms"]
+            result.itl_p99_ms = stats["itl_p99_ms"]
+            result.max_stall_ms = stats["max_stall_ms"]
+            result.stall_count = stats["stall_count"]
+
         if result.ttft_ms > 0 and result.input_tokens > 0:
             result.input_tokens_per_second = result.input_tokens / (result.ttft_ms / 1000)
 
         try:
-            result.cost = litellm.completion_cost(
-                model=target.model_id,
-                prompt=str(result.input_tokens),
-                completion=str(result.output_tokens),
-                prompt_tokens=result.input_tokens,
-                completion_tokens=result.output_tokens,
-            )
+            if result.cached_tokens:
+                # Price cache reads at the provider's discounted rate
+                prompt_cost, completion_cost = litellm.cost_per_token(
+                    model=target.model_id,
+                    prompt_tokens=result.input_tokens,
+                    completion_tokens=result.output_tokens,
+                    cache_read_input_tokens=result.cached_tokens,
+                )
+                result.cost = prompt_cost + completion_cost
+            else:
+                result.cost = litellm.completion_cost(
+                    model=target.model_id,
+                    prompt=str(result.input_tokens),
+                    completion=str(result.output_tokens),
+                    prompt_tokens=result.input_tokens,
+                    completion_tokens=result.output_tokens,
+                )
         except Exception:
             logger.debug("Cost calculation not available for model %s", target.model_id)
             result.cost = 0.0
@@ -1200,6 +1368,24 @@ async def async_run_single(
                 + result.output_tokens * target.output_cost_per_mtok
             ) / 1_000_000
 
+        if missed_deadline == "ttft_timeout":
+            result.success = False
+            result.error = f"[ttft_timeout] No token within {ttft_deadline_s:g}s"
+        elif missed_deadline == "stalled":
+            result.success = False
+            result.error = (
+                f"[stalled] No chunk for {idle_deadline_s:g}s after "
+                f"{chunk_count} output chunks"
+            )
+        elif context_tokens == 0 and replay_messages is None and result.ttft_ms > 0:
+            perf_profiles.observe(target.model_id, target.api_base, "benchmark", result.ttft_ms)
+
+    except asyncio.CancelledError:
+        # Job cancelled mid-stream: close it so the connection is released now
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        raise
     except litellm.exceptions.RateLimitError as e:
         result.success = False
         result.error = f"[rate_limited] {sanitize_error(str(e)[:180], target.api_key)}"
@@ -1216,6 +1402,127 @@ async def async_run_single(
     return result
 
 
+# ---------------------------------------------------------------------------
+# Embedding requests
+# ---------------------------------------------------------------------------
+
+def _embedding_dim(response) -> int | None:
+    """Vector length of the first embedding in a LiteLLM EmbeddingResponse."""
+    data = getattr(response, "data", None) or []
+    if not data:
+        return None
+    first = data[0]
+    vector = first.get("embedding") if isinstance(first, dict) else getattr(first, "embedding", None)
+    return len(vector) if isinstance(vector, (list, tuple)) else None
+
+
+async def async_run_embedding(
+    target: Target, inputs: list[str], timeout: int = 120, provider_params: dict | None = None,
+) -> dict:
+    """Send one embedding request and time it.
+
+    Returns {"success", "error", "latency_s", "input_tokens", "vectors",
+    "embedding_dim", "cost"}. Latency is measured from the moment the
+    request leaves the rate-limit scheduler. Input tokens come from the
+    provider's usage block (characters / 4 when it reports none). Errors
+    are classified like async_run_single's.
+    """
+    kwargs = {"model": target.model_id, "input": inputs, "timeout": timeout}
+    passthrough = (provider_params or {}).get("passthrough")
+    if isinstance(passthrough, dict):
+        kwargs.update(passthrough)  # e.g. dimensions, encoding_format, input_type
+    if target.api_base:
+        kwargs["api_base"] = target.api_base
+    if target.api_key:
+        kwargs["api_key"] = target.api_key
+
+    result = {
+        "success": True, "error": "", "latency_s": 0.0, "input_tokens": 0,
+        "vectors": 0, "embedding_dim": None, "cost": 0.0,
+    }
+    sent_at = time.perf_counter()
+
+    def _mark_send():
+        nonlocal sent_at
+        sent_at = time.perf_counter()
+
+    try:
+        response = await scheduler.aembedding(kwargs, rpm=target.rpm, tpm=target.tpm, on_send=_mark_send)
+        result["latency_s"] = time.perf_counter() - sent_at
+        usage = getattr(response, "usage", None)
+        tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "total_tokens", None)
+        result["input_tokens"] = tokens if isinstance(tokens, int) and tokens > 0 else estimate_tokens(kwargs)
+        result["vectors"] = len(getattr(response, "data", None) or [])
+        result["embedding_dim"] = _embedding_dim(response)
+        try:
+            result["cost"] = litellm.completion_cost(completion_response=response, call_type="aembedding") or 0.0
+        except Exception:
+            logger.debug("Cost calculation not available for model %s", target.model_id)
+        if not result["cost"] and target.input_cost_per_mtok is not None:
+            result["cost"] = result["input_tokens"] * target.input_cost_per_mtok / 1_000_000
+        if result["vectors"] < len(inputs):
+            result["success"] = False
+            result["error"] = f"[incomplete] {result['vectors']} of {len(inputs)} vectors returned"
+    except litellm.exceptions.RateLimitError as e:
+        result.update(success=False, error=f"[rate_limited] {sanitize_error(str(e)[:180], target.api_key)}")
+    except litellm.exceptions.AuthenticationError as e:
+        result.update(success=False, error=f"[auth_failed] {sanitize_error(str(e)[:180], target.api_key)}")
+    except litellm.exceptions.Timeout as e:
+        result.update(success=False, error=f"[timeout] {sanitize_error(str(e)[:180], target.api_key)}")
+    except Exception as e:
+        result.update(success=False, error=sanitize_error(str(e)[:200], target.api_key))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Tool eval case concurrency
+# ---------------------------------------------------------------------------
+
+# Independent test cases of one model evaluated in parallel. Local servers
+# (Ollama, LM Studio) queue requests and only get slower per case, so they
+# stay serial; vLLM batches well; hosted APIs get a moderate default that
+# the latency profile can raise once warm.
+CASE_CONCURRENCY_DEFAULTS = {"ollama": 1, "lm_studio": 1, "vllm": 8}
+CASE_CONCURRENCY_HOSTED = 4
+CASE_CONCURRENCY_MAX = 16
+CASE_LATENCY_GUESS_S = 2.0  # assumed per-case latency while the profile is cold
+_LOCAL_HOSTS = ("localhost", "127.0.0.1", "0.0.0.0", "host.docker.internal")
+
+
+def _is_local_endpoint(api_base: str | None) -> bool:
+    host = urlparse(api_base).hostname if api_base else None
+    return bool(host) and (host in _LOCAL_HOSTS or host.endswith(".local"))
+
+
+def _case_concurrency(target: Target, requested: int | None = None) -> int:
+    """Cases of ``target`` to keep in flight at once.
+
+    ``requested`` overrides the endpoint-type default (local servers 1,
+    vLLM 8, hosted APIs 4, raised or lowered by the tool_eval latency
+    profile). Either way the result is capped by the rate-limit budget:
+    with an RPM limit, no more cases than ``rpm / 60 x p50 latency`` are
+    in flight, so parallelism never just queues in the scheduler.
+    """
+    if requested:
+        concurrency = int(requested)
+    else:
+        concurrency = CASE_CONCURRENCY_DEFAULTS.get(identify_provider(target.model_id, target.provider_key))
+        if concurrency is None:
+            concurrency = 1 if _is_local_endpoint(target.api_base) else CASE_CONCURRENCY_HOSTED
+        if concurrency > 1:
+            concurrency = perf_profiles.suggest_concurrency(
+                target.model_id, target.api_base, "tool_eval", concurrency,
+            )
+
+    kwargs = {"model": target.model_id, "api_base": target.api_base, "api_key": target.api_key}
+    rpm = target.rpm or scheduler.request_limit(kwargs)
+    if rpm:
+        prof = perf_profiles.profile(target.model_id, target.api_base, "tool_eval")
+        latency_s = prof["p50_ms"] / 1000 if prof else CASE_LATENCY_GUESS_S
+        concurrency = min(concurrency, max(1, math.ceil(rpm / 60 * latency_s)))
+    return max(1, min(concurrency, CASE_CONCURRENCY_MAX))
+
+
 # ---------------------------------------------------------------------------
 # SSE + aggregation helpers
 # ---------------------------------------------------------------------------
@@ -1235,36 +1542,17 @@ def _aggregate(raw_results: list[dict], config: dict) -> list[AggregatedResult]:
             grouped[key] = []
         grouped[key].append(r)
 
-    agg_list = []
     all_targets = build_targets(config)
     target_map = {(t.model_id, t.provider): t for t in all_targets}
 
+    groups = []
     for (mid, provider, ctx_tokens), runs in grouped.items():
         target = target_map.get((mid, provider), Target(
             provider=provider,
             model_id=mid,
             display_name=runs[0]["model"],
         ))
-        successes = [r for r in runs if r["success"]]
-        n = len(successes)
-
-        agg = AggregatedResult(
-            target=target,
-            runs=len(runs),
-            failures=len(runs) - n,
-        )
-        if n > 0:
-            agg.avg_ttft_ms = sum(r["ttft_ms"] for r in successes) / n
-            agg.avg_total_time_s = sum(r["total_time_s"] for r in successes) / n
-            agg.avg_tokens_per_second = sum(r["tokens_per_second"] for r in successes) / n
-            agg.avg_output_tokens = sum(r["output_tokens"] for r in successes) / n
-            agg.avg_cost = sum(r.get("cost", 0) for r in successes) / n
-            agg.total_cost = sum(r.get("cost", 0) for r in successes)
-            input_tps_vals = [r.get("input_tokens_per_second", 0) for r in successes if r.get("input_tokens_per_second", 0) > 0]
-            if input_tps_vals:
-                agg.avg_input_tps = sum(input_tps_vals) / len(input_tps_vals)
-
-        agg.all_results = [RunResult(
+        groups.append((target, [RunResult(
             target=target,
             context_tokens=ctx_tokens,
             ttft_ms=r["ttft_ms"],
@@ -1273,18 +1561,17 @@ def _aggregate(raw_results: list[dict], config: dict) -> list[AggregatedResult]:
             input_tokens=r.get("input_tokens", 0),
             tokens_per_second=r["tokens_per_second"],
             input_tokens_per_second=r.get("input_tokens_per_second", 0),
+            output_speed_tps=r.get("output_speed_tps", 0.0),
+            itl_ms=r.get("itl_ms", 0.0),
             cost=r.get("cost", 0),
             success=r["success"],
             error=r.get("error", ""),
-        ) for r in runs]
-
-        if n > 0:
-            success_results = [rr for rr in agg.all_results if rr.success]
-            _compute_variance(agg, success_results)
-
-        agg_list.append(agg)
+            connection_reused=r.get("connection_reused"),
+            **{name: r.get(name) for name in REASONING_FIELDS},
+        ) for r in runs]))
 
-    return agg_list
+    # One vectorized pass over every (model, tier) group
+    return aggregate_runs(groups)
 
 
 # ---------------------------------------------------------------------------
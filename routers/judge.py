@@ -3,6 +3,7 @@
 import asyncio
 import json
 import logging
+import time
 
 import litellm
 
@@ -13,6 +14,9 @@ from pydantic import ValidationError
 import auth
 import db
 from benchmark import Target, build_targets
+from http_clients import attach_pooled_client
+from perf_profiles import profiles as perf_profiles
+from rate_limiter import scheduler
 from schemas import JudgeRequest, JudgeCompareRequest, JudgeRerunRequest, JudgeSettingsUpdate
 from job_registry import registry as job_registry
 from provider_params import build_litellm_kwargs
@@ -276,13 +280,13 @@ async def _call_judge_model(
     """Call the judge model with a prompt, return parsed JSON dict.
 
     Retries transient errors (502/503/500/connection/timeout) with exponential
-    backoff.  Non-transient errors (auth, 400, 404, rate-limit) propagate
-    immediately.
+    backoff.  Rate limits are retried by the shared scheduler (rate_limiter);
+    other non-transient errors (auth, 400, 404) propagate immediately.
     """
     kwargs = {
         "model": judge_target.model_id,
         "messages": [{"role": "user", "content": prompt}],
-        "timeout": 120,
+        "timeout": perf_profiles.timeout_for(judge_target.model_id, judge_target.api_base, "judge", 120),
         "num_retries": 0,  # We handle retries ourselves with backoff
     }
     if judge_target.api_base:
@@ -302,11 +306,24 @@ async def _call_judge_model(
         kwargs["max_tokens"] = max_tokens
 
     logger.debug("Judge call: model=%s api_base=%s prompt_len=%d", judge_target.model_id, judge_target.api_base, len(prompt))
+    attach_pooled_client(kwargs)
 
     last_exc: Exception | None = None
+    sent_at = time.perf_counter()
+
+    def _mark_send():
+        nonlocal sent_at
+        sent_at = time.perf_counter()
+
     for attempt in range(1, _max_retries + 1):
         try:
-            response = await litellm.acompletion(**kwargs)
+            response = await scheduler.acompletion(
+                kwargs, rpm=judge_target.rpm, tpm=judge_target.tpm, on_send=_mark_send,
+            )
+            perf_profiles.observe(
+                judge_target.model_id, judge_target.api_base, "judge",
+                (time.perf_counter() - sent_at) * 1000,
+            )
             content = response.choices[0].message.content or ""
             return _parse_judge_json(content)
         except _JUDGE_RETRYABLE_ERRORS as exc:
@@ -453,7 +470,7 @@ async def run_judge_post_eval(request: Request, user: dict = Depends(auth.get_cu
     parsed_pk, judge_model_id = _parse_compound_key(raw_judge_model)
     judge_provider_key = body.get("judge_provider_key") or parsed_pk
     custom_instructions = body.get("custom_instructions", "")
-    concurrency = body.get("concurrency", 4)
+    concurrency = body.get("concurrency")  # None: suggested from the judge perf profile
 
     # Load eval run (validate before submitting job)
     eval_run = await db.get_tool_eval_run(eval_run_id, user["id"])
@@ -528,7 +545,7 @@ async def run_judge_compare(request: Request, user: dict = Depends(auth.get_curr
     # Parse compound key
     parsed_pk, judge_model_id = _parse_compound_key(validated.judge_model)
     judge_provider_key = body.get("judge_provider_key") or parsed_pk
-    concurrency = body.get("concurrency", 4)
+    concurrency = body.get("concurrency")  # None: suggested from the judge perf profile
 
     # Load both runs (validate before submitting job)
     run_a = await db.get_tool_eval_run(eval_run_id_a, user["id"])
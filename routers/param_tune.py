@@ -49,6 +49,8 @@ async def run_param_tune(request: Request, user: dict = Depends(auth.get_current
             experiment_id=body.get("experiment_id"),
             optimization_mode=body.get("optimization_mode", "grid"),
             n_trials=body.get("n_trials", 50),
+            case_concurrency=body.get("case_concurrency"),
+            cache_mode=body.get("cache_mode", "off"),
         )
     except (ValidationError, Exception) as e:
         raise HTTPException(422, detail=str(e))
@@ -113,6 +115,8 @@ async def run_param_tune(request: Request, user: dict = Depends(auth.get_current
         # 2A: optimization mode
         "optimization_mode": optimization_mode,
         "n_trials": n_trials,
+        "case_concurrency": validated.case_concurrency,
+        "cache_mode": validated.cache_mode,
     }
 
     job_id = await job_registry.submit(
@@ -12,6 +12,8 @@ from pydantic import ValidationError
 import auth
 import db
 from benchmark import Target, build_targets
+from http_clients import attach_pooled_client
+from rate_limiter import scheduler
 from schemas import PromptTuneRequest
 from job_registry import registry as job_registry
 from provider_params import build_litellm_kwargs
@@ -155,10 +157,11 @@ async def _generate_prompts_meta(
     _diag["api_key"] = "***" if kwargs.get("api_key") else None
     _diag["has_response_format"] = "response_format" in kwargs
     logger.info("Meta model call kwargs: %s", _diag)
+    attach_pooled_client(kwargs)
 
     for attempt in range(1, _max_retries + 1):
         try:
-            response = await litellm.acompletion(**kwargs)
+            response = await scheduler.acompletion(kwargs, rpm=meta_target.rpm, tpm=meta_target.tpm)
             content = response.choices[0].message.content or ""
             prompts = _parse_meta_response(content)
             if prompts:
@@ -239,6 +242,8 @@ async def run_prompt_tune(request: Request, user: dict = Depends(auth.get_curren
             base_prompt=body.get("base_prompt"),
             config=body.get("config"),
             experiment_id=body.get("experiment_id"),
+            case_concurrency=body.get("case_concurrency"),
+            cache_mode=body.get("cache_mode", "off"),
         )
     except (ValidationError, Exception) as e:
         raise HTTPException(422, detail=str(e))
@@ -293,6 +298,8 @@ async def run_prompt_tune(request: Request, user: dict = Depends(auth.get_curren
         "config": cfg,
         "experiment_id": experiment_id,
         "profiles": validated.profiles,
+        "case_concurrency": validated.case_concurrency,
+        "cache_mode": validated.cache_mode,
     }
 
     job_id = await job_registry.submit(
@@ -5,17 +5,17 @@ import logging
 import re
 import time
 
-import litellm
-
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 
 import auth
 import db
+import response_cache
 from benchmark import Target, build_targets, sanitize_error
 from schemas import ToolSuiteCreate, ToolSuiteUpdate, TestCaseCreate, ToolEvalRequest
 from job_registry import registry as job_registry
+from perf_profiles import profiles as perf_profiles
 from provider_params import build_litellm_kwargs
 from routers.helpers import (
     _get_user_config,
@@ -28,17 +28,23 @@ from routers.helpers import (
     _serialize_expected_tool,
     _tool_matches,
     _capture_raw_response,
+    _scheduled_completion,
     _parse_ground_truth_call,
     _normalize_bfcl_schema_types,
     score_tool_selection,
     score_params,
     compute_overall_score,
-    score_schema_validation,
     score_multi_turn,
     score_abstention,
     classify_format_compliance,
     classify_error_type,
 )
+from tool_eval_scoring import (
+    _find_parameters_schema,
+    _parse_case_expectations,
+    CompiledSuite,
+    score_schema_validation,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +79,40 @@ def _tool_defs_to_openai_format(tool_defs: list[dict]) -> list[dict]:
     return tools
 
 
+async def _eval_completion(target: Target, kwargs: dict, cache_mode: str = "off") -> tuple[object, float, bool]:
+    """One tool-eval completion, through the response cache when enabled.
+
+    Returns (response, latency_ms, cached). A cache hit reports the latency
+    of the original call and is not fed to the latency profile. Live calls
+    fall back from tool_choice="required" to "auto" for providers that
+    reject it; the response is stored under the request as first issued.
+    Raises response_cache.CacheMiss in replay mode when nothing is stored.
+    """
+    use_cache = cache_mode != "off" and response_cache.cacheable(kwargs)
+    key = response_cache.cache_key(kwargs) if use_cache else None
+    if key:
+        hit = await response_cache.get(key)
+        if hit:
+            return hit[0], hit[1], True
+    if cache_mode == "replay":
+        raise response_cache.CacheMiss("[cache_miss] No cached response for this request (replay mode)")
+
+    try:
+        response, start = await _scheduled_completion(target, kwargs)
+    except Exception:
+        # Fallback: some providers don't support tool_choice="required"
+        if kwargs.get("tool_choice") != "required":
+            raise
+        logger.debug("tool_choice=required failed, falling back to auto for %s", target.model_id)
+        kwargs["tool_choice"] = "auto"
+        response, start = await _scheduled_completion(target, kwargs)
+    latency_ms = (time.perf_counter() - start) * 1000
+    perf_profiles.observe(target.model_id, target.api_base, "tool_eval", latency_ms)
+    if key:
+        await response_cache.put(key, target.model_id, response, latency_ms)
+    return response, latency_ms, False
+
+
 # ---------------------------------------------------------------------------
 # Eval Engine: Single Eval Execution
 # ---------------------------------------------------------------------------
@@ -85,31 +125,21 @@ async def run_single_eval(
     tool_choice: str = "required",
     provider_params: dict | None = None,
     system_prompt: str | None = None,
+    cache_mode: str = "off",
+    suite: CompiledSuite | None = None,
 ) -> dict:
     """Run one test case against one model. Returns result dict.
 
-    Uses litellm.acompletion() (non-streaming, since we need tool_calls).
+    Uses litellm.acompletion() (non-streaming, since we need tool_calls) via
+    the shared rate-limit scheduler.
     Optional system_prompt injects a system message before the user prompt
     (used by Prompt Tuner to test prompt variations).
+    cache_mode ("off" / "read_write" / "replay") routes the call through the
+    response cache; see response_cache.py. Pass the job's CompiledSuite as
+    ``suite`` (with one of its cases) to skip re-parsing and schema scans.
     """
-    # Parse expected values
-    expected_tool = _parse_expected_tool(test_case.get("expected_tool"))
-    expected_params = test_case.get("expected_params")
-    if isinstance(expected_params, str):
-        try:
-            expected_params = json.loads(expected_params)
-        except (json.JSONDecodeError, TypeError):
-            logger.debug("Failed to parse expected_params for test case %s", test_case.get("id"))
-            expected_params = None
-
-    # Parse scoring config for fuzzy matching (S3)
-    scoring_config = None
-    sc_raw = test_case.get("scoring_config_json")
-    if sc_raw:
-        try:
-            scoring_config = json.loads(sc_raw) if isinstance(sc_raw, str) else sc_raw
-        except (json.JSONDecodeError, TypeError):
-            logger.debug("Failed to parse scoring_config_json for test case %s", test_case.get("id"))
+    # Parse expected values and scoring config for fuzzy matching (S3)
+    expected_tool, expected_params, scoring_config = _parse_case_expectations(test_case)
 
     # Irrelevance detection: should this test case expect a tool call?
     # DB stores as INTEGER (1/0), coerce to bool
@@ -135,6 +165,7 @@ async def run_single_eval(
         "latency_ms": 0,
         "raw_request": None,
         "raw_response": None,
+        "cached": False,  # response replayed from the response cache
         "should_call_tool": should_call_tool,
         "irrelevance_score": None,
         # T1: format compliance
@@ -148,6 +179,7 @@ async def run_single_eval(
         "required_present": None,
         "type_correct": None,
         "hallucination_free": None,
+        "schema_errors": [],
     }
 
     # Build validated+clamped params via provider_params module
@@ -173,7 +205,7 @@ async def run_single_eval(
         "tools": tools,
         "tool_choice": tool_choice,
         "max_tokens": 1024,
-        "timeout": 120,
+        "timeout": perf_profiles.timeout_for(target.model_id, target.api_base, "tool_eval", 120),
     }
     if target.api_base:
         kwargs["api_base"] = target.api_base
@@ -208,18 +240,7 @@ async def run_single_eval(
     _params_parse_failed = False
 
     try:
-        start = time.perf_counter()
-        try:
-            response = await litellm.acompletion(**kwargs)
-        except Exception:
-            # Fallback: some providers don't support tool_choice="required"
-            if kwargs.get("tool_choice") == "required":
-                logger.debug("tool_choice=required failed, falling back to auto for %s", target.model_id)
-                kwargs["tool_choice"] = "auto"
-                response = await litellm.acompletion(**kwargs)
-            else:
-                raise
-        latency_ms = (time.perf_counter() - start) * 1000
+        response, latency_ms, result["cached"] = await _eval_completion(target, kwargs, cache_mode)
 
         message = response.choices[0].message
         if message.tool_calls and len(message.tool_calls) > 0:
@@ -279,24 +300,16 @@ async def run_single_eval(
 
     # Tier 2: Schema validation scoring
     # Find the parameters_schema for the expected/actual tool from the tools list
-    tool_name_for_schema = (
-        (expected_tool if isinstance(expected_tool, str) else None)
-        or result["actual_tool"]
+    parameters_schema = (
+        suite.validator_for(expected_tool, result["actual_tool"]) if suite
+        else _find_parameters_schema(tools, expected_tool, result["actual_tool"])
     )
-    parameters_schema = None
-    if tool_name_for_schema:
-        for t in tools:
-            if isinstance(t, dict) and t.get("type") == "function":
-                fn = t.get("function", {})
-                if fn.get("name", "").lower() == tool_name_for_schema.lower():
-                    parameters_schema = fn.get("parameters")
-                    break
-
     schema_result = score_schema_validation(parameters_schema or {}, result["actual_params"])
     result["schema_score"] = schema_result["schema_score"]
     result["required_present"] = schema_result["required_present"]
     result["type_correct"] = schema_result["type_correct"]
     result["hallucination_free"] = schema_result["hallucination_free"]
+    result["schema_errors"] = schema_result["errors"]
 
     result["overall_score"] = compute_overall_score(
         result["tool_selection_score"],
@@ -317,7 +330,9 @@ async def run_single_eval(
     )
 
     # T2: Error type classification
-    tool_names_in_suite = {t["function"]["name"].lower() for t in tools if isinstance(t, dict) and "function" in t}
+    tool_names_in_suite = suite.tool_names if suite else {
+        t["function"]["name"].lower() for t in tools if isinstance(t, dict) and "function" in t
+    }
     result["error_type"] = classify_error_type(
         success=result["success"],
         actual_tool=result["actual_tool"],
@@ -344,11 +359,14 @@ async def run_multi_turn_eval(
     tool_choice: str = "required",
     provider_params: dict | None = None,
     system_prompt: str | None = None,
+    cache_mode: str = "off",
+    suite: CompiledSuite | None = None,
 ) -> dict:
     """Run a multi-turn test case against one model. Returns result dict.
 
     Loops up to max_rounds, feeding mock tool responses back to the model
-    until it calls the expected final tool or exhausts rounds.
+    until it calls the expected final tool or exhausts rounds. Each round
+    goes through the response cache per cache_mode (see run_single_eval).
     """
     mt_config = test_case.get("_mt_config", {})
     max_rounds = mt_config.get("max_rounds", 5)
@@ -356,23 +374,8 @@ async def run_multi_turn_eval(
     valid_prerequisites = mt_config.get("valid_prerequisites", [])
     optimal_hops = mt_config.get("optimal_hops", 2)
 
-    expected_tool = _parse_expected_tool(test_case.get("expected_tool"))
-    expected_params = test_case.get("expected_params")
-    if isinstance(expected_params, str):
-        try:
-            expected_params = json.loads(expected_params)
-        except (json.JSONDecodeError, TypeError):
-            logger.debug("Failed to parse expected_params for multi-turn test case %s", test_case.get("id"))
-            expected_params = None
-
-    # Parse scoring config for fuzzy matching (S3)
-    scoring_config = None
-    sc_raw = test_case.get("scoring_config_json")
-    if sc_raw:
-        try:
-            scoring_config = json.loads(sc_raw) if isinstance(sc_raw, str) else sc_raw
-        except (json.JSONDecodeError, TypeError):
-            logger.debug("Failed to parse scoring_config_json for multi-turn test case %s", test_case.get("id"))
+    # Parse expected values and scoring config for fuzzy matching (S3)
+    expected_tool, expected_params, scoring_config = _parse_case_expectations(test_case)
 
     # Irrelevance detection: should this test case expect a tool call?
     raw_sct = test_case.get("should_call_tool", 1)
@@ -397,6 +400,7 @@ async def run_multi_turn_eval(
         "latency_ms": 0,
         "raw_request": None,
         "raw_response": None,
+        "cached": False,  # every round replayed from the response cache
         # Multi-turn specific fields
         "multi_turn": True,
         "tool_chain": [],
@@ -419,6 +423,7 @@ async def run_multi_turn_eval(
         "required_present": None,
         "type_correct": None,
         "hallucination_free": None,
+        "schema_errors": [],
     }
 
     # Build messages: per-model system_prompt (from config) + explicit system_prompt (from prompt tuner)
@@ -443,7 +448,7 @@ async def run_multi_turn_eval(
         "tools": tools,
         "tool_choice": tool_choice,
         "max_tokens": 1024,
-        "timeout": 120,
+        "timeout": perf_profiles.timeout_for(target.model_id, target.api_base, "tool_eval", 120),
     }
     if target.api_base:
         base_kwargs["api_base"] = target.api_base
@@ -463,6 +468,7 @@ async def run_multi_turn_eval(
                     base_kwargs.pop(p, None)
 
     total_latency = 0.0
+    rounds_cached = []
 
     try:
         for round_num in range(max_rounds):
@@ -475,18 +481,9 @@ async def run_multi_turn_eval(
                 raw_req["tools_summary"] = [t["function"]["name"] for t in raw_req["tools"]]
                 raw_req["tools_count"] = len(raw_req["tools"])
 
-            start = time.perf_counter()
-            try:
-                response = await litellm.acompletion(**kwargs)
-            except Exception:
-                if kwargs.get("tool_choice") == "required":
-                    logger.debug("tool_choice=required failed in multi-turn, falling back to auto for %s", target.model_id)
-                    kwargs["tool_choice"] = "auto"
-                    response = await litellm.acompletion(**kwargs)
-                else:
-                    raise
-            latency_ms = (time.perf_counter() - start) * 1000
+            response, latency_ms, cached = await _eval_completion(target, kwargs, cache_mode)
             total_latency += latency_ms
+            rounds_cached.append(cached)
 
             raw_resp = _capture_raw_response(response)
             result["raw_exchanges"].append({"request": raw_req, "response": raw_resp})
@@ -550,6 +547,7 @@ async def run_multi_turn_eval(
             result["rounds_used"] = max_rounds
 
         result["latency_ms"] = round(total_latency)
+        result["cached"] = bool(rounds_cached) and all(rounds_cached)
 
         # Set raw_request/raw_response to first/last exchange for compatibility
         if result["raw_exchanges"]:
@@ -608,23 +606,16 @@ async def run_multi_turn_eval(
         result["param_accuracy"] = score_params(expected_params, result["actual_params"], scoring_config=scoring_config)
 
         # Tier 2: Schema validation on final tool call params
-        tool_name_for_schema = (
-            (expected_tool if isinstance(expected_tool, str) else None)
-            or result["actual_tool"]
+        mt_parameters_schema = (
+            suite.validator_for(expected_tool, result["actual_tool"]) if suite
+            else _find_parameters_schema(tools, expected_tool, result["actual_tool"])
         )
-        mt_parameters_schema = None
-        if tool_name_for_schema:
-            for t in tools:
-                if isinstance(t, dict) and t.get("type") == "function":
-                    fn = t.get("function", {})
-                    if fn.get("name", "").lower() == tool_name_for_schema.lower():
-                        mt_parameters_schema = fn.get("parameters")
-                        break
         mt_schema_result = score_schema_validation(mt_parameters_schema or {}, result["actual_params"])
         result["schema_score"] = mt_schema_result["schema_score"]
         result["required_present"] = mt_schema_result["required_present"]
         result["type_correct"] = mt_schema_result["type_correct"]
         result["hallucination_free"] = mt_schema_result["hallucination_free"]
+        result["schema_errors"] = mt_schema_result["errors"]
 
         # Irrelevance score: how well did model handle abstention expectation?
         result["irrelevance_score"] = score_abstention(should_call_tool, result["actual_tool"])
@@ -1425,6 +1416,10 @@ async def get_tool_eval_run(eval_id: str, user: dict = Depends(auth.get_current_
                 r["actual_params"] = json.loads(r["actual_params"])
             except (json.JSONDecodeError, TypeError):
                 pass
+        try:
+            r["schema_errors"] = json.loads(r["schema_errors"]) if r.get("schema_errors") else []
+        except (json.JSONDecodeError, TypeError):
+            r["schema_errors"] = []
         results.append(r)
     run["results"] = results
 
@@ -1460,6 +1455,21 @@ async def delete_tool_eval_run(eval_id: str, user: dict = Depends(auth.get_curre
     return {"status": "ok"}
 
 
+@router.post("/api/tool-eval/history/{eval_id}/rescore")
+async def rescore_tool_eval_run(eval_id: str, user: dict = Depends(auth.get_current_user)):
+    """Re-apply current scoring to a stored eval run via job registry. Makes no model calls."""
+    run = await db.get_tool_eval_run(eval_id, user["id"])
+    if not run:
+        return JSONResponse({"error": "Eval run not found"}, status_code=404)
+    job_id = await job_registry.submit(
+        job_type="rescore",
+        user_id=user["id"],
+        params={"user_id": user["id"], "eval_run_id": eval_id},
+        progress_detail=f"Rescore: {run.get('suite_name') or 'eval run'}",
+    )
+    return {"job_id": job_id, "status": "submitted"}
+
+
 @router.post("/api/tool-eval")
 async def run_tool_eval(request: Request, user: dict = Depends(auth.get_current_user)):
     """Run tool calling eval via job registry. Returns job_id immediately."""
@@ -1476,6 +1486,9 @@ async def run_tool_eval(request: Request, user: dict = Depends(auth.get_current_
             experiment_id=body.get("experiment_id"),
             auto_judge=body.get("auto_judge", False),
             auto_judge_threshold=body.get("auto_judge_threshold"),
+            prewarm_connections=body.get("prewarm_connections", False),
+            case_concurrency=body.get("case_concurrency"),
+            cache_mode=body.get("cache_mode", "off"),
         )
     except (ValidationError, Exception) as e:
         raise HTTPException(422, detail=str(e))
@@ -1530,11 +1543,14 @@ async def run_tool_eval(request: Request, user: dict = Depends(auth.get_current_
         "provider_params": provider_params,
         "system_prompt": system_prompt,
         "judge": judge_config,
-        "judge_concurrency": body.get("judge_concurrency", 4),
+        "judge_concurrency": body.get("judge_concurrency"),
         "experiment_id": experiment_id,
         "profiles": profiles,
         "auto_judge": validated.auto_judge,
         "auto_judge_threshold": validated.auto_judge_threshold,
+        "prewarm_connections": validated.prewarm_connections,
+        "case_concurrency": validated.case_concurrency,
+        "cache_mode": validated.cache_mode,
     }
 
     job_id = await job_registry.submit(
@@ -61,6 +61,20 @@ def _build_reconnect_init(job: dict) -> dict | None:
             },
         }
 
+    if job_type == "embedding_benchmark":
+        return {
+            "type": "embedding_init",
+            "job_id": job_id,
+            "reconnect": True,
+            "progress_pct": progress_pct,
+            "data": {
+                "targets": [
+                    {"provider_key": t[0], "model_id": t[1]} for t in params.get("target_set") or [] if len(t) >= 2
+                ] or [{"provider_key": "", "model_id": mid} for mid in params.get("models", [])],
+                "requests": params.get("requests", 8),
+            },
+        }
+
     if job_type == "tool_eval":
         return {
             "type": "tool_eval_init",
@@ -74,6 +88,16 @@ def _build_reconnect_init(job: dict) -> dict | None:
             },
         }
 
+    if job_type == "rescore":
+        return {
+            "type": "rescore_start",
+            "job_id": job_id,
+            "reconnect": True,
+            "progress_pct": progress_pct,
+            "eval_id": params.get("eval_run_id", ""),
+            "total_cases": 0,
+        }
+
     if job_type == "param_tune":
         return {
             "type": "tune_start",
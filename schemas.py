@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Optional, List, Literal, Any
 from pydantic import BaseModel, Field, field_validator, model_validator
 
+from http_clients import POOL_MAX_CONNECTIONS
+
 
 # ──────────────────────── Constants ────────────────────────
 
@@ -26,7 +28,75 @@ class BenchmarkRequest(BaseModel):
     context_tiers: List[int] = Field(default_factory=lambda: [0])
     runs: int = Field(default=1, ge=1, le=20)
     timeout: int = Field(default=120, ge=10, le=600)
+    # Stream deadlines in seconds (None = server default, 0 = off)
+    ttft_deadline_s: Optional[float] = Field(default=None, ge=0, le=3600)
+    idle_deadline_s: Optional[float] = Field(default=None, ge=0, le=600)
     profiles: Optional[dict] = None  # {"model_id": "profile_id"}
+    mode: Literal["standard", "load", "cache", "throughput", "prefill", "decay", "replay", "dataset"] = "standard"
+    capture_timeline: bool = False  # per-chunk arrival timeline + ITL percentiles
+    capture_phases: bool = False  # DNS/TCP/TLS/server-wait breakdown per run
+    context_seed: Optional[int] = None  # reproducible context-window offsets
+    isolate_measurement: Optional[bool] = None  # time streams on the dedicated measurement loop (None = server default)
+    prewarm_connections: bool = False  # open pooled connections to each endpoint before the first run
+    # Open-loop load generator (mode="load")
+    load_steps: List[float] = Field(default_factory=lambda: [1, 2, 4, 8], min_length=1, max_length=12)
+    load_arrival: Literal["poisson", "constant"] = "poisson"
+    load_step_duration_s: float = Field(default=30, ge=1, le=600)
+    load_seed: Optional[int] = None
+    # Max-throughput parallel streams (mode="throughput")
+    throughput_concurrency: List[int] = Field(default_factory=lambda: [1, 2, 4, 8, 16], min_length=1, max_length=12)
+    # Prefill-only probe (mode="prefill"): prompt sizes to predict from the fitted curve
+    prefill_predict_tiers: List[int] = Field(default_factory=list, max_length=32)
+    # Long-generation decay (mode="decay"): output tokens per decode-speed window
+    decay_window_tokens: int = Field(default=128, ge=16, le=4096)
+    # Trace replay (mode="replay"): imported request log and inter-arrival time divisor
+    replay_trace_id: Optional[str] = Field(default=None, max_length=64)
+    replay_speed: float = Field(default=1.0, gt=0.0, le=100.0)
+    # Prompt dataset (mode="dataset"): uploaded JSONL dataset and how to sample it per model
+    dataset_id: Optional[str] = Field(default=None, max_length=64)
+    dataset_samples: int = Field(default=50, ge=1, le=5000)
+    dataset_replace: bool = False  # sample with replacement
+    dataset_seed: Optional[int] = None
+    # Adaptive run count (mode="standard"): stop once the 95% CI is tight enough
+    adaptive: bool = False
+    adaptive_metric: Literal["output_speed", "ttft"] = "output_speed"
+    adaptive_ci_width: float = Field(default=0.10, gt=0.0, le=1.0)  # CI width / mean
+    adaptive_min_runs: int = Field(default=3, ge=2, le=100)
+    adaptive_max_runs: int = Field(default=20, ge=2, le=100)
+    adaptive_max_cost: Optional[float] = Field(default=None, gt=0.0)  # USD per model and tier
+
+    @field_validator("load_steps")
+    @classmethod
+    def check_load_steps(cls, v):
+        """Each step is an offered arrival rate in requests/second."""
+        for rate in v:
+            if rate <= 0 or rate > 100:
+                raise ValueError("load_steps rates must be > 0 and <= 100 requests/second")
+        return v
+
+    @field_validator("prefill_predict_tiers")
+    @classmethod
+    def check_prefill_predict_tiers(cls, v):
+        for tier in v:
+            if tier < 1 or tier > 2_000_000:
+                raise ValueError("prefill_predict_tiers must be between 1 and 2,000,000 tokens")
+        return v
+
+    @field_validator("throughput_concurrency")
+    @classmethod
+    def check_throughput_concurrency(cls, v):
+        """Each level is a number of simultaneous streams.
+
+        Capped at the pooled client's connection limit: a higher level would
+        queue inside the pool and not run at the requested concurrency.
+        """
+        for n in v:
+            if n < 1 or n > POOL_MAX_CONNECTIONS:
+                raise ValueError(
+                    f"throughput_concurrency levels must be between 1 and {POOL_MAX_CONNECTIONS} streams "
+                    "(HTTP_POOL_MAX_CONNECTIONS)"
+                )
+        return v
 
     @model_validator(mode="after")
     def check_models_or_targets(self):
@@ -37,6 +107,67 @@ class BenchmarkRequest(BaseModel):
             raise ValueError("Either 'models' or 'targets' must be provided with at least one item")
         return self
 
+    @model_validator(mode="after")
+    def check_adaptive_runs(self):
+        if self.adaptive_min_runs > self.adaptive_max_runs:
+            raise ValueError("adaptive_min_runs must not exceed adaptive_max_runs")
+        return self
+
+    @model_validator(mode="after")
+    def check_replay_trace(self):
+        if self.mode == "replay" and not self.replay_trace_id:
+            raise ValueError("mode 'replay' requires a replay_trace_id (import via POST /api/benchmark/replay/import)")
+        return self
+
+    @model_validator(mode="after")
+    def check_dataset_id(self):
+        if self.mode == "dataset" and not self.dataset_id:
+            raise ValueError("mode 'dataset' requires a dataset_id (upload via POST /api/benchmark/datasets)")
+        return self
+
+
+class EmbeddingBenchmarkRequest(BaseModel):
+    models: Optional[List[str]] = Field(default=None)
+    targets: Optional[List[dict]] = Field(default=None)
+    batch_sizes: List[int] = Field(default_factory=lambda: [1, 16, 64], min_length=1, max_length=8)
+    input_tokens: List[int] = Field(default_factory=lambda: [128, 512], min_length=1, max_length=8)
+    concurrency: List[int] = Field(default_factory=lambda: [1, 4], min_length=1, max_length=8)
+    requests: int = Field(default=8, ge=1, le=200)  # requests per (input length, batch, concurrency) cell
+    timeout: int = Field(default=120, ge=10, le=600)
+    warmup: bool = True
+    provider_params: Optional[dict] = None  # {"passthrough": {"dimensions": 256, ...}}
+
+    @field_validator("batch_sizes")
+    @classmethod
+    def check_batch_sizes(cls, v):
+        for n in v:
+            if n < 1 or n > 2048:
+                raise ValueError("batch_sizes must be between 1 and 2048 inputs")
+        return v
+
+    @field_validator("input_tokens")
+    @classmethod
+    def check_input_tokens(cls, v):
+        for n in v:
+            if n < 1 or n > 32_768:
+                raise ValueError("input_tokens must be between 1 and 32,768 tokens")
+        return v
+
+    @field_validator("concurrency")
+    @classmethod
+    def check_concurrency(cls, v):
+        for n in v:
+            if n < 1 or n > 64:
+                raise ValueError("concurrency levels must be between 1 and 64 requests")
+        return v
+
+    @model_validator(mode="after")
+    def check_models_or_targets(self):
+        """At least one of models or targets must be provided with items."""
+        if not self.models and not self.targets:
+            raise ValueError("Either 'models' or 'targets' must be provided with at least one item")
+        return self
+
 
 class ModelConfigUpdate(BaseModel):
     model_id: str = Field(..., pattern=r"^[a-zA-Z0-9._\-/:]+$")
@@ -83,6 +214,9 @@ class ToolEvalRequest(BaseModel):
     profiles: Optional[dict] = None  # {"model_id": "profile_id"}
     auto_judge: bool = False
     auto_judge_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    prewarm_connections: bool = False  # open pooled connections to each endpoint before the first case
+    case_concurrency: Optional[int] = Field(default=None, ge=1, le=16)  # None: per-endpoint default
+    cache_mode: Literal["off", "read_write", "replay"] = "off"  # tool-eval response cache
 
     @model_validator(mode="after")
     def check_models_or_targets(self):
@@ -103,6 +237,8 @@ class ParamTuneRequest(BaseModel):
     # 2A: Bayesian / Random search support
     optimization_mode: Literal["grid", "random", "bayesian"] = "grid"
     n_trials: int = Field(default=50, ge=5, le=500)
+    case_concurrency: Optional[int] = Field(default=None, ge=1, le=16)  # None: per-endpoint default
+    cache_mode: Literal["off", "read_write", "replay"] = "off"  # tool-eval response cache
 
     @model_validator(mode="after")
     def check_models_or_targets(self):
@@ -126,6 +262,8 @@ class PromptTuneRequest(BaseModel):
     eval_tool_choice: str = Field(default="required")
     experiment_id: Optional[str] = None
     profiles: Optional[dict] = None  # {"model_id": "profile_id"}
+    case_concurrency: Optional[int] = Field(default=None, ge=1, le=16)  # None: per-endpoint default
+    cache_mode: Literal["off", "read_write", "replay"] = "off"  # tool-eval response cache
     config: Optional[dict] = None  # deprecated: use explicit fields above
 
 
@@ -225,6 +363,8 @@ class ProviderCreate(BaseModel):
     api_base: Optional[str] = None
     model_id_prefix: Optional[str] = Field(None, max_length=64)
     api_key_env: Optional[str] = None
+    rpm: Optional[int] = Field(None, ge=1, le=1_000_000)  # requests/minute (shared scheduler)
+    tpm: Optional[int] = Field(None, ge=1, le=100_000_000)  # tokens/minute (shared scheduler)
 
 
 class DirectBenchmarkResult(BaseModel):
@@ -4,13 +4,17 @@ Provides:
 - Temporary SQLite database per test session (isolated from production)
 - FastAPI async test client via httpx.AsyncClient
 - Authenticated test user + admin user fixtures
+- Local keep-alive SSE server answering chat completions
+- Stubbed config and persistence for benchmark_handler mode tests
 - Test config with a Zai provider for E2E tests
 """
 
 import asyncio
+import json
 import os
 import tempfile
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 import pytest_asyncio
@@ -230,6 +234,115 @@ async def clear_active_jobs(test_user, _patch_db_path):
     raise last_exc
 
 
+# ---------------------------------------------------------------------------
+# Local SSE chat-completions server (connection phases, HTTP pooling)
+# ---------------------------------------------------------------------------
+
+SSE_SERVER_DELAY_S = 0.05
+
+
+def _sse_body() -> bytes:
+    chunk = {"id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "test-model",
+             "choices": [{"index": 0, "delta": {"role": "assistant", "content": "hello"}, "finish_reason": None}]}
+    usage = {**chunk, "choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}}
+    return "".join(f"data: {json.dumps(c)}\n\n" for c in (chunk, usage)).encode() + b"data: [DONE]\n\n"
+
+
+@pytest_asyncio.fixture
+async def sse_server():
+    """Minimal HTTP/1.1 keep-alive server answering chat completions with SSE."""
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode().split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                await reader.readexactly(length)
+                if head.startswith(b"HEAD "):
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                    await writer.drain()
+                    continue
+                await asyncio.sleep(SSE_SERVER_DELAY_S)  # "prefill"
+                body = _sse_body()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                    b"Connection: keep-alive\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    yield port, connections
+    server.close()
+
+
+# ---------------------------------------------------------------------------
+# Benchmark handler with stubbed config and persistence (mode tests)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def benchmark_handler_env(monkeypatch):
+    """Run job_handlers.benchmark_handler without a database or user config.
+
+    Returns a namespace the test fills and inspects:
+    - ``targets``: what build_targets returns (set before running the handler)
+    - ``saved``: save_benchmark_run kwargs, with ``config`` parsed from
+      config_json, plus the parsed ``metadata`` of the last metadata update
+    - ``rows``: kwargs of every save_benchmark_result call
+    - ``progress`` / ``progress_cb``: percentages passed to the progress callback
+
+    save_benchmark_run returns "run-1" and model ids resolve to themselves.
+    Patch ``job_handlers.async_run_single`` (or the mode's runner) in the test.
+    """
+    import job_handlers
+
+    env = SimpleNamespace(targets=[], saved={}, rows=[], progress=[])
+
+    async def fake_config(user_id):
+        return {"providers": {}, "defaults": {}}
+
+    async def fake_save_run(**kw):
+        env.saved.update(kw, config=json.loads(kw["config_json"]))
+        return "run-1"
+
+    async def fake_update_metadata(run_id, metadata):
+        env.saved["metadata"] = json.loads(metadata)
+
+    async def fake_save_result(**kw):
+        env.rows.append(kw)
+
+    async def fake_resolve(user_id, litellm_id):
+        return litellm_id
+
+    async def progress_cb(pct, detail=""):
+        env.progress.append(pct)
+
+    async def noop(*a, **kw):
+        return None
+
+    env.progress_cb = progress_cb
+    monkeypatch.setattr(job_handlers, "_get_user_config", fake_config)
+    monkeypatch.setattr(job_handlers, "build_targets", lambda cfg: env.targets)
+    monkeypatch.setattr(job_handlers, "_resolve_model_db_id", fake_resolve)
+    monkeypatch.setattr(job_handlers, "save_results", lambda *a, **kw: None)
+    monkeypatch.setattr(job_handlers, "_aggregate", lambda *a, **kw: [])
+    monkeypatch.setattr(job_handlers.db, "get_user_key_for_provider", noop)
+    monkeypatch.setattr(job_handlers.db, "save_benchmark_run", fake_save_run)
+    monkeypatch.setattr(job_handlers.db, "update_benchmark_run_metadata", fake_update_metadata)
+    monkeypatch.setattr(job_handlers.db, "save_benchmark_result", fake_save_result)
+    monkeypatch.setattr(job_handlers.db, "log_audit", noop)
+    return env
+
+
 # ---------------------------------------------------------------------------
 # Test config with Zai provider (for E2E smoke tests)
 # ---------------------------------------------------------------------------
@@ -0,0 +1,131 @@
+"""Tests for adaptive run counts with confidence-interval early stopping.
+
+Covers the relative CI width, the per-pair stopping rule, request
+validation, and the benchmark_handler adaptive loop.
+
+Run: uv run pytest tests/test_adaptive_runs.py -v
+"""
+
+import asyncio
+import itertools
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+from benchmark import RunResult, Target, ci_relative_width
+from benchmark_modes import _adaptive_stop_reason
+from schemas import BenchmarkRequest
+
+ADAPTIVE = {"metric": "output_speed", "ci_width": 0.10, "min_runs": 3, "max_runs": 10, "max_cost": None}
+
+
+def _item(tps=100.0, ttft_ms=200.0, success=True, cost=0.0):
+    return {"output_speed_tps": tps, "ttft_ms": ttft_ms, "success": success, "cost": cost}
+
+
+class TestCiRelativeWidth:
+
+    def test_identical_values_have_zero_width(self):
+        assert ci_relative_width([50.0, 50.0, 50.0]) == 0.0
+
+    def test_known_interval(self):
+        # mean 100, stdev 8.165, n=4 -> t=3.182, half width 12.99
+        width = ci_relative_width([90.0, 100.0, 110.0, 100.0])
+        assert width == pytest.approx(2 * 3.182 * 8.165 / 2 / 100, rel=1e-3)
+
+    def test_not_estimable(self):
+        assert ci_relative_width([]) == float("inf")
+        assert ci_relative_width([5.0]) == float("inf")
+        assert ci_relative_width([0.0, 0.0]) == float("inf")
+
+    def test_large_samples_use_normal_quantile(self):
+        values = [100.0, 110.0] * 30
+        expected = 2 * 1.96 * 5.0423 / (60 ** 0.5) / 105
+        assert ci_relative_width(values) == pytest.approx(expected, rel=1e-3)
+
+
+class TestAdaptiveStopReason:
+
+    def test_waits_for_min_runs(self):
+        assert _adaptive_stop_reason([_item(), _item()], ADAPTIVE)[0] is None
+
+    def test_converges_when_stable(self):
+        reason, width = _adaptive_stop_reason([_item(), _item(101), _item(99)], ADAPTIVE)
+        assert reason == "converged"
+        assert width < 0.10
+
+    def test_noisy_runs_continue_then_cap(self):
+        noisy = [_item(tps) for tps in (50, 150, 60, 140)]
+        assert _adaptive_stop_reason(noisy, ADAPTIVE)[0] is None
+        capped = [_item(tps) for tps in itertools.islice(itertools.cycle((50, 150)), 10)]
+        assert _adaptive_stop_reason(capped, ADAPTIVE)[0] == "max_runs"
+
+    def test_ttft_metric(self):
+        items = [_item(tps=t, ttft_ms=200) for t in (10, 500, 90)]
+        assert _adaptive_stop_reason(items, {**ADAPTIVE, "metric": "ttft"})[0] == "converged"
+
+    def test_cost_budget(self):
+        items = [_item(tps, cost=0.5) for tps in (50, 150)]
+        assert _adaptive_stop_reason(items, {**ADAPTIVE, "max_cost": 1.0})[0] == "max_cost"
+
+    def test_repeated_errors_stop_early(self):
+        items = [_item(success=False) for _ in range(3)]
+        assert _adaptive_stop_reason(items, ADAPTIVE)[0] == "errors"
+
+
+class TestAdaptiveRequestSchema:
+
+    def test_defaults(self):
+        req = BenchmarkRequest(models=["m"])
+        assert req.adaptive is False
+        assert (req.adaptive_min_runs, req.adaptive_max_runs) == (3, 20)
+
+    def test_min_above_max_rejected(self):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], adaptive=True, adaptive_min_runs=8, adaptive_max_runs=4)
+
+    @pytest.mark.parametrize("width", [0, -0.1, 1.5])
+    def test_invalid_ci_width_rejected(self, width):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], adaptive=True, adaptive_ci_width=width)
+
+
+class TestAdaptiveBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_stable_model_stops_early_noisy_model_runs_to_cap(self, monkeypatch, benchmark_handler_env):
+        env = benchmark_handler_env
+        stable = Target(provider="Local", model_id="local/stable", display_name="Stable", provider_key="local")
+        noisy = Target(provider="Remote", model_id="remote/noisy", display_name="Noisy", provider_key="remote")
+        noisy_speeds = itertools.cycle((40.0, 160.0))
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            tps = 100.0 if t is stable else next(noisy_speeds)
+            return RunResult(target=t, ttft_ms=50.0, total_time_s=1.0, output_tokens=10,
+                             tokens_per_second=tps, output_speed_tps=tps)
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = [stable, noisy]
+
+        params = {
+            "user_id": "u1",
+            "models": ["local/stable", "remote/noisy"],
+            "prompt": "hi",
+            "warmup": False,
+            "adaptive": {**ADAPTIVE, "max_runs": 6},
+        }
+        run_id = await job_handlers.benchmark_handler("job-a", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["adaptive"]["max_runs"] == 6
+        by_model = {m: sum(1 for r in env.rows if r["model_id"] == m) for m in ("local/stable", "remote/noisy")}
+        assert by_model == {"local/stable": 3, "remote/noisy": 6}
+
+        stops = {s["model_id"]: s for s in env.saved["metadata"]["adaptive"]}
+        assert stops["local/stable"]["reason"] == "converged"
+        assert stops["local/stable"]["runs"] == 3
+        assert stops["remote/noisy"]["reason"] == "max_runs"
+        assert stops["remote/noisy"]["ci_relative_width"] > 0.10
+        # Progress total shrinks when the stable pair stops, so the run ends at 100%
+        assert env.progress[-1] == 100
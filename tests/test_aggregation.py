@@ -0,0 +1,174 @@
+"""Tests for the vectorized aggregation engine.
+
+Covers parity with the statistics module (exclusive quantiles, stdev, IQR
+outliers), bootstrap CI determinism, multi-group aggregation for the CLI and
+job handler, and the stored-result summaries served by history/analytics.
+
+Run: uv run pytest tests/test_aggregation.py -v
+"""
+
+import random
+import statistics
+import time
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+import db
+from aggregation import P50, P95, P99, Q1, Q3, grouped_stats, summarize_result_rows, summarize_runs
+from benchmark import RunResult, Target, aggregate_runs
+
+TARGET = Target(provider="P", model_id="p/m", display_name="M")
+
+
+def _run(tps, ttft=100.0, success=True, **kw):
+    return RunResult(target=TARGET, tokens_per_second=tps, ttft_ms=ttft, total_time_s=1.0,
+                     output_tokens=100, success=success, **kw)
+
+
+class TestGroupedStats:
+
+    @pytest.mark.parametrize("n", range(1, 25))
+    def test_matches_statistics_module(self, n):
+        rng = random.Random(n)
+        vals = [rng.uniform(1, 100) for _ in range(n)]
+        s = grouped_stats(np.array(vals), np.zeros(n, dtype=np.int64), 1,
+                          (P50, P95, P99), outliers=True)
+        assert s[P50][0] == pytest.approx(statistics.median(vals))
+        assert s["mean"][0] == pytest.approx(statistics.mean(vals))
+        if n >= 2:
+            assert s["std"][0] == pytest.approx(statistics.stdev(vals))
+            assert s["pstd"][0] == pytest.approx(statistics.pstdev(vals))
+            assert s[P95][0] == pytest.approx(statistics.quantiles(vals, n=20)[-1])
+            assert s[P99][0] == pytest.approx(statistics.quantiles(vals, n=100)[-1])
+            q1, _, q3 = statistics.quantiles(vals, n=4)
+            assert (s[Q1][0], s[Q3][0]) == pytest.approx((q1, q3))
+
+    def test_groups_are_independent_and_nan_is_ignored(self):
+        values = np.array([1.0, 50.0, np.nan, 3.0, 60.0, 2.0])
+        codes = np.array([0, 1, 1, 0, 1, 0])
+        s = grouped_stats(values, codes, 3)
+        assert list(s["n"]) == [3, 2, 0]
+        assert s["mean"][:2] == pytest.approx([2.0, 55.0])
+        assert (s["min"][0], s["max"][1]) == (1.0, 60.0)
+        assert np.isnan(s["mean"][2])
+
+    def test_outliers_need_four_samples(self):
+        vals = [10.0, 10.0, 11.0, 10.0, 10.0, 11.0, 10.0, 100.0]
+        s = grouped_stats(np.array(vals + [10.0, 100.0, 11.0]), np.array([0] * 8 + [1] * 3), 2, outliers=True)
+        assert list(s["outliers"]) == [1, 0]
+
+    def test_bootstrap_is_deterministic_and_brackets_mean(self):
+        vals = np.array([90.0, 100.0, 110.0, 95.0, 105.0, 102.0])
+        codes = np.zeros(6, dtype=np.int64)
+        a = grouped_stats(vals, codes, 1, bootstrap=True)
+        b = grouped_stats(vals, codes, 1, bootstrap=True)
+        assert (a["ci_low"][0], a["ci_high"][0]) == (b["ci_low"][0], b["ci_high"][0])
+        assert 90.0 < a["ci_low"][0] < a["mean"][0] < a["ci_high"][0] < 110.0
+
+    def test_bootstrap_skips_single_samples(self):
+        s = grouped_stats(np.array([5.0]), np.zeros(1, dtype=np.int64), 1, bootstrap=True)
+        assert np.isnan(s["ci_low"][0])
+
+    def test_many_groups_in_one_pass_is_fast(self):
+        rng = np.random.default_rng(1)
+        codes = np.repeat(np.arange(2000), 20)
+        start = time.perf_counter()
+        s = grouped_stats(rng.normal(100, 10, codes.size), codes, 2000,
+                          (P50, P95), outliers=True, bootstrap=True)
+        assert time.perf_counter() - start < 5.0
+        assert not np.isnan(s["ci_low"]).any()
+
+
+class TestRunAggregation:
+
+    def test_failures_and_defaults(self):
+        runs = [_run(100.0), _run(0.0, success=False, error="boom")]
+        [(key, fields)] = summarize_runs(runs, [0, 0])
+        assert fields["runs"] == 2 and fields["failures"] == 1
+        assert fields["p95_tps"] == 100.0
+        assert fields["confidence_level"] == "low"
+        assert fields["ci_low_tps"] == 0.0
+
+    def test_all_failures_only_count_runs(self):
+        [(_, fields)] = summarize_runs([_run(0.0, success=False)], ["k"])
+        assert fields == {"runs": 1, "failures": 1}
+
+    def test_aggregate_runs_keeps_group_order_and_empty_groups(self):
+        other = Target(provider="P", model_id="p/o", display_name="O")
+        groups = [(other, [_run(50.0), _run(60.0)]), (TARGET, []), (TARGET, [_run(10.0, cost=0.5)])]
+        aggs = aggregate_runs(groups)
+        assert [a.target.model_id for a in aggs] == ["p/o", "p/m", "p/m"]
+        assert aggs[0].avg_tokens_per_second == pytest.approx(55.0)
+        assert 50.0 <= aggs[0].ci_low_tps <= aggs[0].ci_high_tps <= 60.0
+        assert aggs[1].runs == 0
+        assert aggs[2].total_cost == 0.5
+
+    def test_positive_only_speed_averages(self):
+        runs = [_run(100.0, output_speed_tps=120.0, itl_ms=8.0), _run(100.0)]
+        [(_, fields)] = summarize_runs(runs, [0, 0])
+        assert fields["avg_output_speed_tps"] == 120.0
+        assert fields["avg_itl_ms"] == 8.0
+
+
+class TestResultRows:
+
+    def test_rows_per_run_model_tier(self):
+        base = {"model": "M", "provider": "P", "ttft_ms": 100.0, "total_time_s": 1.0}
+        samples = [
+            {**base, "run_id": "r1", "model_id": "m1", "context_tokens": 0, "success": 1,
+             "tokens_per_second": 10.0, "output_speed_tps": 0.0, "cost": 0.1},
+            {**base, "run_id": "r1", "model_id": "m1", "context_tokens": 0, "success": 1,
+             "tokens_per_second": 20.0, "output_speed_tps": 30.0, "cost": 0.3},
+            {**base, "run_id": "r1", "model_id": "m1", "context_tokens": 0, "success": 0,
+             "error": "timeout"},
+            {**base, "run_id": "r1", "model_id": "m2", "context_tokens": 0, "success": 1,
+             "tokens_per_second": 50.0},
+            {**base, "run_id": "r2", "model_id": "m1", "context_tokens": 1000, "success": 0,
+             "error": "boom"},
+        ]
+        by_run = summarize_result_rows(samples)
+        m2, m1 = by_run["r1"]
+        assert m2["model_id"] == "m2"
+        assert (m1["runs"], m1["success_count"], m1["error_count"], m1["error"]) == (3, 2, 1, "timeout")
+        assert m1["avg_tokens_per_second"] == 15.0
+        assert m1["avg_output_speed_tps"] == 20.0      # 0 falls back to tokens_per_second
+        assert m1["std_dev_tps"] == 10.0               # population std
+        assert m1["avg_cost"] == pytest.approx(0.2)
+        assert m1["stall_count"] is None
+        assert m2["std_dev_tps"] == 0
+        [failed] = by_run["r2"]
+        assert failed["avg_tokens_per_second"] is None and failed["success_count"] == 0
+
+
+@pytest_asyncio.fixture
+async def results_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "aggregation.db")
+    await db.init_db()
+    user = await db.create_user("agg@example.com", "pw")
+    model_id = await db.ensure_model_exists(user["id"], "openai/local")
+    run_ids = [await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+               for _ in range(2)]
+    return run_ids, model_id
+
+
+class TestStoredResults:
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_run(self, results_db):
+        run_ids, model_id = results_db
+        for i, run_id in enumerate(run_ids):
+            for n, tps in enumerate([40.0, 44.0, 48.0, 52.0]):
+                await db.save_benchmark_result(
+                    run_id=run_id, model_id=model_id, run_number=n + 1,
+                    tokens_per_second=tps + i, ttft_ms=100.0 + n, total_time_s=1.0, cost=0.01,
+                )
+
+        batch = await db.get_benchmark_results_for_runs(run_ids)
+        assert batch[run_ids[0]] == await db.get_benchmark_results(run_ids[0])
+        row = batch[run_ids[1]][0]
+        assert row["runs"] == 4 and row["avg_tokens_per_second"] == 47.0
+        assert row["p50_ttft_ms"] == 101.5
+        assert row["output_speed_ci_low"] <= 47.0 <= row["output_speed_ci_high"]
+        assert await db.get_benchmark_results("missing") == []
@@ -0,0 +1,149 @@
+"""Tests for immediate cancellation of in-flight benchmark calls.
+
+Covers the cancel watcher, stream closing in async_run_single, and that
+cancelling a standard or mode benchmark aborts the running call instead of
+waiting for it to stream to max_tokens.
+
+Run: uv run pytest tests/test_cancellation.py -v
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import job_handlers
+from benchmark import RunResult, Target
+from routers.helpers import async_run_single
+
+SLOW_CALL_S = 30.0
+
+
+def _target(provider="Local", model_id="openai/m") -> Target:
+    return Target(provider=provider, model_id=model_id, display_name=model_id, api_base="http://h.local/v1")
+
+
+class _EndlessStream:
+    """A stream that yields one chunk and then stalls, like a long generation."""
+
+    def __init__(self):
+        self.closed = False
+        self._sent = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._sent:
+            self._sent = True
+            delta = SimpleNamespace(content="a", reasoning_content=None)
+            return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        await asyncio.sleep(SLOW_CALL_S)
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def _cancel_soon(cancel_event: asyncio.Event, delay: float = 0.05):
+    await asyncio.sleep(delay)
+    cancel_event.set()
+
+
+class TestWatchCancel:
+
+    @pytest.mark.asyncio
+    async def test_cancels_tasks_when_event_set(self):
+        cancel_event = asyncio.Event()
+        tasks = [asyncio.create_task(asyncio.sleep(SLOW_CALL_S)) for _ in range(3)]
+        watcher = job_handlers._watch_cancel(tasks, cancel_event)
+        cancel_event.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(t.cancelled() for t in tasks)
+        assert watcher.done()
+
+    @pytest.mark.asyncio
+    async def test_run_by_provider_aborts_and_still_raises_errors(self):
+        cancel_event = asyncio.Event()
+        started = []
+
+        async def slow(target):
+            started.append(target.model_id)
+            await asyncio.sleep(SLOW_CALL_S)
+
+        asyncio.create_task(_cancel_soon(cancel_event))
+        t0 = time.perf_counter()
+        await job_handlers._run_by_provider([_target("A", "a/1"), _target("A", "a/2"), _target("B", "b/1")],
+                                            slow, cancel_event)
+        assert time.perf_counter() - t0 < 2
+        assert sorted(started) == ["a/1", "b/1"]  # a/2 never started
+
+        async def broken(target):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await job_handlers._run_by_provider([_target()], broken, asyncio.Event())
+
+
+class TestStreamClosedOnCancel:
+
+    @pytest.mark.asyncio
+    async def test_async_run_single_closes_stream(self):
+        stream = _EndlessStream()
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+            task = asyncio.create_task(async_run_single(_target(), "hi", 4096, 0.0))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert stream.closed
+
+
+@pytest.fixture
+def handler_env(benchmark_handler_env, monkeypatch):
+    """Slow benchmark runs for two providers; returns the call log."""
+    log = {"started": 0, "cancelled": 0, "saved": benchmark_handler_env.rows}
+
+    async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+        log["started"] += 1
+        try:
+            await asyncio.sleep(SLOW_CALL_S)
+        except asyncio.CancelledError:
+            log["cancelled"] += 1
+            raise
+        return RunResult(target=t, ttft_ms=10.0, total_time_s=1.0, output_tokens=10, tokens_per_second=10.0)
+
+    monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+    benchmark_handler_env.targets = [_target("A", "a/1"), _target("B", "b/1")]
+    return log
+
+
+class TestHandlerCancellation:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["standard", "decay"])
+    async def test_cancel_aborts_in_flight_runs(self, handler_env, mode):
+        params = {
+            "user_id": "u1",
+            "models": ["a/1", "b/1"],
+            "prompt": "hi",
+            "runs": 3,
+            "warmup": False,
+            "mode": mode,
+        }
+        cancel_event = asyncio.Event()
+        asyncio.create_task(_cancel_soon(cancel_event))
+
+        async def noop(*a, **kw):
+            return None
+
+        t0 = time.perf_counter()
+        run_id = await job_handlers.benchmark_handler("job-c", params, cancel_event, noop)
+
+        assert run_id is None
+        assert time.perf_counter() - t0 < 2
+        assert handler_env["started"] == 2           # one in-flight run per provider
+        assert handler_env["cancelled"] == 2         # both aborted mid-call
+        assert handler_env["saved"] == []
@@ -0,0 +1,154 @@
+"""Tests for bounded per-model case concurrency in the tool-eval engine.
+
+Covers the endpoint-type defaults, the latency-profile suggestion, the
+rate-limit cap, the bounded case runner shared by tool eval, param tune
+and prompt tune, and request validation.
+
+Run: uv run pytest tests/test_case_concurrency.py -v
+"""
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+import routers.helpers as helpers
+from benchmark import Target
+from perf_profiles import PerfProfiles
+from rate_limiter import RateLimitScheduler
+from routers.helpers import CASE_CONCURRENCY_HOSTED, CASE_CONCURRENCY_MAX, _case_concurrency
+from schemas import ParamTuneRequest, PromptTuneRequest, ToolEvalRequest
+
+
+def _target(model_id: str, api_base: str | None = None, provider_key: str | None = None, **kw) -> Target:
+    return Target(provider="P", model_id=model_id, display_name=model_id,
+                  api_base=api_base, provider_key=provider_key, **kw)
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    """Fresh latency profiles and rate-limit state for every test."""
+    store = PerfProfiles()
+    sched = RateLimitScheduler()
+    monkeypatch.setattr(helpers, "perf_profiles", store)
+    monkeypatch.setattr(helpers, "scheduler", sched)
+    return store, sched
+
+
+class TestCaseConcurrency:
+
+    def test_endpoint_type_defaults(self):
+        assert _case_concurrency(_target("ollama/llama3")) == 1
+        assert _case_concurrency(_target("m", provider_key="lm_studio")) == 1
+        assert _case_concurrency(_target("openai/qwen", api_base="http://localhost:1234/v1")) == 1
+        assert _case_concurrency(_target("vllm/qwen", api_base="http://gpu-box:8000/v1")) == 8
+        assert _case_concurrency(_target("gpt-4o")) == CASE_CONCURRENCY_HOSTED
+        assert _case_concurrency(_target("anthropic/claude")) == CASE_CONCURRENCY_HOSTED
+
+    def test_requested_overrides_default(self):
+        assert _case_concurrency(_target("ollama/llama3"), 3) == 3
+        assert _case_concurrency(_target("gpt-4o"), 99) == CASE_CONCURRENCY_MAX
+
+    def test_warm_profile_scales_hosted_default(self, _isolated):
+        store, _ = _isolated
+        for _ in range(30):
+            store.observe("gpt-4o", None, "tool_eval", 500.0)
+            store.observe("ollama/llama3", None, "tool_eval", 500.0)
+        assert _case_concurrency(_target("gpt-4o")) == CASE_CONCURRENCY_MAX
+        assert _case_concurrency(_target("ollama/llama3")) == 1
+
+    def test_rpm_caps_by_littles_law(self, _isolated):
+        store, _ = _isolated
+        # 60 rpm x 2 s assumed latency -> 2 in flight
+        assert _case_concurrency(_target("gpt-4o", rpm=60), 10) == 2
+        for _ in range(30):
+            store.observe("gpt-4o", None, "tool_eval", 6000.0)
+        # 60 rpm x 6 s median -> 6 in flight
+        assert _case_concurrency(_target("gpt-4o", rpm=60), 10) == 6
+        assert _case_concurrency(_target("gpt-4o", rpm=1), 10) == 1
+
+    def test_learned_limit_caps(self, _isolated):
+        _, sched = _isolated
+        target = _target("gpt-4o", api_key="sk-1")
+        key = sched.endpoint_key({"model": "gpt-4o", "api_key": "sk-1"})
+        sched.observe_headers(key, {"x-ratelimit-limit-requests": "30"})
+        assert sched.request_limit({"model": "gpt-4o", "api_key": "sk-1"}) == 30
+        assert _case_concurrency(target, 8) == 1
+        assert sched.request_limit({"model": "gpt-4o", "api_key": "other"}) is None
+
+
+class TestRunCases:
+
+    @pytest.mark.asyncio
+    async def test_bounded_and_ordered(self):
+        in_flight = {"now": 0, "peak": 0}
+        streamed = []
+
+        async def run_case(case):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(case["delay"])
+            in_flight["now"] -= 1
+            return {"test_case_id": case["id"]}
+
+        async def on_result(result):
+            streamed.append(result["test_case_id"])
+
+        cases = [{"id": i, "delay": d} for i, d in enumerate([0.05, 0.01, 0.03, 0.01, 0.02])]
+        results = await job_handlers._run_cases(cases, run_case, 3, asyncio.Event(), on_result=on_result)
+
+        assert in_flight["peak"] == 3
+        assert [r["test_case_id"] for r in results] == [0, 1, 2, 3, 4]
+        assert sorted(streamed) == [0, 1, 2, 3, 4] and streamed[0] == 1 and streamed[-1] == 0
+
+    @pytest.mark.asyncio
+    async def test_serial_when_concurrency_is_one(self):
+        order = []
+
+        async def run_case(case):
+            order.append(("start", case))
+            await asyncio.sleep(0)
+            order.append(("end", case))
+            return case
+
+        assert await job_handlers._run_cases([1, 2], run_case, 1, asyncio.Event()) == [1, 2]
+        assert order == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_new_cases(self):
+        cancel = asyncio.Event()
+        started = []
+
+        async def run_case(case):
+            started.append(case)
+            if case == 1:
+                cancel.set()
+            return case
+
+        results = await job_handlers._run_cases(list(range(10)), run_case, 2, cancel)
+        assert len(started) <= 3 and results == sorted(started)
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate(self):
+        async def run_case(case):
+            if case == 2:
+                raise RuntimeError("boom")
+            await asyncio.sleep(0.01)
+            return case
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await job_handlers._run_cases([1, 2, 3], run_case, 2, asyncio.Event())
+
+
+class TestRequests:
+
+    def test_case_concurrency_bounds(self):
+        assert ToolEvalRequest(suite_id="s", models=["m"]).case_concurrency is None
+        assert ParamTuneRequest(suite_id="s", models=["m"], search_space={}, case_concurrency=8).case_concurrency == 8
+        assert PromptTuneRequest(suite_id="s", mode="quick", target_models=["m"], meta_model="x",
+                                 case_concurrency=1).case_concurrency == 1
+        with pytest.raises(ValidationError):
+            ToolEvalRequest(suite_id="s", models=["m"], case_concurrency=0)
+        with pytest.raises(ValidationError):
+            ToolEvalRequest(suite_id="s", models=["m"], case_concurrency=17)
@@ -0,0 +1,149 @@
+"""Tests for opt-in per-chunk arrival timelines and ITL distributions.
+
+Covers the packed float32 blob format, ITL/stall statistics, timeline
+capture in async_run_single (mocked stream), and blob persistence.
+
+Run: uv run pytest tests/test_chunk_timeline.py -v
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+
+import db
+from benchmark import (
+    Target,
+    chunk_timeline_stats,
+    pack_chunk_timeline,
+    unpack_chunk_timeline,
+)
+from routers.helpers import async_run_single
+
+
+def _chunk(content=None, usage=None):
+    delta = SimpleNamespace(content=content, reasoning_content=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)] if content is not None else [], usage=usage)
+
+
+class _FakeStream:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop(0)
+
+
+def _target():
+    return Target(provider="Local", model_id="openai/local", display_name="Local")
+
+
+# ---------------------------------------------------------------------------
+# Blob format
+# ---------------------------------------------------------------------------
+
+class TestPackedTimeline:
+
+    def test_roundtrip_deltas(self):
+        blob = pack_chunk_timeline([0.2, 0.25, 0.3, 0.9])
+        assert unpack_chunk_timeline(blob) == pytest.approx([200, 50, 50, 600], abs=0.01)
+
+    def test_four_bytes_per_chunk(self):
+        assert len(pack_chunk_timeline([0.1 * i for i in range(1, 1001)])) == 4000
+
+    def test_empty(self):
+        assert pack_chunk_timeline([]) == b""
+        assert unpack_chunk_timeline(b"") == []
+
+
+class TestTimelineStats:
+
+    def test_first_delta_is_ttft_and_excluded(self):
+        stats = chunk_timeline_stats([5000, 10, 10, 10])
+        assert stats["itl_p99_ms"] == pytest.approx(10)
+        assert stats["max_stall_ms"] == 10
+        assert stats["stall_count"] == 0
+
+    def test_stalls_counted_above_threshold(self):
+        deltas = [100] + [20] * 97 + [400, 900]
+        stats = chunk_timeline_stats(deltas, stall_threshold_ms=250)
+        assert stats["stall_count"] == 2
+        assert stats["max_stall_ms"] == 900
+        assert stats["itl_p50_ms"] == 20
+        assert stats["itl_p99_ms"] > stats["itl_p90_ms"]
+
+    def test_single_chunk(self):
+        stats = chunk_timeline_stats([120])
+        assert stats == {"itl_p50_ms": 0.0, "itl_p90_ms": 0.0, "itl_p99_ms": 0.0,
+                         "max_stall_ms": 0.0, "stall_count": 0}
+
+
+# ---------------------------------------------------------------------------
+# Capture in async_run_single
+# ---------------------------------------------------------------------------
+
+class TestAsyncRunSingleTimeline:
+
+    @pytest.mark.asyncio
+    async def test_capture_off_by_default(self):
+        stream = _FakeStream([_chunk("a"), _chunk("b")])
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+            result = await async_run_single(_target(), "hi", 16, 0.0)
+        assert result.success
+        assert result.chunk_timeline is None
+        assert result.stall_count == 0
+
+    @pytest.mark.asyncio
+    async def test_capture_records_every_content_chunk(self):
+        usage = SimpleNamespace(completion_tokens=3, prompt_tokens=5)
+        stream = _FakeStream([_chunk("a"), _chunk("b"), _chunk("c"), _chunk(usage=usage)])
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+            result = await async_run_single(_target(), "hi", 16, 0.0, capture_timeline=True)
+        assert result.success
+        assert len(unpack_chunk_timeline(result.chunk_timeline)) == 3
+        assert result.output_tokens == 3
+        assert result.itl_ms >= 0
+        assert result.output_speed_tps > 0
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+@pytest_asyncio.fixture
+async def timeline_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "timeline.db")
+    await db.init_db()
+    user = await db.create_user("timeline@example.com", "pw")
+    model_id = await db.ensure_model_exists(user["id"], "openai/local")
+    run_id = await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+    return run_id, model_id
+
+
+class TestTimelinePersistence:
+
+    @pytest.mark.asyncio
+    async def test_blob_saved_and_listed(self, timeline_db):
+        run_id, model_id = timeline_db
+        blob = pack_chunk_timeline([0.1, 0.2, 0.5])
+        await db.save_benchmark_result(
+            run_id=run_id, model_id=model_id, run_number=1, ttft_ms=100.0,
+            chunk_timeline=blob, itl_p50_ms=200.0, itl_p90_ms=280.0, itl_p99_ms=298.0,
+            max_stall_ms=300.0, stall_count=1,
+        )
+        await db.save_benchmark_result(run_id=run_id, model_id=model_id, run_number=2, ttft_ms=90.0)
+
+        rows = await db.get_benchmark_timelines(run_id)
+        assert len(rows) == 1
+        assert unpack_chunk_timeline(rows[0]["chunk_timeline"]) == pytest.approx([100, 100, 300], abs=0.01)
+        assert rows[0]["model_id"] == "openai/local"
+
+        agg = await db.get_benchmark_results(run_id)
+        assert agg[0]["max_stall_ms"] == 300.0
+        assert agg[0]["stall_count"] == 1
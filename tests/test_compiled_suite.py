@@ -0,0 +1,155 @@
+"""Tests for compiled tool suites and their per-process LRU.
+
+Covers case/tool pre-parsing, scoring parity between compiled and raw
+cases in run_single_eval, and cache hits, invalidation on suite edits and
+eviction in get_compiled_suite.
+
+Run: uv run pytest tests/test_compiled_suite.py -v
+"""
+
+import json
+import re
+
+import litellm
+import pytest
+import pytest_asyncio
+
+import db
+import routers.tool_eval as tool_eval
+import tool_eval_scoring
+from benchmark import Target
+from routers.tool_eval import run_single_eval
+from tool_eval_scoring import compile_schema, compile_suite, get_compiled_suite
+
+TOOL_DEFS = [
+    {"name": "Get_Weather", "description": "",
+     "parameters_schema": json.dumps({"type": "object", "properties": {"city": {"type": "string"}},
+                                      "required": ["city"]})},
+    {"name": "search", "description": "", "parameters_schema": "not json"},
+]
+CASES = [
+    {"id": "c1", "prompt": "Weather in Paris?", "expected_tool": "get_weather",
+     "expected_params": '{"city": "Paris"}', "scoring_config_json": '{"mode": "contains"}',
+     "multi_turn_config": None, "should_call_tool": True},
+    {"id": "c2", "prompt": "Either", "expected_tool": '["get_weather", "search"]', "expected_params": None,
+     "scoring_config_json": None, "multi_turn_config": '{"multi_turn": true, "max_rounds": 2}'},
+    {"id": "c3", "prompt": "Broken", "expected_tool": "search", "expected_params": "{bad",
+     "scoring_config_json": None, "multi_turn_config": "{bad"},
+]
+
+
+class TestCompileSuite:
+
+    def test_cases_and_tool_index(self):
+        suite = compile_suite("s1", "v1", TOOL_DEFS, CASES)
+        assert [t["function"]["name"] for t in suite.tools] == ["Get_Weather", "search"]
+        assert suite.tool_names == {"get_weather", "search"}
+        assert "search" in suite.validators and suite.validators["search"] is None
+        weather = json.loads(TOOL_DEFS[0]["parameters_schema"])
+        assert suite.validator_for("GET_WEATHER", None) is compile_schema(weather)
+        assert suite.validator_for(["get_weather", "search"], "search") is None
+        assert suite.validator_for(None, None) is None
+
+        c1, c2, c3 = suite.cases
+        assert c1["_expected_params"] == {"city": "Paris"} and c1["_scoring_config"] == {"mode": "contains"}
+        assert c1["expected_params"] == '{"city": "Paris"}'  # raw columns are kept
+        assert c1["_mt_config"] is None and not c1["_mt_config_invalid"]
+        assert c2["_expected_tool"] == ["get_weather", "search"] and c2["_mt_config"]["max_rounds"] == 2
+        assert c3["_expected_params"] is None and c3["_mt_config"] is None and c3["_mt_config_invalid"]
+
+    @pytest.mark.asyncio
+    async def test_compiled_case_scores_like_raw_row(self, monkeypatch):
+        async def fake(target, kwargs, *a, **kw):
+            return litellm.ModelResponse(choices=[{"index": 0, "finish_reason": "tool_calls", "message": {
+                "role": "assistant", "content": None,
+                "tool_calls": [{"id": "t", "type": "function",
+                                "function": {"name": "get_weather", "arguments": '{"city": "Paris, FR", "x": 1}'}}],
+            }}]), 0.0
+
+        monkeypatch.setattr(tool_eval, "_scheduled_completion", fake)
+        target = Target(provider="OpenAI", model_id="gpt-4o", display_name="GPT-4o")
+        suite = compile_suite("s1", "v1", TOOL_DEFS, CASES)
+        raw = await run_single_eval(target, suite.tools, CASES[0], 0.0)
+        compiled = await run_single_eval(target, suite.tools, suite.cases[0], 0.0, suite=suite)
+        for key in ("param_accuracy", "schema_score", "hallucination_free", "overall_score", "error_type",
+                    "format_compliance", "expected_params"):
+            assert compiled[key] == raw[key], key
+        assert compiled["param_accuracy"] == 1.0 and compiled["hallucination_free"] < 1.0
+
+
+@pytest_asyncio.fixture
+async def owner(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "compiled.db")
+    monkeypatch.setattr(tool_eval_scoring, "_compiled_suites", type(tool_eval_scoring._compiled_suites)())
+    await db.init_db()
+    return (await db.create_user("compiled@example.com", "pw"))["id"]
+
+
+@pytest_asyncio.fixture
+async def suite_id(owner):
+    sid = await db.create_tool_suite(owner, "Weather", "")
+    await db.create_tool_definitions_batch(sid, TOOL_DEFS[:1])
+    await db.create_test_case(sid, "Weather in Paris?", "Get_Weather", '{"city": "Paris"}')
+    return sid
+
+
+class TestCompiledSuiteCache:
+
+    @pytest.mark.asyncio
+    async def test_reused_until_suite_changes(self, suite_id, owner, monkeypatch):
+        loads = []
+        real = db.get_test_cases
+
+        async def counting(sid):
+            loads.append(sid)
+            return await real(sid)
+
+        monkeypatch.setattr(db, "get_test_cases", counting)
+        first = await get_compiled_suite(suite_id, owner)
+        assert await get_compiled_suite(suite_id, owner) is first and len(loads) == 1
+
+        case_id = first.cases[0]["id"]
+        await db.update_test_case(case_id, suite_id, scoring_config_json='{"mode": "contains"}')
+        second = await get_compiled_suite(suite_id, owner)
+        assert second is not first and second.cases[0]["_scoring_config"] == {"mode": "contains"}
+
+        await db.create_test_case(suite_id, "Another", "Get_Weather", None)
+        third = await get_compiled_suite(suite_id, owner)
+        assert len(third.cases) == 2
+
+        await db.delete_tool_definitions_for_suite(suite_id)
+        assert (await get_compiled_suite(suite_id, owner)).tool_names == frozenset()
+        await db.delete_test_case(case_id, suite_id)
+        assert len((await get_compiled_suite(suite_id, owner)).cases) == 1
+        assert len(loads) == 5
+
+    @pytest.mark.asyncio
+    async def test_every_writer_stamps_milliseconds(self, suite_id, owner):
+        stamps = [await db.get_tool_suite_version(suite_id, owner)]
+        user = await db.create_user("compiled-3@example.com", "pw")
+        other = await db.create_tool_suite(user["id"], "Other", "")
+        stamps.append(await db.get_tool_suite_version(other, user["id"]))
+        await db.update_tool_suite(other, user["id"], name="Renamed")
+        stamps.append(await db.get_tool_suite_version(other, user["id"]))
+        assert all(re.fullmatch(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3}", s) for s in stamps)
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, suite_id, owner, monkeypatch):
+        monkeypatch.setattr(tool_eval_scoring, "COMPILED_SUITE_CACHE_SIZE", 1)
+        user = await db.create_user("compiled-2@example.com", "pw")
+        other = await db.create_tool_suite(user["id"], "Other", "")
+
+        await get_compiled_suite(suite_id, owner)
+        await get_compiled_suite(other, user["id"])
+        assert list(tool_eval_scoring._compiled_suites) == [other]
+
+    @pytest.mark.asyncio
+    async def test_unknown_suite_is_not_cached(self, suite_id, owner):
+        assert await get_compiled_suite("missing", owner) is None
+        assert "missing" not in tool_eval_scoring._compiled_suites
+
+    @pytest.mark.asyncio
+    async def test_other_users_suite_is_not_served(self, suite_id, owner):
+        intruder = await db.create_user("compiled-4@example.com", "pw")
+        assert await get_compiled_suite(suite_id, owner) is not None  # now cached
+        assert await get_compiled_suite(suite_id, intruder["id"]) is None
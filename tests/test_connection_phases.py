@@ -0,0 +1,117 @@
+"""Tests for connection-phase timing (DNS, TCP, TLS, server wait, first byte).
+
+Covers the phase recorder, per-provider client selection, a real
+keep-alive round trip through LiteLLM against a local SSE server
+(cold vs reused connection), and persistence of the phase columns.
+
+Run: uv run pytest tests/test_connection_phases.py -v
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+
+import db
+from benchmark import Target
+from http_clients import ConnectionPhases, litellm_client
+from routers.helpers import async_run_single
+from tests.conftest import SSE_SERVER_DELAY_S
+
+
+class TestConnectionPhases:
+
+    def test_durations_from_marks(self):
+        phases = ConnectionPhases()
+        phases.begin(10.0)
+        phases.marks.update({
+            "dns_start": 10.0, "dns_end": 10.002, "connect_start": 10.0, "connect_end": 10.005,
+            "tls_start": 10.005, "tls_end": 10.015, "request_sent": 10.016,
+            "first_byte": 10.216, "stream_end": 11.0,
+        })
+        d = phases.durations()
+        assert d["dns_ms"] == 2.0 and d["connect_ms"] == 3.0 and d["tls_ms"] == 10.0
+        assert d["request_sent_ms"] == 16.0 and d["server_wait_ms"] == 200.0
+        assert d["first_byte_ms"] == 216.0 and d["stream_end_ms"] == 1000.0
+        assert d["connection_reused"] is False
+
+    def test_nothing_traced(self):
+        phases = ConnectionPhases()
+        phases.begin()
+        d = phases.durations()
+        assert d["connection_reused"] is None and d["first_byte_ms"] is None
+
+    @pytest.mark.asyncio
+    async def test_client_selection_per_provider(self):
+        base = {"api_base": "http://h.local/v1", "api_key": "k"}
+        openai_client = litellm_client({"model": "openai/x", **base})
+        assert type(openai_client).__name__ == "AsyncOpenAI"
+        assert litellm_client({"model": "openai/y", **base}) is openai_client
+        assert litellm_client({"model": "openai/x", **base, "api_key": "k2"}) is not openai_client
+        assert type(litellm_client({"model": "anthropic/claude-x", "api_key": "k"})).__name__ == "AsyncHTTPHandler"
+        assert litellm_client({"model": "gemini/gemini-pro", "api_key": "k"}) is None
+
+
+class TestRunSinglePhases:
+
+    @pytest.mark.asyncio
+    async def test_cold_then_reused_connection(self, sse_server):
+        port, connections = sse_server
+        target = Target(provider="Local", model_id="openai/test-model", display_name="T",
+                        api_base=f"http://localhost:{port}/v1", api_key="sk-test")
+
+        cold = await async_run_single(target, "hi", 16, 0.0, capture_phases=True)
+        warm = await async_run_single(target, "hi", 16, 0.0, capture_phases=True)
+
+        assert cold.success and warm.success
+        assert cold.output_tokens == 2
+        assert cold.connection_reused is False
+        assert cold.dns_ms is not None and cold.connect_ms is not None
+        assert cold.tls_ms is None  # plain http
+        assert cold.server_wait_ms >= SSE_SERVER_DELAY_S * 1000 * 0.9
+        assert cold.request_sent_ms <= cold.first_byte_ms <= cold.stream_end_ms
+
+        assert warm.connection_reused is True
+        assert warm.dns_ms is None and warm.connect_ms is None
+        assert warm.server_wait_ms >= SSE_SERVER_DELAY_S * 1000 * 0.9
+        assert len(connections) == 1
+
+    @pytest.mark.asyncio
+    async def test_off_with_pool_disabled(self, monkeypatch):
+        monkeypatch.setattr("http_clients.POOL_ENABLED", False)
+        mock = AsyncMock(side_effect=RuntimeError("no network"))
+        target = Target(provider="Local", model_id="openai/m", display_name="M", api_base="http://h.local/v1")
+        with patch("litellm.acompletion", mock):
+            result = await async_run_single(target, "hi", 16, 0.0)
+        assert "client" not in mock.call_args.kwargs
+        assert result.connection_reused is None and result.dns_ms is None
+
+
+@pytest_asyncio.fixture
+async def phases_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "phases.db")
+    await db.init_db()
+    user = await db.create_user("phases@example.com", "pw")
+    model_id = await db.ensure_model_exists(user["id"], "openai/local")
+    run_id = await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+    return run_id, model_id
+
+
+class TestPhasePersistence:
+
+    @pytest.mark.asyncio
+    async def test_phase_averages_in_results(self, phases_db):
+        run_id, model_id = phases_db
+        await db.save_benchmark_result(
+            run_id=run_id, model_id=model_id, run_number=1, tokens_per_second=10.0,
+            dns_ms=4.0, connect_ms=2.0, server_wait_ms=300.0, first_byte_ms=310.0, connection_reused=False,
+        )
+        await db.save_benchmark_result(
+            run_id=run_id, model_id=model_id, run_number=2, tokens_per_second=10.0,
+            server_wait_ms=100.0, first_byte_ms=101.0, connection_reused=True,
+        )
+        [row] = await db.get_benchmark_results(run_id)
+        assert row["avg_dns_ms"] == 4.0
+        assert row["avg_server_wait_ms"] == 200.0
+        assert row["cold_connections"] == 1
+        assert row["avg_tls_ms"] is None
@@ -0,0 +1,104 @@
+"""Tests for the pre-tokenized, memory-mapped context corpus.
+
+Uses a tiny whitespace "encoding" so the index can be exercised without
+downloading tiktoken's BPE files.
+
+Run: uv run pytest tests/test_corpus_index.py -v
+"""
+
+import re
+
+import pytest
+
+import benchmark as bm
+
+
+class _WordEncoding:
+    """Minimal stand-in for a tiktoken Encoding (encode + token bytes)."""
+
+    name = "words"
+
+    def __init__(self):
+        self._vocab: dict[str, int] = {}
+        self._pieces: list[str] = []
+
+    def encode(self, text):
+        ids = []
+        for piece in re.findall(r"\s*\S+|\s+", text):
+            if piece not in self._vocab:
+                self._vocab[piece] = len(self._pieces)
+                self._pieces.append(piece)
+            ids.append(self._vocab[piece])
+        return ids
+
+    def decode_single_token_bytes(self, token):
+        return self._pieces[token].encode("utf-8")
+
+
+TEXT = " ".join(f"word{i} café." for i in range(500))
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(bm, "CORPUS_CACHE_DIR", tmp_path / "corpus_cache")
+    return tmp_path / "corpus_cache"
+
+
+class TestCorpusIndex:
+
+    def test_build_writes_mmap_arrays(self, cache_dir):
+        index = bm._build_corpus_index(TEXT, _WordEncoding())
+        files = sorted(p.name for p in cache_dir.iterdir())
+        assert len(files) == 2
+        assert files[0].endswith(".offsets.u32") and files[1].endswith(".tokens.u32")
+        assert isinstance(index.tokens, memoryview)
+        assert len(index.offsets) == len(index) + 1
+        assert index.offsets[-1] == len(TEXT.encode("utf-8"))
+
+    def test_reload_from_disk(self, cache_dir):
+        first = bm._build_corpus_index(TEXT, _WordEncoding())
+        second = bm._build_corpus_index(TEXT, _WordEncoding())
+        assert list(first.tokens) == list(second.tokens)
+
+    def test_window_matches_token_slice(self, cache_dir):
+        enc = _WordEncoding()
+        index = bm._build_corpus_index(TEXT, enc)
+        expected = "".join(enc._pieces[t] for t in index.tokens[10:30])
+        assert index.window(10, 20) == expected
+
+    def test_window_wraps_past_end(self, cache_dir):
+        index = bm._build_corpus_index(TEXT, _WordEncoding())
+        text = index.window(len(index) - 2, 4)
+        assert text == " word499 café.word0 café."
+
+    def test_unwritable_cache_dir_falls_back_to_memory(self, tmp_path, monkeypatch):
+        blocker = tmp_path / "file"
+        blocker.write_text("x")
+        monkeypatch.setattr(bm, "CORPUS_CACHE_DIR", blocker / "sub")
+        index = bm._build_corpus_index(TEXT, _WordEncoding())
+        assert not isinstance(index.tokens, memoryview)
+        assert index.window(0, 2) == "word0 café."
+
+
+class TestRandomizedWindows:
+
+    def test_seeded_offsets_are_reproducible(self):
+        assert bm.generate_context_text(300, seed=7) == bm.generate_context_text(300, seed=7)
+
+    def test_runs_use_distinct_offsets(self):
+        texts = {bm.generate_context_text(300) for _ in range(5)}
+        assert len(texts) > 1
+
+    def test_different_seeds_differ(self):
+        assert bm.generate_context_text(300, seed=1) != bm.generate_context_text(300, seed=2)
+
+    def test_load_corpus_builds_the_index_once(self, cache_dir, monkeypatch):
+        enc = _WordEncoding()
+        for name in ("_CORPUS_TEXT", "_CORPUS_TOKENS", "_CORPUS_ENC", "_CORPUS_INDEX"):
+            monkeypatch.setattr(bm, name, None)
+        monkeypatch.setattr(bm.tiktoken, "get_encoding", lambda name: enc)
+        index = bm._corpus_index()
+        assert index is not None and index.tokens is bm._CORPUS_TOKENS
+        assert bm._corpus_index() is index
+        text = bm.generate_context_text(20, seed=3)
+        assert text and text in bm._CORPUS_TEXT + bm._CORPUS_TEXT
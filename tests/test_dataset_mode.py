@@ -0,0 +1,263 @@
+"""Tests for the prompt-dataset benchmark mode.
+
+Covers record validation, the streaming upload writer, seeded sampling
+with and without replacement, length-bucket summaries, request
+validation, the dataset endpoints and the benchmark_handler dispatch for
+mode="dataset".
+
+Run: uv run pytest tests/test_dataset_mode.py -v
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+import prompt_datasets
+from benchmark import RunResult, Target
+from prompt_datasets import (
+    DatasetTooLarge,
+    length_bucket,
+    parse_record,
+    sample_dataset,
+    sample_indices,
+    write_dataset,
+)
+from benchmark_modes import _summarize_dataset_buckets
+from schemas import BenchmarkRequest
+
+
+async def _chunks(data: bytes, size: int = 7):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _jsonl(*records) -> bytes:
+    return ("\n".join(json.dumps(r) for r in records) + "\n").encode()
+
+
+class TestParseRecord:
+
+    def test_prompt_messages_and_nested_body(self):
+        assert parse_record('{"prompt": "hi", "max_tokens": 9}', 1) == {"prompt": "hi", "max_tokens": 9}
+        msgs = [{"role": "user", "content": "x"}]
+        assert parse_record(json.dumps({"body": {"messages": msgs}}), 1) == {"messages": msgs}
+        assert parse_record("   ", 1) is None
+
+    @pytest.mark.parametrize("line, error", [
+        ("{", "Line 3: invalid JSON"),
+        ('{"prompt": ""}', "non-empty 'prompt'"),
+        ('{"messages": []}', "'messages' must be a non-empty list"),
+        ('{"messages": [{"content": "x"}]}', "needs a 'role'"),
+        ('{"prompt": "x", "max_tokens": 0}', "max_tokens"),
+    ])
+    def test_errors_name_the_line(self, line, error):
+        with pytest.raises(ValueError, match=error):
+            parse_record(line, 3)
+
+
+class TestWriteDataset:
+
+    @pytest.mark.asyncio
+    async def test_streams_lines_split_across_chunks(self, tmp_path):
+        data = _jsonl({"prompt": "a" * 100}, {"prompt": "b" * 4000}) + b"\n" + b'{"prompt": "no newline"}'
+        path = tmp_path / "u" / "d.jsonl"
+        info = await write_dataset(_chunks(data), path)
+        assert info["prompt_count"] == 3 and info["size_bytes"] == len(data)
+        assert info["input_buckets"] == {"<=128": 2, "<=2048": 1}
+        assert [json.loads(line)["prompt"][:1] for line in path.read_text().splitlines()] == ["a", "b", "n"]
+
+    @pytest.mark.asyncio
+    async def test_bad_line_leaves_nothing_behind(self, tmp_path):
+        path = tmp_path / "d.jsonl"
+        with pytest.raises(ValueError, match="Line 2"):
+            await write_dataset(_chunks(_jsonl({"prompt": "ok"}) + b"nope\n"), path)
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_parsing_runs_off_the_event_loop(self, tmp_path, monkeypatch):
+        threads = set()
+        real_parse = prompt_datasets.parse_record
+
+        def tracking_parse(line, line_no):
+            threads.add(threading.get_ident())
+            return real_parse(line, line_no)
+
+        monkeypatch.setattr(prompt_datasets, "parse_record", tracking_parse)
+        await write_dataset(_chunks(_jsonl({"prompt": "a"}, {"prompt": "b"})), tmp_path / "d.jsonl")
+        assert threads and threading.get_ident() not in threads
+
+    @pytest.mark.asyncio
+    async def test_size_limit_and_empty(self, tmp_path):
+        with pytest.raises(DatasetTooLarge):
+            await write_dataset(_chunks(_jsonl(*[{"prompt": "x"}] * 10)), tmp_path / "big.jsonl", max_bytes=50)
+        with pytest.raises(ValueError, match="no prompts"):
+            await write_dataset(_chunks(b"\n\n"), tmp_path / "empty.jsonl")
+
+
+class TestSampling:
+
+    def test_without_replacement_is_distinct_and_capped(self):
+        draw = sample_indices(10, 25, replace=False, seed=1)
+        assert sorted(draw) == list(range(10))
+        assert sample_indices(10, 4, replace=False, seed=1) == sample_indices(10, 4, replace=False, seed=1)
+
+    def test_with_replacement_repeats(self):
+        draw = sample_indices(3, 30, replace=True, seed=2)
+        assert len(draw) == 30 and len(set(draw)) <= 3
+
+    def test_sample_dataset_keeps_draw_order(self, tmp_path):
+        path = tmp_path / "d.jsonl"
+        path.write_text("".join(json.dumps({"prompt": f"p{i}"}) + "\n" for i in range(20)))
+        records = sample_dataset(path, 20, 5, replace=False, seed=3)
+        expected = sample_indices(20, 5, replace=False, seed=3)
+        assert [r["index"] for r in records] == [i + 1 for i in expected]
+        assert [r["prompt"] for r in records] == [f"p{i}" for i in expected]
+
+        repeated = sample_dataset(path, 20, 40, replace=True, seed=4)
+        assert len(repeated) == 40
+
+
+class TestBucketSummary:
+
+    def test_length_bucket_edges(self):
+        assert [length_bucket(n) for n in (0, 128, 129, 32768, 40000)] == [
+            "<=128", "<=128", "<=512", "<=32768", ">32768",
+        ]
+
+    def test_stratifies_by_input_and_output(self):
+        def item(inp, out, tps, success=True):
+            return {"dataset_input_tokens": inp, "output_tokens": out, "output_speed_tps": tps,
+                    "ttft_ms": 100.0, "input_tokens_per_second": 1000.0, "success": success}
+
+        summary = _summarize_dataset_buckets([
+            item(1000, 100, 50.0), item(1500, 300, 40.0), item(100, 100, 80.0), item(100, 0, 0.0, success=False),
+        ])
+        assert (summary["runs"], summary["successes"]) == (4, 3)
+        assert [b["input_bucket"] for b in summary["by_input"]] == ["<=128", "<=2048"]
+        small, large = summary["by_input"]
+        assert (small["runs"], small["successes"], small["avg_output_tps"]) == (2, 1, 80.0)
+        assert large["avg_output_tps"] == 45.0 and large["avg_input_tokens"] == 1250.0
+        assert [b["output_bucket"] for b in summary["by_output"]] == ["<=128", "<=512"]
+        cells = {(c["input_bucket"], c["output_bucket"]): c["runs"] for c in summary["by_input_output"]}
+        assert cells == {("<=128", "<=128"): 1, ("<=2048", "<=128"): 1, ("<=2048", "<=512"): 1}
+
+
+class TestDatasetRequest:
+
+    def test_dataset_mode_requires_id(self):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="dataset")
+        req = BenchmarkRequest(models=["m"], mode="dataset", dataset_id="d1", dataset_replace=True)
+        assert (req.dataset_samples, req.dataset_replace) == (50, True)
+
+    @pytest.mark.asyncio
+    async def test_upload_list_delete(self, app_client, auth_headers, tmp_path, monkeypatch):
+        monkeypatch.setattr(prompt_datasets, "DATASETS_DIR", tmp_path)
+        body = _jsonl({"prompt": "one"}, {"messages": [{"role": "user", "content": "two"}]})
+        resp = await app_client.post("/api/benchmark/datasets?name=mix", content=body, headers=auth_headers)
+        assert resp.status_code == 200
+        ds = resp.json()
+        assert ds["name"] == "mix" and ds["prompt_count"] == 2
+        assert ds["stats"]["input_buckets"] == {"<=128": 2}
+        stored = list(tmp_path.rglob("*.jsonl"))
+        assert [p.stem for p in stored] == [ds["id"]]
+
+        listed = await app_client.get("/api/benchmark/datasets", headers=auth_headers)
+        assert ds["id"] in [d["id"] for d in listed.json()["datasets"]]
+
+        bad = await app_client.post("/api/benchmark/datasets", content=b"{\n", headers=auth_headers)
+        assert bad.status_code == 400 and "Line 1" in bad.json()["error"]
+
+        missing = await app_client.post(
+            "/api/benchmark", json={"models": ["m"], "mode": "dataset", "dataset_id": "nope"}, headers=auth_headers,
+        )
+        assert missing.status_code == 404
+
+        gone = await app_client.delete(f"/api/benchmark/datasets/{ds['id']}", headers=auth_headers)
+        assert gone.status_code == 200 and not stored[0].exists()
+        again = await app_client.delete(f"/api/benchmark/datasets/{ds['id']}", headers=auth_headers)
+        assert again.status_code == 404
+
+
+class TestDatasetBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_runs_same_sample_per_model(self, monkeypatch, tmp_path, benchmark_handler_env):
+        env = benchmark_handler_env
+        targets = [
+            Target(provider="A", model_id="a/m", display_name="A", provider_key="a"),
+            Target(provider="B", model_id="b/m", display_name="B", provider_key="b"),
+        ]
+        calls = []
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            calls.append((t.model_id, prompt, max_tokens, kw.get("replay_messages")))
+            return RunResult(target=t, ttft_ms=20.0, total_time_s=0.5, output_tokens=max_tokens,
+                             input_tokens=0, tokens_per_second=100.0, output_speed_tps=100.0)
+
+        async def fake_get_dataset(dataset_id, user_id):
+            return {"id": dataset_id, "name": "mix", "prompt_count": 4} if dataset_id == "ds1" else None
+
+        monkeypatch.setattr(prompt_datasets, "DATASETS_DIR", tmp_path)
+        path = prompt_datasets.dataset_path("u1", "ds1")
+        path.parent.mkdir(parents=True)
+        path.write_text("".join(json.dumps(r) + "\n" for r in [
+            {"prompt": "short", "max_tokens": 8},
+            {"prompt": "x" * 2000},
+            {"messages": [{"role": "user", "content": "chat"}], "max_tokens": 600},
+            {"prompt": "four"},
+        ]))
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = targets
+        monkeypatch.setattr(job_handlers.db, "get_prompt_dataset", fake_get_dataset)
+
+        params = {
+            "user_id": "u1",
+            "models": ["a/m", "b/m"],
+            "mode": "dataset",
+            "max_tokens": 100,
+            "warmup": False,
+            "dataset_id": "ds1",
+            "dataset_samples": 10,
+            "dataset_seed": 5,
+        }
+        run_id = await job_handlers.benchmark_handler("job-d", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["prompt"] == "Dataset mix: 4 prompts"
+        assert env.saved["config"]["dataset"] == {
+            "id": "ds1", "name": "mix", "prompt_count": 4, "samples": 4, "replace": False, "seed": 5,
+        }
+        per_model = {m: [c[1:] for c in calls if c[0] == m] for m in ("a/m", "b/m")}
+        assert per_model["a/m"] == per_model["b/m"] and len(per_model["a/m"]) == 4
+        assert ("", 600, [{"role": "user", "content": "chat"}]) in per_model["a/m"]
+        assert ("x" * 2000, 100, None) in per_model["a/m"]
+        assert len(env.rows) == 8
+
+        summaries = env.saved["metadata"]["dataset_buckets"]
+        assert sorted(s["model_id"] for s in summaries) == ["a/m", "b/m"]
+        assert [b["input_bucket"] for b in summaries[0]["by_input"]] == ["<=128", "<=512"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_dataset_fails(self, monkeypatch):
+        sent = []
+
+        async def missing(*a):
+            return None
+
+        class _WS:
+            async def send_to_user(self, user_id, payload):
+                sent.append(payload)
+
+        monkeypatch.setattr(job_handlers.db, "get_prompt_dataset", missing)
+        monkeypatch.setattr(job_handlers, "ws_manager", _WS())
+        result = await job_handlers._run_dataset_benchmark(
+            "job-x", {"user_id": "u1", "dataset_id": "nope"}, [], "", {}, {}, {}, asyncio.Event(), None,
+        )
+        assert result is None
+        assert sent == [{"type": "job_failed", "job_id": "job-x", "error": "Prompt dataset not found"}]
@@ -0,0 +1,177 @@
+"""Tests for the long-generation decay benchmark mode.
+
+Covers per-window decode speeds from chunk arrivals, the decay slope, the
+float32 window blob, forced-length provider params, per-model profiles,
+persistence, and the benchmark_handler dispatch for mode="decay".
+
+Run: uv run pytest tests/test_decay_mode.py -v
+"""
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+import db
+import job_handlers
+from benchmark import (
+    RunResult,
+    Target,
+    decode_decay,
+    decode_window_speeds,
+    pack_decode_windows,
+    unpack_decode_windows,
+)
+from benchmark_modes import _decay_profile, _long_output_params
+from schemas import BenchmarkRequest
+
+
+def _arrivals(gaps: list[float]) -> list[float]:
+    out, t = [0.0], 0.0
+    for g in gaps:
+        t += g
+        out.append(t)
+    return out
+
+
+class TestDecodeWindows:
+
+    def test_windows_slow_down(self):
+        # 200 chunks, one token each: 100 at 10 ms, then 100 at 20 ms
+        arrivals = _arrivals([0.01] * 100 + [0.02] * 99)
+        speeds = decode_window_speeds(arrivals, 200, 100)
+        assert speeds == pytest.approx([100.0, 50.0], rel=0.02)
+
+    def test_short_tail_dropped(self):
+        arrivals = _arrivals([0.01] * 129)  # 130 tokens, window 100 -> 30-token tail
+        assert len(decode_window_speeds(arrivals, 130, 100)) == 1
+
+    def test_degenerate_inputs(self):
+        assert decode_window_speeds([0.0], 50, 16) == []
+        assert decode_window_speeds([0.0, 1.0], 0, 16) == []
+
+    def test_decay_summary(self):
+        s = decode_decay([100.0, 90.0, 80.0], 1000)
+        assert s["windows"] == 3 and s["slope_tps_per_1k"] == -10.0
+        assert s["decay_pct"] == -20.0
+        assert decode_decay([42.0], 128)["slope_tps_per_1k"] is None
+
+    def test_pack_round_trip(self):
+        blob = pack_decode_windows([101.5, 87.25])
+        assert len(blob) == 8
+        assert unpack_decode_windows(blob) == [101.5, 87.25]
+
+
+class TestLongOutputParams:
+
+    def test_vllm_forces_length_and_keeps_user_passthrough(self):
+        target = Target(provider="vLLM", model_id="hosted_vllm/m", display_name="M", provider_key="vllm")
+        pp = {"temperature": 0.1, "passthrough": {"ignore_eos": False}}
+        out = _long_output_params(target, 2048, pp)
+        assert out["passthrough"] == {"min_tokens": 2048, "ignore_eos": False}
+        assert out["temperature"] == 0.1 and pp["passthrough"] == {"ignore_eos": False}
+
+    def test_other_providers_unchanged(self):
+        target = Target(provider="OpenAI", model_id="openai/gpt-x", display_name="G")
+        pp = {"top_p": 0.9}
+        assert _long_output_params(target, 2048, pp) is pp
+
+
+class TestDecayProfile:
+
+    def test_mean_over_runs_that_reached_window(self):
+        items = [
+            {"success": True, "output_tokens": 384, "decode_window_tps": [100.0, 90.0, 80.0]},
+            {"success": True, "output_tokens": 256, "decode_window_tps": [80.0, 70.0]},
+            {"success": False, "output_tokens": 0},
+        ]
+        p = _decay_profile(items, 128)
+        assert p["runs"] == 2 and p["avg_output_tokens"] == 320.0
+        assert p["mean_window_tps"] == [90.0, 80.0, 80.0]
+        assert p["slope_tps_per_1k"] < 0 and p["decay_pct"] == pytest.approx(-11.11)
+
+    def test_no_windows(self):
+        p = _decay_profile([{"success": False}], 128)
+        assert p["windows"] == 0 and p["mean_window_tps"] == []
+
+
+class TestDecayRequestSchema:
+
+    def test_decay_mode_accepted(self):
+        req = BenchmarkRequest(models=["m"], mode="decay", decay_window_tokens=256)
+        assert req.decay_window_tokens == 256
+
+    def test_tiny_window_rejected(self):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="decay", decay_window_tokens=4)
+
+
+class TestDecayPersistence:
+
+    @pytest.mark.asyncio
+    async def test_windows_stored_as_blob(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "decay.db")
+        await db.init_db()
+        user = await db.create_user("decay@example.com", "pw")
+        model_id = await db.ensure_model_exists(user["id"], "openai/local")
+        run_id = await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+        item = {"model_id": "openai/local", "success": True, "tokens_per_second": 50.0,
+                "decode_window_tps": [60.0, 40.0], "decode_slope_tps_per_1k": -156.25,
+                "decode_window_tokens": 128}
+        await job_handlers._persist_benchmark_item(user["id"], run_id, item, {"openai/local": model_id}, {})
+        async with db.aiosqlite.connect(db.DB_PATH) as conn:
+            row = await (await conn.execute(
+                "SELECT decode_windows, decode_window_tokens, decode_slope_tps_per_1k FROM benchmark_results"
+            )).fetchone()
+        assert unpack_decode_windows(row[0]) == [60.0, 40.0]
+        assert (row[1], row[2]) == (128, -156.25)
+
+
+class TestDecayBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_profiles_per_model(self, monkeypatch, benchmark_handler_env):
+        env = benchmark_handler_env
+        target = Target(provider="vLLM", model_id="hosted_vllm/m", display_name="M", provider_key="vllm",
+                        context_window=32_000)
+        calls = []
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            calls.append((max_tokens, kw.get("provider_params"), kw.get("decode_window_tokens")))
+            windows = [120.0, 110.0, 100.0] if kw.get("decode_window_tokens") else None
+            return RunResult(target=t, ttft_ms=50.0, total_time_s=3.0, output_tokens=max_tokens,
+                             tokens_per_second=100.0, decode_windows=windows,
+                             decode_slope_tps_per_1k=-39.062 if windows else None)
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = [target]
+
+        params = {
+            "user_id": "u1",
+            "models": ["hosted_vllm/m"],
+            "prompt": "write a long story",
+            "max_tokens": 4096,
+            "runs": 2,
+            "mode": "decay",
+            "decay_window_tokens": 256,
+        }
+        run_id = await job_handlers.benchmark_handler("job-d", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["mode"] == "decay"
+        assert env.saved["config"]["decay"] == {"window_tokens": 256}
+        warmup, *measured = calls
+        assert warmup[0] == job_handlers.DECAY_WARMUP_MAX_TOKENS and warmup[2] in (None, 0)
+        assert len(measured) == 2
+        assert all(pp["passthrough"] == {"min_tokens": 4096, "ignore_eos": True} for _, pp, _ in measured)
+        assert all(window == 256 for *_, window in measured)
+
+        assert len(env.rows) == 2
+        assert all(r["decode_window_tokens"] == 256 for r in env.rows)
+        assert unpack_decode_windows(env.rows[0]["decode_windows"]) == [120.0, 110.0, 100.0]
+
+        [profile] = env.saved["metadata"]["decay_profiles"]
+        assert profile["forced_length"] is True
+        assert profile["mean_window_tps"] == [120.0, 110.0, 100.0]
+        assert profile["first_window_tps"] == 120.0 and profile["last_window_tps"] == 100.0
+        assert profile["slope_tps_per_1k"] == pytest.approx(-39.062)  # -10 tok/s per 256 tokens
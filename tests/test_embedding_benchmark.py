@@ -0,0 +1,208 @@
+"""Tests for the embedding throughput benchmark job type.
+
+Covers the timed aembedding call, per-cell summaries, the jobs CHECK
+migration, storage in the benchmark run/result tables, the embedding
+leaderboard and the embedding_benchmark_handler grid.
+
+Run: uv run pytest tests/test_embedding_benchmark.py -v
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import aiosqlite
+import pytest
+from pydantic import ValidationError
+
+import db
+import job_handlers
+from benchmark import Target
+from benchmark_modes import _summarize_embedding_cell
+from rate_limiter import estimate_tokens
+from routers.helpers import async_run_embedding
+from schemas import EmbeddingBenchmarkRequest
+
+
+def _target() -> Target:
+    return Target(provider="Local", model_id="openai/embed", display_name="Embed",
+                  api_base="http://h.local/v1", provider_key="local")
+
+
+def _response(n: int, dim: int = 8, prompt_tokens: int | None = 40):
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, total_tokens=prompt_tokens)
+    return SimpleNamespace(data=[{"embedding": [0.1] * dim, "index": i} for i in range(n)], usage=usage)
+
+
+class TestAsyncRunEmbedding:
+
+    @pytest.mark.asyncio
+    async def test_timed_call_with_usage(self):
+        with patch("litellm.aembedding", new_callable=AsyncMock, return_value=_response(3, dim=16)) as mock:
+            res = await async_run_embedding(_target(), ["a", "b", "c"], timeout=30,
+                                            provider_params={"passthrough": {"dimensions": 16}})
+        assert res["success"] and res["error"] == ""
+        assert (res["vectors"], res["embedding_dim"], res["input_tokens"]) == (3, 16, 40)
+        assert res["latency_s"] >= 0
+        kwargs = mock.call_args.kwargs
+        assert kwargs["input"] == ["a", "b", "c"] and kwargs["dimensions"] == 16
+        assert kwargs["api_base"] == "http://h.local/v1"
+
+    @pytest.mark.asyncio
+    async def test_missing_usage_and_short_response(self):
+        with patch("litellm.aembedding", new_callable=AsyncMock, return_value=_response(1, prompt_tokens=None)):
+            res = await async_run_embedding(_target(), ["x" * 400, "y" * 400])
+        assert res["input_tokens"] == 200  # chars / 4
+        assert not res["success"] and res["error"] == "[incomplete] 1 of 2 vectors returned"
+
+    @pytest.mark.asyncio
+    async def test_errors_are_captured(self):
+        with patch("litellm.aembedding", new_callable=AsyncMock, side_effect=RuntimeError("boom")):
+            res = await async_run_embedding(_target(), ["a"])
+        assert not res["success"] and "boom" in res["error"]
+
+    def test_input_counts_towards_tpm_estimate(self):
+        assert estimate_tokens({"input": ["a" * 40, "b" * 40]}) == 20
+        assert estimate_tokens({"input": "c" * 80}) == 20
+
+
+class TestSummarizeCell:
+
+    def test_aggregate_rates_and_cost(self):
+        items = [
+            {"success": True, "batch_size": 16, "input_tokens": 2000, "total_time_s": 0.5, "cost": 0.0002,
+             "embedding_dim": 768},
+            {"success": True, "batch_size": 16, "input_tokens": 2000, "total_time_s": 1.5, "cost": 0.0002,
+             "embedding_dim": 768},
+            {"success": False, "batch_size": 16, "input_tokens": 0, "total_time_s": 0.0, "error": "[timeout] x"},
+        ]
+        s = _summarize_embedding_cell(items, wall_time_s=2.0)
+        assert (s["requests"], s["successes"], s["errors"]) == (3, 2, 1)
+        assert s["vectors_per_second"] == 16.0 and s["tokens_per_second"] == 2000.0
+        assert s["latency_p50_ms"] == 1000.0
+        assert s["cost_per_1m_tokens"] == 0.1 and s["embedding_dim"] == 768
+
+
+class TestRequest:
+
+    def test_defaults_and_bounds(self):
+        req = EmbeddingBenchmarkRequest(models=["m"])
+        assert (req.batch_sizes, req.concurrency, req.requests) == ([1, 16, 64], [1, 4], 8)
+        with pytest.raises(ValidationError):
+            EmbeddingBenchmarkRequest(models=["m"], batch_sizes=[0])
+        with pytest.raises(ValidationError):
+            EmbeddingBenchmarkRequest()
+
+
+class TestStorage:
+
+    @pytest.mark.asyncio
+    async def test_old_jobs_table_is_rebuilt(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "emb.db")
+        await db.init_db()
+        user = await db.create_user("emb-mig@example.com", "pw")
+        async with aiosqlite.connect(str(db.DB_PATH)) as conn:
+            cursor = await conn.execute("SELECT sql FROM sqlite_master WHERE name = 'jobs'")
+            (sql,) = await cursor.fetchone()
+            await conn.execute("ALTER TABLE jobs RENAME TO jobs_tmp")
+            await conn.execute(sql.replace(", 'embedding_benchmark'", ""))
+            await conn.execute("DROP TABLE jobs_tmp")
+            await conn.execute("DELETE FROM schema_version WHERE version = 715")
+            await conn.commit()
+        await db.create_job("old-job", user["id"], "benchmark", "done", "{}")
+        with pytest.raises(Exception):
+            await db.create_job("emb-0", user["id"], "embedding_benchmark", "pending", "{}")
+
+        await db.init_db()
+        assert (await db.get_job("old-job"))["job_type"] == "benchmark"
+        job = await db.create_job("emb-1", user["id"], "embedding_benchmark", "pending", "{}")
+        assert job["job_type"] == "embedding_benchmark"
+
+    @pytest.mark.asyncio
+    async def test_embedding_runs_rank_separately(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "emb.db")
+        await db.init_db()
+        user = await db.create_user("emb-lb@example.com", "pw")
+        model_id = await db.ensure_model_exists(user["id"], "openai/embed")
+        chat_run = await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+        emb_run = await db.save_benchmark_run(
+            user_id=user["id"], prompt="e", context_tiers="[128]", config_json=json.dumps({"mode": "embedding"}),
+        )
+        for latency, cost in ((0.5, 0.001), (1.5, 0.003)):
+            await db.save_benchmark_result(
+                run_id=emb_run, model_id=model_id, run_number=1, context_tokens=128, total_time_s=latency,
+                input_tokens=2048, tokens_per_second=2048 / latency, cost=cost,
+                batch_size=16, concurrency=2, vectors_per_second=16 / latency, embedding_dim=1536,
+            )
+
+        runs = await db.get_analytics_benchmark_runs(user["id"])
+        assert [r["id"] for r in runs] == [chat_run]
+        [row] = await db.get_analytics_embedding_results(user["id"], "7d")
+        assert row["model_id"] == "openai/embed" and row["requests"] == 2
+        assert row["avg_latency_ms"] == 1000.0 and row["embedding_dim"] == 1536
+        assert row["input_tokens"] == 4096
+
+    @pytest.mark.asyncio
+    async def test_leaderboard_endpoint_accepts_embedding(self, app_client, auth_headers):
+        resp = await app_client.get("/api/analytics/leaderboard?type=embedding", headers=auth_headers)
+        assert resp.status_code == 200
+        assert resp.json()["type"] == "embedding"
+
+
+class TestEmbeddingHandler:
+
+    @pytest.mark.asyncio
+    async def test_runs_every_cell_with_bounded_concurrency(self, monkeypatch, benchmark_handler_env):
+        env = benchmark_handler_env
+        sent = []
+        in_flight = {"now": 0, "peak": 0}
+
+        async def fake_run(target, inputs, timeout=120, provider_params=None):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            n = len(inputs)
+            return {"success": True, "error": "", "latency_s": 0.1, "input_tokens": 10 * n,
+                    "vectors": n, "embedding_dim": 8, "cost": 0.0}
+
+        class _WS:
+            async def send_to_user(self, user_id, payload):
+                sent.append(payload)
+
+        monkeypatch.setattr(job_handlers, "async_run_embedding", fake_run)
+        monkeypatch.setattr(job_handlers, "_embedding_inputs", lambda batch, tokens: ["t"] * batch)
+        env.targets = [_target()]
+        monkeypatch.setattr(job_handlers, "ws_manager", _WS())
+
+        params = {
+            "user_id": "u1",
+            "models": ["openai/embed"],
+            "batch_sizes": [1, 4],
+            "input_tokens": [64],
+            "concurrency": [1, 3],
+            "requests": 6,
+            "warmup": False,
+        }
+        run_id = await job_handlers.embedding_benchmark_handler("job-e", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["mode"] == "embedding" and env.saved["context_tiers"] == "[64]"
+        assert len(env.rows) == 4 * 6
+        assert {(r["batch_size"], r["concurrency"]) for r in env.rows} == {(1, 1), (1, 3), (4, 1), (4, 3)}
+        assert all(r["context_tokens"] == 64 and r["embedding_dim"] == 8 for r in env.rows)
+        assert in_flight["peak"] == 3
+
+        cells = env.saved["metadata"]["embedding_cells"]
+        assert len(cells) == 4
+        big = next(c for c in cells if c["batch_size"] == 4 and c["concurrency"] == 3)
+        assert big["requests"] == 6 and big["vectors"] == 24
+        assert [p["type"] for p in sent].count("embedding_cell") == 4
+
+    @pytest.mark.asyncio
+    async def test_registered_as_job_type(self):
+        from job_registry import registry
+
+        job_handlers.register_all_handlers()
+        assert registry._handlers["embedding_benchmark"] is job_handlers.embedding_benchmark_handler
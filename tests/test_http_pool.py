@@ -0,0 +1,156 @@
+"""Tests for pooled per-endpoint HTTP clients.
+
+Covers pool configuration and client attachment, connection reuse reported
+per run and per endpoint, pre-warming against a local keep-alive SSE server,
+the benchmark handler's pre-warm hook, and cold vs warm TTFT aggregation.
+
+Run: uv run pytest tests/test_http_pool.py -v
+"""
+
+import pytest
+
+import db
+import http_clients
+import job_handlers
+from aggregation import summarize_result_rows, summarize_runs
+from benchmark import RunResult, Target
+from http_clients import aclose_clients, attach_pooled_client, pool_stats, prewarm
+from routers.helpers import async_run_single
+
+
+def _target(port: int) -> Target:
+    return Target(provider="Local", model_id="openai/test-model", display_name="T",
+                  api_base=f"http://localhost:{port}/v1", api_key="sk-test")
+
+
+def _endpoint_stats(port: int) -> dict:
+    [stats] = [s for label, s in pool_stats()["endpoints"].items() if f":{port}/" in label]
+    return stats
+
+
+class TestPoolClients:
+
+    @pytest.mark.asyncio
+    async def test_limits_from_config(self, monkeypatch):
+        monkeypatch.setattr(http_clients, "POOL_MAX_CONNECTIONS", 7)
+        monkeypatch.setattr(http_clients, "POOL_MAX_KEEPALIVE", 3)
+        client = http_clients._new_httpx_client()
+        pool = client._transport._pool
+        assert (pool._max_connections, pool._max_keepalive_connections) == (7, 3)
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_attach_pooled_client(self, monkeypatch):
+        kwargs = {"model": "openai/x", "api_base": "http://h.local/v1", "api_key": "k"}
+        assert attach_pooled_client(kwargs)
+        assert type(kwargs["client"]).__name__ == "AsyncOpenAI"
+
+        other = {"model": "openai/y", "api_base": "http://h.local/v1", "api_key": "k"}
+        attach_pooled_client(other)
+        assert other["client"] is kwargs["client"]  # same endpoint + key -> same pool
+
+        assert not attach_pooled_client({"model": "gemini/gemini-pro", "api_key": "k"})
+        mine = {**kwargs, "client": "caller's"}
+        assert not attach_pooled_client(mine) and mine["client"] == "caller's"
+
+        monkeypatch.setattr(http_clients, "POOL_ENABLED", False)
+        off = {"model": "openai/x", "api_base": "http://h.local/v1", "api_key": "k"}
+        assert not attach_pooled_client(off) and "client" not in off
+        await aclose_clients()
+
+
+class TestConnectionReuse:
+
+    @pytest.mark.asyncio
+    async def test_reuse_reported_per_run_and_endpoint(self, sse_server):
+        port, connections = sse_server
+        results = [await async_run_single(_target(port), "hi", 16, 0.0) for _ in range(3)]
+
+        assert all(r.success for r in results)
+        assert [r.connection_reused for r in results] == [False, True, True]
+        assert results[0].dns_ms is None  # phase durations stay off without capture_phases
+        assert len(connections) == 1
+        assert _endpoint_stats(port) == {"requests": 3, "reused": 2, "new_connections": 1}
+        await aclose_clients()
+
+    @pytest.mark.asyncio
+    async def test_prewarm_makes_first_run_warm(self, sse_server):
+        port, connections = sse_server
+        kwargs = {"model": "openai/test-model", "api_base": f"http://localhost:{port}/v1", "api_key": "sk-test"}
+        assert await prewarm([kwargs, dict(kwargs)]) == 1  # one endpoint, warmed once
+
+        first = await async_run_single(_target(port), "hi", 16, 0.0)
+        assert first.success and first.connection_reused is True
+        assert len(connections) == 1
+        await aclose_clients()
+
+    @pytest.mark.asyncio
+    async def test_prewarm_ignores_unreachable_and_unsupported(self):
+        unreachable = {"model": "openai/m", "api_base": "http://127.0.0.1:9/v1", "api_key": "k"}
+        assert await prewarm([unreachable, {"model": "gemini/gemini-pro", "api_key": "k"}], timeout=1.0) == 0
+        await aclose_clients()
+
+
+class TestPrewarmHook:
+
+    @pytest.mark.asyncio
+    async def test_prewarm_only_when_requested(self, monkeypatch):
+        calls = []
+
+        async def fake_prewarm(kwargs_list):
+            calls.append(kwargs_list)
+            return len(kwargs_list)
+
+        monkeypatch.setattr(job_handlers, "prewarm", fake_prewarm)
+        targets = [Target(provider="Local", model_id="openai/m", display_name="M", api_base="http://h/v1")]
+
+        assert await job_handlers._prewarm_targets({}, targets) == 0
+        assert await job_handlers._prewarm_targets({"prewarm_connections": True}, targets) == 1
+        assert calls == [[{"model": "openai/m", "api_base": "http://h/v1"}]]
+
+
+class TestColdWarmTtft:
+
+    def test_run_summary_splits_ttft(self):
+        target = Target(provider="P", model_id="p/m", display_name="M")
+
+        def run(ttft, reused):
+            return RunResult(target=target, ttft_ms=ttft, total_time_s=1.0, output_tokens=10,
+                             tokens_per_second=10.0, connection_reused=reused)
+
+        [(_, fields)] = summarize_runs([run(300.0, False), run(100.0, True), run(120.0, True)], [0] * 3)
+        assert fields["avg_ttft_cold_ms"] == 300.0
+        assert fields["avg_ttft_warm_ms"] == 110.0
+
+        [(_, unknown)] = summarize_runs([run(100.0, None)], [0])
+        assert unknown["avg_ttft_cold_ms"] is None and unknown["avg_ttft_warm_ms"] is None
+
+    def test_stored_rows_split_ttft(self):
+        base = {"run_id": "r", "model_id": "m", "model": "M", "provider": "P", "context_tokens": 0,
+                "success": 1, "tokens_per_second": 10.0}
+        by_run = summarize_result_rows([
+            {**base, "ttft_ms": 250.0, "connection_reused": 0},
+            {**base, "ttft_ms": 90.0, "connection_reused": 1},
+            {**base, "ttft_ms": 500.0, "connection_reused": 1, "success": 0},
+        ])
+        [row] = by_run["r"]
+        assert (row["avg_ttft_cold_ms"], row["avg_ttft_warm_ms"]) == (250.0, 90.0)
+
+    @pytest.mark.asyncio
+    async def test_reuse_persisted_without_phase_capture(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "pool.db")
+        await db.init_db()
+        user = await db.create_user("pool@example.com", "pw")
+        model_id = await db.ensure_model_exists(user["id"], "openai/local")
+        run_id = await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+        target = Target(provider="Local", model_id="openai/local", display_name="L")
+        for n, (ttft, reused) in enumerate([(400.0, False), (150.0, True)]):
+            result = RunResult(target=target, ttft_ms=ttft, total_time_s=1.0, output_tokens=10,
+                               tokens_per_second=10.0, connection_reused=reused)
+            item = job_handlers._benchmark_result_item(target, result, n + 1, 2, 0)
+            assert "dns_ms" not in item and item["connection_reused"] is reused
+            await db.save_benchmark_result(run_id=run_id, model_id=model_id, run_number=n + 1,
+                                           tokens_per_second=10.0, ttft_ms=ttft, connection_reused=reused)
+        [row] = await db.get_benchmark_results(run_id)
+        assert (row["avg_ttft_cold_ms"], row["avg_ttft_warm_ms"]) == (400.0, 150.0)
+        assert row["cold_connections"] == 1
@@ -0,0 +1,204 @@
+"""Tests for the open-loop load generator benchmark mode.
+
+Covers arrival schedules, per-step summaries, the open-loop step runner,
+request validation, and the benchmark_handler dispatch for mode="load".
+
+Run: uv run pytest tests/test_load_generator.py -v
+"""
+
+import asyncio
+import statistics
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+from aggregation import P50, P95, P99, percentile
+from benchmark import RunResult, Target
+from benchmark_modes import _arrival_offsets, _summarize_load_step
+from schemas import BenchmarkRequest
+
+
+def _item(ttft_ms=100.0, output_tokens=50, total_time_s=1.0, success=True, cost=0.001):
+    return {
+        "ttft_ms": ttft_ms,
+        "output_tokens": output_tokens,
+        "total_time_s": total_time_s,
+        "success": success,
+        "cost": cost,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Arrival schedules
+# ---------------------------------------------------------------------------
+
+class TestArrivalOffsets:
+
+    def test_constant_spacing(self):
+        offsets = _arrival_offsets(4, 2, "constant")
+        assert offsets == pytest.approx([0, 0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75])
+
+    def test_poisson_seeded_is_reproducible(self):
+        a = _arrival_offsets(5, 10, "poisson", seed=42)
+        b = _arrival_offsets(5, 10, "poisson", seed=42)
+        assert a == b
+        assert a != _arrival_offsets(5, 10, "poisson", seed=43)
+
+    def test_poisson_within_window_and_sorted(self):
+        offsets = _arrival_offsets(8, 5, "poisson", seed=1)
+        assert offsets[0] == 0.0
+        assert all(0 <= o < 5 for o in offsets)
+        assert offsets == sorted(offsets)
+
+    def test_poisson_mean_rate(self):
+        offsets = _arrival_offsets(10, 200, "poisson", seed=7)
+        assert len(offsets) / 200 == pytest.approx(10, rel=0.1)
+
+    def test_zero_rate_or_duration(self):
+        assert _arrival_offsets(0, 10) == []
+        assert _arrival_offsets(5, 0) == []
+
+    def test_unknown_pattern(self):
+        with pytest.raises(ValueError):
+            _arrival_offsets(1, 1, "burst")
+
+
+# ---------------------------------------------------------------------------
+# Step summaries
+# ---------------------------------------------------------------------------
+
+class TestSummarizeLoadStep:
+
+    def test_percentile_matches_aggregated_views(self):
+        assert percentile([1, 2, 3, 4, 5], P50) == 3
+        assert percentile([10, 20], P50) == 15
+        assert percentile([], P95) == 0.0
+        assert percentile([7], P99) == 7
+        values = [120.0, 80.0, 95.0, 300.0, 110.0, 101.0]
+        assert percentile(values, P95) == pytest.approx(statistics.quantiles(values, n=20)[18])
+
+    def test_aggregate_throughput_uses_wall_time(self):
+        items = [_item(output_tokens=100) for _ in range(4)]
+        s = _summarize_load_step(items, rate=2, duration_s=2, wall_time_s=4.0)
+        # 400 tokens over 4s of wall time, not the mean of per-request speeds
+        assert s["aggregate_output_tps"] == 100.0
+        assert s["requests"] == 4
+        assert s["offered_rps"] == 2.0
+
+    def test_error_rate_and_ttft_from_successes_only(self):
+        items = [_item(ttft_ms=t) for t in (100, 200, 300)] + [_item(ttft_ms=0, success=False, output_tokens=0)]
+        s = _summarize_load_step(items, rate=1, duration_s=4, wall_time_s=5.0)
+        assert s["errors"] == 1
+        assert s["error_rate"] == 0.25
+        assert s["ttft_p50_ms"] == 200
+        # same exclusive method as the aggregated views (statistics.quantiles)
+        assert s["ttft_p99_ms"] == pytest.approx(statistics.quantiles([100, 200, 300], n=100)[98], abs=0.01)
+
+    def test_empty_step(self):
+        s = _summarize_load_step([], rate=1, duration_s=1, wall_time_s=0)
+        assert s["requests"] == 0
+        assert s["error_rate"] == 0.0
+        assert s["aggregate_output_tps"] == 0.0
+
+
+# ---------------------------------------------------------------------------
+# Open-loop step runner
+# ---------------------------------------------------------------------------
+
+class TestOpenLoopStep:
+
+    @pytest.mark.asyncio
+    async def test_sends_do_not_wait_for_completions(self):
+        """A slow endpoint must not delay later sends (open loop)."""
+        async def launch(i):
+            await asyncio.sleep(0.2)
+            return {"i": i}
+
+        items, wall, peak = await job_handlers._run_open_loop_step(
+            [0, 0.01, 0.02, 0.03], launch, asyncio.Event(),
+        )
+        assert sorted(r["i"] for r in items) == [0, 1, 2, 3]
+        assert peak == 4
+        assert wall < 0.4  # closed loop would take >= 0.8s
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_schedule(self):
+        cancel = asyncio.Event()
+        launched = []
+
+        async def launch(i):
+            launched.append(i)
+            if i == 0:
+                cancel.set()
+            await asyncio.sleep(1)
+            return {"i": i}
+
+        items, _, _ = await job_handlers._run_open_loop_step([0, 0.05, 0.1], launch, cancel)
+        assert items == []
+        assert launched == [0]
+
+
+# ---------------------------------------------------------------------------
+# Request validation
+# ---------------------------------------------------------------------------
+
+class TestLoadRequestSchema:
+
+    def test_defaults(self):
+        req = BenchmarkRequest(models=["m"])
+        assert req.mode == "standard"
+        assert req.load_steps == [1, 2, 4, 8]
+        assert req.load_arrival == "poisson"
+
+    def test_load_mode_accepted(self):
+        req = BenchmarkRequest(models=["m"], mode="load", load_steps=[0.5, 3], load_arrival="constant")
+        assert req.load_steps == [0.5, 3]
+
+    @pytest.mark.parametrize("steps", [[0], [-1], [101], []])
+    def test_invalid_steps_rejected(self, steps):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="load", load_steps=steps)
+
+    def test_invalid_arrival_rejected(self):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="load", load_arrival="burst")
+
+
+# ---------------------------------------------------------------------------
+# Handler dispatch
+# ---------------------------------------------------------------------------
+
+class TestLoadBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_load_mode_runs_steps_and_stores_summaries(self, monkeypatch, benchmark_handler_env):
+        env = benchmark_handler_env
+        target = Target(provider="Local", model_id="local/m", display_name="M", provider_key="local")
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            return RunResult(target=t, ttft_ms=50.0, total_time_s=0.01, output_tokens=10, tokens_per_second=1000.0)
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = [target]
+
+        params = {
+            "user_id": "u1",
+            "models": ["local/m"],
+            "prompt": "hi",
+            "warmup": False,
+            "mode": "load",
+            "load_steps": [20, 40],
+            "load_arrival": "constant",
+            "load_step_duration_s": 0.1,
+        }
+        run_id = await job_handlers.benchmark_handler("job-1", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["mode"] == "load"
+        steps = env.saved["metadata"]["load_steps"]
+        assert [s["step"] for s in steps] == [1, 2]
+        assert [s["requests"] for s in steps] == [2, 4]
+        assert all(s["error_rate"] == 0 for s in steps)
+        assert steps[0]["ttft_p95_ms"] == 50.0
+        assert len(env.rows) == 6
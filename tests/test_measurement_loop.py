@@ -0,0 +1,115 @@
+"""Tests for the dedicated measurement event loop.
+
+Covers cross-loop result/exception/cancellation hand-off, isolation from a
+busy main loop, and benchmark_handler routing when isolate_measurement is set.
+
+Run: uv run pytest tests/test_measurement_loop.py -v
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import job_handlers
+from benchmark import RunResult, Target
+from measurement_loop import MeasurementLoop
+
+
+@pytest.fixture
+def loop_thread():
+    ml = MeasurementLoop(name="test-measurement-loop")
+    yield ml
+    ml.stop()
+
+
+async def _timed_sleep(seconds):
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    return time.perf_counter() - start
+
+
+class TestMeasurementLoop:
+
+    @pytest.mark.asyncio
+    async def test_runs_on_its_own_thread(self, loop_thread):
+        async def where():
+            return threading.current_thread().name
+
+        assert await loop_thread.run(where()) == "test-measurement-loop"
+        assert loop_thread.is_running
+
+    @pytest.mark.asyncio
+    async def test_exceptions_propagate(self, loop_thread):
+        async def boom():
+            raise ValueError("bad stream")
+
+        with pytest.raises(ValueError, match="bad stream"):
+            await loop_thread.run(boom())
+
+    @pytest.mark.asyncio
+    async def test_cancel_reaches_measurement_loop(self, loop_thread):
+        cancelled = threading.Event()
+
+        async def long_stream():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        task = asyncio.create_task(loop_thread.run(long_stream()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert await asyncio.to_thread(cancelled.wait, 2)
+
+    @pytest.mark.asyncio
+    async def test_restart_after_stop(self, loop_thread):
+        await loop_thread.run(asyncio.sleep(0))
+        loop_thread.stop()
+        assert not loop_thread.is_running
+        assert await loop_thread.run(_timed_sleep(0)) >= 0
+
+    @pytest.mark.asyncio
+    async def test_busy_main_loop_does_not_inflate_timing(self, loop_thread):
+        async def hog():
+            await asyncio.sleep(0.01)
+            time.sleep(0.3)  # e.g. a slow synchronous handler on the main loop
+
+        hog_task = asyncio.create_task(hog())
+        isolated = await loop_thread.run(_timed_sleep(0.05))
+        await hog_task
+
+        hog_task = asyncio.create_task(hog())
+        shared = await _timed_sleep(0.05)
+        await hog_task
+
+        assert isolated < 0.2
+        assert shared >= 0.25
+
+
+class TestIsolatedBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_runs_execute_on_measurement_loop(self, monkeypatch, loop_thread, benchmark_handler_env):
+        env = benchmark_handler_env
+        target = Target(provider="Local", model_id="local/m", display_name="M", provider_key="local")
+        threads = []
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            threads.append(threading.current_thread().name)
+            return RunResult(target=t, ttft_ms=50.0, total_time_s=0.1, output_tokens=10, tokens_per_second=100.0)
+
+        monkeypatch.setattr(job_handlers, "measurement_loop", loop_thread)
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = [target]
+
+        params = {"user_id": "u1", "models": ["local/m"], "prompt": "hi", "runs": 2, "isolate_measurement": True}
+        assert await job_handlers.benchmark_handler("job-i", params, asyncio.Event(), env.progress_cb) == "run-1"
+
+        # warmup + 2 runs, all timed off the main loop
+        assert threads == ["test-measurement-loop"] * 3
+        assert env.saved["config"]["isolate_measurement"] is True
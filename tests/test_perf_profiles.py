@@ -0,0 +1,195 @@
+"""Tests for the historical latency profiles behind adaptive timeouts.
+
+Covers timeouts and concurrency suggestions from warm/cold profiles,
+reloading from stored benchmark results, and the profile-driven TTFT
+deadline in async_run_single.
+
+Run: uv run pytest tests/test_perf_profiles.py -v
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import db
+import job_handlers
+import perf_profiles
+import routers.helpers as helpers
+from benchmark import RunResult, Target
+from perf_profiles import PerfProfiles, profile_key
+from routers.helpers import async_run_single
+
+BASE = "http://h.local/v1"
+
+
+def _warm(store: PerfProfiles, latencies_ms, call_type="tool_eval", model="openai/m", api_base=BASE):
+    for ms in latencies_ms:
+        store.observe(model, api_base, call_type, ms)
+
+
+class TestTimeouts:
+
+    def test_cold_profile_keeps_default(self):
+        store = PerfProfiles()
+        _warm(store, [500.0] * (perf_profiles.PERF_MIN_SAMPLES - 1))
+        assert store.profile("openai/m", BASE, "tool_eval") is None
+        assert store.timeout_for("openai/m", BASE, "tool_eval", 120) == 120
+
+    def test_p99_times_multiplier(self):
+        store = PerfProfiles()
+        _warm(store, [8000.0] * 98 + [20_000.0] * 2)
+        prof = store.profile("openai/m", BASE, "tool_eval")
+        assert prof["samples"] == 100 and prof["p50_ms"] == 8000.0 and prof["p99_ms"] == 20_000.0
+        assert store.timeout_for("openai/m", BASE, "tool_eval", 120) == 60.0
+
+    def test_floor_and_ceiling(self):
+        store = PerfProfiles()
+        _warm(store, [100.0] * 30, model="fast")
+        _warm(store, [400_000.0] * 30, model="slow")
+        assert store.timeout_for("fast", BASE, "tool_eval", 120) == perf_profiles.PERF_TIMEOUT_FLOOR_S
+        assert store.timeout_for("slow", BASE, "tool_eval", 120) == perf_profiles.PERF_TIMEOUT_MAX_S
+
+    def test_profiles_are_per_endpoint_and_call_type(self):
+        store = PerfProfiles()
+        _warm(store, [100.0] * 30)
+        assert store.timeout_for("openai/m", "http://other/v1", "tool_eval", 120) == 120
+        assert store.timeout_for("openai/m", BASE, "judge", 120) == 120
+        assert profile_key("openai/m", BASE + "/") == profile_key("openai/m", BASE)
+
+    def test_failed_calls_not_observed(self):
+        store = PerfProfiles()
+        _warm(store, [0.0] * 30)
+        assert store.profile("openai/m", BASE, "tool_eval") is None
+
+
+class TestConcurrency:
+
+    def test_fast_models_get_more_parallelism(self):
+        store = PerfProfiles()
+        _warm(store, [400.0] * 30, call_type="judge", model="fast")
+        _warm(store, [2000.0] * 30, call_type="judge", model="mid")
+        _warm(store, [30_000.0] * 30, call_type="judge", model="slow")
+        assert store.suggest_concurrency("fast", BASE, "judge", 4) == perf_profiles.PERF_MAX_CONCURRENCY
+        assert store.suggest_concurrency("mid", BASE, "judge", 4) == 4
+        assert store.suggest_concurrency("slow", BASE, "judge", 4) == 1
+        assert store.suggest_concurrency("cold", BASE, "judge", 4) == 4
+
+    def test_stats_lists_warm_profiles(self):
+        store = PerfProfiles()
+        _warm(store, [1000.0] * 30, call_type="judge")
+        _warm(store, [1000.0] * 3, model="cold")
+        stats = store.stats()
+        assert list(stats) == [profile_key("openai/m", BASE)]
+        entry = stats[profile_key("openai/m", BASE)]["judge"]
+        assert entry["timeout_s"] == perf_profiles.PERF_TIMEOUT_FLOOR_S
+        assert entry["suggested_concurrency"] == 8
+
+
+class TestLoadFromHistory:
+
+    def test_load_replaces_db_profiles_and_keeps_live_ones(self):
+        store = PerfProfiles()
+        _warm(store, [9000.0] * 30)  # stale tool_eval window
+        _warm(store, [1000.0] * 30, call_type="judge")
+        rows = [{"litellm_id": "openai/m", "api_base": BASE, "call_type": "tool_eval", "latency_ms": 200.0}] * 30
+        store.load(rows)
+        assert store.profile("openai/m", BASE, "tool_eval")["p99_ms"] == 200.0
+        assert store.profile("openai/m", BASE, "judge")["samples"] == 30
+
+    @pytest.mark.asyncio
+    async def test_refresh_reads_context_free_benchmark_ttft(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "perf.db")
+        await db.init_db()
+        user = await db.create_user("perf@example.com", "pw")
+        model_id = await db.ensure_model_exists(user["id"], "openai/local")
+        run_id = await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+        cache = {"openai/local": model_id}
+        for i in range(25):
+            item = {"model_id": "openai/local", "success": True, "ttft_ms": 100.0 + i, "context_tokens": 0}
+            await job_handlers._persist_benchmark_item(user["id"], run_id, item, cache, {})
+        padded = {"model_id": "openai/local", "success": True, "ttft_ms": 9000.0, "context_tokens": 8000}
+        failed = {"model_id": "openai/local", "success": False, "ttft_ms": 9000.0, "context_tokens": 0}
+        for item in (padded, failed):
+            await job_handlers._persist_benchmark_item(user["id"], run_id, item, cache, {})
+
+        store = PerfProfiles()
+        assert await perf_profiles.refresh(store) == 25
+        [(key, call_type)] = store._samples
+        assert key.endswith("|openai/local") and call_type == "benchmark"
+        api_base = key.split("|", 1)[0] or None
+        assert store.profile("openai/local", api_base, "benchmark")["p99_ms"] < 125
+
+    @pytest.mark.asyncio
+    async def test_refresh_skips_multi_turn_case_totals(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "perf.db")
+        await db.init_db()
+        user = await db.create_user("perf-mt@example.com", "pw")
+        model_id = await db.ensure_model_exists(user["id"], "openai/local")
+        suite_id = await db.create_tool_suite(user["id"], "S", "")
+        single = await db.create_test_case(suite_id, "p", "t", None)
+        flagged_off = await db.create_test_case(suite_id, "p", "t", None, multi_turn_config='{"multi_turn": false}')
+        multi = await db.create_test_case(suite_id, "p", "t", None, multi_turn_config='{"multi_turn": true}')
+        run_id = await db.save_tool_eval_run(user["id"], suite_id, 0.0)
+        for case_id, latency in ((single, 200), (flagged_off, 300), (multi, 9000)):
+            await db.save_case_result(run_id, case_id, model_id, latency_ms=latency)
+
+        rows = await db.get_recent_call_latencies()
+        assert sorted(r["latency_ms"] for r in rows) == [200, 300]
+
+
+class _HungStream:
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(30)
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        pass
+
+
+class TestProfileTtftDeadline:
+
+    @pytest.mark.asyncio
+    async def test_warm_profile_sets_ttft_deadline(self, monkeypatch):
+        store = PerfProfiles()
+        _warm(store, [100.0] * 30, call_type="benchmark")
+        monkeypatch.setattr(helpers, "perf_profiles", store)
+        monkeypatch.setattr(perf_profiles, "PERF_TIMEOUT_FLOOR_S", 0.1)
+        target = Target(provider="Local", model_id="openai/m", display_name="M", api_base=BASE)
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=_HungStream()):
+            t0 = time.perf_counter()
+            result = await async_run_single(target, "hi", 64, 0.0)
+        assert time.perf_counter() - t0 < 2
+        assert result.error == "[ttft_timeout] No token within 0.3s"
+
+    @pytest.mark.asyncio
+    async def test_successful_run_is_observed(self, monkeypatch):
+        store = PerfProfiles()
+        monkeypatch.setattr(helpers, "perf_profiles", store)
+        delta = SimpleNamespace(content="a", reasoning_content=None)
+        chunk = SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+        class _Stream:
+            def __init__(self):
+                self._chunks = [chunk]
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                if not self._chunks:
+                    raise StopAsyncIteration
+                return self._chunks.pop()
+
+        target = Target(provider="Local", model_id="openai/m", display_name="M", api_base=BASE)
+        for context_tokens in (0, 0, 500):
+            with patch("litellm.acompletion", new_callable=AsyncMock, return_value=_Stream()):
+                result = await async_run_single(target, "hi", 64, 0.0, context_tokens=context_tokens)
+            assert isinstance(result, RunResult) and result.success
+        assert len(store._samples[(profile_key("openai/m", BASE), "benchmark")]) == 2
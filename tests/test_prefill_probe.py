@@ -0,0 +1,142 @@
+"""Tests for the prefill-only probe benchmark mode.
+
+Covers the latency-vs-context curve fit, per-tier summaries, predictions
+for untested tiers, request validation, and the benchmark_handler dispatch
+for mode="prefill".
+
+Run: uv run pytest tests/test_prefill_probe.py -v
+"""
+
+import asyncio
+import math
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+from aggregation import fit_latency_curve, predict_latency
+from benchmark import RunResult, Target
+from benchmark_modes import _prefill_curve, _probe_max_tokens, _summarize_prefill_tier
+from schemas import BenchmarkRequest
+
+
+def _ttft(tokens):
+    return 40.0 + 0.05 * tokens + 2e-7 * tokens * tokens
+
+
+class TestFitLatencyCurve:
+
+    def test_recovers_quadratic(self):
+        xs = [50, 1000, 4000, 16000, 64000] * 2
+        fit = fit_latency_curve(xs, [_ttft(x) for x in xs])
+        assert fit["degree"] == 2 and fit["samples"] == 10
+        assert fit["intercept_ms"] == pytest.approx(40.0)
+        assert fit["per_token_ms"] == pytest.approx(0.05)
+        assert fit["per_token_sq_ms"] == pytest.approx(2e-7)
+        assert fit["r2"] == pytest.approx(1.0)
+        assert predict_latency(fit, [32000]) == pytest.approx([_ttft(32000)])
+
+    def test_two_points_fit_a_line(self):
+        fit = fit_latency_curve([100, 100, 1100], [10.0, 12.0, 111.0])
+        assert fit["degree"] == 1 and fit["per_token_sq_ms"] == 0.0
+        assert fit["per_token_ms"] == pytest.approx(0.1)
+
+    def test_too_few_points_and_nan(self):
+        assert fit_latency_curve([100, 100], [5.0, 6.0]) is None
+        assert fit_latency_curve([100, math.nan, 200], [5.0, 9.0, math.nan]) is None
+
+
+class TestPrefillSummaries:
+
+    def test_tier_summary_uses_successes(self):
+        items = [
+            {"success": True, "ttft_ms": 100.0, "input_tokens": 1010, "input_tokens_per_second": 10100.0},
+            {"success": True, "ttft_ms": 120.0, "input_tokens": 1010, "input_tokens_per_second": 8416.0},
+            {"success": False, "ttft_ms": 0.0},
+        ]
+        s = _summarize_prefill_tier(items, 1000)
+        assert (s["runs"], s["successes"]) == (3, 2)
+        assert s["avg_ttft_ms"] == 110.0 and s["avg_input_tokens"] == 1010.0
+        assert s["avg_prefill_tps"] == 9258.0
+
+    def test_curve_predicts_and_flags_extrapolation(self):
+        items = [
+            {"success": True, "ttft_ms": _ttft(n), "input_tokens": n, "context_tokens": n}
+            for n in (500, 2000, 8000)
+        ]
+        items.append({"success": True, "ttft_ms": _ttft(50), "input_tokens": 0, "context_tokens": 50})
+        curve = _prefill_curve(items, [4000, 32000, 500_000], context_window=128_000)
+        assert curve["fit"]["r2"] == pytest.approx(1.0)
+        inside, outside = curve["predictions"]  # 500k exceeds the context window
+        assert inside["context_tokens"] == 4000 and not inside["extrapolated"]
+        assert inside["ttft_ms"] == pytest.approx(_ttft(4000), abs=0.01)
+        assert inside["prefill_tps"] == pytest.approx(4000 / (_ttft(4000) / 1000), abs=0.01)
+        assert outside["extrapolated"]
+
+    def test_curve_without_enough_samples(self):
+        assert _prefill_curve([{"success": False}], [1000], 8000) == {"fit": None, "predictions": []}
+
+    def test_probe_tokens_is_provider_minimum(self):
+        assert _probe_max_tokens(Target(provider="Anthropic", model_id="anthropic/claude-x", display_name="C")) == 1
+
+
+class TestPrefillRequestSchema:
+
+    def test_prefill_mode_accepted(self):
+        req = BenchmarkRequest(models=["m"], mode="prefill", context_tiers=[0, 1000, 8000],
+                               prefill_predict_tiers=[4000])
+        assert req.prefill_predict_tiers == [4000]
+
+    def test_invalid_predict_tiers_rejected(self):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="prefill", prefill_predict_tiers=[0])
+
+
+class TestPrefillBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_probe_sweeps_tiers_with_minimal_output(self, monkeypatch, benchmark_handler_env):
+        env = benchmark_handler_env
+        target = Target(provider="Local", model_id="openai/m", display_name="M", provider_key="local",
+                        context_window=32_000)
+        calls = []
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            calls.append((max_tokens, context_tokens, kw.get("context_seed"), kw.get("provider_params")))
+            n = context_tokens + 10
+            return RunResult(target=t, context_tokens=context_tokens, ttft_ms=_ttft(n), total_time_s=_ttft(n) / 1000,
+                             output_tokens=1, input_tokens=n, tokens_per_second=1.0,
+                             input_tokens_per_second=n / (_ttft(n) / 1000))
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = [target]
+
+        params = {
+            "user_id": "u1",
+            "models": ["openai/m"],
+            "prompt": "hi",
+            "max_tokens": 2048,
+            "runs": 2,
+            "mode": "prefill",
+            "context_tiers": [0, 2000, 8000, 64000],  # 64K exceeds the window
+            "prefill_predict_tiers": [4000, 16000],
+            "provider_params": {"max_tokens": 999, "top_p": 0.9},
+        }
+        run_id = await job_handlers.benchmark_handler("job-p", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["mode"] == "prefill"
+        assert len(calls) == 1 + 3 * 2  # warm-up + 3 fitting tiers x 2 runs
+        assert all(max_tokens == 1 for max_tokens, *_ in calls)
+        assert all(pp == {"top_p": 0.9} for *_, pp in calls)
+        seeds = [seed for _, tier, seed, _ in calls[1:]]
+        assert len(set(seeds)) == len(seeds)  # fresh window each run: no prompt-cache hits
+        assert len(env.rows) == 6
+
+        [curve] = env.saved["metadata"]["prefill_curves"]
+        assert [t["context_tokens"] for t in curve["tiers"]] == [0, 2000, 8000]
+        assert curve["probe_max_tokens"] == 1
+        assert curve["fit"]["degree"] == 2 and curve["fit"]["r2"] == pytest.approx(1.0)
+        p4k, p16k = curve["predictions"]
+        assert not p4k["extrapolated"] and p16k["extrapolated"]
+        assert p4k["ttft_ms"] == pytest.approx(_ttft(4000), abs=0.01)
@@ -0,0 +1,132 @@
+"""Tests for the prompt-cache effectiveness benchmark mode.
+
+Covers cached-token extraction from usage blocks, phase summaries, and the
+benchmark_handler dispatch for mode="cache" (shared vs unique prefixes).
+
+Run: uv run pytest tests/test_prompt_cache_mode.py -v
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import job_handlers
+from benchmark import RunResult, Target
+from benchmark_modes import _cache_effectiveness, _summarize_cache_phase
+from routers.helpers import _cached_prompt_tokens
+
+
+def _item(ttft_ms, cost=0.01, cached_tokens=0, input_tps=1000.0, success=True):
+    return {
+        "ttft_ms": ttft_ms,
+        "cost": cost,
+        "cached_tokens": cached_tokens,
+        "input_tokens_per_second": input_tps,
+        "success": success,
+    }
+
+
+class TestCachedPromptTokens:
+
+    def test_openai_prompt_tokens_details(self):
+        usage = SimpleNamespace(prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+        assert _cached_prompt_tokens(usage) == 1024
+
+    def test_anthropic_cache_read(self):
+        usage = SimpleNamespace(prompt_tokens_details=None, cache_read_input_tokens=2048)
+        assert _cached_prompt_tokens(usage) == 2048
+
+    def test_no_cache_fields(self):
+        assert _cached_prompt_tokens(SimpleNamespace(prompt_tokens=10)) == 0
+
+    def test_mock_usage_is_not_counted(self):
+        assert _cached_prompt_tokens(MagicMock()) == 0
+
+
+class TestCachePhaseSummary:
+
+    def test_summary_and_effectiveness(self):
+        cached = _summarize_cache_phase([_item(100, cost=0.002, cached_tokens=4000), _item(140, cost=0.002, cached_tokens=4000)])
+        uncached = _summarize_cache_phase([_item(480, cost=0.01), _item(520, cost=0.01)])
+        assert cached["avg_ttft_ms"] == 120
+        assert cached["cache_hit_rate"] == 1.0
+        assert cached["avg_cached_tokens"] == 4000
+        assert uncached["cache_hit_rate"] == 0.0
+
+        eff = _cache_effectiveness(cached, uncached)
+        assert eff["ttft_speedup"] == pytest.approx(500 / 120, rel=1e-3)
+        assert eff["ttft_saved_ms"] == 380
+        assert eff["cost_savings_pct"] == 80.0
+
+    def test_failures_excluded(self):
+        s = _summarize_cache_phase([_item(100), _item(0, success=False)])
+        assert s["runs"] == 2 and s["successes"] == 1
+        assert s["avg_ttft_ms"] == 100
+
+    def test_effectiveness_without_data(self):
+        empty = _summarize_cache_phase([])
+        assert _cache_effectiveness(empty, empty) == {
+            "ttft_speedup": 0.0, "ttft_saved_ms": 0.0, "cost_savings_pct": 0.0,
+        }
+
+
+class TestCacheBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_shared_then_unique_phases(self, monkeypatch, benchmark_handler_env):
+        env = benchmark_handler_env
+        target = Target(provider="OpenAI", model_id="gpt-x", display_name="X", provider_key="openai")
+        seen_seeds = []
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, context_seed=None, **kw):
+            seen_seeds.append(context_seed)
+            warm = context_seed is not None and seen_seeds.count(context_seed) > 1
+            return RunResult(
+                target=t, ttft_ms=100.0 if warm else 500.0, total_time_s=1.0,
+                output_tokens=10, input_tokens=context_tokens,
+                input_tokens_per_second=context_tokens / (0.1 if warm else 0.5),
+                cost=0.002 if warm else 0.01, cached_tokens=context_tokens if warm else 0,
+            )
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = [target]
+
+        params = {
+            "user_id": "u1",
+            "models": ["gpt-x"],
+            "prompt": "Summarize the document.",
+            "warmup": False,
+            "mode": "cache",
+            "runs": 2,
+            "context_tiers": [0, 4000],
+        }
+        run_id = await job_handlers.benchmark_handler("job-c", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["context_tiers"] == [4000]
+        # 1 prime + 2 shared (same seed) + 2 unique (fresh windows)
+        assert len(env.rows) == 5
+        assert [r["cache_phase"] for r in env.rows] == ["prime", "shared", "shared", "unique", "unique"]
+        assert len({s for s in seen_seeds[:3]}) == 1
+        assert seen_seeds[3] is None and seen_seeds[4] is None
+
+        tiers = env.saved["metadata"]["cache_tiers"]
+        assert env.saved["metadata"]["mode"] == "cache"
+        assert len(tiers) == 1
+        summary = tiers[0]
+        assert summary["prime"]["ttft_ms"] == 500.0
+        assert summary["cached"]["avg_ttft_ms"] == 100.0
+        assert summary["uncached"]["avg_ttft_ms"] == 500.0
+        assert summary["cached"]["avg_cached_tokens"] == 4000
+        assert summary["ttft_speedup"] == 5.0
+        assert summary["cost_savings_pct"] == 80.0
+
+    @pytest.mark.asyncio
+    async def test_requires_nonzero_tier(self, benchmark_handler_env):
+        env = benchmark_handler_env
+        env.targets = [Target(provider="OpenAI", model_id="gpt-x", display_name="X")]
+
+        params = {"user_id": "u1", "models": ["gpt-x"], "mode": "cache", "context_tiers": [0]}
+        assert await job_handlers.benchmark_handler("job-c2", params, asyncio.Event(), env.progress_cb) is None
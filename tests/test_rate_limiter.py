@@ -0,0 +1,179 @@
+"""Tests for the process-wide provider rate-limit scheduler.
+
+Covers header parsing, token-bucket reservations, limit learning from
+x-ratelimit-* headers, Retry-After backoff, and scheduler use by
+async_run_single.
+
+Run: uv run pytest tests/test_rate_limiter.py -v
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import litellm
+import pytest
+
+import rate_limiter
+from benchmark import Target
+from rate_limiter import (
+    RateLimitScheduler,
+    TokenBucket,
+    estimate_tokens,
+    parse_duration,
+    parse_retry_after,
+    response_headers,
+)
+from routers.helpers import async_run_single
+
+KWARGS = {"model": "openai/gpt-x", "api_base": "http://llm.local/v1", "api_key": "sk-a",
+          "messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}
+
+
+def _rate_limit_error(headers=None):
+    return litellm.exceptions.RateLimitError(
+        message="slow down", llm_provider="openai", model="gpt-x",
+        response=httpx.Response(429, headers=headers or {}),
+    )
+
+
+class TestParsing:
+
+    @pytest.mark.parametrize("value,expected", [
+        ("20ms", 0.02), ("1.5s", 1.5), ("6m0s", 360.0), ("1h2m3s", 3723.0), ("12", 12.0),
+    ])
+    def test_durations(self, value, expected):
+        assert parse_duration(value) == pytest.approx(expected)
+
+    def test_unparseable_duration(self):
+        assert parse_duration("soon") is None
+        assert parse_duration(None) is None
+
+    def test_retry_after_variants(self):
+        assert parse_retry_after({"retry-after": "3"}) == 3.0
+        assert parse_retry_after({"retry-after-ms": "250"}) == 0.25
+        assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+        assert parse_retry_after({}) is None
+
+    def test_response_headers_strip_provider_prefix(self):
+        resp = SimpleNamespace(_hidden_params={"additional_headers": {
+            "llm_provider-x-ratelimit-limit-requests": "60",
+        }})
+        assert response_headers(resp) == {"x-ratelimit-limit-requests": "60"}
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens(KWARGS) == 150
+
+
+class TestTokenBucket:
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(60)  # 1/s, burst of 10
+        waits = [bucket.reserve(1) for _ in range(12)]
+        assert waits[:10] == [0.0] * 10
+        assert waits[10] == pytest.approx(1.0, abs=0.05)
+        assert waits[11] == pytest.approx(2.0, abs=0.05)
+
+    def test_oversized_request_charges_full_amount(self):
+        bucket = TokenBucket(60)  # 1/s, burst of 10
+        assert bucket.reserve(25) == 0.0  # goes out on a full bucket...
+        assert bucket.reserve(1) == pytest.approx(16.0, abs=0.05)  # ...and the next waits out the overdraft
+
+    def test_sync_remaining_caps_level(self):
+        bucket = TokenBucket(600)
+        bucket.sync_remaining(0)
+        assert bucket.reserve(1) == pytest.approx(0.1, abs=0.01)
+
+
+class TestScheduler:
+
+    def test_endpoint_key_separates_api_keys(self):
+        other = {**KWARGS, "api_key": "sk-b"}
+        assert RateLimitScheduler.endpoint_key(KWARGS) != RateLimitScheduler.endpoint_key(other)
+        assert RateLimitScheduler.endpoint_key({"model": "anthropic/claude"}).startswith("anthropic|")
+        assert "sk-a" not in RateLimitScheduler.endpoint_key(KWARGS)
+
+    def test_learns_limits_unless_configured(self):
+        sched = RateLimitScheduler()
+        sched.observe_headers("a", {"x-ratelimit-limit-requests": "120", "x-ratelimit-limit-tokens": "9000"})
+        assert sched.stats()["a"]["rpm"] == 120 and sched.stats()["a"]["tpm"] == 9000
+
+        sched.configure("b", rpm=30)
+        sched.observe_headers("b", {"x-ratelimit-limit-requests": "500"})
+        assert sched.stats()["b"]["rpm"] == 30
+
+    def test_exhausted_remaining_blocks_until_reset(self):
+        sched = RateLimitScheduler()
+        sched.observe_headers("a", {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+        assert sched.stats()["a"]["blocked_for_s"] == pytest.approx(2.0, abs=0.1)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_bucket(self):
+        sched = RateLimitScheduler()
+        sched.configure("a", rpm=600)  # 10/s, burst of 100
+        for _ in range(100):
+            sched._endpoints["a"].requests.reserve(1)
+        start = time.perf_counter()
+        await asyncio.gather(*(sched.acquire("a") for _ in range(3)))
+        assert time.perf_counter() - start == pytest.approx(0.3, abs=0.1)
+
+    @pytest.mark.asyncio
+    async def test_retries_429_honoring_retry_after(self):
+        sched = RateLimitScheduler()
+        ok = SimpleNamespace(_hidden_params={"additional_headers": {"x-ratelimit-limit-requests": "90"}})
+        mock = AsyncMock(side_effect=[_rate_limit_error({"retry-after": "0.05"}), ok])
+        sends = []
+        with patch("litellm.acompletion", mock):
+            start = time.perf_counter()
+            resp = await sched.acompletion(dict(KWARGS), on_send=lambda: sends.append(time.perf_counter()))
+        assert resp is ok
+        assert mock.await_count == 2
+        assert sends[1] - start >= 0.05
+        stats = sched.stats()[sched.endpoint_key(KWARGS)]
+        assert stats["rate_limited"] == 1
+        assert stats["rpm"] == 90
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, monkeypatch):
+        monkeypatch.setattr(rate_limiter, "BASE_BACKOFF_S", 0.001)
+        sched = RateLimitScheduler()
+        mock = AsyncMock(side_effect=_rate_limit_error())
+        with patch("litellm.acompletion", mock):
+            with pytest.raises(litellm.exceptions.RateLimitError):
+                await sched.acompletion(dict(KWARGS), max_retries=2)
+        assert mock.await_count == 3
+
+
+class _FakeStream:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop(0)
+
+
+class TestAsyncRunSingleScheduling:
+
+    @pytest.mark.asyncio
+    async def test_429_is_retried_and_ttft_excludes_backoff(self, monkeypatch):
+        monkeypatch.setattr(rate_limiter, "scheduler", RateLimitScheduler())
+        monkeypatch.setattr("routers.helpers.scheduler", rate_limiter.scheduler)
+        chunk = SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content="hi", reasoning_content=None))], usage=None,
+        )
+        mock = AsyncMock(side_effect=[_rate_limit_error({"retry-after": "0.2"}), _FakeStream([chunk])])
+        target = Target(provider="Local", model_id="openai/local", display_name="Local",
+                        api_base="http://llm.local/v1", rpm=600)
+        with patch("litellm.acompletion", mock):
+            result = await async_run_single(target, "hi", 16, 0.0)
+        assert result.success
+        assert result.ttft_ms < 150
+        key = rate_limiter.scheduler.endpoint_key({"api_base": "http://llm.local/v1"})
+        assert rate_limiter.scheduler.stats()[key]["rpm"] == 600
@@ -0,0 +1,183 @@
+"""Tests for reasoning vs answer phase metrics on thinking models.
+
+Covers the phase split (usage-reported vs chunk-share reasoning tokens),
+reasoning chunks in async_run_single (mocked stream), aggregation of the
+phase means, and persistence of the reasoning columns.
+
+Run: uv run pytest tests/test_reasoning_phases.py -v
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import db
+import job_handlers
+from aggregation import summarize_result_rows, summarize_runs
+from benchmark import RunResult, Target, split_reasoning_phases, usage_reasoning_tokens
+from routers.helpers import async_run_single
+
+
+def _target() -> Target:
+    return Target(provider="Local", model_id="openai/qwen3", display_name="Q", api_base="http://h.local/v1")
+
+
+def _chunk(content=None, reasoning=None, usage=None):
+    delta = SimpleNamespace(content=content, reasoning_content=reasoning)
+    has_delta = content is not None or reasoning is not None
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)] if has_delta else [], usage=usage)
+
+
+class _TimedStream:
+    """Async stream yielding (delay_s, chunk) pairs."""
+
+    def __init__(self, timed_chunks):
+        self._chunks = list(timed_chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        delay, chunk = self._chunks.pop(0)
+        await asyncio.sleep(delay)
+        return chunk
+
+
+def _usage(completion, reasoning=None):
+    details = SimpleNamespace(reasoning_tokens=reasoning) if reasoning is not None else None
+    return SimpleNamespace(completion_tokens=completion, prompt_tokens=10, completion_tokens_details=details)
+
+
+class TestSplitReasoningPhases:
+
+    def test_usage_reported_tokens(self):
+        result = RunResult(target=_target(), output_tokens=300)
+        split_reasoning_phases(result, 0.2, 2.2, 3.2, reasoning_chunks=150, answer_chunks=50,
+                               reported_reasoning_tokens=200)
+        assert result.reasoning_tokens == 200
+        assert (result.ttft_reasoning_ms, result.ttft_answer_ms) == (200.0, 2200.0)
+        assert result.reasoning_tps == pytest.approx(100.0)   # 200 tokens over 2 s
+        assert result.answer_tps == pytest.approx(100.0)      # 100 tokens over 1 s
+
+    def test_chunk_share_without_usage_details(self):
+        result = RunResult(target=_target(), output_tokens=100)
+        split_reasoning_phases(result, 0.1, None, 1.1, reasoning_chunks=40, answer_chunks=0)
+        assert result.reasoning_tokens == 100
+        assert result.ttft_answer_ms is None and result.answer_tps is None
+        assert result.reasoning_tps == pytest.approx(100.0)
+
+    def test_hidden_reasoning(self):
+        result = RunResult(target=_target(), output_tokens=120)
+        split_reasoning_phases(result, None, 3.0, 3.5, reasoning_chunks=0, answer_chunks=20,
+                               reported_reasoning_tokens=100)
+        assert result.ttft_reasoning_ms is None and result.reasoning_tps is None
+        assert result.ttft_answer_ms == 3000.0 and result.answer_tps == pytest.approx(40.0)
+
+    def test_plain_model_untouched(self):
+        result = RunResult(target=_target(), output_tokens=50)
+        split_reasoning_phases(result, None, 0.1, 1.0, reasoning_chunks=0, answer_chunks=50,
+                               reported_reasoning_tokens=0)
+        assert result.reasoning_tokens is None and result.answer_tps is None
+
+    def test_usage_reasoning_tokens(self):
+        assert usage_reasoning_tokens(_usage(10, 4)) == 4
+        assert usage_reasoning_tokens(_usage(10)) is None
+        assert usage_reasoning_tokens(SimpleNamespace(completion_tokens=10)) is None
+
+
+class TestAsyncRunSingleReasoning:
+
+    @pytest.mark.asyncio
+    async def test_reasoning_chunks_count_and_phases_split(self):
+        stream = _TimedStream(
+            [(0.0, _chunk(reasoning="think"))]
+            + [(0.01, _chunk(reasoning="more")) for _ in range(5)]
+            + [(0.01, _chunk(content="ans")) for _ in range(3)]
+            + [(0.0, _chunk(usage=_usage(90, 60)))]
+        )
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+            result = await async_run_single(_target(), "hi", 256, 0.0)
+
+        assert result.success and result.output_tokens == 90
+        assert result.reasoning_tokens == 60
+        assert result.ttft_reasoning_ms < result.ttft_answer_ms
+        assert result.reasoning_tps > 0 and result.answer_tps > 0
+
+    @pytest.mark.asyncio
+    async def test_reasoning_only_stream_without_usage(self):
+        stream = _TimedStream([(0.0, _chunk(reasoning="a")), (0.01, _chunk(reasoning="b"))])
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+            result = await async_run_single(_target(), "hi", 256, 0.0)
+        assert result.output_tokens == 2  # previously 0: reasoning chunks were not counted
+        assert result.reasoning_tokens == 2 and result.tokens_per_second > 0
+
+    @pytest.mark.asyncio
+    async def test_mixed_delta_counts_once(self):
+        stream = _TimedStream([
+            (0.0, _chunk(reasoning="a")),
+            (0.01, _chunk(content="b", reasoning="c")),
+            (0.01, _chunk(content="d")),
+        ])
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+            result = await async_run_single(_target(), "hi", 256, 0.0)
+        assert result.output_tokens == 3
+        assert result.reasoning_tokens == 2  # 2 of 4 phase chunks were reasoning
+
+
+class TestReasoningAggregation:
+
+    def test_means_over_reasoning_runs(self):
+        def run(reasoning_tps):
+            return RunResult(target=_target(), ttft_ms=50.0, total_time_s=1.0, output_tokens=100,
+                             tokens_per_second=100.0, reasoning_tokens=80 if reasoning_tps else None,
+                             reasoning_tps=reasoning_tps, answer_tps=40.0 if reasoning_tps else None)
+
+        [(_, fields)] = summarize_runs([run(120.0), run(80.0), run(None)], [0] * 3)
+        assert fields["avg_reasoning_tps"] == 100.0
+        assert fields["avg_answer_tps"] == 40.0 and fields["avg_reasoning_tokens"] == 80.0
+
+        [(_, plain)] = summarize_runs([run(None)], [0])
+        assert plain["avg_reasoning_tps"] is None
+
+    def test_stored_rows(self):
+        base = {"run_id": "r", "model_id": "m", "model": "M", "provider": "P", "context_tokens": 0,
+                "success": 1, "tokens_per_second": 10.0, "ttft_ms": 100.0}
+        [row] = summarize_result_rows([
+            {**base, "reasoning_tokens": 300, "ttft_answer_ms": 2000.0, "answer_tps": 50.0},
+            {**base, "reasoning_tokens": 100, "ttft_answer_ms": 1000.0, "answer_tps": 70.0},
+        ])["r"]
+        assert row["avg_reasoning_tokens"] == 200.0
+        assert (row["avg_ttft_answer_ms"], row["avg_answer_tps"]) == (1500.0, 60.0)
+        assert row["avg_reasoning_tps"] is None
+
+
+class TestReasoningPersistence:
+
+    @pytest.mark.asyncio
+    async def test_columns_round_trip(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "reasoning.db")
+        await db.init_db()
+        user = await db.create_user("reasoning@example.com", "pw")
+        model_id = await db.ensure_model_exists(user["id"], "openai/qwen3")
+        run_id = await db.save_benchmark_run(user_id=user["id"], prompt="p", context_tiers="[0]")
+
+        result = RunResult(target=_target(), ttft_ms=40.0, total_time_s=3.0, output_tokens=300,
+                           tokens_per_second=100.0, reasoning_tokens=200, ttft_reasoning_ms=40.0,
+                           ttft_answer_ms=2040.0, reasoning_tps=100.0, answer_tps=100.0)
+        item = job_handlers._benchmark_result_item(_target(), result, 1, 1, 0)
+        assert item["reasoning_tokens"] == 200 and item["answer_tps"] == 100.0
+        await job_handlers._persist_benchmark_item(user["id"], run_id, item, {"openai/qwen3": model_id}, {})
+
+        [row] = await db.get_benchmark_results(run_id)
+        assert row["avg_reasoning_tokens"] == 200.0
+        assert (row["avg_ttft_reasoning_ms"], row["avg_ttft_answer_ms"]) == (40.0, 2040.0)
+        assert (row["avg_reasoning_tps"], row["avg_answer_tps"]) == (100.0, 100.0)
+
+        plain = job_handlers._benchmark_result_item(
+            _target(), RunResult(target=_target(), output_tokens=10, tokens_per_second=10.0), 1, 1, 0,
+        )
+        assert "reasoning_tokens" not in plain
@@ -0,0 +1,268 @@
+"""Tests for rescoring stored tool-eval case results.
+
+Covers the per-row rescoring helper, keyset paging and bulk score updates
+in the case_results table, the jobs CHECK migration, the rescore job
+handler (no model calls) and the submit endpoint.
+
+Run: uv run pytest tests/test_rescore.py -v
+"""
+
+import asyncio
+import json
+
+import aiosqlite
+import litellm
+import pytest
+import pytest_asyncio
+
+import db
+import job_handlers
+import routers.tool_eval as tool_eval
+from benchmark import Target
+from routers.tool_eval import run_single_eval
+from tool_eval_scoring import _compile_case, _rescore_case_result, _response_format_flags, compile_suite
+
+TOOLS = [{"type": "function", "function": {"name": "get_weather", "description": "",
+                                            "parameters": {"type": "object", "properties": {"city": {"type": "string"}},
+                                                           "required": ["city"]}}}]
+SUITE = compile_suite("s1", "v1", [{"name": "get_weather", "parameters_schema": TOOLS[0]["function"]["parameters"]}], [])
+
+
+def _tool_response(name="get_weather", args='{"city": "Paris, FR"}'):
+    return litellm.ModelResponse(
+        choices=[{"index": 0, "finish_reason": "tool_calls", "message": {
+            "role": "assistant", "content": None,
+            "tool_calls": [{"id": "c1", "type": "function", "function": {"name": name, "arguments": args}}],
+        }}],
+        model="gpt-4o", usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    )
+
+
+def _case(**over) -> dict:
+    case = {"id": "tc1", "prompt": "Weather in Paris?", "expected_tool": "get_weather",
+            "expected_params": json.dumps({"city": "Paris"}), "should_call_tool": 1,
+            "scoring_config_json": None, "multi_turn_config": None}
+    case.update(over)
+    return _compile_case(case)
+
+
+async def _live_row(monkeypatch, case: dict, response=None) -> dict:
+    """Run a case through run_single_eval against a fake provider; return it as a stored row."""
+    async def fake(target, kwargs, *a, **kw):
+        return response or _tool_response(), 0.0
+
+    monkeypatch.setattr(tool_eval, "_scheduled_completion", fake)
+    target = Target(provider="OpenAI", model_id="gpt-4o", display_name="GPT-4o")
+    result = await run_single_eval(target, TOOLS, case, 0.0)
+    row = {k: result[k] for k in (
+        "tool_selection_score", "param_accuracy", "overall_score", "irrelevance_score", "schema_score",
+        "required_present", "type_correct", "hallucination_free", "format_compliance", "error_type",
+        "actual_tool",
+    )}
+    row.update(id="cr1", test_case_id=case["id"], success=1 if result["success"] else 0,
+               schema_errors=json.dumps(result["schema_errors"]) if result["schema_errors"] else None,
+               actual_params=json.dumps(result["actual_params"]), raw_response=json.dumps(result["raw_response"]))
+    return row
+
+
+class TestRescoreCaseResult:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("args", [
+        '{"city": "Paris, FR"}', '{"city": "Paris", "units": "c"}', '{"city": 5}', "not json",
+    ])
+    async def test_unchanged_config_reproduces_live_scores(self, monkeypatch, args):
+        case = _case()
+        row = await _live_row(monkeypatch, case, _tool_response(args=args))
+        new = _rescore_case_result(row, case, SUITE)
+        assert {k: new[k] for k in new if k != "id"} == {k: row[k] for k in new if k != "id"}
+
+    @pytest.mark.asyncio
+    async def test_scoring_config_change_applies(self, monkeypatch):
+        row = await _live_row(monkeypatch, _case())
+        assert row["param_accuracy"] == 0.0
+        new = _rescore_case_result(row, _case(scoring_config_json='{"mode": "contains"}'), SUITE)
+        assert new["id"] == "cr1" and new["param_accuracy"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_json_blob_tool_name_stays_normalized(self, monkeypatch):
+        blob = _tool_response(name='{"name": "get_weather", "arguments": {"city": "Paris"}}', args="{}")
+        row = await _live_row(monkeypatch, _case(), blob)
+        assert row["format_compliance"] == "NORMALIZED"
+        assert _rescore_case_result(row, _case(), SUITE)["format_compliance"] == "NORMALIZED"
+
+    def test_skips_failed_multi_turn_and_missing_cases(self):
+        row = {"id": "cr1", "success": 1, "actual_tool": "get_weather", "actual_params": "{}", "raw_response": None}
+        assert _rescore_case_result({**row, "success": 0}, _case(), SUITE) is None
+        mt = _case(multi_turn_config=json.dumps({"multi_turn": True, "max_rounds": 3}))
+        assert _rescore_case_result(row, mt, SUITE) is None
+        assert _rescore_case_result(row, None, SUITE) is None
+
+    def test_format_flags_from_raw_response(self):
+        assert _response_format_flags(None) == (False, False, False)
+        raw = {"choices": [{"message": {"tool_calls": [{"function": {"name": "f", "arguments": "{"}}]}}]}
+        assert _response_format_flags(raw) == (True, False, True)
+
+
+@pytest_asyncio.fixture
+async def eval_run(tmp_path, monkeypatch):
+    """A stored eval run: 3 scoreable single-turn rows, 1 failed row, 1 multi-turn row."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "rescore.db")
+    await db.init_db()
+    user = await db.create_user("rescore@example.com", "pw")
+    suite_id = await db.create_tool_suite(user["id"], "Weather", "")
+    await db.create_tool_definitions_batch(suite_id, [
+        {"name": "get_weather", "description": "", "parameters_schema": TOOLS[0]["function"]["parameters"]},
+    ])
+    case_id = await db.create_test_case(suite_id, "Weather in Paris?", "get_weather", json.dumps({"city": "Paris"}))
+    mt_id = await db.create_test_case(suite_id, "Chain", "get_weather", json.dumps({"city": "Paris"}),
+                                      multi_turn_config=json.dumps({"multi_turn": True, "max_rounds": 3}))
+    model_id = await db.ensure_model_exists(user["id"], "gpt-4o")
+    run_id = await db.save_tool_eval_run(user["id"], suite_id, 0.0)
+
+    raw = json.dumps(tool_eval._capture_raw_response(_tool_response()))
+    stored = {"model_id": model_id, "actual_tool": "get_weather", "actual_params": '{"city": "Paris, FR"}',
+              "raw_response": raw, "tool_selection_score": 1.0, "param_accuracy": 0.0, "overall_score": 1.0,
+              "schema_score": 1.0, "required_present": 1, "type_correct": 1, "hallucination_free": 1}
+    rows = [{**stored, "test_case_id": case_id} for _ in range(3)]
+    rows.append({**stored, "test_case_id": case_id, "success": False, "error": "[timeout]"})
+    rows.append({**stored, "test_case_id": mt_id, "param_accuracy": 0.5})
+    await db.save_case_results_batch(run_id, rows)
+    return {"user": user, "run_id": run_id, "case_id": case_id, "suite_id": suite_id}
+
+
+class TestStorage:
+
+    @pytest.mark.asyncio
+    async def test_pages_and_bulk_update(self, eval_run):
+        run_id = eval_run["run_id"]
+        assert await db.count_case_results(run_id) == 5
+        first = await db.get_case_results_page(run_id, 0, 2)
+        rest = await db.get_case_results_page(run_id, first[-1]["_rowid"], 10)
+        assert len(first) == 2 and len(rest) == 3
+        assert {r["id"] for r in first}.isdisjoint(r["id"] for r in rest)
+
+        new = _rescore_case_result(first[0], _case(), SUITE)
+        await db.update_case_result_scores([{**new, "param_accuracy": 0.25}])
+        [updated] = [r for r in await db.get_case_results(run_id) if r["id"] == new["id"]]
+        assert updated["param_accuracy"] == 0.25
+
+    @pytest.mark.asyncio
+    async def test_schema_errors_persist(self, eval_run):
+        run_id = eval_run["run_id"]
+        [row] = await db.get_case_results_page(run_id, 0, 1)
+        assert row["schema_errors"] is None
+        new = _rescore_case_result({**row, "actual_params": '{"city": 5}'}, _case(), SUITE)
+        assert json.loads(new["schema_errors"]) and new["schema_errors"] != row["schema_errors"]
+        await db.update_case_result_scores([new])
+        [stored] = [r for r in await db.get_case_results(run_id) if r["id"] == row["id"]]
+        assert stored["schema_errors"] == new["schema_errors"]
+
+        model_id = stored["model_id"]
+        await db.save_case_result(run_id, eval_run["case_id"], model_id, schema_errors='["$.city: bad"]')
+        errors = [r["schema_errors"] for r in await db.get_case_results(run_id)]
+        assert '["$.city: bad"]' in errors
+
+    @pytest.mark.asyncio
+    async def test_old_jobs_table_is_rebuilt(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "mig.db")
+        await db.init_db()
+        user = await db.create_user("rescore-mig@example.com", "pw")
+        async with aiosqlite.connect(str(db.DB_PATH)) as conn:
+            cursor = await conn.execute("SELECT sql FROM sqlite_master WHERE name = 'jobs'")
+            (sql,) = await cursor.fetchone()
+            await conn.execute("ALTER TABLE jobs RENAME TO jobs_tmp")
+            await conn.execute(sql.replace(", 'rescore'", ""))
+            await conn.execute("DROP TABLE jobs_tmp")
+            await conn.execute("DELETE FROM schema_version WHERE version = 717")
+            await conn.commit()
+        await db.create_job("old-job", user["id"], "tool_eval", "done", "{}")
+        with pytest.raises(Exception):
+            await db.create_job("rs-0", user["id"], "rescore", "pending", "{}")
+
+        await db.init_db()
+        assert (await db.get_job("old-job"))["job_type"] == "tool_eval"
+        assert (await db.create_job("rs-1", user["id"], "rescore", "pending", "{}"))["job_type"] == "rescore"
+
+    @pytest.mark.asyncio
+    async def test_rebuild_writes_full_job_type_list(self, tmp_path, monkeypatch):
+        """A table that missed both added job types (e.g. 715 failed) gets both back."""
+        monkeypatch.setattr(db, "DB_PATH", tmp_path / "mig2.db")
+        await db.init_db()
+        user = await db.create_user("rescore-mig2@example.com", "pw")
+        async with aiosqlite.connect(str(db.DB_PATH)) as conn:
+            cursor = await conn.execute("SELECT sql FROM sqlite_master WHERE name = 'jobs'")
+            (sql,) = await cursor.fetchone()
+            await conn.execute("ALTER TABLE jobs RENAME TO jobs_tmp")
+            await conn.execute(sql.replace(", 'embedding_benchmark', 'rescore'", ""))
+            await conn.execute("DROP TABLE jobs_tmp")
+            await conn.commit()
+
+        await db.init_db()
+        for job_type in db.JOB_TYPES:
+            job = await db.create_job(f"job-{job_type}", user["id"], job_type, "pending", "{}")
+            assert job["job_type"] == job_type
+
+
+class TestRescoreHandler:
+
+    @pytest.mark.asyncio
+    async def test_rescores_after_scoring_config_change(self, eval_run, monkeypatch):
+        sent, progress = [], []
+
+        class _WS:
+            async def send_to_user(self, user_id, payload):
+                sent.append(payload)
+
+        async def no_calls(*a, **kw):
+            raise AssertionError("rescore must not call the model")
+
+        async def on_progress(pct, detail):
+            progress.append(pct)
+
+        monkeypatch.setattr(job_handlers, "ws_manager", _WS())
+        monkeypatch.setattr(job_handlers, "RESCORE_PAGE_SIZE", 2)
+        monkeypatch.setattr(litellm, "acompletion", no_calls)
+        await db.update_test_case(eval_run["case_id"], eval_run["suite_id"],
+                                  scoring_config_json='{"mode": "contains"}')
+
+        params = {"user_id": eval_run["user"]["id"], "eval_run_id": eval_run["run_id"]}
+        assert await job_handlers.rescore_handler("job-r", params, asyncio.Event(), on_progress) == eval_run["run_id"]
+
+        done = sent[-1]
+        assert [p["type"] for p in sent] == ["rescore_start", "rescore_complete"]
+        assert (done["rescored"], done["changed"], done["skipped"]) == (3, 3, 2)
+        assert len(progress) == 3
+        results = await db.get_case_results(eval_run["run_id"])
+        assert sorted(r["param_accuracy"] for r in results) == [0.0, 0.5, 1.0, 1.0, 1.0]
+        assert done["summaries"][0]["param_accuracy_pct"] == 70.0
+
+    @pytest.mark.asyncio
+    async def test_unknown_run_fails(self, eval_run, monkeypatch):
+        sent = []
+
+        class _WS:
+            async def send_to_user(self, user_id, payload):
+                sent.append(payload)
+
+        async def noop(*a, **kw):
+            return None
+
+        monkeypatch.setattr(job_handlers, "ws_manager", _WS())
+        params = {"user_id": eval_run["user"]["id"], "eval_run_id": "missing"}
+        assert await job_handlers.rescore_handler("job-x", params, asyncio.Event(), noop) is None
+        assert sent[0]["type"] == "job_failed"
+
+    def test_registered_as_job_type(self):
+        from job_registry import registry
+
+        job_handlers.register_all_handlers()
+        assert registry._handlers["rescore"] is job_handlers.rescore_handler
+
+
+class TestEndpoint:
+
+    @pytest.mark.asyncio
+    async def test_unknown_run_is_404(self, app_client, auth_headers):
+        resp = await app_client.post("/api/tool-eval/history/nope/rescore", headers=auth_headers)
+        assert resp.status_code == 404
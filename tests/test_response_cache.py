@@ -0,0 +1,229 @@
+"""Tests for the deterministic tool-eval response cache.
+
+Covers cache keys, LRU eviction in the response_cache table, the
+read_write / replay modes of run_single_eval and run_multi_turn_eval,
+and the admin stats/clear endpoints.
+
+Run: uv run pytest tests/test_response_cache.py -v
+"""
+
+import json
+
+import litellm
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+
+import db
+import response_cache
+import routers.tool_eval as tool_eval
+from benchmark import Target
+from response_cache import cache_key, cacheable
+from routers.tool_eval import run_multi_turn_eval, run_single_eval
+from schemas import ToolEvalRequest
+
+TOOLS = [{"type": "function", "function": {"name": "get_weather", "description": "",
+                                            "parameters": {"type": "object", "properties": {"city": {"type": "string"}}}}}]
+CASE = {"id": "tc1", "prompt": "Weather in Paris?", "expected_tool": "get_weather",
+        "expected_params": {"city": "Paris"}}
+
+
+def _kwargs(**over) -> dict:
+    kw = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}], "tools": TOOLS,
+          "tool_choice": "required", "temperature": 0.0, "max_tokens": 1024, "timeout": 120}
+    kw.update(over)
+    return kw
+
+
+def _tool_response(name="get_weather", args='{"city": "Paris"}', call_id="c1"):
+    return litellm.ModelResponse(
+        choices=[{"index": 0, "finish_reason": "tool_calls", "message": {
+            "role": "assistant", "content": None,
+            "tool_calls": [{"id": call_id, "type": "function", "function": {"name": name, "arguments": args}}],
+        }}],
+        model="gpt-4o", usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    )
+
+
+@pytest_asyncio.fixture
+async def cache_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "cache.db")
+    monkeypatch.setattr(response_cache, "_stored_bytes", None)
+    await db.init_db()
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Fake _scheduled_completion; records every live call."""
+    calls = []
+
+    async def fake(target, kwargs, *a, **kw):
+        calls.append(dict(kwargs))
+        return _tool_response(), 0.0
+
+    monkeypatch.setattr(tool_eval, "_scheduled_completion", fake)
+    return calls
+
+
+class TestCacheKey:
+
+    def test_transport_kwargs_do_not_change_the_key(self):
+        assert cache_key(_kwargs()) == cache_key(_kwargs(timeout=15, client=object()))
+
+    @pytest.mark.parametrize("change", [
+        {"messages": [{"role": "user", "content": "bye"}]},
+        {"tool_choice": "auto"},
+        {"top_p": 0.9},
+        {"api_base": "http://other/v1"},
+        {"api_key": "sk-other"},
+        {"model": "gpt-4o-mini"},
+    ])
+    def test_response_shaping_kwargs_change_the_key(self, change):
+        assert cache_key(_kwargs()) != cache_key(_kwargs(**change))
+
+    def test_only_temperature_zero_is_cacheable(self):
+        assert cacheable(_kwargs())
+        assert not cacheable(_kwargs(temperature=0.7))
+        assert not cacheable({"model": "o1"})
+
+
+class TestStorage:
+
+    @pytest.mark.asyncio
+    async def test_round_trip_and_lru_eviction(self, cache_db, monkeypatch):
+        for key in ("a", "b", "c"):
+            await response_cache.put(key, "gpt-4o", _tool_response(), 800.0)
+        conn = await db.get_db()
+        try:
+            for key, ts in (("a", "2026-01-01 00:00:03"), ("b", "2026-01-01 00:00:01"), ("c", "2026-01-01 00:00:02")):
+                await conn.execute("UPDATE response_cache SET last_used_at = ? WHERE cache_key = ?", (ts, key))
+            await conn.commit()
+        finally:
+            await conn.close()
+
+        response, latency_ms = await response_cache.get("b")  # b becomes most recently used
+        assert response.choices[0].message.tool_calls[0].function.name == "get_weather"
+        assert latency_ms == 800.0
+
+        size = (await db.get_response_cache_stats())["size_bytes"] // 3
+        assert await db.evict_response_cache(size * 2) == 1
+        assert await response_cache.get("c") is None
+        assert await response_cache.get("a") and await response_cache.get("b")
+
+        stats = await db.get_response_cache_stats()
+        assert stats["entries"] == 2 and stats["hits"] >= 3
+
+    @pytest.mark.asyncio
+    async def test_put_evicts_past_size_cap(self, cache_db, monkeypatch):
+        monkeypatch.setattr(response_cache, "RESPONSE_CACHE_MAX_MB", 0.0)
+        await response_cache.put("k", "gpt-4o", {"choices": []}, 1.0)
+        assert (await db.get_response_cache_stats())["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_running_total_skips_sum_until_over_cap(self, cache_db, monkeypatch):
+        sums = []
+        real_stats, real_evict = db.get_response_cache_stats, db.evict_response_cache
+
+        async def counting_stats():
+            sums.append("stats")
+            return await real_stats()
+
+        async def counting_evict(max_bytes):
+            sums.append("evict")
+            return await real_evict(max_bytes)
+
+        monkeypatch.setattr(db, "get_response_cache_stats", counting_stats)
+        monkeypatch.setattr(db, "evict_response_cache", counting_evict)
+        for i in range(5):
+            await response_cache.put(f"k{i}", "gpt-4o", _tool_response(), 1.0)
+        assert sums == ["stats"]
+
+        size = response_cache._stored_bytes // 5
+        monkeypatch.setattr(response_cache, "RESPONSE_CACHE_MAX_MB", size * 5.5 / (1024 * 1024))
+        await response_cache.put("k5", "gpt-4o", _tool_response(), 1.0)
+        assert sums == ["stats", "evict"] and response_cache._stored_bytes is None
+        assert (await real_stats())["entries"] == 4  # evicted down to 90% of the cap
+
+    @pytest.mark.asyncio
+    async def test_replay_keeps_reasoning_and_provider_fields(self, cache_db):
+        response = litellm.ModelResponse(
+            choices=[{"index": 0, "finish_reason": "stop", "message": {
+                "role": "assistant", "content": "ok", "reasoning_content": "thinking...",
+                "provider_specific_fields": {"refusal": None, "citations": ["a"]},
+            }}],
+            model="gpt-4o", usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        )
+        await response_cache.put("r", "gpt-4o", response, 1.0)
+        cached, _ = await response_cache.get("r")
+        message = cached.choices[0].message
+        assert message.reasoning_content == "thinking..."
+        assert message.provider_specific_fields["citations"] == ["a"]
+        assert cached.id == response.id
+
+
+class TestEvalModes:
+
+    @pytest.mark.asyncio
+    async def test_read_write_then_hit(self, cache_db, provider):
+        target = Target(provider="OpenAI", model_id="gpt-4o", display_name="GPT-4o")
+        first = await run_single_eval(target, TOOLS, CASE, 0.0, cache_mode="read_write")
+        second = await run_single_eval(target, TOOLS, CASE, 0.0, cache_mode="read_write")
+        assert len(provider) == 1
+        assert (first["cached"], second["cached"]) == (False, True)
+        assert second["actual_tool"] == "get_weather" and second["overall_score"] == first["overall_score"]
+        assert second["raw_response"]["choices"] == first["raw_response"]["choices"]
+
+        replayed = await run_single_eval(target, TOOLS, CASE, 0.0, cache_mode="replay")
+        assert replayed["cached"] and len(provider) == 1
+
+    @pytest.mark.asyncio
+    async def test_replay_miss_makes_no_call(self, cache_db, provider):
+        target = Target(provider="OpenAI", model_id="gpt-4o", display_name="GPT-4o")
+        result = await run_single_eval(target, TOOLS, CASE, 0.0, cache_mode="replay")
+        assert not result["success"] and result["error"].startswith("[cache_miss]")
+        assert provider == []
+
+    @pytest.mark.asyncio
+    async def test_off_and_nonzero_temperature_bypass(self, cache_db, provider):
+        target = Target(provider="OpenAI", model_id="gpt-4o", display_name="GPT-4o")
+        await run_single_eval(target, TOOLS, CASE, 0.0)
+        await run_single_eval(target, TOOLS, CASE, 0.7, cache_mode="read_write")
+        await run_single_eval(target, TOOLS, CASE, 0.7, cache_mode="read_write")
+        assert len(provider) == 3
+        assert (await db.get_response_cache_stats())["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_multi_turn_rounds_are_cached(self, cache_db, monkeypatch):
+        responses = iter([_tool_response("lookup_city", "{}", "c0"), _tool_response()])
+        calls = []
+
+        async def fake(target, kwargs, *a, **kw):
+            calls.append(kwargs)
+            return next(responses), 0.0
+
+        monkeypatch.setattr(tool_eval, "_scheduled_completion", fake)
+        target = Target(provider="OpenAI", model_id="gpt-4o", display_name="GPT-4o")
+        case = {**CASE, "_mt_config": {"max_rounds": 3, "mock_responses": {"lookup_city": {"id": 1}}}}
+        live = await run_multi_turn_eval(target, TOOLS, case, 0.0, cache_mode="read_write")
+        cached = await run_multi_turn_eval(target, TOOLS, case, 0.0, cache_mode="replay")
+        assert len(calls) == 2
+        assert (live["cached"], cached["cached"]) == (False, True)
+        assert [t["tool_name"] for t in cached["tool_chain"]] == ["lookup_city", "get_weather"]
+        assert cached["actual_tool"] == "get_weather"
+
+
+class TestRequestAndAdmin:
+
+    def test_cache_mode_validation(self):
+        assert ToolEvalRequest(suite_id="s", models=["m"]).cache_mode == "off"
+        with pytest.raises(ValidationError):
+            ToolEvalRequest(suite_id="s", models=["m"], cache_mode="sometimes")
+
+    @pytest.mark.asyncio
+    async def test_admin_stats_and_clear(self, app_client, admin_headers):
+        await db.put_cached_response("x" * 64, "gpt-4o", json.dumps({"choices": []}), 5.0)
+        system = await app_client.get("/api/admin/system", headers=admin_headers)
+        assert system.json()["response_cache"]["entries"] >= 1
+        resp = await app_client.delete("/api/admin/response-cache", headers=admin_headers)
+        assert resp.status_code == 200 and resp.json()["removed"] >= 1
+        assert (await db.get_response_cache_stats())["entries"] == 0
@@ -0,0 +1,143 @@
+"""Tests for compiled JSON-Schema validators used by Tier 2 scoring.
+
+Covers nested objects and arrays, enum/const/format/bounds, $ref/allOf/
+anyOf, additionalProperties, per-path errors, the hash-keyed validator
+cache and CompiledSuite.validator_for.
+
+Run: uv run pytest tests/test_schema_validator.py -v
+"""
+
+import json
+
+import pytest
+
+import tool_eval_scoring
+from tool_eval_scoring import SchemaValidator, compile_schema, compile_suite, score_schema_validation
+
+SEARCH_SCHEMA = {
+    "type": "object",
+    "required": ["query", "filters"],
+    "$defs": {
+        "range": {"type": "object", "required": ["gte"],
+                  "properties": {"gte": {"type": "string", "format": "date"},
+                                 "lte": {"type": "string", "format": "date"}}},
+    },
+    "properties": {
+        "query": {"type": "string", "minLength": 1},
+        "limit": {"type": "integer", "minimum": 1, "maximum": 100},
+        "filters": {
+            "type": "object",
+            "additionalProperties": False,
+            "properties": {
+                "status": {"type": "string", "enum": ["open", "closed"]},
+                "created": {"$ref": "#/$defs/range"},
+                "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 3},
+            },
+        },
+    },
+}
+GOOD = {"query": "bugs", "limit": 10,
+        "filters": {"status": "open", "created": {"gte": "2026-01-01"}, "tags": ["ui", "api"]}}
+
+
+class TestNestedValidation:
+
+    def test_valid_nested_params_score_perfect(self):
+        result = score_schema_validation(SEARCH_SCHEMA, GOOD)
+        assert result["schema_score"] == 1.0 and result["errors"] == []
+
+    def test_errors_are_reported_per_path(self):
+        bad = {"query": "", "limit": 500,
+               "filters": {"status": "done", "created": {"lte": "Jan 1"}, "tags": ["ui", 3], "owner": "me"}}
+        result = score_schema_validation(SEARCH_SCHEMA, bad)
+        assert result["errors"] == [
+            "$.query: expected at least 1 characters, got 0",
+            "$.limit: 500 is not <= 100",
+            "$.filters.status: 'done' is not one of ['open', 'closed']",
+            "$.filters.created.gte: required property missing",
+            "$.filters.created.lte: 'Jan 1' is not a valid date",
+            "$.filters.tags[1]: expected string, got integer",
+            "$.filters.owner: not in schema",
+        ]
+        # required: query, filters, created.gte -> 2/3
+        assert result["required_present"] == pytest.approx(2 / 3, abs=1e-3)
+        # checked values: query, limit, filters, status, created, lte, tags, tags[0], tags[1] -> 4/9 ok
+        assert result["type_correct"] == pytest.approx(4 / 9, abs=1e-3)
+        # keys: 3 top-level (properties known) + 4 in filters, 1 extra
+        assert result["hallucination_free"] == pytest.approx(1 - 1 / 8, abs=1e-3)
+
+    def test_wrong_container_type_does_not_descend(self):
+        result = score_schema_validation(SEARCH_SCHEMA, {"query": "x", "filters": ["status"]})
+        assert result["errors"] == ["$.filters: expected object, got array"]
+        assert result["type_correct"] == 0.5
+
+    def test_booleans_are_not_numbers(self):
+        schema = {"type": "object", "properties": {"n": {"type": "number"}, "i": {"type": "integer"}}}
+        assert score_schema_validation(schema, {"n": True, "i": False})["type_correct"] == 0.0
+        assert score_schema_validation(schema, {"n": 1.5, "i": 2})["type_correct"] == 1.0
+
+    def test_any_of_nullable_and_const(self):
+        schema = {"type": "object", "properties": {
+            "due": {"anyOf": [{"type": "string", "format": "date-time"}, {"type": "null"}]},
+            "kind": {"const": "task"},
+        }}
+        assert score_schema_validation(schema, {"due": None, "kind": "task"})["type_correct"] == 1.0
+        assert score_schema_validation(schema, {"due": "2026-10-16T09:30:00Z"})["type_correct"] == 1.0
+        result = score_schema_validation(schema, {"due": 5, "kind": "bug"})
+        assert result["type_correct"] == 0.0
+        assert result["errors"] == ["$.due: does not match any allowed schema", "$.kind: 'bug' is not 'task'"]
+
+    def test_all_of_and_additional_properties(self):
+        schema = {
+            "type": "object",
+            "allOf": [{"required": ["a"], "properties": {"a": {"type": "string"}}},
+                      {"properties": {"b": {"type": "integer"}}}],
+            "properties": {"meta": {"type": "object", "properties": {"x": {"type": "string"}},
+                                    "additionalProperties": {"type": "integer"}}},
+        }
+        result = score_schema_validation(schema, {"b": 1, "meta": {"x": "y", "extra": "no"}})
+        assert result["required_present"] == 0.0
+        assert result["hallucination_free"] == 1.0
+        assert result["errors"] == ["$.a: required property missing", "$.meta.extra: expected integer, got string"]
+
+    def test_recursive_ref_is_bounded(self):
+        schema = {"type": "object", "properties": {"node": {"$ref": "#/$defs/node"}},
+                  "$defs": {"node": {"type": "object", "properties": {"child": {"$ref": "#/$defs/node"},
+                                                                      "v": {"type": "integer"}}}}}
+        deep = {"v": 1}
+        for _ in range(40):
+            deep = {"v": 1, "child": deep}
+        result = score_schema_validation(schema, {"node": deep})
+        assert result["schema_score"] == 1.0
+
+    def test_oversized_schema_is_not_scored(self):
+        schema = {"type": "object", "properties": {f"p{i}": {"type": "string"} for i in range(201)}}
+        assert score_schema_validation(schema, {"p1": "x"})["schema_score"] is None
+
+
+class TestValidatorCache:
+
+    def test_equal_schemas_share_a_validator(self, monkeypatch):
+        monkeypatch.setattr(tool_eval_scoring, "_schema_validators", type(tool_eval_scoring._schema_validators)())
+        first = compile_schema(SEARCH_SCHEMA)
+        assert isinstance(first, SchemaValidator)
+        assert compile_schema(json.loads(json.dumps(SEARCH_SCHEMA))) is first
+        assert score_schema_validation(first, GOOD) == score_schema_validation(SEARCH_SCHEMA, GOOD)
+        assert compile_schema({}) is None
+
+    def test_lru_eviction(self, monkeypatch):
+        monkeypatch.setattr(tool_eval_scoring, "_schema_validators", type(tool_eval_scoring._schema_validators)())
+        monkeypatch.setattr(tool_eval_scoring, "SCHEMA_VALIDATOR_CACHE_SIZE", 2)
+        a, b, c = ({"type": "object", "properties": {k: {"type": "string"}}} for k in "abc")
+        va = compile_schema(a)
+        compile_schema(b)
+        compile_schema(a)  # a is most recently used
+        compile_schema(c)
+        assert len(tool_eval_scoring._schema_validators) == 2
+        assert compile_schema(a) is va
+
+    def test_compiled_suite_indexes_validators(self):
+        suite = compile_suite("s1", "v1", [{"name": "Search", "parameters_schema": json.dumps(SEARCH_SCHEMA)}], [])
+        validator = suite.validator_for("search", None)
+        assert validator is compile_schema(SEARCH_SCHEMA)
+        assert suite.validator_for(None, "unknown") is None
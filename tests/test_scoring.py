@@ -12,7 +12,7 @@ from app import (
     BUILTIN_PARAM_PRESETS,
     PHASE10_DEFAULTS,
 )
-from routers.helpers import score_schema_validation
+from tool_eval_scoring import score_schema_validation
 
 
 # ===========================================================================
@@ -0,0 +1,158 @@
+"""Tests for the TTFT and inter-chunk idle deadlines in async_run_single.
+
+Covers stalled and never-starting streams (mocked), the server defaults,
+external cancellation still propagating, the request fields and their
+pass-through from job params.
+
+Run: uv run pytest tests/test_stream_deadlines.py -v
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+import routers.helpers as helpers
+from benchmark import RunResult, Target
+from routers.helpers import async_run_single
+from schemas import BenchmarkRequest
+
+HANG_S = 30.0
+
+
+def _target() -> Target:
+    return Target(provider="Local", model_id="openai/m", display_name="M", api_base="http://h.local/v1")
+
+
+def _chunk(content=None, role=None):
+    delta = SimpleNamespace(content=content, reasoning_content=None, role=role)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+
+class _Stream:
+    """Yields ``chunks`` (with an optional hang before chunk ``hang_at``)."""
+
+    def __init__(self, chunks, hang_at=None):
+        self._chunks = list(chunks)
+        self._hang_at = hang_at
+        self._i = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._i == self._hang_at:
+            await asyncio.sleep(HANG_S)
+        if self._i >= len(self._chunks):
+            raise StopAsyncIteration
+        self._i += 1
+        return self._chunks[self._i - 1]
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def _run(stream, **kw):
+    with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+        t0 = time.perf_counter()
+        result = await async_run_single(_target(), "hi", 512, 0.0, **kw)
+    return result, time.perf_counter() - t0
+
+
+class TestIdleDeadline:
+
+    @pytest.mark.asyncio
+    async def test_stall_aborts_and_keeps_partial_metrics(self):
+        stream = _Stream([_chunk("a"), _chunk("b"), _chunk("c"), _chunk("d")], hang_at=3)
+        result, elapsed = await _run(stream, idle_deadline_s=0.1)
+        assert elapsed < 2 and stream.closed
+        assert not result.success
+        assert result.error == "[stalled] No chunk for 0.1s after 3 output chunks"
+        assert result.output_tokens == 3 and result.ttft_ms > 0
+        assert result.total_time_s >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_server_default_applies(self, monkeypatch):
+        monkeypatch.setattr(helpers, "STREAM_IDLE_DEADLINE_S", 0.1)
+        result, elapsed = await _run(_Stream([_chunk("a"), _chunk("b")], hang_at=1))
+        assert result.error.startswith("[stalled]") and elapsed < 2
+
+    @pytest.mark.asyncio
+    async def test_steady_stream_unaffected(self):
+        result, _ = await _run(_Stream([_chunk("a"), _chunk("b")]), ttft_deadline_s=0.5, idle_deadline_s=0.5)
+        assert result.success and result.error == ""
+
+
+class TestTtftDeadline:
+
+    @pytest.mark.asyncio
+    async def test_role_chunk_does_not_count_as_first_token(self):
+        stream = _Stream([_chunk(role="assistant"), _chunk("a")], hang_at=1)
+        result, elapsed = await _run(stream, ttft_deadline_s=0.1)
+        assert elapsed < 2
+        assert result.error == "[ttft_timeout] No token within 0.1s"
+        assert result.output_tokens == 0
+
+    @pytest.mark.asyncio
+    async def test_hung_before_response_headers(self):
+        async def hang(**kwargs):
+            await asyncio.sleep(HANG_S)
+
+        with patch("litellm.acompletion", side_effect=hang):
+            t0 = time.perf_counter()
+            result = await async_run_single(_target(), "hi", 512, 0.0, ttft_deadline_s=0.1)
+        assert time.perf_counter() - t0 < 2
+        assert not result.success and result.error.startswith("[ttft_timeout]")
+
+    @pytest.mark.asyncio
+    async def test_scheduler_queueing_not_counted(self, monkeypatch):
+        async def queued(kwargs, *, on_send=None, **opts):
+            await asyncio.sleep(0.3)  # held by the rate limiter / 429 backoff
+            on_send()
+            return _Stream([_chunk("a"), _chunk("b")])
+
+        monkeypatch.setattr(helpers.scheduler, "acompletion", queued)
+        result = await async_run_single(_target(), "hi", 512, 0.0, ttft_deadline_s=0.2)
+        assert result.success and result.error == ""
+        assert result.ttft_ms < 200
+
+    @pytest.mark.asyncio
+    async def test_zero_disables(self):
+        stream = _Stream([_chunk("a")], hang_at=0)
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=stream):
+            task = asyncio.create_task(async_run_single(_target(), "hi", 512, 0.0, ttft_deadline_s=0))
+            done, _ = await asyncio.wait({task}, timeout=0.3)
+            assert not done  # still waiting: no deadline
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert stream.closed  # external cancellation is not swallowed
+
+
+class TestDeadlineParams:
+
+    def test_request_fields(self):
+        req = BenchmarkRequest(models=["m"], ttft_deadline_s=30, idle_deadline_s=0)
+        assert (req.ttft_deadline_s, req.idle_deadline_s) == (30, 0)
+        assert BenchmarkRequest(models=["m"]).idle_deadline_s is None
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], idle_deadline_s=-1)
+
+    @pytest.mark.asyncio
+    async def test_job_params_passed_through(self, monkeypatch):
+        seen = {}
+
+        async def fake_run_single(*args, **kw):
+            seen.update(kw)
+            return RunResult(target=_target())
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        await job_handlers._measured_run_single(
+            {"ttft_deadline_s": 45.0, "idle_deadline_s": 5.0}, _target(), "hi", 16, 0.0, 0,
+        )
+        assert (seen["ttft_deadline_s"], seen["idle_deadline_s"]) == (45.0, 5.0)
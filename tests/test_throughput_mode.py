@@ -0,0 +1,138 @@
+"""Tests for the max-throughput (parallel streams) benchmark mode.
+
+Covers per-level summaries (aggregate vs per-stream tok/s, fairness), the
+scaling curve, request validation, and the benchmark_handler dispatch for
+mode="throughput".
+
+Run: uv run pytest tests/test_throughput_mode.py -v
+"""
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+from benchmark import RunResult, Target
+from benchmark_modes import _summarize_throughput_level, _throughput_scaling
+from http_clients import POOL_MAX_CONNECTIONS
+from schemas import BenchmarkRequest
+
+
+def _item(output_speed_tps=50.0, output_tokens=100, ttft_ms=80.0, success=True):
+    return {
+        "output_speed_tps": output_speed_tps,
+        "tokens_per_second": output_speed_tps * 0.9,
+        "output_tokens": output_tokens,
+        "ttft_ms": ttft_ms,
+        "success": success,
+    }
+
+
+class TestSummarizeThroughputLevel:
+
+    def test_aggregate_uses_wall_time_not_stream_speeds(self):
+        items = [_item(40.0), _item(60.0), _item(50.0), _item(50.0)]
+        s = _summarize_throughput_level(items, 4, wall_time_s=2.0)
+        assert s["aggregate_output_tps"] == 200.0      # 400 tokens / 2 s
+        assert s["per_stream_tps_mean"] == 50.0
+        assert (s["per_stream_tps_min"], s["per_stream_tps_max"]) == (40.0, 60.0)
+        assert s["stream_tps_spread"] == 20.0
+        assert s["fairness"] == pytest.approx(40 / 60, abs=1e-4)
+
+    def test_failures_excluded_and_speed_falls_back(self):
+        items = [_item(0.0), _item(success=False, output_tokens=0)]
+        s = _summarize_throughput_level(items, 2, wall_time_s=1.0)
+        assert (s["requests"], s["successes"], s["errors"], s["error_rate"]) == (2, 1, 1, 0.5)
+        assert s["per_stream_tps_mean"] == 0.0  # tokens_per_second fallback is 0 too
+        assert s["output_tokens"] == 100
+
+    def test_empty_level(self):
+        s = _summarize_throughput_level([], 8, wall_time_s=0.0)
+        assert s["aggregate_output_tps"] == 0.0 and s["fairness"] == 0.0
+
+
+class TestThroughputScaling:
+
+    def test_efficiency_and_peak(self):
+        levels = [
+            {"concurrency": 1, "aggregate_output_tps": 50.0},
+            {"concurrency": 4, "aggregate_output_tps": 150.0},
+            {"concurrency": 8, "aggregate_output_tps": 140.0},
+        ]
+        peak = _throughput_scaling(levels)
+        assert peak == {"peak_concurrency": 4, "peak_aggregate_tps": 150.0}
+        assert [lv["speedup"] for lv in levels] == [1.0, 3.0, 2.8]
+        assert [lv["scaling_efficiency"] for lv in levels] == [1.0, 0.75, 0.35]
+
+    def test_no_successful_level(self):
+        levels = [{"concurrency": 2, "aggregate_output_tps": 0.0}]
+        assert _throughput_scaling(levels)["peak_concurrency"] is None
+
+
+class TestThroughputRequestSchema:
+
+    def test_defaults(self):
+        req = BenchmarkRequest(models=["m"], mode="throughput")
+        assert req.throughput_concurrency == [1, 2, 4, 8, 16]
+
+    @pytest.mark.parametrize("levels", [[], [0], [1, 300], [1, POOL_MAX_CONNECTIONS + 1]])
+    def test_invalid_levels_rejected(self, levels):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="throughput", throughput_concurrency=levels)
+
+
+class TestThroughputBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_levels_run_streams_in_parallel(self, monkeypatch, benchmark_handler_env):
+        env = benchmark_handler_env
+        target = Target(provider="Local", model_id="lm_studio/m", display_name="M",
+                        provider_key="lm_studio", api_base="http://gpu-box:1234/v1")
+        hosted = Target(provider="OpenAI", model_id="gpt-4o-mini", display_name="Mini",
+                        provider_key="openai", api_base="https://api.openai.com/v1")
+        in_flight = {}
+        peaks = {}
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            in_flight[t.model_id] = in_flight.get(t.model_id, 0) + 1
+            peaks[t.model_id] = max(peaks.get(t.model_id, 0), in_flight[t.model_id])
+            await asyncio.sleep(0.02)
+            in_flight[t.model_id] -= 1
+            return RunResult(target=t, ttft_ms=20.0, total_time_s=0.02, output_tokens=10,
+                             tokens_per_second=500.0, output_speed_tps=500.0)
+
+        async def fake_probe(api_base, api_key=None):
+            env.saved.setdefault("probed", []).append(api_base)
+            return {"available": True, "models": [], "backend_type": "gguf"}
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        monkeypatch.setattr(job_handlers, "probe_lm_studio_backend", fake_probe)
+        env.targets = [target, hosted]
+
+        params = {
+            "user_id": "u1",
+            "models": ["lm_studio/m", "gpt-4o-mini"],
+            "prompt": "hi",
+            "warmup": False,
+            "runs": 2,
+            "mode": "throughput",
+            "throughput_concurrency": [4, 1],
+        }
+        run_id = await job_handlers.benchmark_handler("job-t", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["mode"] == "throughput"
+        assert env.saved["config"]["throughput"] == {"concurrency": [1, 4], "rounds": 2}
+        assert env.saved["probed"] == ["http://gpu-box:1234/v1"]  # hosted API not probed
+        assert len(env.rows) == (1 + 4) * 2 * 2
+        assert peaks == {"lm_studio/m": 4, "gpt-4o-mini": 4}
+
+        curve, hosted_curve = sorted(env.saved["metadata"]["throughput_curves"], key=lambda c: c["backend_type"])
+        assert curve["backend_type"] == "gguf" and hosted_curve["backend_type"] == "unknown"
+        assert [lv["concurrency"] for lv in curve["levels"]] == [1, 4]
+        one, four = curve["levels"]
+        assert (one["requests"], four["requests"]) == (2, 8)
+        assert four["fairness"] == 1.0
+        assert four["aggregate_output_tps"] > one["aggregate_output_tps"]
+        assert curve["peak_concurrency"] == 4
@@ -0,0 +1,226 @@
+"""Tests for the trace-driven replay benchmark mode.
+
+Covers JSONL trace parsing (timestamps, nested bodies, errors), the trace
+shape stats, verbatim messages in async_run_single, per-model summaries,
+request validation, the import endpoint and the benchmark_handler dispatch
+for mode="replay".
+
+Run: uv run pytest tests/test_trace_replay.py -v
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pydantic import ValidationError
+
+import job_handlers
+import prompt_datasets
+from benchmark import RunResult, Target
+from benchmark_modes import _parse_replay_trace, _replay_trace_stats, _summarize_replay
+from routers.helpers import async_run_single
+from schemas import BenchmarkRequest
+
+
+def _line(messages=None, **fields) -> str:
+    return json.dumps({"messages": messages or [{"role": "user", "content": "hi"}], **fields})
+
+
+def _trace(*lines) -> str:
+    return "\n".join(lines) + "\n"
+
+
+class TestParseReplayTrace:
+
+    def test_offsets_sorted_and_relative(self):
+        entries = _parse_replay_trace(_trace(
+            _line(timestamp=1_700_000_002.5, max_tokens=50),
+            _line(timestamp=1_700_000_000.0),
+            "",
+            _line(timestamp=1_700_000_001.0, max_completion_tokens=900),
+        ), default_max_tokens=256)
+        assert [e["offset_s"] for e in entries] == [0.0, 1.0, 2.5]
+        assert [e["index"] for e in entries] == [2, 3, 1]  # index = position in the file
+        assert [e["max_tokens"] for e in entries] == [256, 900, 50]
+
+    def test_iso_timestamps_and_nested_body(self):
+        entries = _parse_replay_trace(_trace(
+            json.dumps({"timestamp": "2026-03-02T10:15:00Z", "body": {"messages": [{"role": "user", "content": "a"}]}}),
+            json.dumps({"timestamp": "2026-03-02T10:15:01.500Z",
+                        "request": {"messages": [{"role": "user", "content": "b"}], "max_tokens": 10}}),
+        ))
+        assert [e["offset_s"] for e in entries] == [0.0, 1.5]
+        assert entries[1]["messages"] == [{"role": "user", "content": "b"}]
+
+    def test_missing_timestamp_arrives_with_previous_line(self):
+        entries = _parse_replay_trace(_trace(_line(arrival_s=0), _line(arrival_s=3), _line(), _line(arrival_s=4)))
+        assert [e["offset_s"] for e in entries] == [0.0, 3.0, 3.0, 4.0]
+
+    @pytest.mark.parametrize("text, error", [
+        ("not json\n", "Line 1: invalid JSON"),
+        (_trace(_line(), json.dumps({"messages": []})), "Line 2: 'messages'"),
+        (_trace(json.dumps({"messages": [{"content": "x"}]})), "needs a 'role'"),
+        (_trace(json.dumps({"prompt": "no messages"})), "Line 1: 'messages'"),
+        (_trace(_line(max_tokens=0)), "max_tokens"),
+        (_trace(_line(timestamp="yesterday")), "unreadable timestamp"),
+        ("\n\n", "no requests"),
+    ])
+    def test_errors_name_the_line(self, text, error):
+        with pytest.raises(ValueError, match=error):
+            _parse_replay_trace(text)
+
+    def test_request_limit(self):
+        with pytest.raises(ValueError, match="more than 2 requests"):
+            _parse_replay_trace(_trace(_line(), _line(), _line()), max_requests=2)
+
+    def test_trace_stats(self):
+        entries = _parse_replay_trace(_trace(
+            _line([{"role": "user", "content": "x" * 100}], arrival_s=0, max_tokens=100),
+            _line([{"role": "user", "content": "x" * 300}], arrival_s=10, max_tokens=300),
+        ))
+        stats = _replay_trace_stats(entries)
+        assert (stats["requests"], stats["duration_s"], stats["avg_rps"]) == (2, 10.0, 0.2)
+        assert stats["prompt_chars_p50"] == 200
+        assert stats["max_tokens_p95"] == round(statistics.quantiles([100, 300], n=20)[18])
+
+
+class TestReplayMessages:
+
+    @pytest.mark.asyncio
+    async def test_messages_sent_verbatim(self):
+        delta = SimpleNamespace(content="ok", reasoning_content=None)
+        chunk = SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+        class _Stream:
+            def __init__(self):
+                self._chunks = [chunk]
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                if not self._chunks:
+                    raise StopAsyncIteration
+                return self._chunks.pop()
+
+        target = Target(provider="Local", model_id="openai/m", display_name="M",
+                        api_base="http://h.local/v1", system_prompt="You are terse.")
+        trace_messages = [{"role": "system", "content": "S"}, {"role": "user", "content": "U"}]
+        with patch("litellm.acompletion", new_callable=AsyncMock, return_value=_Stream()) as mock:
+            result = await async_run_single(target, "", 64, 0.0, context_tokens=0, replay_messages=trace_messages)
+        assert result.success
+        assert mock.call_args.kwargs["messages"] == trace_messages
+
+
+class TestSummarizeReplay:
+
+    def test_percentiles_cost_and_trace_order(self):
+        items = [
+            {"replay_index": 2, "replay_offset_s": 1.0, "success": True, "ttft_ms": 200.0, "total_time_s": 2.0,
+             "input_tokens": 100, "output_tokens": 50, "cost": 0.002},
+            {"replay_index": 1, "replay_offset_s": 0.0, "success": True, "ttft_ms": 100.0, "total_time_s": 1.0,
+             "input_tokens": 80, "output_tokens": 30, "cost": 0.001},
+            {"replay_index": 3, "replay_offset_s": 1.5, "success": False, "error": "[timeout] x",
+             "total_time_s": 0.0},
+        ]
+        s = _summarize_replay(items, speed=2.0, trace_duration_s=3.0, wall_time_s=4.0)
+        assert (s["requests"], s["successes"], s["errors"]) == (3, 2, 1)
+        assert s["latency_p50_ms"] == 1500.0 and s["ttft_p50_ms"] == 150.0
+        assert s["total_cost"] == 0.003 and s["avg_cost_per_request"] == 0.0015
+        assert s["aggregate_output_tps"] == 20.0
+        assert [r["index"] for r in s["per_request"]] == [1, 2, 3]
+        assert s["per_request"][2]["error"] == "[timeout] x"
+
+
+class TestReplayRequest:
+
+    def test_replay_requires_trace(self):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="replay")
+        req = BenchmarkRequest(models=["m"], mode="replay", replay_trace_id="t1", replay_speed=4)
+        assert req.replay_speed == 4
+
+    def test_speed_must_be_positive(self):
+        with pytest.raises(ValidationError):
+            BenchmarkRequest(models=["m"], mode="replay", replay_trace_id="t1", replay_speed=0)
+
+    @pytest.mark.asyncio
+    async def test_import_stores_trace(self, app_client, auth_headers, tmp_path, monkeypatch):
+        monkeypatch.setattr(prompt_datasets, "DATASETS_DIR", tmp_path)
+        trace = _trace(_line(arrival_s=0), _line(arrival_s=2, max_tokens=64))
+        resp = await app_client.post(
+            "/api/benchmark/replay/import", json={"trace": trace, "name": "prod"}, headers=auth_headers,
+        )
+        assert resp.status_code == 200
+        row = resp.json()
+        assert row["name"] == "prod" and row["request_count"] == 2
+        assert row["stats"]["requests"] == 2 and row["stats"]["duration_s"] == 2.0
+        [path] = tmp_path.glob(f"*/{row['id']}.trace.json")
+        assert [e["max_tokens"] for e in prompt_datasets.read_replay_trace(path)] == [512, 64]
+
+        listed = await app_client.get("/api/benchmark/replay/traces", headers=auth_headers)
+        assert row["id"] in [t["id"] for t in listed.json()["traces"]]
+        deleted = await app_client.delete(f"/api/benchmark/replay/traces/{row['id']}", headers=auth_headers)
+        assert deleted.status_code == 200 and not path.exists()
+
+        bad = await app_client.post("/api/benchmark/replay/import", json={"trace": "{"}, headers=auth_headers)
+        assert bad.status_code == 400 and "Line 1" in bad.json()["error"]
+
+
+class TestReplayBenchmarkHandler:
+
+    @pytest.mark.asyncio
+    async def test_replays_trace_with_scaled_timing(self, monkeypatch, tmp_path, benchmark_handler_env):
+        env = benchmark_handler_env
+        target = Target(provider="Local", model_id="openai/m", display_name="M", provider_key="local")
+        calls = []
+
+        async def fake_run_single(t, prompt, max_tokens, temperature, context_tokens=0, **kw):
+            calls.append((time.perf_counter(), max_tokens, kw.get("replay_messages")))
+            return RunResult(target=t, ttft_ms=20.0, total_time_s=0.05, output_tokens=max_tokens,
+                             input_tokens=10, tokens_per_second=100.0, cost=0.001)
+
+        monkeypatch.setattr(job_handlers, "async_run_single", fake_run_single)
+        env.targets = [target]
+
+        entries = _parse_replay_trace(_trace(
+            _line([{"role": "user", "content": "first"}], arrival_s=0, max_tokens=10),
+            _line([{"role": "user", "content": "second"}], arrival_s=0.6, max_tokens=20),
+        ))
+        monkeypatch.setattr(prompt_datasets, "DATASETS_DIR", tmp_path)
+        prompt_datasets.write_replay_trace(entries, prompt_datasets.replay_trace_path("u1", "tr1"))
+
+        async def fake_get_trace(trace_id, user_id):
+            return {"id": trace_id, "name": "prod", "request_count": 2} if trace_id == "tr1" else None
+
+        monkeypatch.setattr(job_handlers.db, "get_replay_trace", fake_get_trace)
+        params = {
+            "user_id": "u1",
+            "models": ["openai/m"],
+            "mode": "replay",
+            "replay_trace_id": "tr1",
+            "replay_speed": 2.0,
+        }
+        run_id = await job_handlers.benchmark_handler("job-r", params, asyncio.Event(), env.progress_cb)
+
+        assert run_id == "run-1"
+        assert env.saved["config"]["mode"] == "replay"
+        assert env.saved["config"]["replay"]["requests"] == 2 and env.saved["config"]["replay"]["speed"] == 2.0
+        assert env.saved["config"]["replay"]["trace_id"] == "tr1"
+        assert env.saved["prompt"].startswith("Trace replay: 2 requests")
+        warmup, first, second = calls
+        assert warmup[1] == job_handlers.REPLAY_WARMUP_MAX_TOKENS
+        assert (first[1], second[1]) == (10, 20)
+        assert second[2] == [{"role": "user", "content": "second"}]
+        assert 0.25 < second[0] - first[0] < 0.6  # 0.6 s gap replayed at 2x
+        assert len(env.rows) == 2
+
+        [summary] = env.saved["metadata"]["replay_summaries"]
+        assert summary["requests"] == 2 and summary["errors"] == 0
+        assert summary["total_cost"] == 0.002
+        assert [r["index"] for r in summary["per_request"]] == [1, 2]
+        assert summary["per_request"][1]["offset_s"] == 0.6
@@ -0,0 +1,608 @@
+"""Schema validation, compiled tool suites and rescoring for tool evals.
+
+Tool-call parameters are scored against the tool's JSON Schema by a
+SchemaValidator compiled once per distinct schema and kept in an LRU.
+A job's suite (tool definitions and test cases) is likewise parsed once
+into a CompiledSuite and reused by every case x model x combo, and across
+jobs while the suite is unchanged. Rescoring re-applies the current
+scoring to stored case results without calling the model again.
+
+The per-call scoring primitives (tool selection, params, overall score,
+error taxonomy) stay in routers.helpers; the eval engine
+(routers.tool_eval) and the job handlers use both.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import db
+from routers.helpers import (
+    _parse_expected_tool,
+    classify_error_type,
+    classify_format_compliance,
+    compute_overall_score,
+    score_abstention,
+    score_params,
+    score_tool_selection,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Schema validation
+# ---------------------------------------------------------------------------
+
+# JSON type map for schema validation
+_JSON_TYPE_MAP: dict[str, type | tuple] = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+    "null": type(None),
+}
+
+# Schema validation limits -- guard against oversized or recursive schemas/params
+SCHEMA_MAX_KEYS = 200  # properties/required per object; larger top-level schemas/params aren't scored
+SCHEMA_MAX_ITEMS = 200  # array items checked per array
+SCHEMA_MAX_DEPTH = 16  # nesting compiled; deeper subschemas are unconstrained
+SCHEMA_MAX_NODES = 2000  # compiled nodes per schema (bounds recursive $ref expansion)
+SCHEMA_MAX_ERRORS = 20  # per-path errors reported per call
+SCHEMA_VALIDATOR_CACHE_SIZE = 512
+
+_SCHEMA_FORMATS = {
+    "email": re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$"),
+    "uri": re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:\S+$"),
+    "uuid": re.compile(r"^[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$"),
+    "ipv4": re.compile(r"^(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)$"),
+    "date": re.compile(r"^\d{4}-\d{2}-\d{2}$"),
+    "time": re.compile(r"^\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?$"),
+    "date-time": re.compile(r"^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:[Zz]|[+-]\d{2}:?\d{2})?$"),
+}
+_NULL_SCHEMA_SCORES = {"required_present": None, "type_correct": None, "hallucination_free": None, "schema_score": None}
+
+
+def _json_type_name(value) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    for name in ("integer", "number", "string", "array", "object", "null"):
+        if isinstance(value, _JSON_TYPE_MAP[name]):
+            return name
+    return type(value).__name__
+
+
+def _type_matches(value, expected_type: str) -> bool:
+    python_type = _JSON_TYPE_MAP.get(expected_type)
+    if python_type is None:
+        return True  # Unknown type = assume correct
+    # Booleans are ints in Python, but not integers/numbers in the JSON Schema sense
+    if isinstance(value, bool) and expected_type in ("integer", "number"):
+        return False
+    return isinstance(value, python_type)
+
+
+class _SchemaTally:
+    """Counts accumulated while validating one set of params."""
+    __slots__ = ("required", "present", "values", "values_ok", "keys", "extra", "errors")
+
+    def __init__(self):
+        self.required = self.present = self.values = self.values_ok = self.keys = self.extra = 0
+        self.errors: list[str] = []
+
+    def error(self, path: str, message: str):
+        if len(self.errors) < SCHEMA_MAX_ERRORS:
+            self.errors.append(f"{path}: {message}")
+
+    def merge_branch(self, other: "_SchemaTally"):
+        """Fold in a matching anyOf/oneOf branch (its root value is already counted)."""
+        self.required += other.required
+        self.present += other.present
+        self.values += other.values - 1
+        self.values_ok += other.values_ok - 1
+        self.keys += other.keys
+        self.extra += other.extra
+
+
+class _SchemaCompiler:
+    """Turns a JSON Schema into nested closures, resolving local $refs once."""
+
+    def __init__(self, root: dict):
+        self.root = root
+        self.nodes = 0
+
+    def resolve(self, schema: dict) -> dict:
+        for _ in range(SCHEMA_MAX_DEPTH):
+            ref = schema.get("$ref")
+            if not isinstance(ref, str) or not ref.startswith("#"):
+                break
+            target = self.root
+            for part in ref.lstrip("#").strip("/").split("/"):
+                if not part:
+                    continue
+                target = target.get(part.replace("~1", "/").replace("~0", "~")) if isinstance(target, dict) else None
+            if not isinstance(target, dict):
+                break
+            schema = {**target, **{k: v for k, v in schema.items() if k != "$ref"}}
+        all_of = schema.get("allOf")
+        if isinstance(all_of, list):
+            # Shallow-merge allOf parts: union properties/required, first value wins otherwise
+            merged = {k: v for k, v in schema.items() if k != "allOf"}
+            for part in all_of:
+                if not isinstance(part, dict):
+                    continue
+                part = self.resolve(part)
+                merged["properties"] = {**(part.get("properties") or {}), **(merged.get("properties") or {})}
+                merged["required"] = list(dict.fromkeys([*(merged.get("required") or []), *(part.get("required") or [])]))
+                for k, v in part.items():
+                    merged.setdefault(k, v)
+            schema = merged
+        return schema
+
+    def node(self, schema, depth: int):
+        """Validator for one value: counts it, checks type/constraints, then descends."""
+        self.nodes += 1
+        if not isinstance(schema, dict) or depth > SCHEMA_MAX_DEPTH or self.nodes > SCHEMA_MAX_NODES:
+            return _accept_value
+        schema = self.resolve(schema)
+        raw_type = schema.get("type")
+        types = tuple(t for t in ([raw_type] if isinstance(raw_type, str) else raw_type or []) if isinstance(t, str))
+        checks = self._constraints(schema)
+        branches = schema.get("anyOf") or schema.get("oneOf")
+        branches = [self.node(b, depth + 1) for b in branches] if isinstance(branches, list) else []
+        body = self.object_body(schema, depth) if (
+            "properties" in schema or "required" in schema or isinstance(schema.get("additionalProperties"), dict)
+        ) else None
+        items = self.node(schema["items"], depth + 1) if isinstance(schema.get("items"), dict) else None
+
+        def check(value, path: str, tally: _SchemaTally):
+            tally.values += 1
+            if types and not any(_type_matches(value, t) for t in types):
+                tally.error(path, f"expected {' | '.join(types)}, got {_json_type_name(value)}")
+                return
+            for constraint in checks:
+                message = constraint(value)
+                if message:
+                    tally.error(path, message)
+                    return
+            if branches:
+                for branch in branches:
+                    scratch = _SchemaTally()
+                    branch(value, path, scratch)
+                    if not scratch.errors and scratch.values_ok == scratch.values:
+                        tally.merge_branch(scratch)
+                        break
+                else:
+                    tally.error(path, "does not match any allowed schema")
+                    return
+            tally.values_ok += 1
+            if body is not None and isinstance(value, dict):
+                body(value, path, tally)
+            elif items is not None and isinstance(value, list):
+                for i, item in enumerate(value[:SCHEMA_MAX_ITEMS]):
+                    items(item, f"{path}[{i}]", tally)
+
+        return check
+
+    def object_body(self, schema: dict, depth: int):
+        """Validator for an object's keys: required presence, per-property checks, extra keys."""
+        properties = schema.get("properties") if isinstance(schema.get("properties"), dict) else {}
+        required = tuple(r for r in schema.get("required") or [] if isinstance(r, str))
+        props = {name: self.node(sub, depth + 1) for name, sub in list(properties.items())[:SCHEMA_MAX_KEYS]}
+        additional = schema.get("additionalProperties")
+        extra_node = self.node(additional, depth + 1) if isinstance(additional, dict) else None
+        # Keys outside `properties` count as hallucinated unless the schema allows them
+        # explicitly; without `properties` there is nothing to compare against.
+        extras_allowed = additional is True or extra_node is not None or not props
+
+        def body(obj: dict, path: str, tally: _SchemaTally):
+            for name in required:
+                tally.required += 1
+                if name in obj:
+                    tally.present += 1
+                else:
+                    tally.error(f"{path}.{name}", "required property missing")
+            if props:
+                tally.keys += min(len(obj), SCHEMA_MAX_KEYS)
+            for key in list(obj)[:SCHEMA_MAX_KEYS]:
+                sub = props.get(key, extra_node)
+                if sub is not None:
+                    sub(obj[key], f"{path}.{key}", tally)
+                elif not extras_allowed:
+                    tally.extra += 1
+                    tally.error(f"{path}.{key}", "not in schema")
+
+        return body
+
+    @staticmethod
+    def _constraints(schema: dict) -> list:
+        """Value-level checks (enum, const, format, bounds); each returns an error message or None."""
+        checks = []
+        if isinstance(schema.get("enum"), list):
+            allowed = schema["enum"]
+            checks.append(lambda v: None if v in allowed else f"{v!r} is not one of {allowed!r}")
+        if "const" in schema:
+            const = schema["const"]
+            checks.append(lambda v: None if v == const else f"{v!r} is not {const!r}")
+        fmt = _SCHEMA_FORMATS.get(schema.get("format"))
+        if fmt is not None:
+            name = schema["format"]
+            checks.append(lambda v: None if not isinstance(v, str) or fmt.match(v) else f"{v!r} is not a valid {name}")
+        if isinstance(schema.get("pattern"), str):
+            try:
+                pattern = re.compile(schema["pattern"])
+            except re.error:
+                pattern = None
+            if pattern is not None:
+                checks.append(lambda v: None if not isinstance(v, str) or pattern.search(v)
+                              else f"{v!r} does not match {pattern.pattern!r}")
+        for key, op, label in (
+            ("minimum", lambda v, b: v >= b, ">="), ("maximum", lambda v, b: v <= b, "<="),
+            ("exclusiveMinimum", lambda v, b: v > b, ">"), ("exclusiveMaximum", lambda v, b: v < b, "<"),
+        ):
+            bound = schema.get(key)
+            if isinstance(bound, (int, float)) and not isinstance(bound, bool):
+                checks.append(lambda v, b=bound, op=op, label=label: None if (
+                    not isinstance(v, (int, float)) or isinstance(v, bool) or op(v, b)
+                ) else f"{v!r} is not {label} {b!r}")
+        for key, kind, op, label in (
+            ("minLength", str, lambda n, b: n >= b, "at least"), ("maxLength", str, lambda n, b: n <= b, "at most"),
+            ("minItems", list, lambda n, b: n >= b, "at least"), ("maxItems", list, lambda n, b: n <= b, "at most"),
+        ):
+            bound = schema.get(key)
+            if isinstance(bound, int) and not isinstance(bound, bool):
+                unit = "characters" if kind is str else "items"
+                checks.append(lambda v, b=bound, kind=kind, op=op, label=label, unit=unit: None if (
+                    not isinstance(v, kind) or op(len(v), b)
+                ) else f"expected {label} {b} {unit}, got {len(v)}")
+        return checks
+
+
+def _accept_value(value, path: str, tally: _SchemaTally):
+    """Validator for an unconstrained value."""
+    tally.values += 1
+    tally.values_ok += 1
+
+
+class SchemaValidator:
+    """A tool's ``parameters`` schema compiled once into nested validators.
+
+    Build through compile_schema(), which caches validators by schema hash.
+    """
+    __slots__ = ("schema_hash", "oversized", "_body")
+
+    def __init__(self, schema: dict, schema_hash: str):
+        self.schema_hash = schema_hash
+        self.oversized = (
+            len(schema.get("properties") or {}) > SCHEMA_MAX_KEYS
+            or len(schema.get("required") or []) > SCHEMA_MAX_KEYS
+        )
+        compiler = _SchemaCompiler(schema)
+        self._body = None if self.oversized else compiler.object_body(compiler.resolve(schema), 0)
+
+    def score(self, actual_params: dict | None) -> dict:
+        """Tier 2 sub-scores plus per-path ``errors`` for one set of params."""
+        actual = actual_params if isinstance(actual_params, dict) else {}
+        if self._body is None or len(actual) > SCHEMA_MAX_KEYS:
+            return dict(_NULL_SCHEMA_SCORES, errors=[])
+        tally = _SchemaTally()
+        self._body(actual, "$", tally)
+        # Nested objects and array items add to the same counts as top-level params
+        required_present = tally.present / tally.required if tally.required else 1.0
+        type_correct = tally.values_ok / tally.values if tally.values else 1.0
+        hallucination_free = max(0.0, 1.0 - tally.extra / tally.keys) if tally.keys else 1.0
+        schema_score = 0.5 * required_present + 0.3 * type_correct + 0.2 * hallucination_free
+        return {
+            "required_present": round(required_present, 4),
+            "type_correct": round(type_correct, 4),
+            "hallucination_free": round(hallucination_free, 4),
+            "schema_score": round(schema_score, 4),
+            "errors": tally.errors,
+        }
+
+
+_schema_validators: OrderedDict[str, SchemaValidator] = OrderedDict()
+
+
+def compile_schema(parameters_schema: dict) -> SchemaValidator | None:
+    """Compiled validator for a parameters schema, cached by its content hash.
+
+    Returns None for an empty or non-dict schema (nothing to validate against).
+    """
+    if not parameters_schema or not isinstance(parameters_schema, dict):
+        return None
+    key = hashlib.sha256(json.dumps(parameters_schema, sort_keys=True, default=str).encode()).hexdigest()
+    validator = _schema_validators.get(key)
+    if validator is not None:
+        _schema_validators.move_to_end(key)
+        return validator
+    validator = SchemaValidator(parameters_schema, key)
+    _schema_validators[key] = validator
+    while len(_schema_validators) > SCHEMA_VALIDATOR_CACHE_SIZE:
+        _schema_validators.popitem(last=False)
+    return validator
+
+
+def score_schema_validation(parameters_schema: dict | SchemaValidator, actual_params: dict | None) -> dict:
+    """Score Tier 2: schema validation of actual LLM parameters against tool schema.
+
+    Validates nested objects, arrays, enums, consts, formats and bounds, not
+    just top-level types. Every value checked (at any depth) counts towards
+    type_correct, every required key of every present object towards
+    required_present, and unknown keys of every object towards
+    hallucination_free.
+
+    Args:
+        parameters_schema: The tool definition's JSON Schema (e.g. {"type": "object", "properties": {...}, "required": [...]}),
+            or a validator already compiled from it (see compile_schema / CompiledSuite.validator_for)
+        actual_params: The parameters the LLM actually called with (dict or None)
+
+    Returns:
+        dict with keys: required_present, type_correct, hallucination_free, schema_score,
+        and errors (per-path messages such as "$.filter.status: 'x' is not one of [...]")
+    """
+    validator = parameters_schema if isinstance(parameters_schema, SchemaValidator) else compile_schema(parameters_schema)
+    if validator is None:
+        return dict(_NULL_SCHEMA_SCORES, errors=[])
+    return validator.score(actual_params)
+
+
+# ---------------------------------------------------------------------------
+# Compiled tool suites
+# ---------------------------------------------------------------------------
+
+COMPILED_SUITE_CACHE_SIZE = int(os.environ.get("COMPILED_SUITE_CACHE_SIZE", "32"))
+
+
+def _tool_defs_to_openai(tool_defs: list[dict]) -> list[dict]:
+    """Convert tool_definitions DB rows to the OpenAI function-calling format
+    expected by LiteLLM and the eval engine.
+
+    Each DB row has: name, description, parameters_schema (JSON string).
+    Returns: [{"type": "function", "function": {"name": ..., "description": ..., "parameters": ...}}, ...]
+    """
+    tools = []
+    for td in tool_defs:
+        params_schema = td.get("parameters_schema", "{}")
+        if isinstance(params_schema, str):
+            try:
+                params_schema = json.loads(params_schema)
+            except (json.JSONDecodeError, TypeError):
+                params_schema = {}
+        tools.append({
+            "type": "function",
+            "function": {
+                "name": td["name"],
+                "description": td.get("description", ""),
+                "parameters": params_schema,
+            },
+        })
+    return tools
+
+
+def _parse_case_expectations(test_case: dict) -> tuple:
+    """(expected_tool, expected_params, scoring_config) for a test case.
+
+    Compiled cases carry them pre-parsed; raw DB rows are parsed here.
+    """
+    if "_expected_params" in test_case:
+        return test_case["_expected_tool"], test_case["_expected_params"], test_case["_scoring_config"]
+    expected_tool = _parse_expected_tool(test_case.get("expected_tool"))
+    expected_params = test_case.get("expected_params")
+    if isinstance(expected_params, str):
+        try:
+            expected_params = json.loads(expected_params)
+        except (json.JSONDecodeError, TypeError):
+            logger.debug("Failed to parse expected_params for test case %s", test_case.get("id"))
+            expected_params = None
+    scoring_config = None
+    sc_raw = test_case.get("scoring_config_json")
+    if sc_raw:
+        try:
+            scoring_config = json.loads(sc_raw) if isinstance(sc_raw, str) else sc_raw
+        except (json.JSONDecodeError, TypeError):
+            logger.debug("Failed to parse scoring_config_json for test case %s", test_case.get("id"))
+    return expected_tool, expected_params, scoring_config
+
+
+def _compile_case(case: dict) -> dict:
+    """Copy of a test case row with its JSON columns parsed into underscore keys.
+
+    ``_mt_config`` is set only for multi-turn cases; ``_mt_config_invalid``
+    flags a multi_turn_config that could not be parsed (run as single-turn).
+    """
+    expected_tool, expected_params, scoring_config = _parse_case_expectations(case)
+    mt_config, mt_invalid = None, False
+    raw_mt = case.get("multi_turn_config")
+    if raw_mt:
+        try:
+            mt_config = json.loads(raw_mt) if isinstance(raw_mt, str) else raw_mt
+        except (json.JSONDecodeError, TypeError):
+            mt_invalid = True
+    if not (isinstance(mt_config, dict) and mt_config.get("multi_turn")):
+        mt_config = None
+    return {
+        **case,
+        "_expected_tool": expected_tool,
+        "_expected_params": expected_params,
+        "_scoring_config": scoring_config,
+        "_mt_config": mt_config,
+        "_mt_config_invalid": mt_invalid,
+    }
+
+
+@dataclass(frozen=True)
+class CompiledSuite:
+    """A tool suite parsed once and shared by every case x model x combo of a job.
+
+    Cases are compiled copies of the DB rows (see _compile_case); treat them
+    and the tools as read-only, since cached instances are shared across jobs.
+    """
+    suite_id: str
+    version: str | None  # tool_suites.updated_at the suite was compiled at
+    tools: list[dict]
+    cases: list[dict]
+    tool_names: frozenset[str]  # lowercase tool names
+    validators: dict[str, SchemaValidator | None]  # lowercase tool name -> compiled schema
+
+    def validator_for(self, expected_tool, actual_tool: str | None) -> SchemaValidator | None:
+        """Compiled validator for the schema _find_parameters_schema would pick."""
+        name = (expected_tool if isinstance(expected_tool, str) else None) or actual_tool
+        return self.validators.get(name.lower()) if name else None
+
+
+def compile_suite(suite_id: str, version: str | None, tool_defs: list[dict], cases: list[dict]) -> CompiledSuite:
+    """Parse a suite's tool definitions and test cases into a CompiledSuite."""
+    tools = _tool_defs_to_openai(tool_defs)
+    schemas: dict[str, dict] = {}
+    for t in tools:
+        schemas.setdefault(t["function"]["name"].lower(), t["function"]["parameters"])
+    return CompiledSuite(
+        suite_id=suite_id,
+        version=version,
+        tools=tools,
+        cases=[_compile_case(c) for c in cases],
+        tool_names=frozenset(schemas),
+        validators={name: compile_schema(schema) for name, schema in schemas.items()},
+    )
+
+
+_compiled_suites: OrderedDict[str, CompiledSuite] = OrderedDict()
+
+
+async def get_compiled_suite(suite_id: str, user_id: str) -> CompiledSuite | None:
+    """Compiled suite for ``suite_id``, from the LRU when the suite is unchanged.
+
+    Entries are keyed by suite id and checked against tool_suites.updated_at,
+    which every suite, tool definition and test case write bumps. The stamp
+    is read scoped to ``user_id``, so None is returned when the suite does
+    not exist or the user does not own it, cached or not.
+    """
+    version = await db.get_tool_suite_version(suite_id, user_id)
+    if version is None:
+        return None
+    cached = _compiled_suites.get(suite_id)
+    if cached is not None and cached.version == version:
+        _compiled_suites.move_to_end(suite_id)
+        return cached
+    compiled = compile_suite(
+        suite_id, version, await db.get_tool_definitions(suite_id), await db.get_test_cases(suite_id),
+    )
+    _compiled_suites[suite_id] = compiled
+    _compiled_suites.move_to_end(suite_id)
+    while len(_compiled_suites) > COMPILED_SUITE_CACHE_SIZE:
+        _compiled_suites.popitem(last=False)
+    return compiled
+
+
+# ---------------------------------------------------------------------------
+# Rescoring stored case results
+# ---------------------------------------------------------------------------
+
+RESCORE_PAGE_SIZE = 500  # case results read and written per batch
+RESCORE_FIELDS = (
+    "tool_selection_score", "param_accuracy", "overall_score", "irrelevance_score",
+    "schema_score", "required_present", "type_correct", "hallucination_free", "schema_errors",
+    "format_compliance", "error_type",
+)
+
+
+def _find_parameters_schema(tools: list[dict], expected_tool, actual_tool: str | None) -> dict | None:
+    """JSON schema of the tool a call is validated against: the expected tool, else the one called."""
+    name = (expected_tool if isinstance(expected_tool, str) else None) or actual_tool
+    if not name:
+        return None
+    for t in tools:
+        if isinstance(t, dict) and t.get("type") == "function":
+            fn = t.get("function", {})
+            if fn.get("name", "").lower() == name.lower():
+                return fn.get("parameters")
+    return None
+
+
+def _response_format_flags(raw_response: dict | None) -> tuple[bool, bool, bool]:
+    """(native tool_calls, tool name was a JSON blob, arguments unparseable) from a captured response."""
+    try:
+        tool_calls = raw_response["choices"][0]["message"]["tool_calls"] or []
+    except (KeyError, IndexError, TypeError):
+        return False, False, False
+    if not tool_calls:
+        return False, False, False
+    fn = tool_calls[0].get("function") or {}
+    name_was_blob = str(fn.get("name") or "").strip().startswith("{")
+    try:
+        json.loads(fn.get("arguments"))
+        parse_failed = False
+    except (json.JSONDecodeError, TypeError):
+        parse_failed = True
+    return True, name_was_blob, parse_failed
+
+
+def _rescore_case_result(row: dict, case: dict | None, suite: CompiledSuite) -> dict | None:
+    """Re-apply single-turn scoring to one stored case result, without calling the model.
+
+    Uses the stored actual_tool / actual_params / raw_response with the
+    compiled case's current expectations and scoring_config_json, the suite's
+    current tool schemas and the current overall-score weights. Returns the
+    new RESCORE_FIELDS plus "id", or None when the row can't be rescored: the
+    call failed, the test case is gone, or the case is multi-turn (the tool
+    chain is not stored).
+    """
+    if not row.get("success") or case is None or case["_mt_config"]:
+        return None
+
+    expected_tool, expected_params, scoring_config = _parse_case_expectations(case)
+    raw_sct = case.get("should_call_tool", 1)
+    should_call_tool = bool(raw_sct) if raw_sct is not None else True
+    actual_tool = row.get("actual_tool")
+    actual_params = row.get("actual_params")
+    if isinstance(actual_params, str):
+        try:
+            actual_params = json.loads(actual_params)
+        except (json.JSONDecodeError, TypeError):
+            actual_params = None
+    try:
+        raw_response = json.loads(row["raw_response"]) if row.get("raw_response") else None
+    except (json.JSONDecodeError, TypeError):
+        raw_response = None
+    native, name_was_blob, parse_failed = _response_format_flags(raw_response)
+
+    tool_score = score_tool_selection(expected_tool, actual_tool)
+    param_score = score_params(expected_params, actual_params, scoring_config=scoring_config)
+    schema = score_schema_validation(suite.validator_for(expected_tool, actual_tool) or {}, actual_params)
+    overall = compute_overall_score(tool_score, param_score, schema["schema_score"])
+    return {
+        "id": row["id"],
+        "tool_selection_score": tool_score,
+        "param_accuracy": param_score,
+        "overall_score": overall,
+        "irrelevance_score": score_abstention(should_call_tool, actual_tool),
+        "schema_score": schema["schema_score"],
+        "required_present": schema["required_present"],
+        "type_correct": schema["type_correct"],
+        "hallucination_free": schema["hallucination_free"],
+        "schema_errors": json.dumps(schema["errors"]) if schema["errors"] else None,
+        "format_compliance": classify_format_compliance(
+            raw_response_had_tool_calls=native,
+            tool_name_was_json_blob=name_was_blob,
+            params_parse_failed=parse_failed,
+            actual_tool=actual_tool,
+            expected_tool=expected_tool,
+        ),
+        "error_type": classify_error_type(
+            success=True,
+            actual_tool=actual_tool,
+            actual_params=actual_params,
+            expected_tool=expected_tool,
+            expected_params=expected_params,
+            tool_names_in_suite=suite.tool_names,
+            overall_score=overall,
+            params_parse_failed=parse_failed,
+        ),
+    }